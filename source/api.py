@@ -5,8 +5,8 @@ FastAPI-based REST API for accessing the AGKI epigraphic corpus.
 Run with: uvicorn source.api:app --reload --port 8000
 """
 
-import json
 import os
+from dataclasses import asdict
 from pathlib import Path
 from typing import Optional, List
 from fastapi import FastAPI, HTTPException, Query
@@ -14,6 +14,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from .records import TaggedRecord, load_tagged_dir
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AGKI Epigraphy API",
@@ -34,7 +36,8 @@ app.add_middleware(
 
 # Data storage
 DATA_DIR = Path(__file__).parent.parent / "data" / "output"
-INSCRIPTIONS_CACHE = {}
+INSCRIPTIONS_CACHE: dict = {}  # phi_id -> TaggedRecord (compact slotted records, see records.py)
+CORPUS = None  # Normalized input snapshot (see source/corpus.py), opened lazily
 
 
 # Pydantic models for API responses
@@ -45,6 +48,9 @@ class Theme(BaseModel):
     confidence: Optional[float] = None
     quote: Optional[str] = None
     is_ambiguous: Optional[bool] = False
+    quote_start: Optional[int] = None
+    quote_end: Optional[int] = None
+    quote_status: Optional[str] = None
 
 
 class Person(BaseModel):
@@ -52,6 +58,8 @@ class Person(BaseModel):
     role: Optional[str] = None
     uri: Optional[str] = None
     confidence: Optional[float] = None
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
 
 
 class Place(BaseModel):
@@ -59,6 +67,8 @@ class Place(BaseModel):
     type: Optional[str] = None
     uri: Optional[str] = None
     confidence: Optional[float] = None
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
 
 
 class Deity(BaseModel):
@@ -66,6 +76,8 @@ class Deity(BaseModel):
     epithet: Optional[str] = None
     uri: Optional[str] = None
     confidence: Optional[float] = None
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
 
 
 class Entities(BaseModel):
@@ -125,27 +137,32 @@ def load_all_inscriptions():
     if not DATA_DIR.exists():
         return {}
 
-    for json_file in DATA_DIR.glob("*.json"):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                phi_id = data.get('phi_id')
-                if phi_id:
-                    INSCRIPTIONS_CACHE[phi_id] = data
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading {json_file}: {e}")
+    INSCRIPTIONS_CACHE.update(load_tagged_dir(DATA_DIR))
 
     return INSCRIPTIONS_CACHE
 
 
-def get_region_from_provenance(provenance: list) -> Optional[str]:
+def get_corpus():
+    """Opens the normalized corpus snapshot (None if it has not been built)."""
+    global CORPUS
+
+    if CORPUS is None:
+        from .corpus import CorpusSnapshot
+        try:
+            CORPUS = CorpusSnapshot()
+        except FileNotFoundError:
+            return None
+    return CORPUS
+
+
+def get_region_from_provenance(record: TaggedRecord) -> Optional[str]:
     """Extract region from provenance data."""
-    if not provenance:
-        return None
-    for p in provenance:
-        if p.get('type') == 'Region':
-            return p.get('name')
-    return provenance[0].get('name') if provenance else None
+    return record.region
+
+
+def _mentions(entity, query_lower: str) -> bool:
+    """Substring match on the spelling in the text or the resolved canonical name."""
+    return query_lower in entity.name.lower() or query_lower in (entity.canonical or '').lower()
 
 
 @app.on_event("startup")
@@ -164,6 +181,7 @@ async def root():
         "endpoints": {
             "inscriptions": "/inscriptions",
             "inscription": "/inscriptions/{phi_id}",
+            "inscription_text": "/inscriptions/{phi_id}/text",
             "search": "/search",
             "stats": "/stats",
             "themes": "/themes",
@@ -189,36 +207,36 @@ async def list_inscriptions(
     for phi_id, data in inscriptions.items():
         # Region filter
         if region:
-            item_region = get_region_from_provenance(data.get('provenance', []))
+            item_region = get_region_from_provenance(data)
             if item_region != region:
                 continue
 
         # Completeness filter
-        if completeness and data.get('completeness') != completeness:
+        if completeness and data.completeness != completeness:
             continue
 
         # Date filters
         if date_min is not None:
-            item_date = data.get('date_min')
+            item_date = data.date_min
             if item_date is None or item_date < date_min:
                 continue
 
         if date_max is not None:
-            item_date = data.get('date_max')
+            item_date = data.date_max
             if item_date is None or item_date > date_max:
                 continue
 
         # Build summary
-        entities = data.get('entities', {})
+        entities = data.entities
         filtered.append(InscriptionSummary(
             phi_id=phi_id,
-            theme_count=len(data.get('themes', [])),
-            person_count=len(entities.get('persons', [])),
-            place_count=len(entities.get('places', [])),
-            deity_count=len(entities.get('deities', [])),
-            completeness=data.get('completeness'),
-            date_str=data.get('date_str'),
-            region=get_region_from_provenance(data.get('provenance', []))
+            theme_count=len(data.themes),
+            person_count=len(entities.persons),
+            place_count=len(entities.places),
+            deity_count=len(entities.deities),
+            completeness=data.completeness,
+            date_str=data.date_str,
+            region=get_region_from_provenance(data)
         ))
 
     # Sort by PHI ID
@@ -246,7 +264,21 @@ async def get_inscription(phi_id: int):
     if phi_id not in inscriptions:
         raise HTTPException(status_code=404, detail=f"Inscription {phi_id} not found")
 
-    return inscriptions[phi_id]
+    return inscriptions[phi_id].to_dict()
+
+
+@app.get("/inscriptions/{phi_id}/text", tags=["Inscriptions"])
+async def get_inscription_text(phi_id: int):
+    """Get the normalized Greek text and input metadata of an inscription."""
+    corpus = get_corpus()
+    if corpus is None:
+        raise HTTPException(status_code=503, detail="Corpus snapshot not built (python -m source.corpus build)")
+
+    inscription = corpus.get(phi_id)
+    if inscription is None:
+        raise HTTPException(status_code=404, detail=f"Inscription {phi_id} not found in corpus")
+
+    return {**inscription.model_dump(), "content_hash": corpus.content_hash(phi_id)}
 
 
 @app.get("/search", response_model=SearchResponse, tags=["Search"])
@@ -269,15 +301,15 @@ async def search_inscriptions(
             q_lower = q.lower()
             found = False
             # Search in themes
-            for t in data.get('themes', []):
-                if q_lower in t.get('label', '').lower():
+            for t in data.themes:
+                if q_lower in t.label.lower():
                     found = True
                     break
-                if q_lower in (t.get('rationale') or '').lower():
+                if q_lower in (t.rationale or '').lower():
                     found = True
                     break
             # Search in rationale
-            if not found and q_lower in (data.get('rationale') or '').lower():
+            if not found and q_lower in (data.rationale or '').lower():
                 found = True
             if not found:
                 continue
@@ -285,37 +317,37 @@ async def search_inscriptions(
         # Theme filter
         if theme:
             theme_lower = theme.lower()
-            if not any(theme_lower in t.get('label', '').lower() for t in data.get('themes', [])):
+            if not any(theme_lower in t.label.lower() for t in data.themes):
                 continue
 
         # Entity filters
-        entities = data.get('entities', {})
+        entities = data.entities
 
         if person:
             person_lower = person.lower()
-            if not any(person_lower in (p.get('name') or '').lower() for p in entities.get('persons', [])):
+            if not any(_mentions(p, person_lower) for p in entities.persons):
                 continue
 
         if place:
             place_lower = place.lower()
-            if not any(place_lower in (p.get('name') or '').lower() for p in entities.get('places', [])):
+            if not any(_mentions(p, place_lower) for p in entities.places):
                 continue
 
         if deity:
             deity_lower = deity.lower()
-            if not any(deity_lower in (d.get('name') or '').lower() for d in entities.get('deities', [])):
+            if not any(_mentions(d, deity_lower) for d in entities.deities):
                 continue
 
         # Build summary
         filtered.append(InscriptionSummary(
             phi_id=phi_id,
-            theme_count=len(data.get('themes', [])),
-            person_count=len(entities.get('persons', [])),
-            place_count=len(entities.get('places', [])),
-            deity_count=len(entities.get('deities', [])),
-            completeness=data.get('completeness'),
-            date_str=data.get('date_str'),
-            region=get_region_from_provenance(data.get('provenance', []))
+            theme_count=len(data.themes),
+            person_count=len(entities.persons),
+            place_count=len(entities.places),
+            deity_count=len(entities.deities),
+            completeness=data.completeness,
+            date_str=data.date_str,
+            region=get_region_from_provenance(data)
         ))
 
     # Sort and paginate
@@ -347,32 +379,32 @@ async def get_stats():
 
     for data in inscriptions.values():
         # Collect entities
-        entities = data.get('entities', {})
-        for p in entities.get('persons', []):
-            if p.get('name'):
-                persons.add(p['name'])
-        for p in entities.get('places', []):
-            if p.get('name'):
-                places.add(p['name'])
-        for d in entities.get('deities', []):
-            if d.get('name'):
-                deities.add(d['name'])
+        entities = data.entities
+        for p in entities.persons:
+            if p.name:
+                persons.add(p.entity_id or p.name)
+        for p in entities.places:
+            if p.name:
+                places.add(p.entity_id or p.name)
+        for d in entities.deities:
+            if d.name:
+                deities.add(d.entity_id or d.name)
 
         # Collect themes
-        for t in data.get('themes', []):
-            if t.get('label'):
-                themes.add(t['label'])
+        for t in data.themes:
+            if t.label:
+                themes.add(t.label)
 
         # Count regions
-        region = get_region_from_provenance(data.get('provenance', []))
+        region = get_region_from_provenance(data)
         if region:
             regions[region] = regions.get(region, 0) + 1
 
         # Date range
-        if data.get('date_min') is not None:
-            min_date = min(min_date, data['date_min'])
-        if data.get('date_max') is not None:
-            max_date = max(max_date, data['date_max'])
+        if data.date_min is not None:
+            min_date = min(min_date, data.date_min)
+        if data.date_max is not None:
+            max_date = max(max_date, data.date_max)
 
     return StatsResponse(
         total_inscriptions=len(inscriptions),
@@ -397,12 +429,12 @@ async def get_themes():
     theme_hierarchies = {}
 
     for data in inscriptions.values():
-        for t in data.get('themes', []):
-            label = t.get('label')
+        for t in data.themes:
+            label = t.label
             if label:
                 theme_counts[label] = theme_counts.get(label, 0) + 1
                 if label not in theme_hierarchies:
-                    theme_hierarchies[label] = t.get('hierarchy', {})
+                    theme_hierarchies[label] = asdict(t.hierarchy)
 
     # Sort by count descending
     sorted_themes = sorted(theme_counts.items(), key=lambda x: -x[1])
@@ -435,39 +467,43 @@ async def get_entities(
 
     inscriptions = load_all_inscriptions()
 
-    entity_data = {}  # name -> {count, inscriptions, roles/types}
+    # Resolved entity ID (python -m source.entity_resolution), else the raw name
+    entity_data = {}  # key -> {count, inscriptions, variants, roles/types}
 
     for phi_id, data in inscriptions.items():
-        entities = data.get('entities', {}).get(entity_type, [])
+        entities = getattr(data.entities, entity_type)
         for e in entities:
-            name = e.get('name')
+            name = e.name
             if not name:
                 continue
+            key = e.entity_id or name
 
-            if name not in entity_data:
-                entity_data[name] = {
-                    'name': name,
+            if key not in entity_data:
+                entity_data[key] = {
+                    'name': e.canonical or name,
+                    'entity_id': e.entity_id,
                     'count': 0,
                     'inscriptions': [],
+                    'variants': set(),
                     'attributes': set()
                 }
 
-            entity_data[name]['count'] += 1
-            entity_data[name]['inscriptions'].append(phi_id)
+            entity_data[key]['count'] += 1
+            entity_data[key]['inscriptions'].append(phi_id)
+            entity_data[key]['variants'].add(name)
 
             # Collect roles/types
-            if entity_type == 'persons' and e.get('role'):
-                entity_data[name]['attributes'].add(e['role'])
-            elif entity_type == 'places' and e.get('type'):
-                entity_data[name]['attributes'].add(e['type'])
-            elif entity_type == 'deities' and e.get('epithet'):
-                entity_data[name]['attributes'].add(e['epithet'])
+            if entity_type == 'persons' and e.role:
+                entity_data[key]['attributes'].add(e.role)
+            elif entity_type == 'places' and e.type:
+                entity_data[key]['attributes'].add(e.type)
 
     # Convert to list and sort
     entity_list = sorted(entity_data.values(), key=lambda x: -x['count'])
 
     # Convert sets to lists for JSON
     for e in entity_list:
+        e['variants'] = sorted(e['variants'])
         e['attributes'] = list(e['attributes'])
 
     # Paginate
@@ -491,7 +527,7 @@ async def get_regions():
 
     regions = {}
     for data in inscriptions.values():
-        region = get_region_from_provenance(data.get('provenance', []))
+        region = get_region_from_provenance(data)
         if region:
             regions[region] = regions.get(region, 0) + 1
 
@@ -0,0 +1,268 @@
+"""
+Batch rewriting of output JSON files for maintenance passes.
+
+A pass is a *transform*: a function that edits one parsed output dict in
+place and returns a list of notes (e.g. the corrections it made).
+``rewrite_files`` runs it over many files and takes care of the rest:
+
+- CPU-bound passes (parsing, taxonomy enforcement) run in a process pool,
+  I/O-bound ones (network reconciliation) in a thread pool
+- files are replaced atomically (temp file + rename, see
+  ``codec.write_atomic``), so a crash never leaves a truncated output
+- files whose content did not change are not written
+- ``dry_run`` writes nothing and reports what would change, as a per-file
+  field diff and a count of changed fields
+- progress bar plus a files/s and MB/s summary
+
+Process-pool transforms must be picklable: a module-level function, or a
+``functools.partial`` of one. Large shared state (a taxonomy, a lookup
+table) goes through ``initializer``/``initargs`` so it is sent once per
+worker rather than with every chunk.
+
+Usage:
+    python -m source.batch_rewrite --benchmark [--workers N]
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from tqdm import tqdm
+
+from . import codec
+from .config import MAINTENANCE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+Transform = Callable[[dict], Optional[list]]
+
+# Below this many files the pool start-up costs more than it saves
+PARALLEL_MIN_BATCH = 64
+DIFF_LINES_PER_FILE = 20
+
+
+def _short(value: Any, width: int = 60) -> str:
+    text = codec.dumps(value) if isinstance(value, (dict, list)) else repr(value)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def json_diff(before: Any, after: Any, limit: int = DIFF_LINES_PER_FILE) -> List[str]:
+    """Changed fields between two JSON documents as ``+``/``-``/``~ path: value`` lines."""
+    lines: List[str] = []
+
+    def walk(a: Any, b: Any, path: str) -> None:
+        if len(lines) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in list(a) + [k for k in b if k not in a]:
+                if key not in b:
+                    lines.append(f"- {path}.{key}: {_short(a[key])}")
+                elif key not in a:
+                    lines.append(f"+ {path}.{key}: {_short(b[key])}")
+                else:
+                    walk(a[key], b[key], f"{path}.{key}")
+        elif isinstance(a, list) and isinstance(b, list):
+            # Align items first, so removing one theme does not show up as changes to all later ones
+            keys_a = [codec.dumpb(x, sort_keys=True) for x in a]
+            keys_b = [codec.dumpb(x, sort_keys=True) for x in b]
+            for op, i1, i2, j1, j2 in SequenceMatcher(None, keys_a, keys_b, autojunk=False).get_opcodes():
+                if op == "equal":
+                    continue
+                paired = min(i2 - i1, j2 - j1)
+                for k in range(paired):
+                    walk(a[i1 + k], b[j1 + k], f"{path}[{i1 + k}]")
+                for i in range(i1 + paired, i2):
+                    lines.append(f"- {path}[{i}]: {_short(a[i])}")
+                for j in range(j1 + paired, j2):
+                    lines.append(f"+ {path}[{j}]: {_short(b[j])}")
+        elif a != b:
+            lines.append(f"~ {path}: {_short(a)} -> {_short(b)}")
+
+    walk(before, after, "$")
+    return lines[:limit]
+
+
+@dataclass
+class FileResult:
+    name: str
+    status: str  # changed | unchanged | error
+    notes: list = field(default_factory=list)
+    diff: List[str] = field(default_factory=list)
+    bytes_read: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class RewriteReport:
+    files: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    written: int = 0
+    notes: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+    workers: int = 1
+    dry_run: bool = False
+    # Files that changed, failed or produced notes (unchanged files without notes are not kept)
+    results: List[FileResult] = field(default_factory=list)
+
+    def add(self, result: FileResult) -> None:
+        self.files += 1
+        self.bytes_read += result.bytes_read
+        self.notes += len(result.notes)
+        if result.status == "changed":
+            self.changed += 1
+            self.written += not self.dry_run
+        elif result.status == "error":
+            self.errors += 1
+        else:
+            self.unchanged += 1
+        if result.status != "unchanged" or result.notes:
+            self.results.append(result)
+
+    def summary_lines(self) -> List[str]:
+        rate = self.files / self.seconds if self.seconds else 0.0
+        mode = "dry run, nothing written" if self.dry_run else f"{self.written:,} written"
+        return [
+            f"Files: {self.files:,} in {self.seconds:.2f}s ({rate:,.0f} files/s, "
+            f"{self.bytes_read / 1e6 / self.seconds if self.seconds else 0.0:.1f} MB/s, {self.workers} workers)",
+            f"Changed: {self.changed:,} ({mode}), unchanged: {self.unchanged:,}, errors: {self.errors:,}",
+        ]
+
+    def diff_summary(self, max_files: int = 10) -> List[str]:
+        """Most frequently changed fields plus the field diffs of the first few changed files."""
+        fields: Dict[str, int] = {}
+        for result in self.results:
+            for line in result.diff:
+                key = re.sub(r"\[\d+\]", "[]", line[2:].split(":", 1)[0])
+                fields[f"{line[0]} {key}"] = fields.get(f"{line[0]} {key}", 0) + 1
+        lines = [f"{count:6,d}  {key}" for key, count in sorted(fields.items(), key=lambda kv: -kv[1])[:15]]
+        shown = [r for r in self.results if r.status == "changed"][:max_files]
+        for result in shown:
+            lines.append(f"--- {result.name}")
+            lines.extend(f"    {line}" for line in result.diff)
+        if self.changed > len(shown):
+            lines.append(f"... and {self.changed - len(shown):,} more changed files")
+        return lines
+
+
+def rewrite_file(path: Path, transform: Transform, dry_run: bool = False, pretty: bool = True) -> FileResult:
+    """Applies ``transform`` to one file; writes it atomically if the content changed."""
+    try:
+        raw = path.read_bytes()
+        data = codec.loads(raw)
+        before = codec.dumpb(data, sort_keys=True)
+        notes = transform(data) or []
+        if codec.dumpb(data, sort_keys=True) == before:
+            return FileResult(path.name, "unchanged", notes, bytes_read=len(raw))
+        diff = json_diff(codec.loads(raw), data) if dry_run else []
+        if not dry_run:
+            codec.write_atomic(path, codec.dumpb(data, pretty=pretty))
+        return FileResult(path.name, "changed", notes, diff, len(raw))
+    except Exception as e:
+        return FileResult(path.name, "error", error=f"{type(e).__name__}: {e}")
+
+
+def rewrite_files(
+    files: Sequence[Path],
+    transform: Transform,
+    workers: Optional[int] = None,
+    processes: bool = True,
+    dry_run: bool = False,
+    pretty: bool = True,
+    desc: str = "Rewriting",
+    progress: bool = True,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+) -> RewriteReport:
+    """
+    Runs a maintenance transform over many output files.
+
+    Args:
+        files: Output files to process.
+        transform: Edits a parsed file in place and returns notes (or None).
+        workers: Pool size (default: MAINTENANCE_WORKERS, 0 = CPU count).
+            1 forces serial processing.
+        processes: Process pool for CPU-bound transforms; False uses
+            threads (transforms that wait on the network or share state).
+        dry_run: Write nothing; changed files carry a field diff.
+        pretty: Indent written files (data/output is read by humans).
+        initializer: Called with ``initargs`` once per worker process (or
+            once in this process) to set up large shared state, e.g. a
+            lookup table, instead of pickling it with every chunk.
+    """
+    workers = workers or MAINTENANCE_WORKERS or os.cpu_count() or 1
+    if len(files) < PARALLEL_MIN_BATCH and processes:
+        workers = 1
+    report = RewriteReport(workers=workers, dry_run=dry_run)
+    task = partial(rewrite_file, transform=transform, dry_run=dry_run, pretty=pretty)
+    start = time.perf_counter()
+
+    bar = tqdm(total=len(files), desc=desc, unit="file", disable=not progress)
+    try:
+        if initializer is not None and (workers == 1 or not processes):
+            initializer(*initargs)
+        if workers == 1:
+            results = map(task, files)
+            executor = None
+        elif processes:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+            results = executor.map(task, files, chunksize=max(1, min(256, len(files) // (workers * 8))))
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            results = executor.map(task, files)
+        try:
+            for result in results:
+                report.add(result)
+                if result.status == "error":
+                    logger.error(f"Error processing {result.name}: {result.error}")
+                bar.update()
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    finally:
+        bar.close()
+        report.seconds = time.perf_counter() - start
+    return report
+
+
+def _identity(data: dict) -> list:
+    return []
+
+
+def benchmark(directory: Path, workers: int) -> None:
+    """Dry-run taxonomy enforcement over a directory, serial vs pool."""
+    from .config import TAXONOMY_DIR
+    from .enforce_schema_retroactive import enforce_transform, init_taxonomy
+    from .taxonomy_utils import load_taxonomy
+
+    files = sorted(directory.glob("*.json"))
+    taxonomy = load_taxonomy(TAXONOMY_DIR / "taxonomy.json")
+    print(f"{len(files):,} files in {directory}")
+    for name, transform, initializer in (("parse only", _identity, None), ("enforce", enforce_transform, init_taxonomy)):
+        for n in sorted({1, workers}):
+            report = rewrite_files(files, transform, workers=n, dry_run=True, progress=False,
+                                   initializer=initializer, initargs=(taxonomy,))
+            print(f"{name:10s} workers={n:<3d} " + report.summary_lines()[0])
+
+
+if __name__ == "__main__":
+    from .config import OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Batch rewrite framework for output maintenance passes.")
+    parser.add_argument("--benchmark", action="store_true", help="Time dry-run passes, serial vs process pool")
+    parser.add_argument("--dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=MAINTENANCE_WORKERS or os.cpu_count() or 1)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.dir, args.workers)
+    else:
+        parser.print_help()
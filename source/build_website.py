@@ -1,11 +1,14 @@
-import json
+import logging
 import urllib.request
 import time
 import concurrent.futures
 from pathlib import Path
-from .config import INPUT_DIR, OUTPUT_DIR, TAXONOMY_DIR, DATA_DIR
-from .data_loader import load_inscriptions
-from .preprocessing import clean_metadata
+from . import codec
+from .config import OUTPUT_DIR, TAXONOMY_DIR, DATA_DIR
+from .corpus import load_corpus
+from .quotes import NOT_FOUND, AlignedText, QuoteMatch
+
+logger = logging.getLogger(__name__)
 
 ROOT_INDEX = Path("index.html")
 WEBSITE_DIR = Path("website")
@@ -39,14 +42,12 @@ def load_pleiades_cache():
     global PLEIADES_CACHE
     if PLEIADES_CACHE_FILE.exists():
         try:
-            with open(PLEIADES_CACHE_FILE, 'r', encoding='utf-8') as f:
-                PLEIADES_CACHE = json.load(f)
+            PLEIADES_CACHE = codec.load_file(PLEIADES_CACHE_FILE)
         except Exception:
             PLEIADES_CACHE = {}
 
 def save_pleiades_cache():
-    with open(PLEIADES_CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(PLEIADES_CACHE, f, ensure_ascii=False)
+    codec.dump_file(PLEIADES_CACHE, PLEIADES_CACHE_FILE)
 
 def fetch_pleiades_coords(uri):
     if not uri or "pleiades.stoa.org" not in uri: return None
@@ -55,10 +56,10 @@ def fetch_pleiades_coords(uri):
     try:
         api_url = f"{uri.rstrip('/')}/json"
         req = urllib.request.Request(api_url, headers={'User-Agent': 'AGKI-Tagging-Tool/1.0'})
-        print(f"DEBUG: Fetching {api_url}...")
+        logger.debug(f"Fetching {api_url}...")
         with urllib.request.urlopen(req, timeout=5) as response:
             if response.status == 200:
-                content = json.loads(response.read().decode())
+                content = codec.loads(response.read())
                 if 'reprPoint' in content:
                     lon, lat = content['reprPoint']
                     PLEIADES_CACHE[uri] = [lat, lon]
@@ -106,10 +107,10 @@ GAZETTEER.update({
 
 def load_json(path):
     if not path.exists(): return None
-    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+    return codec.load_file(path)
 
 def load_taxonomy():
-    with open(TAXONOMY_DIR / "taxonomy.json", 'r', encoding='utf-8') as f: return json.load(f)
+    return codec.load_file(TAXONOMY_DIR / "taxonomy.json")
 
 def sync_static_pages():
     index_template = TEMPLATES_DIR / "index.html"
@@ -122,10 +123,44 @@ def sync_static_pages():
         target = WEBSITE_DIR / name
         target.write_text(template.read_text(encoding="utf-8"), encoding="utf-8")
 
+def mark_quotes(text, spans):
+    """Escaped text with each quote span wrapped as <span class="quote-span q-<theme index>"> (overlaps allowed)."""
+    import html
+    bounds = sorted({0, len(text)} | {b for span in spans if span for b in span})
+    parts = []
+    for start, end in zip(bounds, bounds[1:]):
+        covering = [i for i, span in enumerate(spans) if span and span[0] <= start and end <= span[1]]
+        segment = html.escape(text[start:end])
+        if covering:
+            segment = '<span class="quote-span {}">{}</span>'.format(" ".join(f"q-{i}" for i in covering), segment)
+        parts.append(segment)
+    return "".join(parts)
+
+def stored_quote_match(theme, text):
+    """The quote location saved by quotes.align_themes, or None if the theme has none that fits ``text``."""
+    status, start, end = theme.get('quote_status'), theme.get('quote_start'), theme.get('quote_end')
+    if status == NOT_FOUND:
+        return QuoteMatch(status)
+    if status and isinstance(start, int) and isinstance(end, int) and 0 <= start <= end <= len(text):
+        return QuoteMatch(status, start, end)
+    return None
+
 def generate_detail_page(merged_data):
     import html
     phi_id = merged_data['id']
-    text_content = merged_data['input'].get('text', '').replace('\r\n', '\n').replace('\r', '\n')
+    raw_text = merged_data['input'].get('text', '')
+    text_content = raw_text.replace('\r\n', '\n').replace('\r', '\n')
+
+    # Quote spans in the displayed text: the offsets stored by quotes.align_themes (they refer to
+    # the same corpus text), re-aligned only for outputs without them or with shifted line breaks
+    aligned = None
+    quote_matches = []
+    for t in merged_data.get('output', {}).get('themes', []):
+        match = stored_quote_match(t, text_content) if raw_text == text_content else None
+        if match is None and t.get('quote'):
+            aligned = aligned or AlignedText(text_content)
+            match = aligned.locate(t.get('quote'))
+        quote_matches.append(match)
     
     # Provenance
     prov_list = merged_data['output'].get('provenance', [])
@@ -143,21 +178,22 @@ def generate_detail_page(merged_data):
 
     # Themes
     themes_html = ""
-    for t in merged_data.get('output', {}).get('themes', []):
+    for i, t in enumerate(merged_data.get('output', {}).get('themes', [])):
         h = t['hierarchy']
         path_str = " > ".join(filter(None, [h.get('domain'), h.get('subdomain'), h.get('category'), h.get('subcategory')]))
         conf = t.get('confidence', 1.0)
         conf_color = "green" if conf > 0.8 else ("orange" if conf > 0.6 else "red")
         quote = t.get('quote', '') or ''
-        safe_quote = html.escape(quote).replace('"', '&quot;')
         
         ambiguity_html = ""
         if t.get('is_ambiguous'):
             note = html.escape(t.get('ambiguity_note', ''))
             ambiguity_html = f'<span class="badge orange" title="{note}" style="font-size:0.7rem; vertical-align:middle; margin-left:0.5rem; cursor:help;">⚠️ Ambiguous</span>'
+        if quote_matches[i] is not None and quote_matches[i].status == NOT_FOUND:
+            ambiguity_html += '<span class="badge red" title="The evidence quote does not occur in the text" style="font-size:0.7rem; vertical-align:middle; margin-left:0.5rem; cursor:help;">Quote not in text</span>'
 
         themes_html += """
-        <div class="theme-card" onmouseover="highlightQuote('{quote}')" onmouseout="clearHighlight()">
+        <div class="theme-card" onmouseover="highlightQuote({index})" onmouseout="clearHighlight()">
             <div style="display:flex; justify-content:space-between; align-items:center;">
                 <div>
                     <a href=\"../search.html?theme={path_encoded}" class="tag domain-tag" style="text-decoration:none;">{domain}</a>
@@ -172,7 +208,7 @@ def generate_detail_page(merged_data):
             </div>
         </div>
         """.format(
-            quote=safe_quote,
+            index=i,
             path_encoded=html.escape(path_str.replace(" > ", "/")),
             domain=h.get('domain', 'Unclassified'),
             conf_color=conf_color,
@@ -208,7 +244,8 @@ def generate_detail_page(merged_data):
     model_version = merged_data.get('output', {}).get('model') or 'Unknown'
 
     # Original Text (Strict Line-by-Line)
-    raw_greek_html = html.escape(text_content)
+    raw_greek_html = mark_quotes(text_content, [(m.start, m.end) if m and m.start is not None else None
+                                                for m in quote_matches])
     lines = text_content.split('\n')
     line_nums = [str(i+1) if (i+1)%5==0 or i==0 else "" for i in range(len(lines))]
     line_nums_html = "\n".join(line_nums)
@@ -263,19 +300,13 @@ def generate_detail_page(merged_data):
         alert("Citation copied to clipboard!");
     }}
 
-    function highlightQuote(quote) {{
-        const container = document.querySelector('.greek-content');
-        if (!container || !quote) return;
-        if (!container.dataset.original) container.dataset.original = container.innerHTML;
-        else container.innerHTML = container.dataset.original;
-        
-        const regex = new RegExp(quote.trim().replace(/\s+/g, '\\s+'), 'g');
-        container.innerHTML = container.innerHTML.replace(regex, match => `<mark class="highlight-evidence">${{match}}</mark>`);
+    function highlightQuote(index) {{
+        clearHighlight();
+        document.querySelectorAll('.greek-content .q-' + index).forEach(el => el.classList.add('highlight-evidence'));
     }}
 
     function clearHighlight() {{
-        const container = document.querySelector('.greek-content');
-        if (container && container.dataset.original) container.innerHTML = container.dataset.original;
+        document.querySelectorAll('.greek-content .highlight-evidence').forEach(el => el.classList.remove('highlight-evidence'));
     }}
 
     function updateFontSize(size) {{
@@ -431,10 +462,15 @@ def generate_indices_page(deities, persons, places):
     import html
 
     def dict_to_rows(d, is_person=False, is_place=False):
-        sorted_keys = sorted(d.keys())
+        # Keys are entity IDs; rows show the canonical name (homonyms get one row each)
+        def display(k):
+            return d[k].get('name', k) if isinstance(d[k], dict) else k
+
+        sorted_keys = sorted(d.keys(), key=lambda k: (display(k), k))
         rows = ""
         for k in sorted_keys:
             val = d[k]
+            name = display(k)
             count = val if isinstance(val, int) else val['count']
             ids = val.get('ids', []) if isinstance(val, dict) else []
             ids_str = ",".join(map(str, ids))
@@ -448,10 +484,13 @@ def generate_indices_page(deities, persons, places):
             uri = val.get('uri') if isinstance(val, dict) else None
             if uri:
                 uri_link = f' <a href="{uri}" target="_blank" class="index-link">Link</a>'
+            variants = sorted(set(val.get('variants', ())) - {name}) if isinstance(val, dict) else []
+            if variants:
+                uri_link += f' <span class="index-variants">({html.escape(", ".join(variants))})</span>'
             
             action_btn = f'<button onclick="window.basket.addMany([{ids_str}])" class="button tiny secondary" title="Add all {count} items to basket">Add to Basket</button>'
             
-            rows += f"<tr><td>{html.escape(k)}{uri_link}</td>{extra}<td>{count}</td><td>{action_btn}</td></tr>"
+            rows += f"<tr><td>{html.escape(name)}{uri_link}</td>{extra}<td>{count}</td><td>{action_btn}</td></tr>"
         return rows
 
     def get_template(title, content, active_sub=""):
@@ -480,6 +519,7 @@ def generate_indices_page(deities, persons, places):
     .index-table {{ margin-top: 1rem; overflow: auto; border-radius: 8px; border: 1px solid var(--border); background: var(--panel); position: relative; }}
     .index-empty {{ display: none; align-items: center; justify-content: center; padding: 2rem; color: var(--muted); }}
     .index-link {{ color: var(--primary); font-size: 0.85rem; margin-left: 0.35rem; }}
+    .index-variants {{ color: var(--muted); font-size: 0.85rem; }}
     table {{ width: 100%; border-collapse: collapse; font-size: 0.92rem; }}
     th, td {{ text-align: left; padding: 0.65rem 0.75rem; border-bottom: 1px solid var(--border); }}
     th {{ color: var(--muted); text-transform: uppercase; font-size: 0.75rem; letter-spacing: 0.05em; background: var(--panel); position: sticky; top: 0; }}
@@ -656,9 +696,8 @@ def build_website(mode=None):
     load_pleiades_cache()
     print("Building website...")
     INSCRIPTIONS_DIR.mkdir(parents=True, exist_ok=True)
-    inputs = load_inscriptions(INPUT_DIR)
-    # Clean metadata (e.g. prune corpus citations from regions)
-    inputs = [clean_metadata(i) for i in inputs]
+    # Normalized snapshot (regions pruned, text cleaned); only changed inputs are re-parsed
+    inputs = load_corpus()
     inputs_map = {i.id: i.model_dump() for i in inputs}
     
     outputs = []
@@ -709,19 +748,27 @@ def build_website(mode=None):
         merged_list.append(merged)
         
         ents = out.get('entities', {})
+        # Indices list resolved entities (python -m source.entity_resolution) by entity ID,
+        # under their canonical name
         for d in ents.get('deities', []):
-            name = d['name'] if isinstance(d, dict) else d
-            if name not in all_deities: all_deities[name] = {"uri": d.get('uri') if isinstance(d, dict) else None, "count": 0, "ids": []}
-            all_deities[name]["count"] += 1
-            all_deities[name]["ids"].append(phi_id)
+            if not isinstance(d, dict): d = {"name": d}
+            key = d.get('entity_id') or d['name']
+            if key not in all_deities: all_deities[key] = {"name": d.get('canonical') or d['name'], "uri": d.get('uri'), "count": 0, "ids": [], "variants": set()}
+            all_deities[key]["count"] += 1
+            all_deities[key]["ids"].append(phi_id)
+            all_deities[key]["variants"].add(d['name'])
         for p in ents.get('persons', []):
-            if p['name'] not in all_persons: all_persons[p['name']] = {"role": p.get('role'), "uri": p.get('uri'), "count": 0, "ids": []}
-            all_persons[p['name']]["count"] += 1
-            all_persons[p['name']]["ids"].append(phi_id)
+            key = p.get('entity_id') or p['name']
+            if key not in all_persons: all_persons[key] = {"name": p.get('canonical') or p['name'], "role": p.get('role'), "uri": p.get('uri'), "count": 0, "ids": [], "variants": set()}
+            all_persons[key]["count"] += 1
+            all_persons[key]["ids"].append(phi_id)
+            all_persons[key]["variants"].add(p['name'])
         for pl in ents.get('places', []):
-            if pl['name'] not in all_places: all_places[pl['name']] = {"type": pl.get('type'), "uri": pl.get('uri'), "count": 0, "ids": []}
-            all_places[pl['name']]["count"] += 1
-            all_places[pl['name']]["ids"].append(phi_id)
+            key = pl.get('entity_id') or pl['name']
+            if key not in all_places: all_places[key] = {"name": pl.get('canonical') or pl['name'], "type": pl.get('type'), "uri": pl.get('uri'), "count": 0, "ids": [], "variants": set()}
+            all_places[key]["count"] += 1
+            all_places[key]["ids"].append(phi_id)
+            all_places[key]["variants"].add(pl['name'])
 
         with open(INSCRIPTIONS_DIR / f"{phi_id}.html", 'w', encoding='utf-8') as f:
             f.write(generate_detail_page(merged))
@@ -775,7 +822,7 @@ def build_website(mode=None):
 
     full_data = {"taxonomy": load_taxonomy(), "inscriptions": search_index}
     with open(WEBSITE_DIR / "assets/js/data.js", 'w', encoding='utf-8') as f:
-        f.write(f"const APP_DATA = {json.dumps(full_data, ensure_ascii=False)};")
+        f.write(f"const APP_DATA = {codec.dumps(full_data)};")
 
     sync_static_pages()
     print(f"Website built. {len(merged_list)} pages generated.")
@@ -0,0 +1,449 @@
+"""
+Local lightweight theme classifier trained on existing outputs.
+
+Character n-grams of the (accent-stripped) Greek text are hashed into a fixed
+feature space, weighted by TF-IDF and fed to one-vs-rest logistic regression
+over full taxonomy paths. Everything is plain NumPy and runs on CPU in
+milliseconds per inscription.
+
+The model is used in two ways (``CLASSIFIER_MODE``):
+- ``hints``: candidate paths are added to the Proposer prompt.
+- ``route``: additionally, inscriptions the model is confident about are
+  tagged locally and never sent to the LLM.
+
+Usage:
+    python -m source.classifier train
+    python -m source.classifier evaluate --test-fraction 0.2
+    python -m source.classifier predict --limit 10
+"""
+import argparse
+import logging
+import re
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import codec
+from .config import (
+    CLASSIFIER_MAX_HINTS,
+    CLASSIFIER_MODE,
+    CLASSIFIER_MODEL_PATH,
+    CLASSIFIER_ROUTE_CONFIDENCE,
+    CLASSIFIER_THRESHOLD,
+    INPUT_DIR,
+    MIN_TEXT_LENGTH,
+    OUTPUT_DIR,
+)
+from .schema import TaggedInscription
+
+logger = logging.getLogger(__name__)
+
+PATH_SEPARATOR = " > "
+# ``model`` field of route-mode outputs (excluded from training data)
+LOCAL_MODEL_NAME = "local-classifier"
+HIERARCHY_LEVELS = ("domain", "subdomain", "category", "subcategory")
+
+_EDITORIAL = re.compile(r"[\[\]\(\)<>{}⟦⟧|.·:;,\-—_0-9]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_for_features(text: str) -> str:
+    """Lowercase, strip accents/breathings and editorial sigla."""
+    text = unicodedata.normalize("NFD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _EDITORIAL.sub(" ", text.lower()).replace("ς", "σ")
+    return _SPACES.sub(" ", text).strip()
+
+
+def theme_path(theme: dict) -> Optional[str]:
+    """Formats a theme hierarchy as 'Domain > Subdomain > ...' (None if empty)."""
+    hierarchy = theme.get("hierarchy") or {}
+    parts = [hierarchy.get(level) for level in HIERARCHY_LEVELS]
+    parts = [p for p in parts if p]
+    return PATH_SEPARATOR.join(parts) if parts else None
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class ThemeClassifier:
+    """Hashed char n-gram TF-IDF + one-vs-rest logistic regression."""
+
+    def __init__(self, n_features: int = 2 ** 14, ngram_range: Tuple[int, int] = (2, 4)):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.idf: Optional[np.ndarray] = None
+        self.labels: List[str] = []
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    # --- Features ---
+
+    def _counts(self, text: str) -> np.ndarray:
+        text = f" {normalize_for_features(text)} "
+        lo, hi = self.ngram_range
+        buckets = [
+            zlib.crc32(text[i:i + n].encode("utf-8")) % self.n_features
+            for n in range(lo, hi + 1)
+            for i in range(len(text) - n + 1)
+        ]
+        return np.bincount(np.asarray(buckets, dtype=np.int64), minlength=self.n_features).astype(np.float32)
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns the L2-normalized TF-IDF matrix (n_texts x n_features)."""
+        X = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            X[row] = self._counts(text)
+        np.log1p(X, out=X)  # Sublinear tf
+        if self.idf is not None:
+            X *= self.idf
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        X /= norms
+        return X
+
+    # --- Training / inference ---
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        label_sets: Sequence[Sequence[str]],
+        min_support: int = 3,
+        epochs: int = 300,
+        learning_rate: float = 0.05,
+        l2: float = 1e-4,
+    ) -> "ThemeClassifier":
+        """Trains all one-vs-rest classifiers jointly with full-batch Adam."""
+        support: Dict[str, int] = {}
+        for labels in label_sets:
+            for label in set(labels):
+                support[label] = support.get(label, 0) + 1
+        self.labels = sorted(label for label, count in support.items() if count >= min_support)
+        if not self.labels:
+            raise ValueError(f"No label has at least {min_support} training examples")
+        index = {label: i for i, label in enumerate(self.labels)}
+
+        Y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        for row, labels in enumerate(label_sets):
+            for label in labels:
+                if label in index:
+                    Y[row, index[label]] = 1.0
+
+        # IDF over raw document frequencies
+        self.idf = None
+        raw = self.transform(texts)
+        df = np.count_nonzero(raw, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        X = self.transform(texts)
+
+        n, d = X.shape
+        # Up-weight rare positives so small labels are not always predicted 0
+        positives = Y.sum(axis=0)
+        pos_weight = np.clip((n - positives) / np.maximum(positives, 1), 1.0, 10.0)
+        sample_weight = 1.0 + Y * (pos_weight - 1.0)
+
+        W = np.zeros((d, len(self.labels)), dtype=np.float32)
+        b = np.log(np.maximum(positives, 1) / np.maximum(n - positives, 1)).astype(np.float32)
+        m_W, v_W = np.zeros_like(W), np.zeros_like(W)
+        m_b, v_b = np.zeros_like(b), np.zeros_like(b)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            error = (_sigmoid(X @ W + b) - Y) * sample_weight
+            grad_W = X.T @ error / n + l2 * W
+            grad_b = error.mean(axis=0)
+            for param, grad, m, v in ((W, grad_W, m_W, v_W), (b, grad_b, m_b, v_b)):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                m_hat = m / (1 - beta1 ** step)
+                v_hat = v / (1 - beta2 ** step)
+                param -= learning_rate * m_hat / (np.sqrt(v_hat) + eps)
+
+        self.weights, self.bias = W, b
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns label probabilities (n_texts x n_labels)."""
+        if self.weights is None:
+            raise RuntimeError("Classifier is not trained")
+        return _sigmoid(self.transform(texts) @ self.weights + self.bias)
+
+    def candidates(self, probs: np.ndarray, top_k: int, min_prob: float = 0.2) -> List[Tuple[str, float]]:
+        """Top-k (path, probability) pairs of one probability row."""
+        order = np.argsort(-probs)[:top_k]
+        return [(self.labels[i], float(probs[i])) for i in order if probs[i] >= min_prob]
+
+    # --- Persistence ---
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            n_features=self.n_features,
+            ngram_range=np.asarray(self.ngram_range),
+            idf=self.idf,
+            labels=np.asarray(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "ThemeClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            model = cls(int(data["n_features"]), tuple(int(n) for n in data["ngram_range"]))
+            model.idf = data["idf"]
+            model.labels = [str(label) for label in data["labels"]]
+            model.weights = data["weights"]
+            model.bias = data["bias"]
+        return model
+
+
+# --- Pipeline integration ---
+
+def load_classifier(mode: str = CLASSIFIER_MODE, path: Path = CLASSIFIER_MODEL_PATH) -> Optional[ThemeClassifier]:
+    """Loads the trained model if the classifier is enabled (None otherwise)."""
+    if mode == "off":
+        return None
+    if not path.exists():
+        logger.warning(f"CLASSIFIER_MODE={mode} but no model at {path}; run 'python -m source.classifier train'")
+        return None
+    model = ThemeClassifier.load(path)
+    logger.info(f"Theme classifier loaded ({len(model.labels)} paths, mode={mode})")
+    return model
+
+
+def prelabel(
+    model: ThemeClassifier,
+    text: str,
+    max_hints: int = CLASSIFIER_MAX_HINTS,
+    route_confidence: float = CLASSIFIER_ROUTE_CONFIDENCE,
+) -> Tuple[List[Tuple[str, float]], bool]:
+    """
+    Returns (candidate paths, needs_llm).
+
+    An inscription can skip the LLM only if every path is either clearly
+    present (>= route_confidence) or clearly absent (<= 1 - route_confidence),
+    and at least one path is present.
+    """
+    probs = model.predict_proba([text])[0]
+    hints = model.candidates(probs, max_hints)
+    present = probs >= route_confidence
+    uncertain = (probs > 1 - route_confidence) & ~present
+    needs_llm = bool(uncertain.any() or not present.any())
+    return hints, needs_llm
+
+
+def format_hints_for_prompt(hints: List[Tuple[str, float]]) -> str:
+    if not hints:
+        return ""
+    lines = [f"• {path} (p={prob:.2f})" for path, prob in hints]
+    return (
+        "CANDIDATE PATHS FROM A LOCAL CLASSIFIER (hints only - verify against the text, "
+        "add or drop paths as the text requires):\n" + "\n".join(lines)
+    )
+
+
+def _theme_from_path(path: str, prob: float) -> dict:
+    parts = path.split(PATH_SEPARATOR)
+    hierarchy = dict(zip(HIERARCHY_LEVELS, parts))
+    return {
+        "label": parts[-1],
+        "hierarchy": hierarchy,
+        "rationale": f"Predicted by the local theme classifier (p={prob:.2f}).",
+        "confidence": round(prob, 2),
+    }
+
+
+def classifier_result(model: ThemeClassifier, inscription, threshold: float = CLASSIFIER_THRESHOLD) -> TaggedInscription:
+    """Builds a themes-only TaggedInscription from the classifier (route mode)."""
+    probs = model.predict_proba([inscription.text])[0]
+    themes = [_theme_from_path(model.labels[i], float(probs[i]))
+              for i in np.argsort(-probs) if probs[i] >= threshold]
+    return TaggedInscription(
+        phi_id=inscription.id,
+        themes=themes,
+        rationale="Themes predicted by the local classifier; entities were not extracted.",
+        model=LOCAL_MODEL_NAME,
+        date_str=inscription.date_str,
+        date_min=inscription.date_min,
+        date_max=inscription.date_max,
+        date_circa=inscription.date_circa,
+    )
+
+
+# --- Training data / evaluation ---
+
+def load_training_data(
+    output_dir: Path = OUTPUT_DIR,
+    input_dir: Path = INPUT_DIR,
+    min_confidence: float = 0.5,
+) -> Tuple[List[int], List[str], List[List[str]]]:
+    """
+    Pairs each tagged output with its input text.
+
+    Outputs whose input file is not available fall back to the concatenated
+    theme quotes, which are verbatim excerpts of the text.
+    """
+    from .data_loader import load_inscriptions
+
+    input_texts = {i.id: i.text for i in load_inscriptions(input_dir)} if input_dir.exists() else {}
+    ids, texts, label_sets = [], [], []
+    for file_path in sorted(output_dir.glob("*.json")):
+        try:
+            data = codec.load_file(file_path)
+        except (OSError, *codec.DECODE_ERRORS):
+            continue
+        if data.get("model") == LOCAL_MODEL_NAME:
+            # Route-mode outputs are the classifier's own predictions
+            continue
+        themes = data.get("themes") or []
+        labels = sorted({
+            path for path in (theme_path(t) for t in themes
+                              if (t.get("confidence") is None or t["confidence"] >= min_confidence))
+            if path
+        })
+        text = input_texts.get(data.get("phi_id")) or " ".join(t.get("quote") or "" for t in themes)
+        if labels and text.strip():
+            ids.append(data.get("phi_id"))
+            texts.append(text)
+            label_sets.append(labels)
+    return ids, texts, label_sets
+
+
+def evaluate(
+    model: ThemeClassifier,
+    texts: Sequence[str],
+    label_sets: Sequence[Sequence[str]],
+    threshold: float = CLASSIFIER_THRESHOLD,
+    route_confidence: float = CLASSIFIER_ROUTE_CONFIDENCE,
+) -> dict:
+    """Micro/macro P/R/F1, per-label scores and routing coverage."""
+    start = time.perf_counter()
+    probs = model.predict_proba(texts)
+    ms_per_doc = (time.perf_counter() - start) * 1000 / max(len(texts), 1)
+
+    index = {label: i for i, label in enumerate(model.labels)}
+    truth = np.zeros_like(probs, dtype=bool)
+    for row, labels in enumerate(label_sets):
+        for label in labels:
+            if label in index:
+                truth[row, index[label]] = True
+    pred = probs >= threshold
+
+    tp = (pred & truth).sum(axis=0)
+    fp = (pred & ~truth).sum(axis=0)
+    fn = (~pred & truth).sum(axis=0)
+    precision = tp / np.maximum(tp + fp, 1)
+    recall = tp / np.maximum(tp + fn, 1)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-9)
+    micro_p = tp.sum() / max(tp.sum() + fp.sum(), 1)
+    micro_r = tp.sum() / max(tp.sum() + fn.sum(), 1)
+
+    # Routing: documents the model would tag without the LLM
+    confident = ((probs >= route_confidence) | (probs <= 1 - route_confidence)).all(axis=1)
+    confident &= (probs >= route_confidence).any(axis=1)
+    routed_exact = (pred[confident] == truth[confident]).all(axis=1).mean() if confident.any() else 0.0
+
+    return {
+        "documents": len(texts),
+        "labels": len(model.labels),
+        "micro_precision": float(micro_p),
+        "micro_recall": float(micro_r),
+        "micro_f1": float(2 * micro_p * micro_r / max(micro_p + micro_r, 1e-9)),
+        "macro_f1": float(f1.mean()),
+        "ms_per_document": ms_per_doc,
+        "routed_fraction": float(confident.mean()),
+        "routed_exact_match": float(routed_exact),
+        "per_label": {
+            label: {
+                "support": int(truth[:, i].sum()),
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1": float(f1[i]),
+            }
+            for i, label in enumerate(model.labels)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train, evaluate or run the local theme classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_p = sub.add_parser("train", help="Train on data/output and save the model")
+    eval_p = sub.add_parser("evaluate", help="Hold-out evaluation report")
+    for p in (train_p, eval_p):
+        p.add_argument("--min-support", type=int, default=3, help="Minimum examples per path")
+        p.add_argument("--features", type=int, default=2 ** 14, help="Hashed feature dimension")
+        p.add_argument("--epochs", type=int, default=300)
+    eval_p.add_argument("--test-fraction", type=float, default=0.2)
+    eval_p.add_argument("--seed", type=int, default=42)
+    eval_p.add_argument("--report", type=Path, default=None, help="Write the full report as JSON")
+
+    predict_p = sub.add_parser("predict", help="Pre-label inscriptions from data/input")
+    predict_p.add_argument("--limit", type=int, default=None)
+
+    parser.add_argument("--model", type=Path, default=CLASSIFIER_MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "predict":
+        from .corpus import load_corpus
+
+        model = ThemeClassifier.load(args.model)
+        inscriptions = load_corpus(limit=args.limit, min_length=MIN_TEXT_LENGTH)
+        routed = 0
+        for inscription in inscriptions:
+            hints, needs_llm = prelabel(model, inscription.text)
+            routed += not needs_llm
+            print(f"{inscription.id}: {'LLM' if needs_llm else 'local'}")
+            for path, prob in hints:
+                print(f"    {prob:.2f}  {path}")
+        print(f"Local (no LLM): {routed}/{len(inscriptions)}")
+        return
+
+    ids, texts, label_sets = load_training_data()
+    print(f"Training examples: {len(texts)}")
+    if not texts:
+        return
+
+    if args.command == "train":
+        start = time.perf_counter()
+        model = ThemeClassifier(n_features=args.features).fit(
+            texts, label_sets, min_support=args.min_support, epochs=args.epochs
+        )
+        model.save(args.model)
+        print(f"Trained {len(model.labels)} paths in {time.perf_counter() - start:.1f}s -> {args.model}")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(texts))
+    n_test = max(1, int(len(texts) * args.test_fraction))
+    test, train = order[:n_test], order[n_test:]
+    model = ThemeClassifier(n_features=args.features).fit(
+        [texts[i] for i in train], [label_sets[i] for i in train],
+        min_support=args.min_support, epochs=args.epochs,
+    )
+    report = evaluate(model, [texts[i] for i in test], [label_sets[i] for i in test])
+
+    print(f"Test documents: {report['documents']}  Paths: {report['labels']}")
+    print(f"Micro P/R/F1: {report['micro_precision']:.3f} / {report['micro_recall']:.3f} / {report['micro_f1']:.3f}")
+    print(f"Macro F1: {report['macro_f1']:.3f}")
+    print(f"Inference: {report['ms_per_document']:.2f} ms/document")
+    print(f"Routable without LLM: {report['routed_fraction']:.1%} "
+          f"(exact match on those: {report['routed_exact_match']:.1%})")
+    print("\nPer path (support, P, R, F1):")
+    for label, scores in sorted(report["per_label"].items(), key=lambda kv: -kv[1]["support"]):
+        print(f"  {scores['support']:4d}  {scores['precision']:.2f}  {scores['recall']:.2f}  {scores['f1']:.2f}  {label}")
+    if args.report:
+        codec.dump_file(report, args.report, pretty=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Single JSON codec for corpus reads and writes.
+
+Backed by orjson or msgspec when installed, falling back to the stdlib
+``json`` module. All backends produce the same output format (UTF-8, no ASCII
+escaping; pretty mode uses a 2-space indent like the existing files).
+
+Pretty output is for files humans read (``data/output``); machine-only
+artifacts (caches, indices, embedded site data) are written compact.
+
+Usage:
+    python -m source.codec --benchmark
+"""
+import argparse
+import importlib.util
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Union
+
+_BACKEND_OVERRIDE = os.getenv("JSON_BACKEND", "").strip().lower()
+
+
+def _select_backend() -> str:
+    candidates = ("orjson", "msgspec", "json")
+    if _BACKEND_OVERRIDE in candidates:
+        candidates = (_BACKEND_OVERRIDE,)
+    for name in candidates:
+        if name == "json" or importlib.util.find_spec(name) is not None:
+            return name
+    return "json"
+
+
+BACKEND = _select_backend()
+
+if BACKEND == "orjson":
+    import orjson
+
+    DECODE_ERRORS = (json.JSONDecodeError, orjson.JSONDecodeError)
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumpb(obj, pretty: bool, sort_keys: bool) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+
+elif BACKEND == "msgspec":
+    import msgspec
+
+    _decoder = msgspec.json.Decoder()
+    _encoder = msgspec.json.Encoder()
+    _sorted_encoder = msgspec.json.Encoder(order="sorted")
+    DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+
+    def _loads(data):
+        return _decoder.decode(data)
+
+    def _dumpb(obj, pretty: bool, sort_keys: bool) -> bytes:
+        encoded = (_sorted_encoder if sort_keys else _encoder).encode(obj)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+
+else:
+    DECODE_ERRORS = (json.JSONDecodeError,)
+
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumpb(obj, pretty: bool, sort_keys: bool) -> bytes:
+        text = json.dumps(
+            obj,
+            ensure_ascii=False,
+            indent=2 if pretty else None,
+            separators=None if pretty else (",", ":"),
+            sort_keys=sort_keys,
+        )
+        return text.encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parses a JSON document (str or UTF-8 bytes)."""
+    return _loads(data)
+
+
+def dumpb(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """Serializes to UTF-8 bytes (compact unless ``pretty``)."""
+    return _dumpb(obj, pretty, sort_keys)
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Serializes to a str (compact unless ``pretty``)."""
+    return _dumpb(obj, pretty, sort_keys).decode("utf-8")
+
+
+def load_file(path: Path) -> Any:
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def dump_file(obj: Any, path: Path, pretty: bool = False, atomic: bool = False) -> None:
+    """Writes ``obj`` to ``path``; ``atomic`` replaces the file only once fully written."""
+    if atomic:
+        write_atomic(path, _dumpb(obj, pretty, False))
+        return
+    with open(path, 'wb') as f:
+        f.write(_dumpb(obj, pretty, False))
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Writes to a temp file in the same directory, then renames it over ``path``.
+
+    Readers and a crash mid-write see either the old or the new content,
+    never a truncated file: the data is fsynced before the rename and the
+    directory after it, so the rename cannot reach the disk ahead of the
+    content. Leftover temp files end in ``.tmp``.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persists a rename in ``directory`` (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def dump_model(model, path: Path, pretty: bool = True) -> None:
+    """Writes a Pydantic model (serialized by pydantic-core, which is already native)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(model.model_dump_json(indent=2 if pretty else None))
+
+
+def benchmark(directory: Path, repeat: int = 3) -> None:
+    files = sorted(directory.glob("*.json"))
+    if not files:
+        print(f"No JSON files in {directory}")
+        return
+    raw = [f.read_bytes() for f in files]
+    print(f"Files: {len(files)} ({sum(len(r) for r in raw) / 1e6:.2f} MB), backend: {BACKEND}")
+
+    def best_of(fn) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    docs = [json.loads(r) for r in raw]
+    results = {
+        "load  stdlib json": best_of(lambda: [json.loads(r) for r in raw]),
+        f"load  {BACKEND}": best_of(lambda: [loads(r) for r in raw]),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+
+        def write_stdlib():
+            for i, doc in enumerate(docs):
+                with open(tmp_path / f"{i}.json", 'w', encoding='utf-8') as f:
+                    json.dump(doc, f, indent=2, ensure_ascii=False)
+
+        def write_codec(pretty: bool):
+            for i, doc in enumerate(docs):
+                dump_file(doc, tmp_path / f"{i}.json", pretty=pretty)
+
+        results["write stdlib json (indent=2)"] = best_of(write_stdlib)
+        results[f"write {BACKEND} (pretty)"] = best_of(lambda: write_codec(True))
+        pretty_size = sum(len(dumpb(d, pretty=True)) for d in docs)
+        results[f"write {BACKEND} (compact)"] = best_of(lambda: write_codec(False))
+        compact_size = sum(len(dumpb(d)) for d in docs)
+
+    for name, seconds in results.items():
+        print(f"{name:32s} {seconds * 1000:8.1f} ms  ({seconds / len(files) * 1e6:.0f} us/file)")
+    print(f"Size pretty: {pretty_size / 1e6:.2f} MB, compact: {compact_size / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    from .config import OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="JSON codec utilities.")
+    parser.add_argument("--benchmark", action="store_true", help="Compare stdlib and fast backend on the corpus")
+    parser.add_argument("--dir", type=Path, default=OUTPUT_DIR, help="Directory of JSON files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.dir, args.repeat)
+    else:
+        parser.print_help()
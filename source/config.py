@@ -17,6 +17,48 @@ INPUT_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 TAXONOMY_DIR.mkdir(parents=True, exist_ok=True)
 
+# Ingest: data/input directory or a single PHI dump (.jsonl, .jsonl.gz or .zip)
+INPUT_SOURCE = Path(os.getenv("INPUT_SOURCE", INPUT_DIR))
+MIN_TEXT_LENGTH = int(os.getenv("MIN_TEXT_LENGTH", 1000))  # Roadmap: only substantial texts are tagged
+INGEST_REGIONS = [r.strip() for r in os.getenv("INGEST_REGIONS", "").split(",") if r.strip()]
+INGEST_DATE_MIN = float(os.environ["INGEST_DATE_MIN"]) if os.getenv("INGEST_DATE_MIN") else None
+INGEST_DATE_MAX = float(os.environ["INGEST_DATE_MAX"]) if os.getenv("INGEST_DATE_MAX") else None
+
+# Normalized corpus snapshot (python -m source.corpus build)
+CORPUS_DB_PATH = Path(os.getenv("CORPUS_DB_PATH", DATA_DIR / "corpus.sqlite"))
+# Text normalization runs in a process pool from this many documents on
+PREPROCESS_PARALLEL_MIN_BATCH = int(os.getenv("PREPROCESS_PARALLEL_MIN_BATCH", 2000))
+
+# Output maintenance passes (enforce_schema_retroactive, reconcile_entities): pool size, 0 = CPU count
+MAINTENANCE_WORKERS = int(os.getenv("MAINTENANCE_WORKERS", 0))
+
+# Inverted index taxonomy path -> PHI ids of the outputs (python -m source.path_index)
+PATH_INDEX_PATH = Path(os.getenv("PATH_INDEX_PATH", DATA_DIR / "path_index.sqlite"))
+
+# Structural validation (python -m source.validation): report with per-file content hashes
+VALIDATION_DIR = Path(os.getenv("VALIDATION_DIR", DATA_DIR / "validation"))
+VALIDATION_MAX_FAILURES = int(os.getenv("VALIDATION_MAX_FAILURES", 0))  # Stop after N invalid files (0 = check all)
+
+# Quote verification (source/quotes.py): minimum similarity of a fuzzy match, below it a quote is not_found
+QUOTE_MIN_SIMILARITY = float(os.getenv("QUOTE_MIN_SIMILARITY", 0.75))
+
+# Binary Pleiades gazetteer index, built from the CSV dumps on first use (python -m source.gazetteer --build)
+GAZETTEER_INDEX_DIR = Path(os.getenv("GAZETTEER_INDEX_DIR", DATA_DIR / "gazetteer_index"))
+# Optional JSON file replacing sections of gazetteer.DEFAULT_SCORING (candidate priors and place type bonuses)
+GAZETTEER_SCORING = os.getenv("GAZETTEER_SCORING", "")
+
+# Entity resolution (python -m source.entity_resolution): clusters of name variants with their IDs
+ENTITY_INDEX_PATH = Path(os.getenv("ENTITY_INDEX_PATH", DATA_DIR / "entities.json"))
+# Minimum similarity of two normalized names for them to be merged into one entity
+ENTITY_MATCH_THRESHOLD = float(os.getenv("ENTITY_MATCH_THRESHOLD", 0.92))
+
+# Benchmark and scale-test results (python -m source.scale_test)
+BENCHMARKS_DIR = DATA_DIR / "benchmarks"
+
+# Taxonomy enforcement: invalid paths are repaired to the nearest valid path
+# at or above this confidence before pruning (above 1 disables repairs)
+TAXONOMY_REPAIR_THRESHOLD = float(os.getenv("TAXONOMY_REPAIR_THRESHOLD", 0.85))
+
 # Logs
 LOGS_DIR = DATA_DIR / "logs"
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -32,3 +74,78 @@ DEFAULT_MODEL_NAME = os.getenv("DEFAULT_MODEL_NAME", "gemini-3-flash-preview")
 
 # Project Settings
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()  # Run log file: json (JSON lines) or text
+LOG_ITEM_SAMPLE_EVERY = int(os.getenv("LOG_ITEM_SAMPLE_EVERY", 10))  # Console shows 1 in N per-inscription lines
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# LLM Client Resilience
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 120))  # seconds per call
+LLM_TOTAL_DEADLINE = float(os.getenv("LLM_TOTAL_DEADLINE", 600))  # seconds incl. retries
+LLM_HEDGE_ENABLED = _env_flag("LLM_HEDGE_ENABLED")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", 5))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", 60))
+
+# Streaming with incremental validation (early abort on bad or runaway output)
+LLM_STREAMING = _env_flag("LLM_STREAMING")
+STREAM_MAX_CHARS = int(os.getenv("STREAM_MAX_CHARS", 60000))
+STREAM_MAX_VIOLATIONS = int(os.getenv("STREAM_MAX_VIOLATIONS", 2))
+
+# Multi-provider routing (DEFAULT_MODEL_PROVIDER=router)
+# LLM_BACKENDS is a JSON list of backend specs, or a path to a JSON file with one.
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+ROUTER_THROTTLE_COOLDOWN = float(os.getenv("ROUTER_THROTTLE_COOLDOWN", 30))
+
+
+def load_backend_specs() -> list:
+    """Parses LLM_BACKENDS (inline JSON or a JSON file path)."""
+    import json
+
+    raw = LLM_BACKENDS.strip()
+    if not raw:
+        return []
+    if not raw.startswith("["):
+        with open(raw, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(raw)
+
+# Concurrency and shared HTTP connection pool for provider clients
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 5))
+# Default leaves room for hedged duplicates (two requests per worker) plus slack
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", MAX_WORKERS * 2 + 4))
+# Threads for hedged LLM calls; sized like the HTTP pool so primaries never queue behind each other
+LLM_HEDGE_POOL_SIZE = int(os.getenv("LLM_HEDGE_POOL_SIZE", MAX_WORKERS * 2 + 4))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 120))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 30))
+HTTP2_ENABLED = _env_flag("HTTP2_ENABLED", "true")
+
+# Scheduling of the parallel runner (python -m source.main_parallel)
+# lpt: longest estimated inscriptions start first; random: previous shuffled order
+SCHEDULE_ORDER = os.getenv("SCHEDULE_ORDER", "lpt").strip().lower()
+SCHEDULE_WINDOW = int(os.getenv("SCHEDULE_WINDOW", 0))  # Sort within windows of N items (0 = whole run)
+# Dedicated workers for the longest inscriptions (0 = single shared pool)
+LONG_LANE_WORKERS = int(os.getenv("LONG_LANE_WORKERS", 0))
+LONG_LANE_QUANTILE = float(os.getenv("LONG_LANE_QUANTILE", 0.9))
+
+# Run budget, pricing and provider rate limits (0 = unlimited)
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", 0))
+RUN_SPEND_BUDGET = float(os.getenv("RUN_SPEND_BUDGET", 0))  # USD
+PRICE_INPUT_PER_MTOK = float(os.getenv("PRICE_INPUT_PER_MTOK", 0.50))  # USD per 1M input tokens
+PRICE_OUTPUT_PER_MTOK = float(os.getenv("PRICE_OUTPUT_PER_MTOK", 3.00))  # USD per 1M output tokens
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", 0))
+RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", 0))
+
+# Local theme classifier (python -m source.classifier train)
+# off: disabled, hints: candidate paths in the Proposer prompt,
+# route: hints + confident inscriptions are tagged locally without the LLM
+CLASSIFIER_MODE = os.getenv("CLASSIFIER_MODE", "off").strip().lower()
+CLASSIFIER_MODEL_PATH = Path(os.getenv("CLASSIFIER_MODEL_PATH", DATA_DIR / "models" / "theme_classifier.npz"))
+CLASSIFIER_THRESHOLD = float(os.getenv("CLASSIFIER_THRESHOLD", 0.5))
+CLASSIFIER_ROUTE_CONFIDENCE = float(os.getenv("CLASSIFIER_ROUTE_CONFIDENCE", 0.9))
+CLASSIFIER_MAX_HINTS = int(os.getenv("CLASSIFIER_MAX_HINTS", 8))
@@ -0,0 +1,332 @@
+"""
+Normalized corpus snapshot shared by the pipeline, the site builder and the API.
+
+The raw PHI JSON (``INPUT_SOURCE``: the ``data/input`` directory or a single
+JSONL/zip dump) is parsed, filtered, validated and normalized once into a
+SQLite file (``data/corpus.sqlite``) holding text, regions and dates plus the
+content hash of each record. Rebuilds are incremental: files whose size/mtime
+(or, failing that, content hash) are unchanged are not parsed again, and an
+unchanged dump is not read at all. Bumping ``SNAPSHOT_VERSION`` (e.g. after
+changing the normalization in ``preprocessing``) or changing the ingest
+filter forces a full rebuild.
+
+Usage:
+    python -m source.corpus build [--force]
+    python -m source.corpus stats
+    python -m source.corpus show <phi_id>
+"""
+import argparse
+import hashlib
+import logging
+import sqlite3
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from . import codec
+from .config import CORPUS_DB_PATH, INPUT_SOURCE
+from .data_loader import IngestFilter, IngestStats, InputInscription, default_ingest_filter, iter_records
+from .preprocessing import clean_metadata_batch
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Changed records are normalized and committed in chunks of this size, so a
+# full rebuild from a large dump never holds more than one chunk in memory
+CHUNK_SIZE = 4000
+
+FIELDS = (
+    "text", "metadata", "region_main_id", "region_main", "region_sub_id", "region_sub",
+    "date_str", "date_min", "date_max", "date_circa",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS inscriptions (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT,
+    region_main_id TEXT,
+    region_main TEXT,
+    region_sub_id TEXT,
+    region_sub TEXT,
+    date_str TEXT,
+    date_min REAL,
+    date_max REAL,
+    date_circa INTEGER
+);
+CREATE TABLE IF NOT EXISTS rejected (
+    source TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    reason TEXT NOT NULL
+);
+"""
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _snapshot_key(ingest_filter: IngestFilter) -> str:
+    """Changes whenever a full rebuild is required."""
+    return f"{SNAPSHOT_VERSION}:{ingest_filter!r}"
+
+
+def _scan_directory(input_dir: Path, known: dict, conn: sqlite3.Connection, ingest_filter: IngestFilter,
+                    stats: dict, seen: set) -> Iterator[tuple]:
+    """One file per inscription; unchanged files are skipped by size/mtime without reading."""
+    for file_path in sorted(input_dir.glob("*.json")):
+        source = file_path.name
+        seen.add(source)
+        st = file_path.stat()
+        previous = known.get(source)
+        if previous and previous[1] == st.st_size and previous[2] == st.st_mtime:
+            stats["unchanged"] += 1
+            continue
+
+        raw = file_path.read_bytes()
+        digest = file_hash(raw)
+        if previous and previous[0] == digest:
+            # Touched but identical: only refresh the stat fingerprint
+            for table in ("inscriptions", "rejected"):
+                conn.execute(f"UPDATE {table} SET size = ?, mtime = ? WHERE source = ?",
+                             (st.st_size, st.st_mtime, source))
+            stats["unchanged"] += 1
+            continue
+
+        invalid = None
+        try:
+            data = codec.loads(raw)
+            reason = ingest_filter.reject_reason(data)
+            inscription = None if reason else InputInscription(**data)
+        except Exception as e:
+            logger.warning(f"Skipping invalid input {file_path}: {e}")
+            invalid = reason = f"invalid: {type(e).__name__}"
+        if reason:
+            # A file that became invalid or filtered must not keep its old row
+            stats["removed"] += conn.execute("DELETE FROM inscriptions WHERE source = ?", (source,)).rowcount
+            # Remembered so the next build does not re-read the file
+            conn.execute("INSERT OR REPLACE INTO rejected (source, content_hash, size, mtime, reason) "
+                         "VALUES (?, ?, ?, ?, ?)", (source, digest, st.st_size, st.st_mtime, reason))
+            stats["invalid" if invalid else "filtered"] += 1
+            continue
+        stats["updated" if previous else "added"] += 1
+        yield source, digest, st.st_size, st.st_mtime, inscription
+
+
+def _scan_stream(source_path: Path, known: dict, ingest_filter: IngestFilter,
+                 stats: dict, seen: set) -> Iterator[tuple]:
+    """Single JSONL/zip dump: one sequential read, records compared by content hash."""
+    ingest = IngestStats()
+    for _, digest, inscription in iter_records(source_path, ingest_filter, ingest):
+        source = f"{source_path.name}#{inscription.id}"
+        seen.add(source)
+        previous = known.get(source)
+        if previous and previous[0] == digest:
+            stats["unchanged"] += 1
+            continue
+        stats["updated" if previous else "added"] += 1
+        yield source, digest, 0, 0.0, inscription
+    stats["invalid"] += ingest.invalid
+    stats["filtered"] += sum(ingest.rejected.values())
+    for line in ingest.summary_lines():
+        logger.info(f"Ingest: {line}")
+
+
+def _store(conn: sqlite3.Connection, changed: List[tuple]) -> None:
+    """Normalizes one chunk of (source, hash, size, mtime, inscription) entries and writes it."""
+    cleaned = clean_metadata_batch([entry[4] for entry in changed])
+    placeholders = ", ".join("?" for _ in range(5 + len(FIELDS)))
+    for (key, digest, size, mtime, _), inscription in zip(changed, cleaned):
+        conn.execute("DELETE FROM rejected WHERE source = ?", (key,))
+        conn.execute("DELETE FROM inscriptions WHERE source = ? OR id = ?", (key, inscription.id))
+        conn.execute(
+            f"INSERT INTO inscriptions (id, source, content_hash, size, mtime, {', '.join(FIELDS)}) "
+            f"VALUES ({placeholders})",
+            (inscription.id, key, digest, size, mtime,
+             *(getattr(inscription, name) for name in FIELDS)),
+        )
+
+
+def build_snapshot(
+    source: Path = INPUT_SOURCE,
+    db_path: Path = CORPUS_DB_PATH,
+    force: bool = False,
+    ingest_filter: Optional[IngestFilter] = None,
+) -> dict:
+    """
+    Brings the snapshot up to date with ``source``: a directory of JSON files,
+    or a single JSONL / JSONL.gz / zip dump (see ``data_loader.iter_raw_records``).
+
+    Returns:
+        Counts of added, updated, unchanged, removed, filtered and invalid records.
+    """
+    ingest_filter = ingest_filter or default_ingest_filter()
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "filtered": 0, "invalid": 0}
+    conn = _connect(db_path)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if force or meta.get("version") != _snapshot_key(ingest_filter):
+            conn.execute("DELETE FROM inscriptions")
+            conn.execute("DELETE FROM rejected")
+            meta = {}
+
+        if not source.exists():
+            return stats
+
+        # A dump whose size/mtime did not change needs no read at all
+        st = source.stat()
+        fingerprint = f"{source.resolve()}:{st.st_size}:{st.st_mtime}"
+        if not source.is_dir() and meta.get("source") == fingerprint:
+            stats["unchanged"] = conn.execute("SELECT COUNT(*) FROM inscriptions").fetchone()[0]
+            return stats
+
+        # Chunks are committed as they go: until the scan completes, an
+        # interrupted build must not look up to date
+        conn.execute("DELETE FROM meta WHERE key = 'source'")
+        known = {
+            row[0]: row[1:]
+            for table in ("inscriptions", "rejected")
+            for row in conn.execute(f"SELECT source, content_hash, size, mtime FROM {table}")
+        }
+        seen: set = set()
+        if source.is_dir():
+            changed = _scan_directory(source, known, conn, ingest_filter, stats, seen)
+        else:
+            changed = _scan_stream(source, known, ingest_filter, stats, seen)
+
+        # Normalize changed inputs chunk by chunk (process pool for large chunks);
+        # only ``known`` and ``seen`` grow with the corpus
+        while chunk := list(islice(changed, CHUNK_SIZE)):
+            _store(conn, chunk)
+            conn.commit()
+
+        for key in set(known) - seen:
+            removed = conn.execute("DELETE FROM inscriptions WHERE source = ?", (key,)).rowcount
+            conn.execute("DELETE FROM rejected WHERE source = ?", (key,))
+            stats["removed"] += removed
+
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (_snapshot_key(ingest_filter),))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (fingerprint,))
+        conn.commit()
+    finally:
+        conn.close()
+    return stats
+
+
+class CorpusSnapshot:
+    """Read access to the snapshot with random access by PHI id (thread-safe)."""
+
+    def __init__(self, db_path: Path = CORPUS_DB_PATH):
+        if not db_path.exists():
+            raise FileNotFoundError(f"Corpus snapshot not found at {db_path}; run 'python -m source.corpus build'")
+        self.db_path = db_path
+        self._local = threading.local()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_inscription(row: tuple) -> InputInscription:
+        data = dict(zip(("id",) + FIELDS, row))
+        if data["date_circa"] is not None:
+            data["date_circa"] = bool(data["date_circa"])
+        return InputInscription(**data)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM inscriptions").fetchone()[0]
+
+    def __contains__(self, phi_id: int) -> bool:
+        return self._conn.execute("SELECT 1 FROM inscriptions WHERE id = ?", (phi_id,)).fetchone() is not None
+
+    def ids(self) -> List[int]:
+        return [row[0] for row in self._conn.execute("SELECT id FROM inscriptions ORDER BY id")]
+
+    def get(self, phi_id: int) -> Optional[InputInscription]:
+        row = self._conn.execute(
+            f"SELECT id, {', '.join(FIELDS)} FROM inscriptions WHERE id = ?", (phi_id,)
+        ).fetchone()
+        return self._to_inscription(row) if row else None
+
+    def content_hash(self, phi_id: int) -> Optional[str]:
+        row = self._conn.execute("SELECT content_hash FROM inscriptions WHERE id = ?", (phi_id,)).fetchone()
+        return row[0] if row else None
+
+    def iter_inscriptions(self, limit: Optional[int] = None, min_length: int = 0) -> Iterator[InputInscription]:
+        query = f"SELECT id, {', '.join(FIELDS)} FROM inscriptions"
+        params: tuple = ()
+        if min_length > 0:
+            query += " WHERE length(text) >= ?"
+            params += (min_length,)
+        query += " ORDER BY id"
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        for row in self._conn.execute(query, params):
+            yield self._to_inscription(row)
+
+
+def load_corpus(limit: Optional[int] = None, refresh: bool = True, min_length: int = 0) -> List[InputInscription]:
+    """
+    Returns the normalized inscriptions, updating the snapshot first.
+
+    This replaces ``load_inscriptions`` + ``clean_metadata`` for consumers of
+    the whole corpus; the texts are already normalized. The snapshot holds
+    every valid input; the tagging entry points pass ``MIN_TEXT_LENGTH`` as
+    ``min_length`` to select what to process.
+    """
+    if refresh:
+        stats = build_snapshot()
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            logger.info(f"Corpus snapshot updated: {stats}")
+    return list(CorpusSnapshot().iter_inscriptions(limit=limit, min_length=min_length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the normalized corpus snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build", help="Create or incrementally update the snapshot")
+    build_p.add_argument("--force", action="store_true", help="Rebuild from scratch")
+    sub.add_parser("stats", help="Show snapshot size and version")
+    show_p = sub.add_parser("show", help="Print one normalized inscription")
+    show_p.add_argument("phi_id", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        stats = build_snapshot(force=args.force)
+        print(f"Snapshot {CORPUS_DB_PATH}: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+    elif args.command == "stats":
+        snapshot = CorpusSnapshot()
+        print(f"Snapshot: {CORPUS_DB_PATH} (version {SNAPSHOT_VERSION})")
+        print(f"Inscriptions: {len(snapshot)}")
+        print(f"Size: {CORPUS_DB_PATH.stat().st_size / 1e6:.1f} MB")
+    else:
+        inscription = CorpusSnapshot().get(args.phi_id)
+        if inscription is None:
+            print(f"Inscription {args.phi_id} not in snapshot")
+        else:
+            print(inscription.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
-import json
+import argparse
+import gzip
+import hashlib
+import logging
+import time
+import zipfile
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field, ValidationError
+from . import codec
+
+logger = logging.getLogger(__name__)
 
 class InputInscription(BaseModel):
     id: int
@@ -18,28 +27,199 @@ class InputInscription(BaseModel):
 
 def load_inscription(file_path: Path) -> InputInscription:
     """Loads a single inscription from a JSON file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return InputInscription(**data)
+    return InputInscription(**codec.load_file(file_path))
 
 def load_inscriptions(directory: Path, limit: Optional[int] = None) -> List[InputInscription]:
     """
     Loads all JSON inscriptions from a directory.
-    
+
     Args:
         directory: Path to the directory containing JSON files.
         limit: Optional maximum number of files to load (useful for testing).
     """
     inscriptions = []
     files = list(directory.glob("*.json"))
-    
+
     if limit:
         files = files[:limit]
-        
+
     for file_path in files:
         try:
             inscriptions.append(load_inscription(file_path))
         except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-            
+            logger.warning(f"Error loading {file_path}: {e}")
+
     return inscriptions
+
+
+# --- Streaming bulk ingest (single PHI dump instead of one file per inscription) ---
+
+@dataclass
+class IngestFilter:
+    """
+    Filters applied to raw records during the stream, before validation.
+
+    Attributes:
+        min_length: Drop texts shorter than this many characters. The corpus
+            snapshot keeps all lengths; ``MIN_TEXT_LENGTH`` is applied when
+            selecting what to tag (see ``corpus.load_corpus``).
+        regions: Keep only these ``region_main`` values (None = all).
+        date_min / date_max: Keep only inscriptions overlapping this date range.
+    """
+    min_length: int = 0
+    regions: Optional[Set[str]] = None
+    date_min: Optional[float] = None
+    date_max: Optional[float] = None
+
+    def reject_reason(self, data: dict) -> Optional[str]:
+        if len(data.get("text") or "") < self.min_length:
+            return "too_short"
+        # Region names are compared without corpus citations, e.g. "Attica (IG I-III)" -> "Attica"
+        if self.regions is not None and (data.get("region_main") or "").split(" (")[0].strip() not in self.regions:
+            return "region"
+        if self.date_min is not None and (data.get("date_max") is None or data["date_max"] < self.date_min):
+            return "date"
+        if self.date_max is not None and (data.get("date_min") is None or data["date_min"] > self.date_max):
+            return "date"
+        return None
+
+
+@dataclass
+class IngestStats:
+    records: int = 0
+    loaded: int = 0
+    invalid: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    bytes_read: int = 0
+    seconds: float = 0.0
+
+    def summary_lines(self) -> List[str]:
+        rate = self.records / self.seconds if self.seconds else 0.0
+        lines = [
+            f"Records read: {self.records:,} ({self.bytes_read / 1e6:.1f} MB in {self.seconds:.1f}s, {rate:,.0f} rec/s)",
+            f"Loaded: {self.loaded:,}",
+            f"Invalid: {self.invalid:,}",
+        ]
+        lines += [f"Filtered ({reason}): {count:,}" for reason, count in sorted(self.rejected.items())]
+        return lines
+
+
+def _iter_lines(stream, name: str) -> Iterator[Tuple[str, bytes]]:
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            yield f"{name}:{lineno}", line
+
+
+def iter_raw_records(source: Path) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yields (key, raw_json_bytes) from a directory of JSON files, a JSONL file
+    (optionally gzipped) or a zip archive of JSON/JSONL members.
+
+    Archives are read sequentially, one record at a time.
+    """
+    if source.is_dir():
+        for file_path in sorted(source.glob("*.json")):
+            yield file_path.name, file_path.read_bytes()
+    elif source.suffix == ".zip":
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if info.filename.endswith(".json"):
+                    yield info.filename, archive.read(info)
+                elif info.filename.endswith((".jsonl", ".jsonl.gz")):
+                    with archive.open(info) as member:
+                        stream = gzip.open(member) if info.filename.endswith(".gz") else member
+                        yield from _iter_lines(stream, info.filename)
+    elif source.suffix == ".gz":
+        with gzip.open(source, "rb") as stream:
+            yield from _iter_lines(stream, source.name)
+    else:
+        with open(source, "rb") as stream:
+            yield from _iter_lines(stream, source.name)
+
+
+def iter_records(
+    source: Path,
+    ingest_filter: Optional[IngestFilter] = None,
+    stats: Optional[IngestStats] = None,
+    limit: Optional[int] = None,
+) -> Iterator[Tuple[str, str, InputInscription]]:
+    """
+    Streams validated inscriptions as (key, content_hash, inscription).
+
+    Filters run on the decoded dict before Pydantic validation, so rejected
+    records cost only the JSON parse.
+    """
+    stats = stats if stats is not None else IngestStats()
+    start = time.perf_counter()
+    try:
+        for key, raw in iter_raw_records(source):
+            stats.records += 1
+            stats.bytes_read += len(raw)
+            try:
+                data = codec.loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("record is not a JSON object")
+            except (ValueError, *codec.DECODE_ERRORS):
+                stats.invalid += 1
+                continue
+            reason = ingest_filter.reject_reason(data) if ingest_filter else None
+            if reason:
+                stats.rejected[reason] = stats.rejected.get(reason, 0) + 1
+                continue
+            try:
+                inscription = InputInscription(**data)
+            except ValidationError:
+                stats.invalid += 1
+                continue
+            stats.loaded += 1
+            yield key, hashlib.sha256(raw).hexdigest(), inscription
+            if limit and stats.loaded >= limit:
+                break
+    finally:
+        stats.seconds += time.perf_counter() - start
+
+
+def iter_inscriptions(
+    source: Path,
+    ingest_filter: Optional[IngestFilter] = None,
+    stats: Optional[IngestStats] = None,
+    limit: Optional[int] = None,
+) -> Iterator[InputInscription]:
+    """Streams inscriptions from any supported source (see ``iter_raw_records``)."""
+    for _, _, inscription in iter_records(source, ingest_filter, stats, limit):
+        yield inscription
+
+
+def default_ingest_filter(min_length: int = 0) -> IngestFilter:
+    """Corpus scope configured via INGEST_REGIONS / INGEST_DATE_MIN / INGEST_DATE_MAX."""
+    from .config import INGEST_DATE_MAX, INGEST_DATE_MIN, INGEST_REGIONS
+
+    return IngestFilter(
+        min_length=min_length,
+        regions=set(INGEST_REGIONS) if INGEST_REGIONS else None,
+        date_min=INGEST_DATE_MIN,
+        date_max=INGEST_DATE_MAX,
+    )
+
+
+if __name__ == "__main__":
+    from .config import INPUT_SOURCE, MIN_TEXT_LENGTH
+
+    parser = argparse.ArgumentParser(description="Stream a PHI dump and report ingest statistics.")
+    parser.add_argument("--source", type=Path, default=INPUT_SOURCE,
+                        help="Directory, .jsonl, .jsonl.gz or .zip (default: INPUT_SOURCE)")
+    parser.add_argument("--min-length", type=int, default=None, help="Override MIN_TEXT_LENGTH")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    ingest_filter = default_ingest_filter(MIN_TEXT_LENGTH if args.min_length is None else args.min_length)
+    stats = IngestStats()
+    lengths = [len(i.text) for i in iter_inscriptions(args.source, ingest_filter, stats, args.limit)]
+    for line in stats.summary_lines():
+        print(line)
+    if lengths:
+        lengths.sort()
+        print(f"Text length: median {lengths[len(lengths) // 2]:,}, max {lengths[-1]:,} characters")
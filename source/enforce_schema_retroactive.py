@@ -1,76 +1,207 @@
 """
 Retroactively enforces taxonomy compliance on existing output files.
-Reads each JSON file in data/output/, applies the new pruning logic, and saves it back if changes are made.
+
+By default only outputs affected by a taxonomy change are touched: the
+current taxonomy is diffed against the one the outputs were last migrated to
+(stored in the path index, see ``path_index``), renamed and moved nodes are
+mapped to their new paths, and inscriptions under split or removed nodes are
+listed for re-tagging. The first run, and ``--full``, read every file in
+data/output/, apply the pruning logic and save files whose themes changed.
+
+Files are processed in a process pool and replaced atomically; ``--dry-run``
+only reports what would change.
+
+Usage:
+    python -m source.enforce_schema_retroactive [--full] [--dry-run]
 """
-import json
+import argparse
+import datetime
 import logging
-from pathlib import Path
-from tqdm import tqdm
+import time
+from typing import Dict, List, Optional, Tuple
 
-from source.config import OUTPUT_DIR, TAXONOMY_DIR
-from source.taxonomy_utils import enforce_taxonomy_compliance, load_taxonomy
+from source import codec
+from source.batch_rewrite import RewriteReport, rewrite_files
+from source.config import DATA_DIR, OUTPUT_DIR, PATH_INDEX_PATH, TAXONOMY_DIR
+from source.logging_setup import setup_logging
+from source.path_index import PathIndex, split_key
+from source.taxonomy_diff import RENAMED, MOVED, TaxonomyDiff, diff_taxonomies
+from source.taxonomy_utils import enforce_taxonomy_compliance, get_taxonomy_index, load_taxonomy
 
 # Define path
 TAXONOMY_PATH = TAXONOMY_DIR / "taxonomy.json"
+MIGRATIONS_DIR = DATA_DIR / "migrations"
 
 # Setup Logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+setup_logging()
 logger = logging.getLogger(__name__)
 
-def main():
-    logger.info("Loading taxonomy...")
-    try:
-        taxonomy = load_taxonomy(TAXONOMY_PATH)
-    except Exception as e:
-        logger.error(f"Failed to load taxonomy: {e}")
-        return
 
+_TAXONOMY: dict = {}
+_DIFF: Optional[TaxonomyDiff] = None
+
+
+def init_taxonomy(taxonomy: dict, baseline: Optional[dict] = None) -> None:
+    """
+    Worker initializer for the transforms below: the taxonomy (and the diff
+    from ``baseline``) is sent to each worker once instead of with every chunk.
+    """
+    global _TAXONOMY, _DIFF
+    _TAXONOMY = taxonomy
+    _DIFF = diff_taxonomies(baseline, taxonomy) if baseline is not None else None
+
+
+def enforce_transform(data: dict) -> List[str]:
+    """Batch transform: enforces the taxonomy on one output, returns the corrections."""
+    # We only care about the 'themes' part for taxonomy compliance
+    if "themes" not in data:
+        return []
+    _, corrections = enforce_taxonomy_compliance(data, _TAXONOMY)
+    return corrections
+
+
+def enforce_all(taxonomy: dict, dry_run: bool = False) -> RewriteReport:
+    """Enforces the taxonomy on every output file (process pool, atomic writes)."""
     logger.info(f"Scanning {OUTPUT_DIR}...")
     files = list(OUTPUT_DIR.glob("*.json"))
-    
+
     if not files:
         logger.info("No files found to process.")
-        return
+        return RewriteReport(dry_run=dry_run)
 
-    modified_count = 0
-    total_corrections = 0
-    
-    # Use tqdm for progress bar
-    for file_path in tqdm(files, desc="Enforcing Schema"):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Apply enforcement
-            # We only care about the 'themes' part for taxonomy compliance
-            if "themes" in data:
-                original_themes = json.dumps(data["themes"], sort_keys=True)
-                
-                # Run the enforcement
-                corrected_data, corrections = enforce_taxonomy_compliance(data, taxonomy)
-                
-                # Check if changes actually happened (enforce_taxonomy_compliance modifies in-place, but returns tuple)
-                new_themes = json.dumps(corrected_data["themes"], sort_keys=True)
-                
-                if corrections:
-                    modified_count += 1
-                    total_corrections += len(corrections)
-                    
-                    # Log corrections (compactly)
-                    # tqdm.write(f"Fixed {file_path.name}: {len(corrections)} corrections")
-                    
-                    # Save back to file
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        json.dump(corrected_data, f, indent=2, ensure_ascii=False)
-                        
-        except Exception as e:
-            logger.error(f"Error processing {file_path.name}: {e}")
+    report = rewrite_files(files, enforce_transform, dry_run=dry_run, desc="Enforcing Schema",
+                           initializer=init_taxonomy, initargs=(taxonomy,))
 
     logger.info("=" * 40)
     logger.info(f"Processing Complete.")
-    logger.info(f"Files Modified: {modified_count}/{len(files)}")
-    logger.info(f"Total Corrections Applied: {total_corrections}")
+    logger.info(f"Files Modified: {report.changed}/{len(files)}")
+    logger.info(f"Total Corrections Applied: {report.notes}")
+    for line in report.summary_lines():
+        logger.info(line)
     logger.info("=" * 40)
+    return report
+
+
+def _theme_depth(data: dict) -> int:
+    return sum(1 for theme in data.get("themes", []) for value in (theme.get("hierarchy") or {}).values() if value)
+
+
+def migrate_transform(data: dict) -> List[Tuple[str, str]]:
+    """
+    Batch transform: applies rename/move mappings, then enforces the taxonomy
+    (both set up by ``init_taxonomy`` with a baseline).
+
+    Returns (kind, message) notes; kind "retag" marks themes under split or
+    removed nodes and themes that enforcement had to prune or remove.
+    """
+    notes = []
+    for theme in data.get("themes", []):
+        kind, message = _DIFF.migrate_theme(theme)
+        if kind in (RENAMED, MOVED):
+            notes.append(("migrated", message))
+        elif kind is not None:
+            notes.append(("retag", message))
+    depth_before = _theme_depth(data)
+    data, corrections = enforce_taxonomy_compliance(data, _TAXONOMY)
+    if _theme_depth(data) < depth_before:
+        notes.extend(("retag", c) for c in corrections)
+    return notes
+
+
+def migrate(baseline: dict, taxonomy: dict, index: PathIndex, dry_run: bool = False) -> dict:
+    """
+    Migrates only the outputs affected by the change from ``baseline`` to ``taxonomy``.
+
+    Themes under renamed or moved nodes get their new path; files with themes
+    under split or removed nodes (or otherwise invalid paths) are enforced
+    as usual and their inscriptions listed for re-tagging.
+
+    Returns:
+        Report with the classified changes, migrated theme count, modified
+        files and the PHI ids to re-tag.
+    """
+    start = time.perf_counter()
+    diff = diff_taxonomies(baseline, taxonomy)
+    for change in diff.changes:
+        logger.info(f"Taxonomy change: {change.describe()}")
+
+    new_index = get_taxonomy_index(taxonomy)
+    files: Dict[str, int] = index.files_under(diff.affected_prefixes())
+    # Outputs that were already invalid (e.g. written with an older prompt) are fixed on the way
+    invalid_paths = [key for key in index.path_counts()
+                     if split_key(key) + (None,) * (4 - len(split_key(key))) not in new_index.valid]
+    files.update(index.files_with_paths(invalid_paths))
+
+    result = rewrite_files([OUTPUT_DIR / name for name in sorted(files)], migrate_transform,
+                           dry_run=dry_run, desc="Migrating",
+                           initializer=init_taxonomy, initargs=(taxonomy, baseline))
+    migrated = sum(1 for r in result.results for kind, _ in r.notes if kind == "migrated")
+    retag = {files[r.name] for r in result.results if any(kind == "retag" for kind, _ in r.notes)}
+    modified = [r.name for r in result.results if r.status == "changed"]
+    if not dry_run:
+        index.refresh(modified)
+
+    report = {
+        "from_version": diff.old_index.version,
+        "to_version": diff.new_index.version,
+        "changes": [
+            {"kind": c.kind, "old": list(c.old_path) if c.old_path else None, "new": [list(p) for p in c.new_paths]}
+            for c in diff.changes
+        ],
+        "files_checked": len(files),
+        "files_modified": len(modified),
+        "themes_migrated": migrated,
+        "retag": sorted(retag),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info("=" * 40)
+    logger.info(f"Migration {report['from_version']} -> {report['to_version']}: "
+                + (", ".join(f"{n} {kind}" for kind, n in sorted(diff.counts().items())) or "no node changes"))
+    logger.info(f"Files checked: {len(files)}, modified: {len(modified)}, themes migrated: {migrated}")
+    logger.info(f"Inscriptions to re-tag: {len(retag)}")
+    logger.info(f"Migration time: {report['seconds']:.3f}s")
+    logger.info("=" * 40)
+    if dry_run:
+        for line in result.diff_summary():
+            logger.info(line)
+    return report
+
+
+def main(full: bool = False, dry_run: bool = False):
+    logger.info("Loading taxonomy...")
+    try:
+        taxonomy = load_taxonomy(TAXONOMY_PATH)
+    except Exception as e:
+        logger.error(f"Failed to load taxonomy: {e}")
+        return
+
+    with PathIndex(PATH_INDEX_PATH, OUTPUT_DIR) as index:
+        baseline = index.taxonomy()
+        if full or baseline is None:
+            report = enforce_all(taxonomy, dry_run=dry_run)
+            if dry_run:
+                for line in report.diff_summary():
+                    logger.info(line)
+                return
+            index.refresh()
+        else:
+            index.refresh()
+            report = migrate(baseline, taxonomy, index, dry_run=dry_run)
+            if dry_run:
+                return
+            if report["changes"] or report["files_modified"]:
+                MIGRATIONS_DIR.mkdir(parents=True, exist_ok=True)
+                stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+                report_path = MIGRATIONS_DIR / f"migration_{stamp}.json"
+                codec.dump_file(report, report_path, pretty=True)
+                logger.info(f"Report (incl. re-tag list): {report_path}")
+        index.set_taxonomy(taxonomy)
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Apply the current taxonomy to existing outputs.")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-enforce every output instead of only those affected by taxonomy changes")
+    parser.add_argument("--dry-run", action="store_true", help="Write nothing; summarize what would change")
+    args = parser.parse_args()
+    main(full=args.full, dry_run=args.dry_run)
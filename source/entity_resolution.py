@@ -0,0 +1,365 @@
+"""
+Entity resolution: groups spelling variants of person, place and deity names.
+
+The LLM spells names as it finds them ("Hadrian", "Hadrianus",
+"Hadrian (emperor)"; "Asklepios", "Asclepius"). This pass clusters the
+variants and writes a canonical form and a stable ID back into every entity
+of the outputs (``canonical``, ``entity_id``), so the API, the website
+indices and reconciliation can work on entities instead of raw strings.
+
+It stays near-linear at corpus scale:
+
+- every distinct name is reduced to a *key*: parenthetical qualifiers
+  dropped, Greek transliterated, Latin/Greek spelling variants folded
+  (c/k, ph/f, ae/ai, inner ai/e, ou/u, ...), as are equivalent endings
+  (-os/-us, ...)
+- names are only compared within *blocks* (first letters of the key and a
+  consonant skeleton); oversized blocks fall back to a sorted neighbourhood
+- pairs score 1.0 for equal keys, otherwise (long keys that only differ in
+  inner vowels, i.e. typos and dialect forms) by string similarity; pairs
+  above ``ENTITY_MATCH_THRESHOLD`` are merged (union-find), except when
+  that would join two clusters linked to different Pleiades/Wikidata URIs.
+  A shared URI is not taken as evidence: reconciliation deliberately maps
+  e.g. the Akropolis to Athens
+
+IDs are carried over from the previous run's entity table (``data/entities.json``),
+so a cluster keeps its ID when new variants join it.
+
+Usage:
+    python -m source.entity_resolution [--dry-run]
+"""
+import argparse
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import codec
+from .batch_rewrite import rewrite_files
+from .config import ENTITY_INDEX_PATH, ENTITY_MATCH_THRESHOLD, OUTPUT_DIR
+from .logging_setup import setup_logging
+from .taxonomy_repair import normalize_name
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ("persons", "places", "deities")
+ID_PREFIX = {"persons": "person", "places": "place", "deities": "deity"}
+
+# Blocks above this size are compared with their sorted neighbours only
+MAX_BLOCK = 200
+NEIGHBOURS = 10
+# Keys shorter than this only merge when equal ("Atene" is not "Athens")
+MIN_FUZZY_KEY = 8
+
+_GREEK = {
+    "α": "a", "β": "b", "γ": "g", "δ": "d", "ε": "e", "ζ": "z", "η": "e", "θ": "th",
+    "ι": "i", "κ": "k", "λ": "l", "μ": "m", "ν": "n", "ξ": "x", "ο": "o", "π": "p",
+    "ρ": "r", "σ": "s", "ς": "s", "τ": "t", "υ": "y", "φ": "ph", "χ": "ch", "ψ": "ps", "ω": "o",
+}
+_GREEK_TABLE = str.maketrans(_GREEK)
+# Latin and Greek transliterations of the same name, applied in order. Upsilon
+# folds to u, not i, so Pythagoras and Peithagoras stay apart
+_FOLDS = (
+    ("ph", "f"), ("th", "t"), ("ch", "k"), ("kh", "k"), ("rh", "r"), ("x", "ks"),
+    ("c", "k"), ("q", "k"), ("ae", "ai"), ("oe", "oi"), ("ei", "i"), ("y", "u"),
+    ("ou", "u"), ("j", "i"), ("w", "v"),
+)
+# ai/oi -> e inside a word only (Athenai / Athenae / Athene); initial diphthongs
+# tell names apart (Oineis / Ainis)
+_INNER_DIPHTHONG = re.compile(r"\B[ao]i")
+_PAREN = re.compile(r"\s*[(\[].*?[)\]]")
+_DOUBLE = re.compile(r"(.)\1+")
+_IDENTITY_URI = re.compile(r"pleiades\.stoa\.org/places/\d+|wikidata\.org/wiki/Q\d+")
+
+
+def _stem(token: str) -> str:
+    """Folds endings that only differ by transliteration; -is, -as, -es etc. are distinct names."""
+    if len(token) < 5:
+        return token
+    if token.endswith(("os", "us")):  # Dionysios / Dionysius, Hadrianus / Hadrian
+        return token[:-2]
+    if token.endswith(("on", "um")):  # Apollon / Apollo, Ilion / Ilium
+        return token[:-1] if token.endswith("on") else token[:-2] + "o"
+    if token.endswith("er"):  # Alexander / Alexandros
+        return token[:-2] + "r"
+    if token[-1] in "ei":  # Athene / Athena, Acharnai / Acharnae, Dioskouroi / Dioscuri
+        return token[:-1] + "a"
+    return token
+
+
+@lru_cache(maxsize=None)
+def name_key(name: str) -> str:
+    """Spelling-insensitive key: "Hadrianus" and "Hadrian (emperor)" both give "hadrian"."""
+    text = normalize_name(_PAREN.sub("", name) or name).translate(_GREEK_TABLE)
+    for old, new in _FOLDS:
+        text = text.replace(old, new)
+    text = _INNER_DIPHTHONG.sub("e", text)
+    return " ".join(_stem(_DOUBLE.sub(r"\1", token)) for token in text.split())
+
+
+def _skeleton(key: str) -> str:
+    """First letter plus the following consonants of the first word (a crude phonetic code)."""
+    word = key.split(" ", 1)[0]
+    return word[:1] + "".join(c for c in word[1:] if c not in "aeiou")[:3]
+
+
+def _consonants(key: str) -> str:
+    return "".join(c for c in key if c not in "aeiou ")
+
+
+def identity_uri(uri: Optional[str]) -> Optional[str]:
+    """Pleiades or Wikidata part of a URI; search links (LGPN) identify nothing."""
+    match = _IDENTITY_URI.search(uri or "")
+    return match.group(0) if match else None
+
+
+@dataclass
+class Name:
+    """One distinct spelling of an entity type with its corpus statistics."""
+    name: str
+    key: str
+    count: int = 0
+    uris: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class Cluster:
+    entity_id: str
+    canonical: str
+    variants: Dict[str, int]
+    uri: Optional[str] = None
+
+    @property
+    def count(self) -> int:
+        return sum(self.variants.values())
+
+
+def blocking_keys(entry: Name) -> Iterable[str]:
+    compact = entry.key.replace(" ", "")
+    yield "p:" + compact[:3]
+    yield "s:" + _skeleton(entry.key)
+
+
+def similarity(a: Name, b: Name) -> float:
+    if a.key == b.key:
+        return 1.0
+    # Greek names are compounds: a different last letter or consonant is a different name
+    # or gender (Polykrates / Polykrateia, Theokydes / Theokleides); a vowel inside is
+    # usually a typo or dialect spelling (Olympidoros, Nasigenes / Nausigenes)
+    if (a.key[0] != b.key[0] or a.key[-1] != b.key[-1] or min(len(a.key), len(b.key)) < MIN_FUZZY_KEY
+            or _consonants(a.key) != _consonants(b.key)):
+        return 0.0
+    return SequenceMatcher(None, a.key, b.key, autojunk=False).ratio()
+
+
+def candidate_pairs(entries: List[Name]) -> Set[Tuple[int, int]]:
+    """Index pairs sharing a block; the only pairs that are ever scored."""
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    for i, entry in enumerate(entries):
+        for key in blocking_keys(entry):
+            blocks[key].append(i)
+    pairs = set()
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK:
+            members = sorted(members, key=lambda i: entries[i].key)
+            window = NEIGHBOURS
+        else:
+            window = len(members)
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:pos + 1 + window]:
+                pairs.add((min(i, j), max(i, j)))
+    return pairs
+
+
+def cluster_names(entries: List[Name], threshold: float = ENTITY_MATCH_THRESHOLD) -> List[List[int]]:
+    """Union-find over the scored pairs, strongest first; refuses merges with conflicting URIs."""
+    parent = list(range(len(entries)))
+    uris = [set(entry.uris) for entry in entries]
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    scored = []
+    for i, j in candidate_pairs(entries):
+        score = similarity(entries[i], entries[j])
+        if score >= threshold:
+            scored.append((-score, i, j))
+    for _, i, j in sorted(scored):
+        a, b = find(i), find(j)
+        if a == b or (uris[a] and uris[b] and uris[a].isdisjoint(uris[b])):
+            continue
+        parent[b] = a
+        uris[a] |= uris[b]
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(entries)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def _canonical(names: List[Name]) -> str:
+    # Most frequent spelling; ties prefer no qualifier, then the shorter, then alphabetical
+    return min(names, key=lambda n: (-n.count, "(" in n.name, len(n.name), n.name)).name
+
+
+def _slug(text: str) -> str:
+    text = normalize_name(text).translate(_GREEK_TABLE)
+    return "-".join(text.encode("ascii", "ignore").decode().split()) or "unnamed"
+
+
+def resolve(entries: List[Name], entity_type: str, previous: Optional[Dict[str, str]] = None,
+            threshold: float = ENTITY_MATCH_THRESHOLD) -> List[Cluster]:
+    """
+    Clusters the names of one entity type.
+
+    Args:
+        entries: Distinct names with counts and URIs.
+        entity_type: persons | places | deities (ID prefix).
+        previous: Variant -> entity ID of the previous run, to keep IDs stable.
+    """
+    previous = previous or {}
+    groups = [[entries[i] for i in group] for group in cluster_names(entries, threshold)]
+    # Largest clusters claim previous IDs first (a split keeps the ID on the bigger part)
+    groups.sort(key=lambda names: (-sum(n.count for n in names), _canonical(names)))
+    taken: Set[str] = set()
+    clusters = []
+    for names in groups:
+        canonical = _canonical(names)
+        votes = Counter()
+        for n in names:
+            if previous.get(n.name) and previous[n.name] not in taken:
+                votes[previous[n.name]] += n.count
+        if votes:
+            entity_id = min(votes, key=lambda k: (-votes[k], k))
+        else:
+            base = f"{ID_PREFIX[entity_type]}:{_slug(canonical)}"
+            entity_id, suffix = base, 2
+            while entity_id in taken or entity_id in previous.values():
+                entity_id, suffix = f"{base}-{suffix}", suffix + 1
+        taken.add(entity_id)
+        uris = Counter(uri for n in names for uri in n.uris)
+        clusters.append(Cluster(
+            entity_id, canonical,
+            {n.name: n.count for n in sorted(names, key=lambda n: (-n.count, n.name))},
+            uris.most_common(1)[0][0] if uris else None,
+        ))
+    return clusters
+
+
+# --- Corpus passes ---
+
+def _entity_lists(data: dict) -> Iterable[Tuple[str, list]]:
+    entities = data.get("entities") or {}
+    for entity_type in ENTITY_TYPES:
+        yield entity_type, entities.get(entity_type) or []
+    # Provenance entries are places too
+    yield "places", data.get("provenance") or []
+
+
+def collect_transform(data: dict) -> List[Tuple[str, str, Optional[str]]]:
+    """Batch transform (read-only): the (type, name, uri) mentions of one output."""
+    return [(entity_type, e["name"], e.get("uri"))
+            for entity_type, items in _entity_lists(data)
+            for e in items if isinstance(e, dict) and e.get("name")]
+
+
+_MAPPING: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+
+def _init_mapping(mapping: Dict[Tuple[str, str], Tuple[str, str]]) -> None:
+    global _MAPPING
+    _MAPPING = mapping
+
+
+def apply_transform(data: dict) -> List[str]:
+    """Batch transform: writes ``entity_id`` and ``canonical`` into every entity of one output."""
+    notes = []
+    for entity_type, items in _entity_lists(data):
+        for e in items:
+            if not isinstance(e, dict) or (entity_type, e.get("name")) not in _MAPPING:
+                continue
+            entity_id, canonical = _MAPPING[entity_type, e["name"]]
+            if e.get("entity_id") != entity_id or e.get("canonical") != canonical:
+                e["entity_id"], e["canonical"] = entity_id, canonical
+                notes.append(f"{e['name']} -> {entity_id}")
+    return notes
+
+
+def load_table(path: Path = ENTITY_INDEX_PATH) -> Dict[str, List[Cluster]]:
+    """Entity table of the last run: type -> clusters (empty if none)."""
+    if not path.exists():
+        return {}
+    data = codec.load_file(path)
+    return {
+        entity_type: [Cluster(entity_id, c["canonical"], c["variants"], c.get("uri"))
+                      for entity_id, c in data.get(entity_type, {}).items()]
+        for entity_type in ENTITY_TYPES
+    }
+
+
+def save_table(table: Dict[str, List[Cluster]], path: Path = ENTITY_INDEX_PATH) -> None:
+    codec.dump_file({
+        entity_type: {c.entity_id: {"canonical": c.canonical, "uri": c.uri, "count": c.count,
+                                    "variants": c.variants}
+                      for c in clusters}
+        for entity_type, clusters in table.items()
+    }, path, pretty=True, atomic=True)
+
+
+def main(dry_run: bool = False, threshold: float = ENTITY_MATCH_THRESHOLD) -> Dict[str, List[Cluster]]:
+    files = sorted(OUTPUT_DIR.glob("*.json"))
+    scan = rewrite_files(files, collect_transform, dry_run=True, desc="Collecting names")
+
+    names: Dict[str, Dict[str, Name]] = {entity_type: {} for entity_type in ENTITY_TYPES}
+    for result in scan.results:
+        for entity_type, name, uri in result.notes:
+            entry = names[entity_type].get(name)
+            if entry is None:
+                entry = names[entity_type][name] = Name(name, name_key(name))
+            entry.count += 1
+            if identity_uri(uri):
+                entry.uris.add(identity_uri(uri))
+
+    previous = load_table()
+    table, mapping = {}, {}
+    for entity_type in ENTITY_TYPES:
+        prev_ids = {variant: c.entity_id for c in previous.get(entity_type, []) for variant in c.variants}
+        clusters = resolve(list(names[entity_type].values()), entity_type, prev_ids, threshold)
+        table[entity_type] = clusters
+        for c in clusters:
+            for variant in c.variants:
+                mapping[entity_type, variant] = (c.entity_id, c.canonical)
+        merged = [c for c in clusters if len(c.variants) > 1]
+        logger.info(f"{entity_type}: {len(names[entity_type]):,} names -> {len(clusters):,} entities "
+                    f"({len(merged):,} with variants)")
+        for c in sorted(merged, key=lambda c: -c.count)[:5]:
+            logger.info(f"  {c.entity_id}: {', '.join(c.variants)}")
+
+    report = rewrite_files(files, apply_transform, dry_run=dry_run, desc="Writing entity IDs",
+                           initializer=_init_mapping, initargs=(mapping,))
+    for line in report.summary_lines():
+        logger.info(line)
+    if dry_run:
+        for line in report.diff_summary():
+            logger.info(line)
+    else:
+        save_table(table)
+        logger.info(f"Entity table: {ENTITY_INDEX_PATH}")
+    return table
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Cluster entity name variants and write canonical IDs to the outputs.")
+    parser.add_argument("--dry-run", action="store_true", help="Write nothing; summarize what would change")
+    parser.add_argument("--threshold", type=float, default=ENTITY_MATCH_THRESHOLD,
+                        help="Minimum name similarity for a merge (0-1)")
+    args = parser.parse_args()
+    main(dry_run=args.dry_run, threshold=args.threshold)
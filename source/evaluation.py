@@ -0,0 +1,403 @@
+"""
+Evaluation of tagging runs against ground truth.
+
+Gold and predicted labels are encoded as sparse indicator matrices
+(inscriptions x nodes) with one matrix per hierarchy level: a theme under
+``Content > Official and Legal Documents > Decrees`` sets the domain,
+subdomain and category columns of its row. Columns are the taxonomy nodes
+of that level (plus any out-of-taxonomy paths a run produced); predicted
+cells carry the theme confidence. Entities (persons, places, deities,
+provenance) are encoded the same way over their normalized names.
+
+All metrics come from vectorized operations on these matrices:
+
+- micro precision/recall/F1 per level and entity type, macro F1 over nodes
+- per-node support/P/R/F1
+- precision/recall/F1 for a sweep of confidence thresholds (one sort plus
+  ``searchsorted``, not one pass per threshold), and the best threshold
+- bootstrap confidence intervals (resampled inscriptions)
+
+Several runs are scored against the same gold set in one call.
+
+Usage:
+    python -m source.evaluation GOLD_DIR RUN_DIR [RUN_DIR ...] [--bootstrap 1000] [--report out.json]
+"""
+import argparse
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import codec
+from .records import TaggedRecord, load_tagged_dir
+from .taxonomy_repair import normalize_name
+from .taxonomy_utils import HIERARCHY_LEVELS, TaxonomyIndex
+
+logger = logging.getLogger(__name__)
+
+PATH_SEPARATOR = " > "
+ENTITY_TYPES = ("persons", "places", "deities", "provenance")
+DEFAULT_THRESHOLDS = np.round(np.linspace(0.0, 1.0, 21), 2)
+BOOTSTRAP_CHUNK = 200  # Resamples per vectorized batch (bounds memory to chunk x inscriptions)
+
+Items = List[Tuple[str, float]]  # (column label, score) of one inscription
+
+
+class Indicator:
+    """Sparse indicator matrix: sorted unique cell keys (row * n_cols + col) with the max score per cell."""
+
+    __slots__ = ("n_rows", "n_cols", "keys", "scores")
+
+    def __init__(self, n_rows: int, n_cols: int, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray):
+        self.n_rows, self.n_cols = n_rows, n_cols
+        keys = rows.astype(np.int64) * max(n_cols, 1) + cols
+        # Sort by key, highest score first, and keep the first cell of each key
+        order = np.lexsort((-scores, keys))
+        self.keys, first = np.unique(keys[order], return_index=True)
+        self.scores = scores[order][first]
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self.keys // max(self.n_cols, 1)
+
+    @property
+    def cols(self) -> np.ndarray:
+        return self.keys % max(self.n_cols, 1)
+
+    def dense(self) -> np.ndarray:
+        """Score matrix (0 where unset); for small matrices and debugging."""
+        matrix = np.zeros((self.n_rows, self.n_cols), dtype=np.float32)
+        matrix[self.rows, self.cols] = self.scores
+        return matrix
+
+
+class Encoder:
+    """Collects (row, column, score) triples against a shared column vocabulary."""
+
+    def __init__(self, columns: Iterable[str] = ()):
+        self.vocab: Dict[str, int] = {}
+        for column in columns:
+            self.vocab.setdefault(column, len(self.vocab))
+        self.n_known = len(self.vocab)
+
+    def collect(self, items_per_row: Sequence[Items]) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        rows, cols, scores = [], [], []
+        vocab = self.vocab
+        for row, items in enumerate(items_per_row):
+            for column, score in items:
+                rows.append(row)
+                cols.append(vocab.setdefault(column, len(vocab)))
+                scores.append(score)
+        return (len(items_per_row), np.asarray(rows, dtype=np.int64),
+                np.asarray(cols, dtype=np.int64), np.asarray(scores, dtype=np.float32))
+
+    def finalize(self, collected) -> Indicator:
+        """Builds the matrix once the vocabulary is complete (all runs collected)."""
+        n_rows, rows, cols, scores = collected
+        return Indicator(n_rows, len(self.vocab), rows, cols, scores)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.vocab)
+
+
+# --- Label extraction ---
+
+def _score(confidence: Optional[float]) -> float:
+    return 1.0 if confidence is None else float(confidence)
+
+
+# Names and paths repeat across inscriptions and runs; normalize each once
+_entity_key = lru_cache(maxsize=2 ** 16)(normalize_name)
+
+
+@lru_cache(maxsize=2 ** 14)
+def _node_paths(domain, subdomain, category, subcategory) -> Tuple[str, ...]:
+    """``('A', 'B', None, None)`` -> ``('A', 'A > B')``: one node path per set level."""
+    paths, path = [], []
+    for value in (domain, subdomain, category, subcategory):
+        if not value:
+            break
+        path.append(value)
+        paths.append(PATH_SEPARATOR.join(path))
+    return tuple(paths)
+
+
+def level_items(record: Optional[TaggedRecord]) -> List[Items]:
+    """Per hierarchy level, the node paths (with confidence) a record's themes touch."""
+    per_level: List[Items] = [[] for _ in HIERARCHY_LEVELS]
+    if record is None:
+        return per_level
+    for theme in record.themes:
+        h = theme.hierarchy
+        score = _score(theme.confidence)
+        for depth, path in enumerate(_node_paths(h.domain, h.subdomain, h.category, h.subcategory)):
+            per_level[depth].append((path, score))
+    return per_level
+
+
+def entity_items(record: Optional[TaggedRecord]) -> List[Items]:
+    """Per entity type, the normalized names (with confidence) of a record."""
+    if record is None:
+        return [[] for _ in ENTITY_TYPES]
+    groups = (record.entities.persons, record.entities.places, record.entities.deities, record.provenance)
+    return [[(_entity_key(e.name), _score(e.confidence)) for e in group if e.name] for group in groups]
+
+
+def taxonomy_columns(index: TaxonomyIndex) -> List[List[str]]:
+    """Taxonomy nodes per hierarchy level, in taxonomy order."""
+    columns: List[Dict[str, None]] = [{} for _ in HIERARCHY_LEVELS]
+    for path in index.paths:
+        for depth in range(min(len(path), len(HIERARCHY_LEVELS))):
+            columns[depth].setdefault(PATH_SEPARATOR.join(path[:depth + 1]))
+    return [list(c) for c in columns]
+
+
+# --- Metrics ---
+
+def _prf(tp, fp, fn) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    tp, fp, fn = (np.asarray(x, dtype=np.float64) for x in (tp, fp, fn))
+    precision = tp / np.maximum(tp + fp, 1)
+    recall = tp / np.maximum(tp + fn, 1)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-9)
+    return precision, recall, f1
+
+
+def doc_counts(gold: Indicator, pred: Indicator, threshold: float = 0.0) -> np.ndarray:
+    """Per-inscription (tp, fp, fn) counts, shape 3 x rows."""
+    active = pred.scores >= threshold
+    matched = np.isin(pred.keys, gold.keys, assume_unique=True)
+    rows = pred.rows
+    tp = np.bincount(rows[active & matched], minlength=gold.n_rows)
+    fp = np.bincount(rows[active & ~matched], minlength=gold.n_rows)
+    fn = np.bincount(gold.rows, minlength=gold.n_rows) - tp
+    return np.stack([tp, fp, fn])
+
+
+def bootstrap_ci(
+    counts: np.ndarray, samples: int, rng: np.random.Generator, alpha: float = 0.05,
+) -> List[Dict[str, List[float]]]:
+    """
+    Percentile intervals of micro P/R/F1 over inscriptions resampled with replacement.
+
+    ``counts`` holds per-inscription (tp, fp, fn) of one or more comparisons
+    (shape k x 3 x rows); all of them are resampled with the same draws, as
+    a weight matrix (resample x inscription) times the counts.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if counts.ndim == 2:
+        counts = counts[None]
+    k, _, n = counts.shape
+    if not samples or not n:
+        return [{} for _ in range(k)]
+    flat = counts.reshape(k * 3, n).T  # n x 3k
+    totals = []
+    for start in range(0, samples, BOOTSTRAP_CHUNK):
+        chunk = min(BOOTSTRAP_CHUNK, samples - start)
+        draws = rng.integers(0, n, size=(chunk, n)) + (np.arange(chunk) * n)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=chunk * n).reshape(chunk, n).astype(np.float64)
+        totals.append(weights @ flat)  # chunk x 3k
+    totals = np.concatenate(totals).T.reshape(k, 3, samples)
+    lo, hi = 100 * alpha / 2, 100 * (1 - alpha / 2)
+    intervals = []
+    for tp, fp, fn in totals:
+        intervals.append({
+            name: [float(np.percentile(values, lo)), float(np.percentile(values, hi))]
+            for name, values in zip(("precision", "recall", "f1"), _prf(tp, fp, fn))
+        })
+    return intervals
+
+
+def score(
+    gold: Indicator,
+    pred: Indicator,
+    columns: Optional[Sequence[str]] = None,
+    threshold: float = 0.0,
+    thresholds: np.ndarray = DEFAULT_THRESHOLDS,
+    bootstrap: int = 0,
+    rng: Optional[np.random.Generator] = None,
+) -> dict:
+    """
+    Compares a prediction matrix with the gold matrix (same shape).
+
+    Args:
+        columns: Column labels; when given, per-node scores are included.
+        threshold: Predictions with a lower score count as absent.
+        thresholds: Confidence values for the threshold sweep.
+        bootstrap: Number of bootstrap resamples for confidence intervals
+            (0 = none; ``evaluate_runs`` resamples all levels at once instead).
+    """
+    matched = np.isin(pred.keys, gold.keys, assume_unique=True)
+    active = pred.scores >= threshold
+    hit = matched & active
+    pred_cols, gold_cols = pred.cols, gold.cols
+
+    tp, fp = int(hit.sum()), int((active & ~matched).sum())
+    fn = len(gold.keys) - tp
+    precision, recall, f1 = (float(x) for x in _prf(tp, fp, fn))
+
+    # Threshold sweep: counts of matched / unmatched scores at or above each threshold
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    tp_scores, fp_scores = np.sort(pred.scores[matched]), np.sort(pred.scores[~matched])
+    sweep_tp = len(tp_scores) - np.searchsorted(tp_scores, thresholds, side="left")
+    sweep_fp = len(fp_scores) - np.searchsorted(fp_scores, thresholds, side="left")
+    sweep_p, sweep_r, sweep_f1 = _prf(sweep_tp, sweep_fp, len(gold.keys) - sweep_tp)
+    best = int(np.argmax(sweep_f1)) if len(thresholds) else 0
+
+    # Per node
+    col_tp = np.bincount(pred_cols[hit], minlength=gold.n_cols)
+    col_fp = np.bincount(pred_cols[active & ~matched], minlength=gold.n_cols)
+    col_support = np.bincount(gold_cols, minlength=gold.n_cols)
+    col_p, col_r, col_f1 = _prf(col_tp, col_fp, col_support - col_tp)
+    used = (col_support + col_fp) > 0
+
+    result = {
+        "support": len(gold.keys),
+        "predicted": tp + fp,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "macro_f1": float(col_f1[used].mean()) if used.any() else 0.0,
+        "sweep": {
+            "thresholds": [float(t) for t in thresholds],
+            "precision": sweep_p.tolist(),
+            "recall": sweep_r.tolist(),
+            "f1": sweep_f1.tolist(),
+        },
+        "best_threshold": {
+            "threshold": float(thresholds[best]) if len(thresholds) else threshold,
+            "f1": float(sweep_f1[best]) if len(thresholds) else f1,
+        },
+    }
+    if bootstrap:
+        result["ci"] = bootstrap_ci(doc_counts(gold, pred, threshold), bootstrap, rng or np.random.default_rng(0))[0]
+    if columns is not None:
+        result["per_node"] = {
+            columns[i]: {
+                "support": int(col_support[i]),
+                "precision": float(col_p[i]),
+                "recall": float(col_r[i]),
+                "f1": float(col_f1[i]),
+            }
+            for i in np.flatnonzero(used)
+        }
+    return result
+
+
+# --- Runs ---
+
+def evaluate_runs(
+    gold: Dict[int, TaggedRecord],
+    runs: Dict[str, Dict[int, TaggedRecord]],
+    index: Optional[TaxonomyIndex] = None,
+    threshold: float = 0.0,
+    thresholds: np.ndarray = DEFAULT_THRESHOLDS,
+    bootstrap: int = 0,
+    seed: int = 0,
+) -> Dict[str, dict]:
+    """
+    Scores several runs against the same gold records (keyed by PHI id).
+
+    Inscriptions missing from a run count as predicted without any label;
+    predictions for inscriptions without gold are ignored.
+    """
+    ids = sorted(gold)
+    level_encoders = [Encoder(c) for c in (taxonomy_columns(index) if index else [()] * len(HIERARCHY_LEVELS))]
+    entity_encoders = [Encoder() for _ in ENTITY_TYPES]
+
+    def collect(records: Dict[int, TaggedRecord]):
+        levels = [level_items(records.get(phi_id)) for phi_id in ids]
+        entities = [entity_items(records.get(phi_id)) for phi_id in ids]
+        return (
+            [enc.collect([doc[i] for doc in levels]) for i, enc in enumerate(level_encoders)],
+            [enc.collect([doc[i] for doc in entities]) for i, enc in enumerate(entity_encoders)],
+        )
+
+    # Collect everything first so all matrices share the final column vocabularies
+    gold_raw = collect(gold)
+    runs_raw = {name: collect(records) for name, records in runs.items()}
+    gold_levels = [enc.finalize(raw) for enc, raw in zip(level_encoders, gold_raw[0])]
+    gold_entities = [enc.finalize(raw) for enc, raw in zip(entity_encoders, gold_raw[1])]
+
+    results = {}
+    for name, (levels_raw, entities_raw) in runs_raw.items():
+        start = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        result = {
+            "documents": len(ids),
+            "missing": sum(1 for phi_id in ids if phi_id not in runs[name]),
+            "levels": {},
+            "entities": {},
+        }
+        matrices = []
+        for level, enc, g, raw in zip(HIERARCHY_LEVELS, level_encoders, gold_levels, levels_raw):
+            matrices.append((result["levels"], level, g, enc.finalize(raw)))
+            result["levels"][level] = score(g, matrices[-1][3], enc.columns, threshold, thresholds)
+            result["levels"][level]["out_of_taxonomy_nodes"] = len(enc.vocab) - enc.n_known if index else 0
+        for kind, enc, g, raw in zip(ENTITY_TYPES, entity_encoders, gold_entities, entities_raw):
+            matrices.append((result["entities"], kind, g, enc.finalize(raw)))
+            result["entities"][kind] = score(g, matrices[-1][3], None, threshold, thresholds)
+        if bootstrap:
+            # Same resamples for every level and entity type (and, with the same seed, every run)
+            counts = np.stack([doc_counts(g, pred, threshold) for _, _, g, pred in matrices])
+            for (group, key, _, _), ci in zip(matrices, bootstrap_ci(counts, bootstrap, rng)):
+                group[key]["ci"] = ci
+        result["seconds"] = time.perf_counter() - start
+        results[name] = result
+    return results
+
+
+def _ci(scores: dict, key: str) -> str:
+    ci = scores.get("ci", {}).get(key)
+    return f" [{ci[0]:.3f}-{ci[1]:.3f}]" if ci else ""
+
+
+def print_report(results: Dict[str, dict], per_node: Optional[str] = None) -> None:
+    for name, result in results.items():
+        print(f"\n== {name}: {result['documents']:,} inscriptions ({result['missing']:,} missing), "
+              f"scored in {result['seconds']:.2f}s")
+        print(f"  {'':12s} {'support':>8s} {'precision':>22s} {'recall':>22s} {'f1':>22s} {'macroF1':>8s} {'best t':>7s}")
+        rows = [(level, s) for level, s in result["levels"].items()] + list(result["entities"].items())
+        for label, s in rows:
+            print(f"  {label:12s} {s['support']:8,d} "
+                  f"{s['precision']:.3f}{_ci(s, 'precision'):>16s} {s['recall']:.3f}{_ci(s, 'recall'):>16s} "
+                  f"{s['f1']:.3f}{_ci(s, 'f1'):>16s} {s['macro_f1']:8.3f} {s['best_threshold']['threshold']:7.2f}")
+        if per_node:
+            nodes = result["levels"][per_node].get("per_node", {})
+            print(f"\n  Per {per_node} (support, P, R, F1):")
+            for node, s in sorted(nodes.items(), key=lambda kv: -kv[1]["support"]):
+                print(f"    {s['support']:5d}  {s['precision']:.2f}  {s['recall']:.2f}  {s['f1']:.2f}  {node}")
+
+
+def main():
+    from .config import TAXONOMY_DIR
+    from .taxonomy_utils import get_taxonomy_index, load_taxonomy
+
+    parser = argparse.ArgumentParser(description="Score tagging runs against ground-truth outputs.")
+    parser.add_argument("gold", type=Path, help="Directory with ground-truth output JSON files")
+    parser.add_argument("runs", type=Path, nargs="+", help="Output directories of the runs to score")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Ignore predictions below this confidence")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap resamples for CIs (0 = none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-node", choices=HIERARCHY_LEVELS, default=None, help="Print per-node scores of a level")
+    parser.add_argument("--report", type=Path, default=None, help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    gold = load_tagged_dir(args.gold)
+    runs = {str(path): load_tagged_dir(path) for path in args.runs}
+    loaded = time.perf_counter() - start
+    index = get_taxonomy_index(load_taxonomy(TAXONOMY_DIR / "taxonomy.json"))
+    results = evaluate_runs(gold, runs, index, args.threshold, bootstrap=args.bootstrap, seed=args.seed)
+    print(f"Loaded {len(gold):,} gold and {sum(len(r) for r in runs.values()):,} predicted records in {loaded:.2f}s")
+    print_report(results, args.per_node)
+    if args.report:
+        codec.dump_file(results, args.report, pretty=True)
+        print(f"\nReport: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
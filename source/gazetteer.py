@@ -1,15 +1,103 @@
-import gzip
+"""
+Offline Pleiades gazetteer for place reconciliation.
+
+The CSV dumps (data/pleiades_names.csv.gz, data/pleiades_places.csv.gz) are
+parsed once into a compact binary index in data/gazetteer_index/:
+
+- a string table of normalized names (UTF-8 blob plus offsets) and an
+  open-addressing hash table of slots into it (crc32, linear probing)
+- per name, a CSR slice of candidate entries (pid, place row) and the pid of
+  its best candidate
+- per entry, a static prior score from its location precision and the
+  place's feature types and time periods
+- per place, the pid plus a feature-type bitmask (packed bits over the
+  vocabulary stored in meta.json), for re-ranking
+
+The prior depends only on the place, never on the query, so a search is a
+hash slot probe plus one array lookup. Given a place type ("Deme",
+"Sanctuary"), the name's candidates are re-ranked instead: prior plus the
+type's feature-type bonus, vectorized over the candidate set.
+
+Scoring rules live in ``DEFAULT_SCORING``; a JSON file named by
+``GAZETTEER_SCORING`` replaces any of its sections. Keywords match as
+substrings ('deme' also matches 'deme-attic') and count once per place.
+
+The arrays are memory-mapped, so opening the index takes milliseconds and
+pages are only read when touched. The index is rebuilt when a dump (size/
+mtime, confirmed by content hash) or the scoring rules change. Builds are
+crash-safe: array files carry the build id, and meta.json, which names the
+current build, is replaced atomically last.
+
+Loading is lazy and guarded by a lock; ``reconcile_entities`` searches from
+many threads.
+
+Usage:
+    python -m source.gazetteer --build [--force]
+    python -m source.gazetteer --benchmark [NAME ...]
+"""
+import argparse
 import csv
+import gzip
+import hashlib
 import logging
+import mmap
+import os
+import threading
+import time
 import unicodedata
+import zlib
 from pathlib import Path
-from collections import defaultdict
-from .config import DATA_DIR
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import codec
+from .config import DATA_DIR, GAZETTEER_INDEX_DIR, GAZETTEER_SCORING
+from .logging_setup import setup_logging
 
 logger = logging.getLogger(__name__)
 
 NAMES_FILE = DATA_DIR / "pleiades_names.csv.gz"
 PLACES_FILE = DATA_DIR / "pleiades_places.csv.gz"
+INDEX_FORMAT = 2
+
+_ARRAYS = ("name_offsets", "name_slots", "name_best", "entry_offsets", "entry_pid", "entry_place", "entry_prior",
+           "place_pid", "place_features")
+
+DEFAULT_SCORING = {
+    # locationPrecision of the name's location -> score
+    "precision": {"precise": 3},
+    # Feature type keyword -> score (boost demes significantly)
+    "feature_types": {"settlement": 2, "deme": 5, "city": 2, "island": 2, "sanctuary": 2},
+    # Time period keyword -> score (prefer Classical/Hellenistic/Roman)
+    "time_periods": {"classical": 1, "hellenistic": 1, "roman": 1, "archaic": 1},
+    # Re-ranking: keyword in the entity's place type -> feature type keyword -> bonus
+    "place_types": {
+        "deme": {"deme": 4},
+        "city": {"settlement": 2, "city": 2},
+        "polis": {"settlement": 2, "city": 2},
+        "village": {"settlement": 2, "village": 2},
+        "sanctuary": {"sanctuary": 3, "temple": 3},
+        "temple": {"temple": 3, "sanctuary": 2},
+        "island": {"island": 4},
+        "region": {"region": 3},
+        "port": {"port": 3, "harbor": 3},
+        "fort": {"fort": 3},
+    },
+}
+
+
+def load_scoring(path: Optional[str] = GAZETTEER_SCORING) -> dict:
+    """DEFAULT_SCORING with the sections of the JSON file at ``path`` (if any) replaced."""
+    scoring = dict(DEFAULT_SCORING)
+    if path:
+        scoring.update(codec.load_file(Path(path)))
+    return scoring
+
+
+def _scoring_digest(scoring: dict) -> str:
+    return hashlib.blake2b(codec.dumpb(scoring, sort_keys=True), digest_size=8).hexdigest()
+
 
 def normalize(text):
     """Normalize text by stripping accents and converting to lowercase."""
@@ -17,114 +105,366 @@ def normalize(text):
     return ''.join(c for c in unicodedata.normalize('NFD', text)
                   if unicodedata.category(c) != 'Mn').lower().strip()
 
+
+def _pid(value: str) -> Optional[int]:
+    # "/places/579885" and "579885" -> 579885; "errata/..." entries are not places
+    value = value.replace('/places/', '').strip('/')
+    return int(value) if value.isdigit() else None
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _signature(path: Path, digest: bool = True) -> dict:
+    stat = path.stat()
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if digest:
+        signature["digest"] = _file_digest(path)
+    return signature
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(',') if part.strip()]
+
+
+def _packed_bits(rows: List[List[str]], vocabulary: List[str]) -> np.ndarray:
+    """(n_rows, ceil(V / 8)) uint8: bit j of row i is set if rows[i] contains vocabulary[j]."""
+    column = {value: j for j, value in enumerate(vocabulary)}
+    bits = np.zeros((len(rows), max(1, len(vocabulary))), dtype=bool)
+    for i, values in enumerate(rows):
+        for value in values:
+            bits[i, column[value]] = True
+    return np.packbits(bits, axis=1)
+
+
+def _rule_matrix(vocabulary: List[str], rules: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """(V, rules) 0/1 matrix: does vocabulary value j contain rule keyword k; plus the weights."""
+    matrix = np.array([[keyword in value for keyword in rules] for value in vocabulary], dtype=np.int32)
+    return matrix.reshape(len(vocabulary), len(rules)), np.array(list(rules.values()), dtype=np.float32)
+
+
+def _rule_scores(packed: np.ndarray, vocabulary: List[str], rules: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Per row of packed bits: sum of the weights of the rules that any of its values match."""
+    matrix, weights = rules
+    if not len(packed) or not matrix.size:
+        return np.zeros(len(packed), dtype=np.float32)
+    bits = np.unpackbits(packed, axis=1, count=len(vocabulary))
+    return (((bits @ matrix) > 0) @ weights).astype(np.float32)
+
+
+def _first_max(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Per (non-empty) CSR segment: index of its first maximum, so ties go to dump order."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    starts = offsets[:-1]
+    is_max = values == np.repeat(np.maximum.reduceat(values, starts), np.diff(offsets))
+    hits = np.flatnonzero(is_max)
+    return hits[np.searchsorted(hits, starts)]
+
+
+def _hash_slots(keys: List[bytes]) -> np.ndarray:
+    """Open-addressing table (size a power of two, load <= 0.5): slot -> key index, -1 empty."""
+    size = 1 << max(4, (2 * len(keys) - 1).bit_length())
+    mask = size - 1
+    slots = np.full(size, -1, dtype=np.int32)
+    for i, key in enumerate(keys):
+        h = zlib.crc32(key) & mask
+        while slots[h] >= 0:
+            h = (h + 1) & mask
+        slots[h] = i
+    return slots
+
+
+def build_index(index_dir: Path = GAZETTEER_INDEX_DIR, scoring: Optional[dict] = None) -> dict:
+    """Parses both dumps into a new index build; returns its meta.json content."""
+    start = time.perf_counter()
+    index_dir.mkdir(parents=True, exist_ok=True)
+    scoring = scoring or load_scoring()
+    sources = {"names": _signature(NAMES_FILE), "places": _signature(PLACES_FILE)}
+
+    # Places: pid, feature types, time periods (sorted by pid for searchsorted)
+    places: Dict[int, Tuple[List[str], List[str]]] = {}
+    with gzip.open(PLACES_FILE, 'rt', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            pid = _pid(row.get('id') or '')
+            if pid is not None:
+                places[pid] = (_split(row.get('featureTypes')), _split(row.get('timePeriods')))
+    place_pid = np.array(sorted(places), dtype=np.int64)
+    feature_types = sorted({t for ftypes, _ in places.values() for t in ftypes})
+    time_periods = sorted({p for _, periods in places.values() for p in periods})
+    place_features = _packed_bits([places[pid][0] for pid in place_pid.tolist()], feature_types)
+    place_periods = _packed_bits([places[pid][1] for pid in place_pid.tolist()], time_periods)
+
+    # Names: normalized name -> unique (pid, precision) entries in dump order
+    entries: Dict[str, Dict[Tuple[int, str], None]] = {}
+    with gzip.open(NAMES_FILE, 'rt', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            pid = _pid(row.get('pid') or '')
+            if pid is None:
+                continue
+            entry = (pid, row.get('locationPrecision') or '')
+            for field in ('nameTransliterated', 'title', 'nameAttested'):
+                norm = normalize(row.get(field))
+                if norm:
+                    entries.setdefault(norm, {})[entry] = None
+
+    encoded = sorted((name.encode('utf-8'), name) for name in entries)
+    blob = b"".join(raw for raw, _ in encoded)
+    name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(raw) for raw, _ in encoded], out=name_offsets[1:])
+    name_slots = _hash_slots([raw for raw, _ in encoded])
+    flat = [entry for _, name in encoded for entry in entries[name]]
+    entry_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(entries[name]) for _, name in encoded], out=entry_offsets[1:])
+    entry_pid = np.array([pid for pid, _ in flat], dtype=np.int64)
+    rows = np.searchsorted(place_pid, entry_pid)
+    found = rows < len(place_pid)
+    found[found] = place_pid[rows[found]] == entry_pid[found]
+    entry_place = np.where(found, rows, -1).astype(np.int32)  # -1: pid without place metadata
+
+    # Static priors: they depend on the place only, so the best candidate per name is fixed too
+    place_prior = _rule_scores(place_features, feature_types, _rule_matrix(feature_types, scoring["feature_types"])) \
+        + _rule_scores(place_periods, time_periods, _rule_matrix(time_periods, scoring["time_periods"]))
+    entry_prior = np.array([scoring["precision"].get(precision, 0) for _, precision in flat], dtype=np.float32)
+    entry_prior[found] += place_prior[entry_place[found]]
+    name_best = entry_pid[_first_max(entry_prior, entry_offsets)]
+
+    digest = _scoring_digest(scoring)
+    build = f"{sources['names']['digest'][:6]}{sources['places']['digest'][:6]}{digest[:4]}"
+    arrays = {
+        "name_offsets": name_offsets, "name_slots": name_slots, "entry_offsets": entry_offsets, "entry_pid": entry_pid,
+        "entry_place": entry_place, "entry_prior": entry_prior, "name_best": name_best,
+        "place_pid": place_pid, "place_features": place_features,
+    }
+    # Temp file + rename: a forced rebuild of the same build id must not rewrite files mapped by readers
+    for key, array in arrays.items():
+        path = index_dir / f"{build}.{key}.npy"
+        with open(path.with_name(path.name + ".tmp"), 'wb') as f:
+            np.save(f, array)
+        os.replace(path.with_name(path.name + ".tmp"), path)
+    codec.write_atomic(index_dir / f"{build}.names.bin", blob)
+
+    meta = {
+        "format": INDEX_FORMAT,
+        "build": build,
+        "sources": sources,
+        "scoring": scoring,
+        "scoring_digest": digest,
+        "feature_types": feature_types,
+        "names": len(encoded),
+        "entries": len(flat),
+        "places": len(place_pid),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    codec.dump_file(meta, index_dir / "meta.json", pretty=True, atomic=True)
+    # Earlier builds are unreferenced now (readers that still map them keep their inodes)
+    for path in index_dir.iterdir():
+        if path.name != "meta.json" and not path.name.startswith(f"{build}."):
+            path.unlink(missing_ok=True)
+    logger.info(f"Gazetteer index built: {meta['names']:,} names, {meta['places']:,} places "
+                f"in {meta['seconds']:.1f}s")
+    return meta
+
+
+def _current_meta(index_dir: Path, scoring: dict) -> Optional[dict]:
+    """meta.json of the index if it matches the dumps and scoring rules, else None (rebuild needed)."""
+    meta_path = index_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = codec.load_file(meta_path)
+    except codec.DECODE_ERRORS:
+        return None
+    if meta.get("format") != INDEX_FORMAT or meta.get("scoring_digest") != _scoring_digest(scoring):
+        return None
+    refreshed = False
+    for key, path in (("names", NAMES_FILE), ("places", PLACES_FILE)):
+        recorded = meta["sources"].get(key, {})
+        current = _signature(path, digest=False)
+        if all(recorded.get(k) == v for k, v in current.items()):
+            continue
+        # Touched or copied but identical content: keep the index, remember the new stat
+        if recorded.get("digest") != _file_digest(path):
+            return None
+        recorded.update(current)
+        refreshed = True
+    if refreshed:
+        codec.dump_file(meta, meta_path, pretty=True, atomic=True)
+    return meta
+
+
+class _NameTable:
+    """Hash lookup over the name blob (see ``_hash_slots``)."""
+
+    def __init__(self, blob, offsets: np.ndarray, slots: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self.slots = slots
+        self.mask = len(slots) - 1
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def find(self, key: bytes) -> Optional[int]:
+        h = zlib.crc32(key) & self.mask
+        while True:
+            i = int(self.slots[h])
+            if i < 0:
+                return None
+            if self.blob[self.offsets[i]:self.offsets[i + 1]] == key:
+                return i
+            h = (h + 1) & self.mask
+
+
 class PleiadesGazetteer:
-    def __init__(self):
-        self.name_index = defaultdict(list)
-        self.place_metadata = {}
+    def __init__(self, index_dir: Path = GAZETTEER_INDEX_DIR, scoring: Optional[dict] = None):
+        self.index_dir = index_dir
+        self.scoring = scoring or load_scoring()
         self.loaded = False
-    
-    def load(self):
-        if self.loaded: return
-        
-        # Check if files exist
-        if not NAMES_FILE.exists() or not PLACES_FILE.exists():
-            logger.warning("Pleiades data dumps not found. Offline reconciliation unavailable.")
-            return
-
-        logger.info("Loading Pleiades dumps into memory...")
-        
-        try:
-            # Load Places Metadata
-            with gzip.open(PLACES_FILE, 'rt', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Fix PID format (strip /places/)
-                    pid = row['id'].replace('/places/', '')
-                    
-                    self.place_metadata[pid] = {
-                        'featureTypes': row.get('featureTypes', '').split(','),
-                        'timePeriods': row.get('timePeriods', '').split(','),
-                        'bbox': row.get('bbox')
-                    }
-
-            # Load Names
-            with gzip.open(NAMES_FILE, 'rt', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Index multiple name fields
-                    names_to_index = set()
-                    if row.get('nameTransliterated'): names_to_index.add(row['nameTransliterated'])
-                    if row.get('title'): names_to_index.add(row['title'])
-                    if row.get('nameAttested'): names_to_index.add(row['nameAttested'])
-                    
-                    # Fix PID format
-                    pid = row['pid'].replace('/places/', '').strip('/')
-                    
-                    entry = {
-                        'pid': pid,
-                        'precision': row.get('locationPrecision', ''),
-                    }
-                    
-                    for n in names_to_index:
-                        if n:
-                            norm_n = normalize(n)
-                            self.name_index[norm_n].append(entry)
-            
-            self.loaded = True
-            logger.info(f"Gazetteer loaded: {len(self.name_index)} unique names, {len(self.place_metadata)} places.")
-            
-        except Exception as e:
-            logger.error(f"Failed to load Pleiades dumps: {e}")
-
-    def search(self, query):
+        self.meta: dict = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.names: Optional[_NameTable] = None
+        # Place type keyword -> (feature type rule matrix, weights), for re-ranking
+        self._type_rules: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._failed = False
+
+    def load(self, rebuild: bool = False):
+        """Opens the index (building it first if missing or stale); safe to call from many threads."""
+        if self.loaded and not rebuild: return
+        with self._lock:
+            if (self.loaded or self._failed) and not rebuild:
+                return
+
+            # Check if files exist
+            if not NAMES_FILE.exists() or not PLACES_FILE.exists():
+                logger.warning("Pleiades data dumps not found. Offline reconciliation unavailable.")
+                self._failed = True
+                return
+
+            try:
+                meta = None if rebuild else _current_meta(self.index_dir, self.scoring)
+                if meta is None:
+                    logger.info("Building Pleiades gazetteer index (one-time)...")
+                    meta = build_index(self.index_dir, self.scoring)
+                build = meta["build"]
+                # Plain ndarray views: indexing np.memmap objects is several times slower
+                self.arrays = {key: np.asarray(np.load(self.index_dir / f"{build}.{key}.npy", mmap_mode='r'))
+                               for key in _ARRAYS}
+                blob = b""
+                if self.arrays["name_offsets"][-1]:
+                    with open(self.index_dir / f"{build}.names.bin", 'rb') as f:
+                        blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.names = _NameTable(blob, self.arrays["name_offsets"], self.arrays["name_slots"])
+                self._type_rules = {keyword: _rule_matrix(meta["feature_types"], rules)
+                                    for keyword, rules in self.scoring.get("place_types", {}).items()}
+                self.meta = meta
+                self.loaded = True
+                logger.info(f"Gazetteer loaded: {meta['names']} unique names, {meta['places']} places.")
+            except Exception as e:
+                logger.error(f"Failed to load Pleiades gazetteer: {e}")
+                self._failed = True
+
+    def lookup(self, query: str) -> Optional[int]:
+        """Row of the normalized query in the name table, or None if the name is unknown."""
+        return self.names.find(normalize(query).encode('utf-8'))
+
+    def rank(self, query: str, place_type: Optional[str] = None) -> List[Tuple[int, float]]:
+        """All candidates of a name as (pid, score), best first (ties in dump order)."""
+        if not self.loaded: self.load()
+        i = self.lookup(query) if self.loaded else None
+        if i is None: return []
+        offsets = self.arrays["entry_offsets"]
+        span = slice(int(offsets[i]), int(offsets[i + 1]))
+        score = self.arrays["entry_prior"][span] + self._type_bonus(span, place_type)
+        order = np.argsort(-score, kind='stable')
+        return list(zip(self.arrays["entry_pid"][span][order].tolist(), score[order].tolist()))
+
+    def _type_bonus(self, span: slice, place_type: Optional[str]) -> np.ndarray:
+        """Per candidate: bonus of the feature types the entity's place type asks for."""
+        bonus = np.zeros(span.stop - span.start, dtype=np.float32)
+        place_type = (place_type or "").lower()
+        rules = [self._type_rules[keyword] for keyword in self._type_rules if keyword in place_type]
+        if not rules or len(bonus) < 2:
+            return bonus
+        rows = self.arrays["entry_place"][span]
+        known = rows >= 0  # Names whose pid has no place metadata keep their prior
+        packed = self.arrays["place_features"][rows[known]]
+        for rule in rules:
+            bonus[known] += _rule_scores(packed, self.meta["feature_types"], rule)
+        return bonus
+
+    def search(self, query, place_type=None):
+        """Pleiades URI for a place name; ``place_type`` (e.g. "Deme") re-ranks ambiguous names."""
         if not self.loaded: self.load()
         if not self.loaded: return None # Failed to load
-        
-        norm_query = normalize(query)
-        matches = self.name_index.get(norm_query, [])
-        if not matches: return None
-        
-        # Scoring Algorithm
-        scored = []
-        for m in matches:
-            pid = m['pid']
-            meta = self.place_metadata.get(pid, {})
-            score = 0
-            
-            # Precision
-            if m['precision'] == 'precise': score += 3
-            
-            # Feature Types
-            ftypes = meta.get('featureTypes', [])
-            ftypes_str = ",".join(ftypes)
-            if 'settlement' in ftypes_str: score += 2
-            if 'deme' in ftypes_str: score += 5 # Boost demes significantly
-            if 'city' in ftypes_str: score += 2
-            if 'island' in ftypes_str: score += 2
-            if 'sanctuary' in ftypes_str: score += 2
-            
-            # Time Periods (Prefer Classical/Hellenistic/Roman)
-            periods = meta.get('timePeriods', [])
-            periods_str = ",".join(periods)
-            if 'classical' in periods_str: score += 1
-            if 'hellenistic' in periods_str: score += 1
-            if 'roman' in periods_str: score += 1
-            if 'archaic' in periods_str: score += 1
-            
-            scored.append((score, pid))
-        
-        # Sort by score desc
-        scored.sort(key=lambda x: x[0], reverse=True)
-        
-        if scored:
-            best_pid = scored[0][1]
-            return f"https://pleiades.stoa.org/places/{best_pid}"
-        
-        return None
+
+        i = self.lookup(query)
+        if i is None: return None
+        offsets = self.arrays["entry_offsets"]
+        start, stop = int(offsets[i]), int(offsets[i + 1])
+        if stop - start > 1 and place_type and any(k in place_type.lower() for k in self._type_rules):
+            best_pid = self.rank(query, place_type)[0][0]
+        else:
+            best_pid = int(self.arrays["name_best"][i])
+        return f"https://pleiades.stoa.org/places/{best_pid}"
+
 
 _gazetteer = None
+_gazetteer_lock = threading.Lock()
+
 def get_gazetteer():
     global _gazetteer
     if not _gazetteer:
-        _gazetteer = PleiadesGazetteer()
+        with _gazetteer_lock:
+            if not _gazetteer:
+                _gazetteer = PleiadesGazetteer()
     return _gazetteer
+
+
+def benchmark(names: List[str], repeat: int = 1000) -> None:
+    """Index open time, lookup latency and memory."""
+    import tracemalloc
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    gaz = PleiadesGazetteer()
+    gaz.load()
+    opened = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if not gaz.loaded:
+        print("Gazetteer unavailable (dumps missing?)")
+        return
+    print(f"Open: {opened * 1000:.1f} ms, Python heap peak {peak / 1e6:.2f} MB "
+          f"({gaz.meta['names']:,} names, {gaz.meta['places']:,} places)")
+    names = names or ["Athens", "Sparta", "Korinthos", "Rhamnous", "Nowhere"]
+    for place_type in (None, "Deme"):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for name in names:
+                gaz.search(name, place_type)
+        per_query = (time.perf_counter() - start) / (repeat * len(names))
+        print(f"Search (place type {place_type}): {per_query * 1e6:.1f} us/query")
+    for name in names:
+        print(f"  {name}: {gaz.search(name)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the offline Pleiades gazetteer index.")
+    parser.add_argument("--build", action="store_true", help="Build the index if missing or stale")
+    parser.add_argument("--force", action="store_true", help="With --build: rebuild even if current")
+    parser.add_argument("--benchmark", nargs="*", metavar="NAME", help="Time index open and lookups")
+    args = parser.parse_args()
+    setup_logging()
+    if args.build:
+        get_gazetteer().load(rebuild=args.force)
+    elif args.benchmark is not None:
+        benchmark(args.benchmark)
+    else:
+        parser.print_help()
@@ -0,0 +1,81 @@
+"""
+Shared, tuned HTTP client for the provider SDKs.
+
+Both SDKs use httpx underneath. By default each client gets its own pool with
+SDK defaults. Here we build one client whose pool limits are sized to the
+worker count, with long-lived keep-alive connections, HTTP/2 when ``h2`` is
+installed, and explicit connect/read/pool timeouts. Per-request tracing reports
+how long requests waited for a connection, and how many new connections
+(TCP + TLS) were opened, in ``METRICS``.
+"""
+import importlib.util
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from .config import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_TIMEOUT,
+    LLM_REQUEST_TIMEOUT,
+)
+from .metrics import METRICS
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _attach_trace(request: httpx.Request) -> None:
+    """httpx request hook: installs an httpcore trace callback for this request."""
+    started = time.monotonic()
+    connect_started = [0.0]
+
+    def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            connect_started[0] = time.monotonic()
+        elif event in ("connection.start_tls.complete", "connection.connect_tcp.complete"):
+            if event == "connection.start_tls.complete" or request.url.scheme == "http":
+                METRICS.incr("http.new_connections")
+                METRICS.observe("http.connect", time.monotonic() - connect_started[0])
+        elif event.endswith("send_request_headers.started"):
+            # Time from handing the request to the pool until a connection was ready
+            METRICS.observe("http.connection_wait", time.monotonic() - started)
+            METRICS.incr("http.requests")
+
+    request.extensions["trace"] = trace
+
+
+def client_settings() -> dict:
+    """Keyword arguments for an httpx.Client with the tuned pool settings."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=LLM_REQUEST_TIMEOUT,
+            write=HTTP_CONNECT_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+        "http2": http2_available(),
+        "event_hooks": {"request": [_attach_trace]},
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Returns the process-wide shared HTTP client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(**client_settings())
+        return _client
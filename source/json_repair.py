@@ -0,0 +1,302 @@
+"""
+Local repair and salvage of truncated or slightly malformed LLM JSON output.
+
+A failed ``json.loads`` used to trigger a full network retry. Most failures are
+mechanical (truncation, trailing commas, unescaped quotes inside Greek quotes)
+and can be fixed locally in microseconds:
+
+1. Cut leading prose and trailing garbage around the top-level value.
+2. Escape unescaped quotes and raw control characters inside strings.
+3. Drop trailing commas and insert missing commas between values and members.
+4. On truncation, drop the trailing partial element (a complete trailing
+   scalar is kept) and close all open braces/brackets.
+
+The repaired object is then validated against the ``schema.py`` models and
+invalid themes/entities are dropped (see ``salvage_response``).
+"""
+import json
+from typing import Any, List, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+_VALUE_START = set('"{[-0123456789tfn')
+
+
+class JSONRepairError(ValueError):
+    """Raised when a response cannot be repaired into valid JSON."""
+
+
+def _next_significant(text: str, pos: int) -> Tuple[str, int]:
+    """Returns the next non-whitespace character at or after pos (or '')."""
+    n = len(text)
+    while pos < n and text[pos] in " \t\r\n":
+        pos += 1
+    return (text[pos], pos) if pos < n else ("", n)
+
+
+def _string_end(text: str, pos: int) -> int:
+    """Index of the quote that ends the string opened at ``pos`` (-1 if none)."""
+    i = pos + 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == '"':
+            return i
+        i += 1
+    return -1
+
+
+def _is_closing_quote(text: str, pos: int, container: str) -> bool:
+    """
+    Decides whether the quote at ``pos`` (inside a string) ends the string.
+
+    A real closing quote is followed by a structural character. A comma only
+    counts if what follows it looks like the next key/value, which catches
+    quoted speech such as ``"he said "yes", then left"``.
+    """
+    nxt, nxt_pos = _next_significant(text, pos + 1)
+    if nxt in ("", ":", "}", "]"):
+        return True
+    if nxt == '"':
+        # Adjacent string with a missing comma: the next string must itself
+        # be a key (in an object) or a complete array element
+        end = _string_end(text, nxt_pos)
+        if end < 0:
+            return False
+        after, _ = _next_significant(text, end + 1)
+        return after == ":" if container == "{" else after in (",", "]")
+    if nxt == ",":
+        after, _ = _next_significant(text, nxt_pos + 1)
+        if after == "":
+            return True
+        if container == "{":
+            return after == '"'
+        return after in _VALUE_START
+    return False
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool]:
+    """
+    Single pass over ``text`` that emits a repaired JSON string.
+
+    Returns (output, repairs, truncated).
+    """
+    out: List[str] = []
+    repairs: List[str] = []
+    # Stack frames: [container_char, element_start_index_in_out]
+    stack: List[list] = []
+    in_string = False
+    last_sig = ""
+    i = 0
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if in_string:
+            if ch == "\\":
+                if i + 1 < n:
+                    out.append(text[i:i + 2])
+                    i += 2
+                    continue
+                # Dangling backslash at the very end: truncated escape
+                break
+            if ch == '"':
+                container = stack[-1][0] if stack else ""
+                if _is_closing_quote(text, i, container):
+                    in_string = False
+                    out.append(ch)
+                    last_sig = '"'
+                else:
+                    out.append('\\"')
+                    repairs.append("escaped quote")
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in " \t\r\n":
+            out.append(ch)
+            i += 1
+            continue
+
+        if not stack and last_sig:
+            # Top-level value complete; anything else is trailing garbage
+            repairs.append("dropped trailing text")
+            break
+
+        after_literal = last_sig.isalnum() and out and out[-1] in " \t\r\n"
+        if stack and ch in _VALUE_START and (last_sig in ('"', "}", "]") or after_literal):
+            out.append(",")
+            repairs.append("inserted missing comma")
+            last_sig = ","
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            out.append(ch)
+            stack.append([ch, len(out)])
+            last_sig = ch
+        elif ch in "}]":
+            if not stack:
+                repairs.append("dropped unmatched closer")
+                i += 1
+                continue
+            # Trailing comma before a closer
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                repairs.append("removed trailing comma")
+            opener = stack.pop()[0]
+            out.append(_CLOSERS[opener])
+            if _CLOSERS[opener] != ch:
+                repairs.append("fixed mismatched closer")
+            last_sig = _CLOSERS[opener]
+        elif ch == ",":
+            if last_sig in (",", "{", "[", ":"):
+                repairs.append("removed duplicate comma")
+            else:
+                if stack:
+                    stack[-1][1] = len(out)
+                out.append(ch)
+                last_sig = ","
+        else:
+            out.append(ch)
+            last_sig = ch
+        i += 1
+
+    truncated = in_string or bool(stack)
+    return "".join(out), repairs, truncated
+
+
+def _close_truncated(out: str) -> Tuple[str, List[str]]:
+    """Drops the trailing partial element and closes all open containers."""
+    # Rescan the emitted text (already normalized) to recover the stack
+    stack: List[list] = []
+    in_string = False
+    i = 0
+    while i < len(out):
+        ch = out[i]
+        if in_string:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append([ch, i + 1])
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == "," and stack:
+            stack[-1][1] = i
+        i += 1
+
+    if not stack:
+        return out, []
+
+    closing = "".join(_CLOSERS[frame[0]] for frame in reversed(stack))
+    # A complete trailing scalar (``[1,2,3``, ``{"a": "x"``) is kept as is
+    if not in_string:
+        try:
+            json.loads(out.rstrip() + closing)
+            return out.rstrip() + closing, [f"closed {len(stack)} truncated container(s)"]
+        except json.JSONDecodeError:
+            pass
+
+    # Otherwise cut the partial element of the innermost container, then close all.
+    out = out[:stack[-1][1]].rstrip()
+    if out.endswith(","):
+        out = out[:-1]
+    return out + closing, [f"closed {len(stack)} truncated container(s)"]
+
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """
+    Repairs a malformed JSON string.
+
+    Returns:
+        Tuple of (parsed_object, list_of_repairs_applied)
+
+    Raises:
+        JSONRepairError: If no valid JSON could be recovered.
+    """
+    start = min((p for p in (text.find("{"), text.find("[")) if p >= 0), default=-1)
+    if start < 0:
+        raise JSONRepairError("No JSON object or array found in response")
+
+    repairs = ["dropped leading text"] if text[:start].strip() else []
+    candidate, scan_repairs, truncated = _scan(text[start:])
+    repairs.extend(scan_repairs)
+
+    if truncated:
+        candidate, close_repairs = _close_truncated(candidate)
+        repairs.extend(close_repairs)
+
+    try:
+        return json.loads(candidate), repairs
+    except json.JSONDecodeError as e:
+        raise JSONRepairError(f"Repair failed: {e}") from e
+
+
+def salvage_response(data: Any) -> Tuple[dict, List[str]]:
+    """
+    Validates a repaired response against the ``schema.py`` models.
+
+    Invalid themes, entities and provenance entries are dropped individually so
+    a single broken element does not cost the whole response.
+
+    Raises:
+        JSONRepairError: If the result is not a tagging response, or it had
+            themes and none of them is valid (an empty list is kept).
+    """
+    from pydantic import ValidationError
+    from .schema import DeityEntity, GeoLocation, PersonEntity, PlaceEntity, Theme
+
+    if not isinstance(data, dict):
+        raise JSONRepairError("Repaired response is not a JSON object")
+
+    dropped: List[str] = []
+
+    def keep_valid(items: Any, model, label: str) -> list:
+        if not isinstance(items, list):
+            return []
+        valid = []
+        for item in items:
+            try:
+                model.model_validate(item)
+                valid.append(item)
+            except ValidationError:
+                dropped.append(f"dropped invalid {label}")
+        return valid
+
+    given = data.get("themes")
+    data["themes"] = keep_valid(given, Theme, "theme")
+    if given and not data["themes"]:
+        raise JSONRepairError("No valid theme survived repair")
+
+    entities = data.get("entities")
+    if isinstance(entities, dict):
+        entities["persons"] = keep_valid(entities.get("persons", []), PersonEntity, "person")
+        entities["places"] = keep_valid(entities.get("places", []), PlaceEntity, "place")
+        entities["deities"] = keep_valid(entities.get("deities", []), DeityEntity, "deity")
+    else:
+        data["entities"] = {"persons": [], "places": [], "deities": []}
+
+    if "provenance" in data:
+        data["provenance"] = keep_valid(data.get("provenance"), GeoLocation, "provenance")
+
+    if data.get("completeness") not in ("intact", "fragmentary", "mutilated"):
+        data.pop("completeness", None)
+
+    return data, dropped
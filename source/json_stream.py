@@ -0,0 +1,171 @@
+"""
+Incremental JSON validation for streamed LLM responses.
+
+The validator is fed text chunks as they arrive. It tracks the JSON structure
+character by character and, whenever a theme or entity object is complete,
+parses just that object and checks it against hard constraints. Generation is
+aborted early (``StreamAborted``) when constraints are violated repeatedly or
+the response outgrows its size budget, instead of waiting for a full (and
+possibly 65k-token) bad completion.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+GREEK_CHARS = re.compile(r"[\u0370-\u03FF\u1F00-\u1FFF]")
+
+ENTITY_GROUPS = ("persons", "places", "deities")
+
+
+class StreamAborted(Exception):
+    """Raised by the validator to stop a streamed completion early."""
+
+    def __init__(self, reason: str, message: str, partial: str):
+        super().__init__(message)
+        self.reason = reason
+        self.partial = partial
+
+    @property
+    def salvageable(self) -> bool:
+        """Budget overruns keep a usable prefix; constraint violations do not."""
+        return self.reason == "size_budget"
+
+
+@dataclass
+class StreamChecks:
+    """
+    Hard constraints applied while a response streams in.
+
+    Attributes:
+        max_chars: Abort once the response exceeds this many characters.
+        max_violations: Abort once more than this many elements violate a check.
+        reject_greek_names: Entity names must be English/Latinized.
+        hierarchy_check: Returns an error message for a theme whose path cannot
+            be repaired, else None.
+    """
+    max_chars: int = 60000
+    max_violations: int = 2
+    reject_greek_names: bool = True
+    hierarchy_check: Optional[Callable[[dict], Optional[str]]] = None
+
+
+class StreamingJSONValidator:
+    """Tracks the structure of a streamed JSON document and checks elements."""
+
+    def __init__(self, checks: StreamChecks):
+        self.checks = checks
+        self.buffer: List[str] = []
+        self._joined: Optional[str] = ""
+        self.length = 0
+        self.violations: List[str] = []
+        self.themes_seen = 0
+        self.entities_seen = 0
+        # Frames: {"type": "{"|"[", "key": str|None, "index": int, "start": int}
+        self._stack: List[dict] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._joined is None:
+            self._joined = "".join(self.buffer)
+        return self._joined
+
+    def feed(self, chunk: str) -> None:
+        """Consumes a chunk; raises StreamAborted if a constraint is broken."""
+        if not chunk:
+            return
+        offset = self.length
+        self.buffer.append(chunk)
+        self._joined = None
+        self.length += len(chunk)
+
+        for i, ch in enumerate(chunk):
+            self._consume(ch, offset + i)
+
+        if self.length > self.checks.max_chars:
+            raise StreamAborted(
+                "size_budget",
+                f"Response exceeded {self.checks.max_chars} characters",
+                self.text,
+            )
+
+    def _path(self) -> List[object]:
+        path: List[object] = []
+        for frame in self._stack:
+            path.append(frame["key"] if frame["type"] == "{" else frame["index"])
+        return path
+
+    def _consume(self, ch: str, pos: int) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._last_string = (self.text[self._string_start + 1:pos]
+                                     if self._awaiting_key() else None)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = pos
+        elif ch == ":":
+            if self._stack and self._stack[-1]["type"] == "{":
+                self._stack[-1]["key"] = self._last_string
+        elif ch == ",":
+            if self._stack:
+                frame = self._stack[-1]
+                if frame["type"] == "[":
+                    frame["index"] += 1
+                else:
+                    frame["key"] = None
+        elif ch in "{[":
+            self._stack.append({"type": ch, "key": None, "index": 0, "start": pos})
+        elif ch in "}]":
+            if not self._stack:
+                return
+            frame = self._stack.pop()
+            if ch == "}":
+                self._on_object_closed(frame["start"], pos)
+
+    def _awaiting_key(self) -> bool:
+        return bool(self._stack) and self._stack[-1]["type"] == "{" and self._stack[-1]["key"] is None
+
+    def _on_object_closed(self, start: int, end: int) -> None:
+        path = self._path()
+        is_theme = len(path) == 2 and path[0] == "themes"
+        is_entity = len(path) == 3 and path[0] == "entities" and path[1] in ENTITY_GROUPS
+        if not (is_theme or is_entity):
+            return
+
+        try:
+            element = json.loads(self.text[start:end + 1])
+        except json.JSONDecodeError:
+            return  # Left to the repair stage
+        if not isinstance(element, dict):
+            return
+
+        error = None
+        if is_theme:
+            self.themes_seen += 1
+            if self.checks.hierarchy_check is not None:
+                error = self.checks.hierarchy_check(element)
+        else:
+            self.entities_seen += 1
+            name = element.get("name") or ""
+            if self.checks.reject_greek_names and GREEK_CHARS.search(name):
+                error = f"Greek characters in {path[1]} name '{name}'"
+
+        if error:
+            self.violations.append(error)
+            if len(self.violations) > self.checks.max_violations:
+                raise StreamAborted(
+                    "constraint",
+                    f"{len(self.violations)} constraint violations: {'; '.join(self.violations)}",
+                    self.text,
+                )
@@ -1,14 +1,37 @@
 from abc import ABC, abstractmethod
 import json
-from typing import Any, Dict, Optional
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
 import datetime
+import random
+import threading
+import time
 from pathlib import Path
 from openai import OpenAI
 from google import genai
 from google.genai import types
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from .config import LOGS_DIR
+from tenacity import retry, stop_after_attempt, stop_after_delay, wait_exponential, retry_if_not_exception_type
+from .config import (
+    LOGS_DIR,
+    LLM_REQUEST_TIMEOUT,
+    LLM_TOTAL_DEADLINE,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_POOL_SIZE,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_BREAKER_COOLDOWN,
+    LLM_STREAMING,
+    STREAM_MAX_CHARS,
+)
+from .http_pool import client_settings, get_http_client
+from .json_repair import JSONRepairError, repair_json, salvage_response
+from .json_stream import StreamAborted, StreamChecks, StreamingJSONValidator
+from .metrics import METRICS
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged_call
+
+logger = logging.getLogger(__name__)
 
 # Global session timestamp for this run
 SESSION_TIMESTAMP = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -53,101 +76,560 @@ def clean_json_response(text: str) -> str:
     text = text.strip()
 
     # If it doesn't end with } or ], it might be truncated.
-    # We only want to cut off if we are SURE we found the last valid object/array.
-    # For now, let's just let json.loads fail naturally if it's truncated, 
-    # but try to strip trailing garbage if present.
+    # Truncation and trailing garbage are handled by parse_json_response,
+    # which falls back to json_repair only if json.loads fails.
     
     return text
 
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """
+    Parses a cleaned LLM response, falling back to local repair and salvage.
+
+    Only raises (and thereby triggers a network retry) if salvage fails.
+    """
+    try:
+        data = json.loads(text)
+        METRICS.incr("llm.json_ok")
+        return data
+    except json.JSONDecodeError as e:
+        parse_error = e
+
+    try:
+        data, repairs = repair_json(text)
+        data, dropped = salvage_response(data)
+    except JSONRepairError as e:
+        METRICS.incr("llm.json_unrepairable")
+        logger.warning(f"Unrepairable JSON response ({parse_error}): {e}")
+        raise
+
+    METRICS.incr("llm.json_repaired")
+    logger.info(f"Repaired JSON response locally: {', '.join(repairs + dropped)}")
+    return data
+
+
+def _count_retry(retry_state) -> None:
+    """tenacity before_sleep hook: counts network retries."""
+    METRICS.incr("llm.retries")
+
+
 class LLMProvider(ABC):
+    """
+    Base class for provider clients.
+
+    Provider clients implement ``_request`` (one raw completion under a
+    timeout) and optionally ``_stream`` (the same completion as text chunks);
+    clients that delegate whole calls, like ``RoutingClient``, only implement
+    ``generate_json``. ``_call`` wraps them with the per-model circuit
+    breaker, latency tracking, optional hedging and the shared counters in
+    ``METRICS``.
+    """
+    provider_name = "llm"
+
+    def __init__(self):
+        self._health_lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._local = threading.local()
+
+    @property
+    def served_by(self) -> str:
+        """Backend (``provider:model``) that served this thread's last successful call."""
+        return getattr(self._local, "served_by", self.provider_name)
+
     @abstractmethod
-    def generate_json(self, system_prompt: str, user_prompt: str, model: str) -> Dict[str, Any]:
-        """Generates a JSON response from the LLM."""
+    def generate_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> Dict[str, Any]:
+        """
+        Generates a JSON response from the LLM.
+
+        If streaming is enabled (``LLM_STREAMING``), ``stream_checks`` are
+        applied incrementally while the response arrives.
+        """
         pass
 
+    def _request(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> str:
+        """Performs a single completion request and returns the raw text."""
+        raise NotImplementedError(f"{self.provider_name} does not send raw requests")
+
+    def _stream(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> Iterator[str]:
+        """Performs a single streamed completion request, yielding text chunks."""
+        raise NotImplementedError(f"{self.provider_name} does not support streaming")
+
+    def _request_streaming(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        timeout: float,
+        checks: StreamChecks
+    ) -> str:
+        """Streams a completion through the incremental validator."""
+        validator = StreamingJSONValidator(checks)
+        chunks = self._stream(system_prompt, user_prompt, model, timeout)
+        try:
+            for chunk in chunks:
+                validator.feed(chunk)
+        finally:
+            # Closing the generator closes the underlying HTTP stream on abort
+            chunks.close()
+        return validator.text
+
+    @staticmethod
+    def _record_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        """Reports provider token usage (read by the planner's budget governor)."""
+        METRICS.incr("llm.tokens_in", prompt_tokens or 0)
+        METRICS.incr("llm.tokens_out", completion_tokens or 0)
+
+    def _health(self, model: str) -> Tuple[CircuitBreaker, LatencyTracker]:
+        with self._health_lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(
+                    f"{self.provider_name}:{model}",
+                    failure_threshold=CIRCUIT_BREAKER_THRESHOLD,
+                    cooldown=CIRCUIT_BREAKER_COOLDOWN,
+                )
+                self._latency[model] = LatencyTracker()
+            return self._breakers[model], self._latency[model]
+
+    def _hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        if not LLM_HEDGE_ENABLED or len(tracker) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return tracker.percentile(LLM_HEDGE_PERCENTILE)
+
+    def _call(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> str:
+        """Sends one request through the breaker with deadline and optional hedging."""
+        breaker, tracker = self._health(model)
+        breaker.before_call()
+
+        if stream_checks is not None:
+            def request(timeout: float) -> str:
+                return self._request_streaming(system_prompt, user_prompt, model, timeout, stream_checks)
+        else:
+            def request(timeout: float) -> str:
+                return self._request(system_prompt, user_prompt, model, timeout)
+
+        METRICS.incr("llm.calls")
+        start = time.monotonic()
+        try:
+            text = hedged_call(
+                request,
+                timeout=LLM_REQUEST_TIMEOUT,
+                hedge_delay=self._hedge_delay(tracker),
+                pool_size=LLM_HEDGE_POOL_SIZE,
+            )
+        except StreamAborted as e:
+            # The provider answered; the output was bad. Not a health failure.
+            breaker.record_success()
+            METRICS.incr("llm.stream_aborts")
+            METRICS.incr(f"llm.stream_aborts.{e.reason}")
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            METRICS.incr("llm.failures")
+            # Covers our own TimeoutError as well as the SDKs' timeout exceptions
+            if "timeout" in type(e).__name__.lower():
+                METRICS.incr("llm.timeouts")
+            raise
+
+        elapsed = time.monotonic() - start
+        breaker.record_success()
+        tracker.record(elapsed)
+        METRICS.observe("llm.latency", elapsed)
+        return text
+
+    def _generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> Dict[str, Any]:
+        if LLM_STREAMING and stream_checks is None:
+            stream_checks = StreamChecks(max_chars=STREAM_MAX_CHARS)
+        elif not LLM_STREAMING:
+            stream_checks = None
+
+        try:
+            content = self._call(system_prompt, user_prompt, model, stream_checks)
+        except StreamAborted as e:
+            # Runaway output keeps a usable prefix: repair it instead of retrying.
+            # Constraint violations propagate and are retried by tenacity.
+            if not e.salvageable:
+                raise
+            METRICS.incr("llm.stream_salvaged")
+            content = e.partial
+
+        if not content:
+            raise ValueError(f"Empty response from {self.provider_name}")
+
+        content = clean_json_response(content)
+        log_interaction(model, system_prompt, user_prompt, content)
+        data = parse_json_response(content)
+        self._local.served_by = f"{self.provider_name}:{model}"
+        return data
+
+
 class OpenAIClient(LLMProvider):
+    provider_name = "openai"
+
     def __init__(self, api_key: str, base_url: Optional[str] = None):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        super().__init__()
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=LLM_REQUEST_TIMEOUT,
+            http_client=get_http_client()
+        )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def generate_json(self, system_prompt: str, user_prompt: str, model: str) -> Dict[str, Any]:
+    @retry(
+        stop=(stop_after_attempt(3) | stop_after_delay(LLM_TOTAL_DEADLINE)),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type(CircuitOpenError),
+        before_sleep=_count_retry,
+    )
+    def generate_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> Dict[str, Any]:
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.0
-            )
-            content = response.choices[0].message.content
-            if not content:
-                raise ValueError("Empty response from LLM")
-            
-            content = clean_json_response(content)
-            log_interaction(model, system_prompt, user_prompt, content)
-            return json.loads(content)
+            return self._generate(system_prompt, user_prompt, model, stream_checks)
         except Exception as e:
-            print(f"OpenAI Error: {e}")
+            logger.error(f"OpenAI Error: {e}")
             raise e
 
+    def _request(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> str:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0,
+            timeout=timeout
+        )
+        if response.usage:
+            self._record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    def _stream(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0,
+            timeout=timeout,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    self._record_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+
 class GoogleClient(LLMProvider):
+    provider_name = "google"
+
     def __init__(self, api_key: str):
-        self.client = genai.Client(api_key=api_key)
+        super().__init__()
+        http_options = {"timeout": int(LLM_REQUEST_TIMEOUT * 1000)}
+        if "httpx_client" in types.HttpOptions.model_fields:
+            http_options["httpx_client"] = get_http_client()
+        else:
+            # Older SDKs build their own httpx.Client; give it the same pool settings
+            http_options["client_args"] = client_settings()
+        self.client = genai.Client(api_key=api_key, http_options=types.HttpOptions(**http_options))
 
     @retry(
-        stop=stop_after_attempt(5),
+        stop=(stop_after_attempt(5) | stop_after_delay(LLM_TOTAL_DEADLINE)),
         wait=wait_exponential(multiplier=2, min=5, max=60),
+        retry=retry_if_not_exception_type(CircuitOpenError),
+        before_sleep=_count_retry,
         reraise=True
     )
-    def generate_json(self, system_prompt: str, user_prompt: str, model: str) -> Dict[str, Any]:
+    def generate_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> Dict[str, Any]:
         try:
-            # Config for the new SDK
-            config = types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0.0,
-                top_p=0.95,
-                top_k=64,
-                max_output_tokens=65536,
-                response_mime_type="application/json",
-                safety_settings=[
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HARASSMENT",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HATE_SPEECH",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                        threshold="BLOCK_NONE"
-                    ),
-                ]
-            )
-            
-            print(f"Calling Gemini model (new SDK): {model}")
-            response = self.client.models.generate_content(
-                model=model,
-                contents=user_prompt,
-                config=config
-            )
-            
-            if not response.text:
-                raise ValueError("Empty response text from Gemini")
-                
-            text = clean_json_response(response.text)
-            log_interaction(model, system_prompt, user_prompt, text)
-            return json.loads(text)
+            return self._generate(system_prompt, user_prompt, model, stream_checks)
         except Exception as e:
-            print(f"Google Gemini Error: {e}")
+            logger.error(f"Google Gemini Error: {e}")
             raise e
 
+    def _config(self, system_prompt: str, timeout: float) -> types.GenerateContentConfig:
+        # Config for the new SDK
+        return types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            temperature=0.0,
+            top_p=0.95,
+            top_k=64,
+            max_output_tokens=65536,
+            response_mime_type="application/json",
+            # Per-call deadline (milliseconds); hedged duplicates get the remaining budget
+            http_options=types.HttpOptions(timeout=int(timeout * 1000)),
+            safety_settings=[
+                types.SafetySetting(
+                    category="HARM_CATEGORY_HARASSMENT",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_HATE_SPEECH",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                    threshold="BLOCK_NONE"
+                ),
+            ]
+        )
+
+    def _request(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> str:
+        logger.debug(f"Calling Gemini model (new SDK): {model}")
+        response = self.client.models.generate_content(
+            model=model,
+            contents=user_prompt,
+            config=self._config(system_prompt, timeout)
+        )
+        if response.usage_metadata:
+            self._record_usage(
+                response.usage_metadata.prompt_token_count,
+                response.usage_metadata.candidates_token_count
+            )
+        return response.text
+
+    def _stream(self, system_prompt: str, user_prompt: str, model: str, timeout: float) -> Iterator[str]:
+        logger.debug(f"Streaming Gemini model (new SDK): {model}")
+        # Usage metadata is cumulative; the last chunk carries the totals
+        usage = None
+        for chunk in self.client.models.generate_content_stream(
+            model=model,
+            contents=user_prompt,
+            config=self._config(system_prompt, timeout)
+        ):
+            if chunk.usage_metadata:
+                usage = chunk.usage_metadata
+            if chunk.text:
+                yield chunk.text
+        if usage is not None:
+            self._record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extracts an HTTP status code from OpenAI / google-genai SDK errors."""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """True for quota exhaustion, server errors and unreachable backends."""
+    if isinstance(error, (CircuitOpenError, TimeoutError)):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    name = type(error).__name__.lower()
+    return "ratelimit" in name or "timeout" in name or "connection" in name
+
+
+class RoutedBackend:
+    """One backend of a RoutingClient with its weight, concurrency limit and health."""
+
+    def __init__(
+        self,
+        name: str,
+        client: LLMProvider,
+        weight: float = 1.0,
+        max_concurrency: int = 8,
+        model: Optional[str] = None
+    ):
+        self.name = name
+        self.client = client
+        self.weight = weight
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._health = 1.0  # Multiplier on weight, halved on every throttle
+        self._cooldown_until = 0.0
+
+    def available(self, now: float) -> bool:
+        with self._lock:
+            return now >= self._cooldown_until
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return self._in_flight < self.max_concurrency
+
+    def effective_weight(self) -> float:
+        with self._lock:
+            return self.weight * self._health
+
+    def penalize(self, cooldown: float) -> None:
+        with self._lock:
+            self._health = max(self._health / 2, 0.05)
+            self._cooldown_until = time.monotonic() + cooldown
+
+    def reward(self) -> None:
+        with self._lock:
+            self._health = min(self._health + 0.1, 1.0)
+
+    def run(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks]
+    ) -> Dict[str, Any]:
+        with self._slots:
+            with self._lock:
+                self._in_flight += 1
+            try:
+                return self.client._generate(system_prompt, user_prompt, self.model or model, stream_checks)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+
+class RoutingClient(LLMProvider):
+    """
+    Spreads calls over several configured backends (see ``LLM_BACKENDS``).
+
+    Backends are picked by weight among those that are not cooling down and
+    have free concurrency slots. A 429/5xx (or timeout / open circuit) halves
+    the backend's weight, puts it on cooldown and fails the call over to
+    another backend, so combined quota becomes the throughput limit.
+    """
+    provider_name = "router"
+
+    def __init__(self, backends: List[RoutedBackend], throttle_cooldown: float = 30.0, max_attempts: Optional[int] = None):
+        super().__init__()
+        if not backends:
+            raise ValueError("RoutingClient needs at least one backend.")
+        self.backends = backends
+        self.throttle_cooldown = throttle_cooldown
+        self.max_attempts = max_attempts or 2 * len(backends) + 1
+
+    def _pick(self, exclude: set) -> RoutedBackend:
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.name not in exclude and b.available(now)]
+        if not candidates:
+            # Everything is cooling down: fall back to any non-excluded backend
+            candidates = [b for b in self.backends if b.name not in exclude] or list(self.backends)
+        pool = [b for b in candidates if b.has_capacity()] or candidates
+        return random.choices(pool, weights=[b.effective_weight() for b in pool])[0]
+
+    def generate_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        stream_checks: Optional[StreamChecks] = None
+    ) -> Dict[str, Any]:
+        tried: set = set()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_attempts):
+            if len(tried) >= len(self.backends):
+                # Every backend failed once this round: back off, then start over
+                time.sleep(min(2 ** (attempt // len(self.backends)), 30))
+                tried.clear()
+
+            backend = self._pick(tried)
+            METRICS.incr(f"router.{backend.name}.calls")
+            try:
+                data = backend.run(system_prompt, user_prompt, model, stream_checks)
+            except Exception as e:
+                last_error = e
+                tried.add(backend.name)
+                if is_throttle_error(e):
+                    backend.penalize(self.throttle_cooldown)
+                    METRICS.incr(f"router.{backend.name}.throttled")
+                else:
+                    METRICS.incr(f"router.{backend.name}.failures")
+                logger.warning(f"Backend '{backend.name}' failed ({type(e).__name__}): {e}")
+                continue
+
+            backend.reward()
+            METRICS.incr(f"router.{backend.name}.served")
+            self._local.served_by = f"{backend.name}:{backend.model or model}"
+            return data
+
+        raise last_error
+
+
+def _build_backend_client(spec: dict) -> LLMProvider:
+    provider = spec.get("provider", "openai")
+    api_key = spec.get("api_key") or os.getenv(spec.get("api_key_env", ""), "")
+    if provider == "openai":
+        # Local OpenAI-compatible servers (vLLM, llama.cpp, Ollama) often ignore the key
+        return OpenAIClient(api_key=api_key or "not-needed", base_url=spec.get("base_url"))
+    if provider == "google":
+        if not api_key:
+            raise ValueError(f"No API key for backend '{spec.get('name')}'.")
+        return GoogleClient(api_key=api_key)
+    raise ValueError(f"Unknown provider for backend '{spec.get('name')}': {provider}")
+
+
+def build_routing_client(specs: List[dict]) -> RoutingClient:
+    """
+    Builds a RoutingClient from backend specs, e.g.::
+
+        [{"name": "openai", "provider": "openai", "api_key_env": "OPENAI_API_KEY", "weight": 2},
+         {"name": "gemini", "provider": "google", "api_key_env": "GOOGLE_API_KEY", "model": "gemini-2.5-flash"},
+         {"name": "local", "provider": "openai", "base_url": "http://localhost:8000/v1",
+          "model": "qwen2.5-32b", "max_concurrency": 2}]
+    """
+    from .config import ROUTER_THROTTLE_COOLDOWN
+
+    backends = []
+    for i, spec in enumerate(specs):
+        name = spec.get("name") or f"{spec.get('provider', 'openai')}-{i}"
+        backends.append(RoutedBackend(
+            name=name,
+            client=_build_backend_client({**spec, "name": name}),
+            weight=float(spec.get("weight", 1.0)),
+            max_concurrency=int(spec.get("max_concurrency", 8)),
+            model=spec.get("model"),
+        ))
+    return RoutingClient(backends, throttle_cooldown=ROUTER_THROTTLE_COOLDOWN)
+
+
 def get_llm_client() -> LLMProvider:
     """Factory to get the configured LLM client."""
     from .config import DEFAULT_MODEL_PROVIDER, OPENAI_API_KEY, GOOGLE_API_KEY
@@ -161,6 +643,13 @@ def get_llm_client() -> LLMProvider:
         if not GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found.")
         return GoogleClient(api_key=GOOGLE_API_KEY)
+
+    elif DEFAULT_MODEL_PROVIDER == "router":
+        from .config import load_backend_specs
+        specs = load_backend_specs()
+        if not specs:
+            raise ValueError("DEFAULT_MODEL_PROVIDER=router but LLM_BACKENDS is empty.")
+        return build_routing_client(specs)
     
     else:
         raise ValueError(f"Unknown provider: {DEFAULT_MODEL_PROVIDER}")
\ No newline at end of file
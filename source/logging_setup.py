@@ -0,0 +1,280 @@
+"""
+Centralized, non-blocking logging for the pipeline and utilities.
+
+Every logger writes into an in-memory queue (``QueueHandler``); a single
+background ``QueueListener`` thread does the file and console I/O. Worker
+threads therefore never wait on handler locks or a slow terminal.
+
+- The run log file holds structured JSON lines (one object per record, with
+  the ``phi_id`` of per-inscription messages as a field). Set
+  ``LOG_FORMAT=text`` for the classic text log.
+- Per-inscription messages (logged with ``extra={"phi_id": ...}``) are
+  sampled on the console: one in ``LOG_ITEM_SAMPLE_EVERY`` per call site.
+  Warnings and errors always pass, and the log file keeps everything.
+
+Usage:
+    python -m source.logging_setup --benchmark
+"""
+import argparse
+import atexit
+import datetime
+import logging
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import codec
+from .config import LOG_FORMAT, LOG_ITEM_SAMPLE_EVERY, LOG_LEVEL, LOGS_DIR
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+_log_file: Optional[Path] = None
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # Already rendered by the queue handler
+        return codec.dumps(entry)
+
+
+class ItemSamplingFilter(logging.Filter):
+    """
+    Passes one in ``every`` per-item records per call site.
+
+    Per-item records carry a ``phi_id`` attribute. Records at WARNING and
+    above, and records without ``phi_id``, always pass.
+    """
+
+    def __init__(self, every: int = LOG_ITEM_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno >= logging.WARNING or not hasattr(record, "phi_id"):
+            return True
+        key = (record.name, record.lineno)
+        with self._lock:
+            count = self._seen[key]
+            self._seen[key] = count + 1
+            if count % self.every == 0:
+                return True
+            self.dropped += 1
+            return False
+
+
+class _ListenerQueueHandler(QueueHandler):
+    """Queues records untouched except for merging ``msg % args``.
+
+    The stock ``prepare`` formats the record with this handler's formatter,
+    which would bake a text layout into the message before the JSON
+    formatter sees it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(run_name: Optional[str] = None, level: str = LOG_LEVEL, console: bool = True) -> Optional[Path]:
+    """
+    Routes all logging through a queue to a background writer thread.
+
+    Args:
+        run_name: Writes ``data/logs/<run_name>_<timestamp>.jsonl`` (``.log``
+            with LOG_FORMAT=text). None logs to the console only.
+        level: Root log level.
+        console: Also log to stderr (per-item messages sampled).
+
+    Returns:
+        The run log file, if any. Calling again reuses the running listener.
+    """
+    global _listener, _log_file
+    if _listener is not None:
+        return _log_file
+
+    handlers = []
+    if run_name:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        suffix = "jsonl" if LOG_FORMAT == "json" else "log"
+        _log_file = LOGS_DIR / f"{run_name}_{timestamp}.{suffix}"
+        file_handler = logging.FileHandler(_log_file, encoding='utf-8')
+        file_handler.setFormatter(
+            JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+        )
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        console_handler.addFilter(ItemSamplingFilter())
+        handlers.append(console_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_ListenerQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _log_file
+
+
+def stop_logging() -> None:
+    """Flushes the queue and stops the writer thread (also runs at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# --- Benchmark ---
+
+_WORKER_PREFIX = "bench-worker"
+
+
+class _TimedLockMixin:
+    """Accumulates the time worker threads spend waiting for the handler lock."""
+    wait_seconds = 0.0
+    _wait_lock = threading.Lock()
+
+    def acquire(self):
+        start = time.perf_counter()
+        super().acquire()
+        waited = time.perf_counter() - start
+        if threading.current_thread().name.startswith(_WORKER_PREFIX):
+            with self._wait_lock:
+                _TimedLockMixin.wait_seconds += waited
+
+
+class _TimedFileHandler(_TimedLockMixin, logging.FileHandler):
+    pass
+
+
+class _TimedStreamHandler(_TimedLockMixin, logging.StreamHandler):
+    pass
+
+
+def _hammer(logger: logging.Logger, threads: int, messages: int) -> dict:
+    latencies = [[] for _ in range(threads)]
+
+    def worker(n: int):
+        record_latency = latencies[n].append
+        for i in range(messages):
+            start = time.perf_counter()
+            logger.info(f"Processing Inscription ID: {n * messages + i}", extra={"phi_id": n * messages + i})
+            record_latency(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(n,), name=f"{_WORKER_PREFIX}-{n}") for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    flat = sorted(x for lat in latencies for x in lat)
+    return {
+        "seconds": elapsed,
+        "p50_us": statistics.median(flat) * 1e6,
+        "p99_us": flat[int(len(flat) * 0.99)] * 1e6,
+    }
+
+
+def benchmark(threads: int = 16, messages: int = 2000, sample_every: int = LOG_ITEM_SAMPLE_EVERY) -> None:
+    """Worker-side cost of per-item logging: direct handlers vs queue vs queue + sampling."""
+    total = threads * messages
+    print(f"{threads} threads x {messages} per-item messages ({total:,} records)")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Console stand-in: a real file, so both paths pay actual write I/O
+        console_stream = open(Path(tmp) / "console.txt", "w", encoding="utf-8")
+
+        def handlers(sampled: bool):
+            file_handler = _TimedFileHandler(Path(tmp) / "run.log", encoding="utf-8")
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            stream_handler = _TimedStreamHandler(console_stream)
+            stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            if sampled:
+                stream_handler.addFilter(ItemSamplingFilter(sample_every))
+            return [file_handler, stream_handler]
+
+        results = {}
+        for name in ("direct", "queue", "queue+sampled"):
+            logger = logging.getLogger(f"bench.{name}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            _TimedLockMixin.wait_seconds = 0.0
+            targets = handlers(sampled=name == "queue+sampled")
+            listener = None
+            if name == "direct":
+                for handler in targets:
+                    logger.addHandler(handler)
+            else:
+                log_queue: queue.SimpleQueue = queue.SimpleQueue()
+                logger.addHandler(_ListenerQueueHandler(log_queue))
+                listener = QueueListener(log_queue, *targets, respect_handler_level=True)
+                listener.start()
+            result = _hammer(logger, threads, messages)
+            if listener is not None:
+                drain_start = time.perf_counter()
+                listener.stop()
+                result["drain_seconds"] = time.perf_counter() - drain_start
+            result["lock_wait_seconds"] = _TimedLockMixin.wait_seconds
+            for handler in list(logger.handlers) + targets:
+                handler.close()
+                logger.removeHandler(handler)
+            results[name] = result
+        console_stream.close()
+
+    for name, r in results.items():
+        drain = f"  (+{r['drain_seconds']:.2f}s background drain)" if "drain_seconds" in r else ""
+        print(f"{name:14s} workers {r['seconds']:6.2f}s  {total / r['seconds']:9,.0f} msg/s  "
+              f"p50 {r['p50_us']:6.1f}us  p99 {r['p99_us']:8.1f}us  "
+              f"handler lock wait in workers {r['lock_wait_seconds']:6.2f}s{drain}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queued logging setup and contention benchmark.")
+    parser.add_argument("--benchmark", action="store_true", help="Measure per-item logging cost in worker threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per thread")
+    parser.add_argument("--sample-every", type=int, default=LOG_ITEM_SAMPLE_EVERY)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.threads, args.messages, args.sample_every)
+    else:
+        parser.print_help()
@@ -1,42 +1,34 @@
-import json
 import logging
 from pathlib import Path
 from tqdm import tqdm
-import datetime
 
-from .config import INPUT_DIR, OUTPUT_DIR, TAXONOMY_DIR, DEFAULT_MODEL_NAME, LOG_LEVEL, LOGS_DIR
-from .data_loader import load_inscriptions
-from .preprocessing import clean_metadata
+from .config import INPUT_DIR, OUTPUT_DIR, TAXONOMY_DIR, DEFAULT_MODEL_NAME, CLASSIFIER_MODE, MIN_TEXT_LENGTH
+from .classifier import classifier_result, load_classifier, prelabel
+from . import codec
+from .corpus import load_corpus
 from .llm_client import get_llm_client
+from .logging_setup import setup_logging
+from .metrics import METRICS
+from .planner import BudgetExceeded, TokenBudgetGovernor, TokenEstimator
 from .tagger import tag_inscription
 
-# Setup Logging
-timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-log_file = LOGS_DIR / f"pipeline_run_{timestamp}.log"
-
-logging.basicConfig(
-    level=LOG_LEVEL, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Setup Logging (queued; JSON lines run log in data/logs)
+setup_logging("pipeline_run")
 logger = logging.getLogger(__name__)
 
 def load_taxonomy():
     taxonomy_path = TAXONOMY_DIR / "taxonomy.json"
     if not taxonomy_path.exists():
         raise FileNotFoundError(f"Taxonomy file not found at {taxonomy_path}")
-    with open(taxonomy_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return codec.load_file(taxonomy_path)
 
 def main():
     logger.info("Starting AGKI-PM-TaggingEpigraphy Pipeline")
     
     # 1. Load Data
     logger.info(f"Loading inscriptions from {INPUT_DIR}...")
-    inscriptions = load_inscriptions(INPUT_DIR)
+    # Normalized snapshot, rebuilt for changed inputs only; short texts are not tagged
+    inscriptions = load_corpus(min_length=MIN_TEXT_LENGTH)
     logger.info(f"Found {len(inscriptions)} inscriptions.")
     
     if not inscriptions:
@@ -63,10 +55,15 @@ def main():
         logger.error(f"Failed to initialize LLM Client: {e}")
         return
 
+    estimator = TokenEstimator(taxonomy)
+    governor = TokenBudgetGovernor()
+    classifier = load_classifier()
+
     # 4. Processing Loop
     success_count = 0
     skip_count = 0
     error_count = 0
+    local_count = 0
     
     import os
     max_inscriptions = int(os.getenv("MAX_INSCRIPTIONS", -1))
@@ -84,32 +81,53 @@ def main():
         if output_file.exists():
             skip_count += 1
             continue
-            
+
+        reservation = 0
         try:
-            logger.info(f"Processing Inscription ID: {inscription.id}")
-            # Preprocess
-            clean_inscription = clean_metadata(inscription)
-            
+            # Local classifier: prompt hints, and in route mode confident inscriptions skip the LLM
+            hints = None
+            if classifier is not None:
+                hints, needs_llm = prelabel(classifier, inscription.text)
+                if CLASSIFIER_MODE == "route" and not needs_llm:
+                    codec.dump_model(classifier_result(classifier, inscription), output_file)
+                    local_count += 1
+                    continue
+
+            reservation = governor.acquire(estimator.estimate(inscription).total)
+
+            logger.info(f"Processing Inscription ID: {inscription.id}", extra={"phi_id": inscription.id})
+
             # Tag
             tagged_result = tag_inscription(
-                inscription=clean_inscription,
+                inscription=inscription,
                 llm_client=llm_client,
                 taxonomy=taxonomy,
-                model=DEFAULT_MODEL_NAME
+                model=DEFAULT_MODEL_NAME,
+                hints=hints
             )
             
             # Save Output
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(tagged_result.model_dump_json(indent=2))
+            codec.dump_model(tagged_result, output_file)
             
             success_count += 1
             
+        except BudgetExceeded as e:
+            logger.warning(f"Stopping: {e}")
+            break
+
         except Exception as e:
             error_count += 1
-            logger.error(f"Error processing ID {inscription.id}: {e}")
+            logger.error(f"Error processing ID {inscription.id}: {e}", extra={"phi_id": inscription.id})
+
+        finally:
+            governor.release(reservation)
 
     logger.info("Pipeline Complete.")
     logger.info(f"Processed: {success_count}, Skipped: {skip_count}, Failed: {error_count}")
+    if local_count:
+        logger.info(f"Tagged locally by classifier (no LLM): {local_count}")
+    for line in METRICS.summary_lines():
+        logger.info(f"  {line}")
 
 if __name__ == "__main__":
     main()
@@ -2,49 +2,48 @@
 Parallel processing version of the tagging pipeline.
 Uses concurrent.futures for parallel inscription processing.
 """
-import json
 import logging
 import os
 import datetime
 import random
+import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 
-from .config import INPUT_DIR, OUTPUT_DIR, TAXONOMY_DIR, DEFAULT_MODEL_NAME, LOG_LEVEL, LOGS_DIR
-from .data_loader import load_inscriptions
-from .preprocessing import clean_metadata
+from .config import (
+    INPUT_DIR, OUTPUT_DIR, TAXONOMY_DIR, DEFAULT_MODEL_NAME, MAX_WORKERS, CLASSIFIER_MODE,
+    SCHEDULE_ORDER, SCHEDULE_WINDOW, LONG_LANE_WORKERS, LONG_LANE_QUANTILE, MIN_TEXT_LENGTH
+)
+from .classifier import classifier_result, load_classifier, prelabel
+from . import codec
+from .corpus import load_corpus
 from .llm_client import get_llm_client
+from .logging_setup import setup_logging
+from .metrics import METRICS
+from .planner import (
+    BudgetExceeded, TokenBudgetGovernor, TokenEstimator, lpt_order, makespan_report, plan_run, split_lanes
+)
 from .tagger import tag_inscription
 
-# Setup Logging
-timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-log_file = LOGS_DIR / f"pipeline_parallel_{timestamp}.log"
-
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Setup Logging: worker threads only enqueue records; a background thread writes them
+setup_logging("pipeline_parallel")
 logger = logging.getLogger(__name__)
 
 # Thread-safe counters
 counter_lock = Lock()
-counters = {"success": 0, "skip": 0, "error": 0}
+counters = {"success": 0, "skip": 0, "error": 0, "budget": 0, "local": 0}
 
 
 def load_taxonomy():
     taxonomy_path = TAXONOMY_DIR / "taxonomy.json"
     if not taxonomy_path.exists():
         raise FileNotFoundError(f"Taxonomy file not found at {taxonomy_path}")
-    with open(taxonomy_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return codec.load_file(taxonomy_path)
 
 
-def process_single_inscription(inscription, llm_client, taxonomy, model, output_dir):
+def process_single_inscription(inscription, llm_client, taxonomy, model, output_dir,
+                               governor=None, estimated_tokens=0, classifier=None):
     """Process a single inscription. Thread-safe."""
     output_file = output_dir / f"{inscription.id}.json"
 
@@ -54,41 +53,95 @@ def process_single_inscription(inscription, llm_client, taxonomy, model, output_
             counters["skip"] += 1
         return {"id": inscription.id, "status": "skipped"}
 
+    reservation = 0
     try:
-        logger.info(f"Processing Inscription ID: {inscription.id}")
-
-        # Preprocess
-        clean_inscription = clean_metadata(inscription)
+        # Local classifier: prompt hints, and in route mode confident inscriptions skip the LLM
+        hints = None
+        if classifier is not None:
+            hints, needs_llm = prelabel(classifier, inscription.text)
+            if CLASSIFIER_MODE == "route" and not needs_llm:
+                codec.dump_model(classifier_result(classifier, inscription), output_file)
+                with counter_lock:
+                    counters["local"] += 1
+                return {"id": inscription.id, "status": "local"}
+
+        # Token budget / rate limit (blocks while throttled)
+        if governor is not None:
+            reservation = governor.acquire(estimated_tokens)
+
+        logger.info(f"Processing Inscription ID: {inscription.id}", extra={"phi_id": inscription.id})
 
         # Tag
         tagged_result = tag_inscription(
-            inscription=clean_inscription,
+            inscription=inscription,
             llm_client=llm_client,
             taxonomy=taxonomy,
-            model=model
+            model=model,
+            hints=hints
         )
 
         # Save Output
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(tagged_result.model_dump_json(indent=2))
+        codec.dump_model(tagged_result, output_file)
 
         with counter_lock:
             counters["success"] += 1
 
-        logger.info(f"Completed Inscription ID: {inscription.id}")
+        logger.info(f"Completed Inscription ID: {inscription.id}", extra={"phi_id": inscription.id})
         return {"id": inscription.id, "status": "success"}
 
+    except BudgetExceeded as e:
+        with counter_lock:
+            counters["budget"] += 1
+        return {"id": inscription.id, "status": "budget", "error": str(e)}
+
     except Exception as e:
         with counter_lock:
             counters["error"] += 1
-        logger.error(f"Error processing ID {inscription.id}: {e}")
+        logger.error(f"Error processing ID {inscription.id}: {e}", extra={"phi_id": inscription.id})
         return {"id": inscription.id, "status": "error", "error": str(e)}
 
+    finally:
+        if governor is not None:
+            governor.release(reservation)
+
+
+def timed_process(*args):
+    """Runs ``process_single_inscription`` and records its wall time."""
+    start = time.perf_counter()
+    result = process_single_inscription(*args)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def schedule(inscriptions, estimates, max_workers):
+    """
+    Orders inscriptions for the worker pool(s).
+
+    Returns a list of (inscriptions in start order, workers) lanes. Already
+    tagged inscriptions weigh nothing (they are skipped instantly), so they
+    do not take the front of the queue.
+    """
+    def weight(inscription):
+        if (OUTPUT_DIR / f"{inscription.id}.json").exists():
+            return 0.0
+        return estimates[inscription.id].expected_seconds
+
+    if SCHEDULE_ORDER != "lpt":
+        return [(inscriptions, max_workers)]
+    if 0 < LONG_LANE_WORKERS < max_workers:
+        long_lane, short_lane = split_lanes(inscriptions, weight, LONG_LANE_QUANTILE)
+        if long_lane and short_lane:
+            return [
+                (lpt_order(long_lane, weight, SCHEDULE_WINDOW), LONG_LANE_WORKERS),
+                (lpt_order(short_lane, weight, SCHEDULE_WINDOW), max_workers - LONG_LANE_WORKERS),
+            ]
+    return [(lpt_order(inscriptions, weight, SCHEDULE_WINDOW), max_workers)]
+
 
 def main():
     # Configuration
     max_inscriptions = int(os.getenv("MAX_INSCRIPTIONS", -1))
-    max_workers = int(os.getenv("MAX_WORKERS", 5))  # Concurrent workers
+    max_workers = MAX_WORKERS  # Concurrent workers (also sizes the HTTP pool)
 
     logger.info("=" * 60)
     logger.info("Starting AGKI-PM-TaggingEpigraphy Pipeline (PARALLEL MODE)")
@@ -98,14 +151,15 @@ def main():
 
     # 1. Load Data
     logger.info(f"Loading inscriptions from {INPUT_DIR}...")
-    inscriptions = load_inscriptions(INPUT_DIR)
+    # Normalized snapshot, rebuilt for changed inputs only; short texts are not tagged
+    inscriptions = load_corpus(min_length=MIN_TEXT_LENGTH)
     logger.info(f"Found {len(inscriptions)} inscriptions.")
 
     if not inscriptions:
         logger.warning("No input files found. Please place JSON files in data/input/")
         return
 
-    # Shuffle for random selection if limiting
+    # Shuffle for random selection if limiting (run order is set by the scheduler below)
     random.shuffle(inscriptions)
 
     # Limit if specified
@@ -121,6 +175,21 @@ def main():
         logger.error(f"Failed to load taxonomy: {e}")
         return
 
+    # Token estimates drive the run plan and the budget governor
+    estimator = TokenEstimator(taxonomy)
+    estimates = {i.id: estimator.estimate(i) for i in inscriptions}
+    for line in plan_run(list(estimates.values()), workers=max_workers).summary_lines():
+        logger.info(f"Plan: {line}")
+    governor = TokenBudgetGovernor()
+    classifier = load_classifier()
+
+    lanes = schedule(inscriptions, estimates, max_workers)
+    for lane, workers in lanes:
+        logger.info(
+            f"Schedule ({SCHEDULE_ORDER}): {len(lane)} inscriptions on {workers} workers"
+            + (f", first ID {lane[0].id} (~{estimates[lane[0].id].total:,} tokens)" if lane else "")
+        )
+
     # 3. Setup LLM Client (shared across threads - thread-safe)
     try:
         llm_client = get_llm_client()
@@ -133,18 +202,25 @@ def main():
     logger.info(f"Starting parallel processing with {max_workers} workers...")
     start_time = datetime.datetime.now()
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    # One pool per lane; each pool starts its jobs in submission order
+    executors = [ThreadPoolExecutor(max_workers=workers) for _, workers in lanes]
+    seconds_by_id = {}
+    try:
         # Submit all tasks
         future_to_inscription = {
             executor.submit(
-                process_single_inscription,
+                timed_process,
                 inscription,
                 llm_client,
                 taxonomy,
                 DEFAULT_MODEL_NAME,
-                OUTPUT_DIR
+                OUTPUT_DIR,
+                governor,
+                estimates[inscription.id].total,
+                classifier
             ): inscription
-            for inscription in inscriptions
+            for executor, (lane, _) in zip(executors, lanes)
+            for inscription in lane
         }
 
         # Process results as they complete
@@ -154,6 +230,7 @@ def main():
         for future in as_completed(future_to_inscription):
             completed += 1
             result = future.result()
+            seconds_by_id[result["id"]] = result["seconds"]
 
             # Progress update every 10 inscriptions
             if completed % 10 == 0 or completed == total:
@@ -165,6 +242,9 @@ def main():
                     f"Rate: {rate:.2f}/sec | ETA: {eta:.0f}s | "
                     f"Success: {counters['success']}, Errors: {counters['error']}, Skipped: {counters['skip']}"
                 )
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
 
     # 5. Summary
     end_time = datetime.datetime.now()
@@ -174,7 +254,16 @@ def main():
     logger.info("Pipeline Complete.")
     logger.info(f"Duration: {duration:.1f} seconds ({duration/60:.1f} minutes)")
     logger.info(f"Processed: {counters['success']}, Skipped: {counters['skip']}, Failed: {counters['error']}")
+    if counters["local"]:
+        logger.info(f"Tagged locally by classifier (no LLM): {counters['local']}")
+    if counters["budget"]:
+        logger.warning(f"Not started (budget reached): {counters['budget']}")
     logger.info(f"Effective rate: {counters['success'] / duration:.2f} inscriptions/second")
+    lane_durations = [([seconds_by_id.get(i.id, 0.0) for i in lane], workers) for lane, workers in lanes]
+    for line in makespan_report(lane_durations, duration):
+        logger.info(line)
+    for line in METRICS.summary_lines():
+        logger.info(f"  {line}")
     logger.info("=" * 60)
 
 
@@ -0,0 +1,74 @@
+"""
+Thread-safe run metrics (counters and timings) shared across the pipeline.
+
+Provider clients, the tagger and the runners all report into the module-level
+``METRICS`` registry so a single summary can be logged at the end of a run.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+
+class Metrics:
+    """A minimal registry of named counters and timing aggregates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(int)
+        # name -> [count, total_seconds, max_seconds]
+        self._timings: Dict[str, List[float]] = {}
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._timings.get(name)
+            if entry is None:
+                self._timings[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        """Returns a copy of all counters and timing aggregates."""
+        with self._lock:
+            timings = {
+                name: {
+                    "count": int(count),
+                    "total": total,
+                    "mean": total / count if count else 0.0,
+                    "max": peak,
+                }
+                for name, (count, total, peak) in self._timings.items()
+            }
+            return {"counters": dict(self._counters), "timings": timings}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def summary_lines(self, prefix: str = "") -> List[str]:
+        """Formats the metrics (optionally filtered by name prefix) for logging."""
+        snap = self.snapshot()
+        lines = []
+        for name in sorted(snap["counters"]):
+            if name.startswith(prefix):
+                lines.append(f"{name}: {snap['counters'][name]:g}")
+        for name in sorted(snap["timings"]):
+            if name.startswith(prefix):
+                t = snap["timings"][name]
+                lines.append(
+                    f"{name}: n={t['count']} mean={t['mean']:.3f}s max={t['max']:.3f}s"
+                )
+        return lines
+
+
+METRICS = Metrics()
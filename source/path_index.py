@@ -0,0 +1,224 @@
+"""
+Persistent inverted index from taxonomy path to PHI ids of the tagged outputs.
+
+The index lives in a small SQLite file (``data/path_index.sqlite``) with one
+row per theme (its four hierarchy levels joined as ``domain > ... >
+subcategory`` plus its label) and one row per output file with its
+size/mtime. ``refresh`` re-reads only output files that were added or changed
+since the last call, so finding all inscriptions under a taxonomy node costs
+a directory scan and one indexed range query instead of parsing every output.
+
+The index also stores the taxonomy the outputs were last migrated to, which
+``enforce_schema_retroactive`` diffs against the current one.
+
+Usage:
+    python -m source.path_index refresh
+    python -m source.path_index stats
+    python -m source.path_index show "Content > Official and Legal Documents"
+"""
+import argparse
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import codec
+from .config import OUTPUT_DIR, PATH_INDEX_PATH
+from .taxonomy_utils import HIERARCHY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = " > "
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    phi_id INTEGER,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS themes (
+    path TEXT NOT NULL,
+    label TEXT,
+    phi_id INTEGER NOT NULL,
+    file TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS themes_path ON themes (path);
+CREATE INDEX IF NOT EXISTS themes_file ON themes (file);
+"""
+
+
+def path_key(hierarchy: dict) -> str:
+    """``domain > subdomain > category > subcategory`` (empty levels omitted)."""
+    return SEPARATOR.join(hierarchy.get(level) for level in HIERARCHY_LEVELS if hierarchy.get(level))
+
+
+def split_key(key: str) -> Tuple[str, ...]:
+    return tuple(key.split(SEPARATOR)) if key else ()
+
+
+class PathIndex:
+    """Path -> PHI id lookups over the output directory, kept up to date by ``refresh``."""
+
+    def __init__(self, db_path: Path = PATH_INDEX_PATH, output_dir: Path = OUTPUT_DIR):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Maintenance ---
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Re-indexes added or changed output files and drops deleted ones.
+
+        Args:
+            names: Only check these file names (e.g. files just rewritten);
+                None scans the whole output directory.
+
+        Returns:
+            Counts of added, updated, removed and unchanged files.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        known = {row[0]: row[1:] for row in self.conn.execute("SELECT name, size, mtime FROM files")}
+        if names is None:
+            current = {}
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        current[entry.name] = (st.st_size, st.st_mtime)
+            gone: Set[str] = set(known) - set(current)
+        else:
+            current, gone = {}, set()
+            for name in names:
+                try:
+                    st = (self.output_dir / name).stat()
+                except FileNotFoundError:
+                    gone.add(name)
+                    continue
+                current[name] = (st.st_size, st.st_mtime)
+
+        with self.conn:
+            for name in gone:
+                self._drop(name)
+                stats["removed"] += 1
+            for name, (size, mtime) in current.items():
+                previous = known.get(name)
+                if previous is not None and previous[0] == size and previous[1] == mtime:
+                    stats["unchanged"] += 1
+                    continue
+                self._drop(name)
+                self._add(name, size, mtime)
+                stats["updated" if previous is not None else "added"] += 1
+        return stats
+
+    def _drop(self, name: str) -> None:
+        self.conn.execute("DELETE FROM themes WHERE file = ?", (name,))
+        self.conn.execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def _add(self, name: str, size: int, mtime: float) -> None:
+        try:
+            data = codec.load_file(self.output_dir / name)
+        except (OSError, ValueError, *codec.DECODE_ERRORS) as e:
+            logger.warning(f"Path index: skipping unreadable {name}: {e}")
+            data = {}
+        phi_id = data.get("phi_id")
+        if phi_id is None and Path(name).stem.isdigit():
+            phi_id = int(Path(name).stem)
+        self.conn.execute("INSERT INTO files (name, phi_id, size, mtime) VALUES (?, ?, ?, ?)",
+                          (name, phi_id, size, mtime))
+        if phi_id is None:
+            return
+        self.conn.executemany(
+            "INSERT INTO themes (path, label, phi_id, file) VALUES (?, ?, ?, ?)",
+            [(path_key(theme.get("hierarchy") or {}), theme.get("label"), phi_id, name)
+             for theme in data.get("themes") or [] if isinstance(theme, dict)],
+        )
+
+    # --- Queries ---
+
+    def files_under(self, prefixes: Iterable[Tuple[str, ...]]) -> Dict[str, int]:
+        """Output files (name -> PHI id) with a theme at or below any of the path prefixes."""
+        files: Dict[str, int] = {}
+        for prefix in prefixes:
+            key = SEPARATOR.join(prefix)
+            if len(prefix) == 5:
+                # 5th-level node: stored as its 4-level path plus the label
+                rows = self.conn.execute(
+                    "SELECT file, phi_id FROM themes WHERE path = ? AND label = ?",
+                    (SEPARATOR.join(prefix[:4]), prefix[4]))
+            else:
+                rows = self.conn.execute(
+                    "SELECT file, phi_id FROM themes WHERE path = ? OR (path >= ? AND path < ?)",
+                    (key, key + SEPARATOR, key + SEPARATOR + "\U0010ffff"))
+            files.update(rows)
+        return files
+
+    def ids_under(self, prefix: Tuple[str, ...]) -> List[int]:
+        return sorted(set(self.files_under([prefix]).values()))
+
+    def path_counts(self) -> Dict[str, int]:
+        """Indexed path -> number of distinct inscriptions."""
+        return dict(self.conn.execute("SELECT path, COUNT(DISTINCT phi_id) FROM themes GROUP BY path"))
+
+    def files_with_paths(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Output files (name -> PHI id) with a theme at exactly one of these path keys."""
+        files: Dict[str, int] = {}
+        for key in keys:
+            files.update(self.conn.execute("SELECT file, phi_id FROM themes WHERE path = ?", (key,)))
+        return files
+
+    # --- Taxonomy baseline ---
+
+    def taxonomy(self) -> Optional[dict]:
+        """The taxonomy the outputs were last migrated to (None before the first run)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'taxonomy'").fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def set_taxonomy(self, taxonomy: dict) -> None:
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('taxonomy', ?)",
+                              (codec.dumps(taxonomy),))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain or query the taxonomy path -> PHI id index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="Index added or changed output files")
+    sub.add_parser("stats", help="Show indexed files and the most used paths")
+    show_p = sub.add_parser("show", help="List PHI ids at or below a path")
+    show_p.add_argument("path", help='e.g. "Content > Official and Legal Documents"')
+    args = parser.parse_args()
+
+    with PathIndex() as index:
+        stats = index.refresh()
+        if args.command == "refresh":
+            print(f"Path index {index.db_path}: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+        elif args.command == "stats":
+            counts = index.path_counts()
+            files = index.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            print(f"Path index: {index.db_path} ({files} files, {len(counts)} distinct paths)")
+            for key, count in sorted(counts.items(), key=lambda kv: -kv[1])[:20]:
+                print(f"{count:6d}  {key}")
+        elif args.command == "show":
+            prefix = tuple(level.strip() for level in args.path.split(">") if level.strip())
+            ids = index.ids_under(prefix)
+            print(f"{len(ids)} inscriptions under {SEPARATOR.join(prefix)}")
+            print(" ".join(str(phi_id) for phi_id in ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Token estimation, run cost planning and a live token/spend budget governor.
+
+Estimates are made offline from the inscription text and the taxonomy prompt
+(no API calls). The same per-inscription estimates feed:
+- the run planner (``python -m source.planner``) projecting tokens, cost and
+  duration under the configured rate limits,
+- the length-aware scheduler of the parallel runner (longest first, optional
+  long/short lanes) and its makespan report,
+- the ``TokenBudgetGovernor`` that rate-limits and stops a live run.
+"""
+import argparse
+import heapq
+import importlib.util
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from .config import (
+    MAX_WORKERS,
+    PRICE_INPUT_PER_MTOK,
+    PRICE_OUTPUT_PER_MTOK,
+    RATE_LIMIT_RPM,
+    RATE_LIMIT_TPM,
+    RUN_SPEND_BUDGET,
+    RUN_TOKEN_BUDGET,
+)
+from .metrics import METRICS
+
+T = TypeVar("T")
+
+# Heuristic tokenizer ratios (used when tiktoken is not installed).
+# Polytonic Greek splits into far more tokens per character than English.
+GREEK_CHARS_PER_TOKEN = 1.8
+LATIN_CHARS_PER_TOKEN = 4.0
+
+# Expected response size: base + proportional part, capped.
+OUTPUT_BASE_TOKENS = 900
+OUTPUT_TOKENS_PER_TEXT_TOKEN = 0.6
+OUTPUT_MAX_TOKENS = 8000
+# Judge input carries the Proposer JSON pretty-printed (indent=2)
+PRETTY_JSON_OVERHEAD = 1.15
+
+# Proposer + Judge: requests per inscription against the requests/min limit
+CALLS_PER_INSCRIPTION = 2
+
+# Latency model for duration projections: fixed overhead + generation speed
+CALL_OVERHEAD_SECONDS = 2.0
+OUTPUT_TOKENS_PER_SECOND = 80.0
+
+_GREEK = re.compile(r"[\u0370-\u03FF\u1F00-\u1FFF]")
+_encoder = None
+
+
+def _tiktoken_encoder():
+    global _encoder
+    if _encoder is None and importlib.util.find_spec("tiktoken") is not None:
+        import tiktoken
+        _encoder = tiktoken.get_encoding("o200k_base")
+    return _encoder
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimates the token count of a string (tiktoken if available)."""
+    if not text:
+        return 0
+    encoder = _tiktoken_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    greek = len(_GREEK.findall(text))
+    other = len(text) - greek
+    return math.ceil(greek / GREEK_CHARS_PER_TOKEN + other / LATIN_CHARS_PER_TOKEN)
+
+
+@dataclass
+class InscriptionEstimate:
+    id: int
+    text_tokens: int
+    proposer_in: int
+    proposer_out: int
+    judge_in: int
+    judge_out: int
+
+    @property
+    def input_tokens(self) -> int:
+        return self.proposer_in + self.judge_in
+
+    @property
+    def output_tokens(self) -> int:
+        return self.proposer_out + self.judge_out
+
+    @property
+    def total(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def expected_seconds(self) -> float:
+        """Sequential latency of both passes under the latency model."""
+        return 2 * CALL_OVERHEAD_SECONDS + self.output_tokens / OUTPUT_TOKENS_PER_SECOND
+
+
+class TokenEstimator:
+    """Per-inscription estimates; the fixed prompt parts are tokenized once."""
+
+    def __init__(self, taxonomy: dict):
+        from .tagger import JUDGE_SYSTEM_PROMPT, PROPOSER_SYSTEM_PROMPT
+        from .taxonomy_utils import format_taxonomy_for_prompt
+
+        self.proposer_fixed = (
+            estimate_tokens(PROPOSER_SYSTEM_PROMPT)
+            + estimate_tokens(format_taxonomy_for_prompt(taxonomy))
+        )
+        self.judge_fixed = estimate_tokens(JUDGE_SYSTEM_PROMPT)
+
+    def estimate(self, inscription) -> InscriptionEstimate:
+        text_tokens = estimate_tokens(inscription.text)
+        metadata_tokens = estimate_tokens(inscription.metadata)
+        proposer_out = min(
+            OUTPUT_MAX_TOKENS,
+            int(OUTPUT_BASE_TOKENS + OUTPUT_TOKENS_PER_TEXT_TOKEN * text_tokens),
+        )
+        # Judge re-emits the reviewed analysis with confidences added
+        judge_out = min(OUTPUT_MAX_TOKENS, int(proposer_out * 1.1))
+        return InscriptionEstimate(
+            id=inscription.id,
+            text_tokens=text_tokens,
+            proposer_in=self.proposer_fixed + text_tokens + metadata_tokens,
+            proposer_out=proposer_out,
+            judge_in=self.judge_fixed + text_tokens + int(proposer_out * PRETTY_JSON_OVERHEAD),
+            judge_out=judge_out,
+        )
+
+
+def cost_usd(input_tokens: float, output_tokens: float) -> float:
+    return (input_tokens * PRICE_INPUT_PER_MTOK + output_tokens * PRICE_OUTPUT_PER_MTOK) / 1e6
+
+
+@dataclass
+class RunPlan:
+    inscriptions: int
+    input_tokens: int
+    output_tokens: int
+    cost: float
+    duration_seconds: float
+    bottleneck: str
+
+    def summary_lines(self) -> List[str]:
+        return [
+            f"Inscriptions: {self.inscriptions}",
+            f"Input tokens: {self.input_tokens:,}",
+            f"Output tokens: {self.output_tokens:,}",
+            f"Total tokens: {self.input_tokens + self.output_tokens:,}",
+            f"Estimated cost: ${self.cost:,.2f}",
+            f"Estimated duration: {self.duration_seconds / 3600:.2f} h (bound by {self.bottleneck})",
+        ]
+
+
+def plan_run(
+    estimates: List[InscriptionEstimate],
+    workers: int = MAX_WORKERS,
+    rpm: float = RATE_LIMIT_RPM,
+    tpm: float = RATE_LIMIT_TPM,
+) -> RunPlan:
+    """Projects total tokens, cost and wall-clock time for a run."""
+    input_tokens = sum(e.input_tokens for e in estimates)
+    output_tokens = sum(e.output_tokens for e in estimates)
+    bounds = {"concurrency": sum(e.expected_seconds for e in estimates) / max(workers, 1)}
+    if rpm > 0:
+        bounds["requests/min"] = CALLS_PER_INSCRIPTION * len(estimates) / rpm * 60
+    if tpm > 0:
+        bounds["tokens/min"] = (input_tokens + output_tokens) / tpm * 60
+    bottleneck = max(bounds, key=bounds.get)
+    return RunPlan(
+        inscriptions=len(estimates),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost=cost_usd(input_tokens, output_tokens),
+        duration_seconds=bounds[bottleneck],
+        bottleneck=bottleneck,
+    )
+
+
+# --- Length-aware scheduling ---
+
+def lpt_order(items: Sequence[T], weight: Callable[[T], float], window: int = 0) -> List[T]:
+    """
+    Longest-processing-time-first order.
+
+    With ``window`` > 0 items are only reordered within consecutive windows of
+    that size, so a limited or resumed run still progresses through the input
+    in order while no long item is left to the end of its window.
+    """
+    if window <= 0:
+        return sorted(items, key=weight, reverse=True)
+    ordered: List[T] = []
+    for start in range(0, len(items), window):
+        ordered.extend(sorted(items[start:start + window], key=weight, reverse=True))
+    return ordered
+
+
+def split_lanes(
+    items: Sequence[T], weight: Callable[[T], float], quantile: float
+) -> Tuple[List[T], List[T]]:
+    """Splits items into (long, short) at the given weight quantile, keeping order."""
+    if not items:
+        return [], []
+    weights = sorted(weight(i) for i in items)
+    cutoff = weights[min(len(weights) - 1, int(len(weights) * quantile))]
+    long_lane: List[T] = []
+    short_lane: List[T] = []
+    for item in items:
+        w = weight(item)
+        (long_lane if w > 0 and w >= cutoff else short_lane).append(item)
+    return long_lane, short_lane
+
+
+def simulate_makespan(durations: Sequence[float], workers: int) -> float:
+    """Makespan of a FIFO worker pool that starts jobs in the given order."""
+    if not durations:
+        return 0.0
+    finish = [0.0] * max(1, min(workers, len(durations)))
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
+
+
+def makespan_report(
+    lanes: Sequence[Tuple[Sequence[float], int]],
+    actual_seconds: float,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Compares the run's makespan with the previous random order.
+
+    ``lanes`` holds (measured durations in start order, worker count) per
+    lane. Both orders are replayed with the measured durations, so the
+    comparison reflects this run's actual latencies rather than estimates.
+    """
+    scheduled = max(simulate_makespan(durations, workers) for durations, workers in lanes)
+    all_durations = [d for durations, _ in lanes for d in durations]
+    workers = sum(w for _, w in lanes)
+    shuffled = list(all_durations)
+    random.Random(seed).shuffle(shuffled)
+    baseline = simulate_makespan(shuffled, workers)
+    lower_bound = max(sum(all_durations) / max(workers, 1), max(all_durations, default=0.0))
+    change = (scheduled - baseline) / baseline * 100 if baseline else 0.0
+    return [
+        f"Makespan: {actual_seconds:.1f}s measured",
+        f"Replayed with measured durations: scheduled {scheduled:.1f}s vs random order {baseline:.1f}s "
+        f"({change:+.1f}%), lower bound {lower_bound:.1f}s",
+    ]
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised by the governor once the token or spend budget is used up."""
+
+
+class TokenBudgetGovernor:
+    """
+    Live throttle and kill switch for a tagging run.
+
+    ``acquire`` reserves the estimated tokens and requests of one inscription.
+    It blocks while the tokens-per-minute or requests-per-minute bucket is
+    empty and raises BudgetExceeded once
+    actual usage (reported by the provider clients via ``METRICS``) plus
+    in-flight reservations would pass the token or spend budget.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = RUN_TOKEN_BUDGET,
+        spend_budget: float = RUN_SPEND_BUDGET,
+        tpm: float = RATE_LIMIT_TPM,
+        rpm: float = RATE_LIMIT_RPM,
+    ):
+        self.token_budget = token_budget
+        self.spend_budget = spend_budget
+        self.tpm = tpm
+        self.rpm = rpm
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._bucket = float(tpm)
+        self._request_bucket = float(rpm)
+        self._refilled_at = time.monotonic()
+        self.stopped = False
+
+    @staticmethod
+    def used_tokens() -> tuple:
+        return METRICS.get("llm.tokens_in"), METRICS.get("llm.tokens_out")
+
+    def _over_budget(self, extra: int) -> Optional[str]:
+        tokens_in, tokens_out = self.used_tokens()
+        if self.token_budget > 0 and tokens_in + tokens_out + self._in_flight + extra > self.token_budget:
+            return f"token budget of {self.token_budget:,} reached"
+        # Reservations are charged at the output price (upper bound)
+        spend = cost_usd(tokens_in, tokens_out + self._in_flight + extra)
+        if self.spend_budget > 0 and spend > self.spend_budget:
+            return f"spend budget of ${self.spend_budget:.2f} reached"
+        return None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._refilled_at
+        self._bucket = min(self.tpm, self._bucket + elapsed * self.tpm / 60)
+        self._request_bucket = min(self.rpm, self._request_bucket + elapsed * self.rpm / 60)
+        self._refilled_at = now
+
+    def _wait_seconds(self, tokens: int, requests: int) -> float:
+        """Time until both buckets can serve the request (0 = now)."""
+        wait = 0.0
+        # Requests bigger than the whole bucket pass once it is full
+        if self.tpm > 0:
+            wait = max(wait, (min(tokens, self.tpm) - self._bucket) * 60 / self.tpm)
+        if self.rpm > 0:
+            wait = max(wait, (min(requests, self.rpm) - self._request_bucket) * 60 / self.rpm)
+        return wait
+
+    def acquire(self, tokens: int, requests: int = CALLS_PER_INSCRIPTION) -> int:
+        """Reserves ``tokens`` and ``requests``; returns the reservation to pass to ``release``."""
+        while True:
+            with self._lock:
+                reason = None if not self.stopped else "run stopped"
+                reason = reason or self._over_budget(tokens)
+                if reason:
+                    if not self.stopped:
+                        METRICS.incr("governor.stops")
+                    self.stopped = True
+                    raise BudgetExceeded(reason)
+                self._refill()
+                wait = self._wait_seconds(tokens, requests)
+                if wait <= 0:
+                    if self.tpm > 0:
+                        self._bucket -= tokens
+                    if self.rpm > 0:
+                        self._request_bucket -= requests
+                    self._in_flight += tokens
+                    return tokens
+            METRICS.incr("governor.throttled")
+            METRICS.observe("governor.wait", wait)
+            time.sleep(wait)
+
+    def release(self, reservation: int) -> None:
+        with self._lock:
+            self._in_flight -= reservation
+
+
+def main():
+    from .corpus import load_corpus
+    from .config import INPUT_SOURCE, MIN_TEXT_LENGTH, TAXONOMY_DIR
+    from .taxonomy_utils import load_taxonomy
+
+    parser = argparse.ArgumentParser(description="Estimate tokens, cost and duration of a tagging run.")
+    parser.add_argument("--limit", type=int, default=None, help="Only plan the first N inscriptions")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--rpm", type=float, default=RATE_LIMIT_RPM, help="Requests per minute limit")
+    parser.add_argument("--tpm", type=float, default=RATE_LIMIT_TPM, help="Tokens per minute limit")
+    args = parser.parse_args()
+
+    inscriptions = load_corpus(limit=args.limit, min_length=MIN_TEXT_LENGTH)
+    if not inscriptions:
+        print(f"No inscriptions found in {INPUT_SOURCE}")
+        return
+
+    estimator = TokenEstimator(load_taxonomy(TAXONOMY_DIR / "taxonomy.json"))
+    estimates = [estimator.estimate(i) for i in inscriptions]
+    plan = plan_run(estimates, workers=args.workers, rpm=args.rpm, tpm=args.tpm)
+
+    for line in plan.summary_lines():
+        print(line)
+    durations = [e.expected_seconds for e in estimates]
+    shuffled = list(durations)
+    random.Random(0).shuffle(shuffled)
+    print(f"Projected makespan ({args.workers} workers): longest-first "
+          f"{simulate_makespan(sorted(durations, reverse=True), args.workers) / 3600:.2f} h, "
+          f"random order {simulate_makespan(shuffled, args.workers) / 3600:.2f} h")
+    largest = sorted(estimates, key=lambda e: e.total, reverse=True)[:5]
+    print("Largest inscriptions (tokens): " + ", ".join(f"{e.id}={e.total:,}" for e in largest))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,191 @@
+import argparse
+import os
 import re
+import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Sequence
+from .config import PREPROCESS_PARALLEL_MIN_BATCH
 from .data_loader import InputInscription
 
+# Compiled once at import; the batch API runs these over the whole corpus
+_HORIZONTAL_SPACE = re.compile(r'[ \t]+')
+_CORPUS_CITATION = re.compile(r'\s*\(.*?\)')
+
+# Odd whitespace from PDFs/web scrapes -> plain space; invisible marks dropped
+_WHITESPACE_TABLE = str.maketrans({
+    '\u00a0': ' ',  # no-break space
+    '\u2002': ' ',  # en space
+    '\u2003': ' ',  # em space
+    '\u2009': ' ',  # thin space
+    '\u200b': None,  # zero-width space
+    '\ufeff': None,  # BOM
+})
+
+# Mojibake detection: UTF-8 Greek is encoded as lead byte 0xCE/0xCF (basic
+# Greek) or 0xE1 0xBC-0xBF (polytonic). Read as Latin-1/cp1252 these become a
+# lead char in U+00C2-U+00F4 followed by a continuation char (U+0080-U+00BF,
+# or its cp1252 replacement).
+_MOJIBAKE_HINT = re.compile(r'[\u00c2-\u00f4]')
+_MOJIBAKE_PAIR = re.compile(
+    r'[\u00c2-\u00f4][\u0080-\u00bf\u0152\u0153\u0160\u0161\u0178\u017d\u017e\u0192\u02c6\u02dc\u2013-\u203a\u20ac\u2122]'
+)
+_GREEK_CHAR = re.compile(r'[\u0370-\u03ff\u1f00-\u1fff]')
+MOJIBAKE_MIN_RATIO = 0.3
+
+
+def mojibake_score(text: str) -> float:
+    """Fraction of non-ASCII characters that belong to a UTF-8-as-Latin-1 pair."""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    if not non_ascii:
+        return 0.0
+    return 2 * len(_MOJIBAKE_PAIR.findall(text)) / non_ascii
+
+
+def fix_mojibake(text: str) -> str:
+    """
+    Repairs Greek text whose UTF-8 bytes were decoded as Latin-1/cp1252.
+
+    The round-trip is only attempted when the byte-pair statistics look like
+    mojibake, and only kept if it yields more Greek letters than before.
+    """
+    if not _MOJIBAKE_HINT.search(text) or mojibake_score(text) < MOJIBAKE_MIN_RATIO:
+        return text
+    greek_before = len(_GREEK_CHAR.findall(text))
+    for encoding in ('latin1', 'cp1252'):
+        try:
+            fixed = text.encode(encoding).decode('utf-8')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            continue
+        if len(_GREEK_CHAR.findall(fixed)) > greek_before:
+            return fixed
+    return text
+
+
 def normalize_greek_text(text: str) -> str:
     """
     Normalizes Greek text for processing.
     """
     if not text:
         return ""
-    
-    # Try to fix mojibake (UTF-8 bytes interpreted as Latin-1)
-    try:
-        # Common pattern: Î¸ (theta) is \xce\xb8 in UTF-8. 
-        # If we find many such patterns, it's likely mojibake.
-        if "Î" in text or "Ï" in text:
-            fixed_text = text.encode('latin1').decode('utf-8')
-            text = fixed_text
-    except (UnicodeEncodeError, UnicodeDecodeError):
-        pass
+
+    text = fix_mojibake(text)
 
     # Unicode normalization
-    text = unicodedata.normalize("NFC", text)
-    
+    text = unicodedata.normalize("NFC", text).translate(_WHITESPACE_TABLE)
+
     # Collapse multiple spaces but KEEP newlines for alignment precision
-    text = re.sub(r'[ \t]+', ' ', text)
-    
+    text = _HORIZONTAL_SPACE.sub(' ', text)
+
     return text.strip()
 
+
+@lru_cache(maxsize=4096)
+def clean_region(region: str) -> str:
+    """Removes corpus citations in parentheses (region names repeat heavily)."""
+    return _CORPUS_CITATION.sub('', region).strip()
+
+
 def clean_metadata(inscription: InputInscription) -> InputInscription:
     """
     Cleans and standardizes metadata fields.
     """
     # Example: Ensure date fields are consistent or handle missing values
     # For now, we pass it through, but this is where specific logic would go.
-    
+
     # Clean regions (remove corpus citations in parentheses)
     if inscription.region_main:
-        inscription.region_main = re.sub(r'\s*\(.*?\)', '', inscription.region_main).strip()
+        inscription.region_main = clean_region(inscription.region_main)
     if inscription.region_sub:
-        inscription.region_sub = re.sub(r'\s*\(.*?\)', '', inscription.region_sub).strip()
-    
+        inscription.region_sub = clean_region(inscription.region_sub)
+
     # Clean text
     inscription.text = normalize_greek_text(inscription.text)
-    
+
     return inscription
+
+
+def normalize_batch(texts: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Normalizes many texts; large batches are spread over a process pool.
+
+    Args:
+        texts: Raw texts.
+        workers: Pool size (default: CPU count). 1 forces serial processing.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) < PREPROCESS_PARALLEL_MIN_BATCH:
+        return [normalize_greek_text(t) for t in texts]
+    chunksize = max(1, len(texts) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(normalize_greek_text, texts, chunksize=chunksize))
+
+
+def clean_metadata_batch(
+    inscriptions: Sequence[InputInscription],
+    workers: Optional[int] = None
+) -> List[InputInscription]:
+    """Batch version of ``clean_metadata`` (texts normalized via ``normalize_batch``)."""
+    texts = normalize_batch([i.text for i in inscriptions], workers=workers)
+    for inscription, text in zip(inscriptions, texts):
+        if inscription.region_main:
+            inscription.region_main = clean_region(inscription.region_main)
+        if inscription.region_sub:
+            inscription.region_sub = clean_region(inscription.region_sub)
+        inscription.text = text
+    return list(inscriptions)
+
+
+def _benchmark_texts(limit: Optional[int]) -> List[str]:
+    """Input texts, or theme quotes from data/output when no input is present."""
+    from . import codec
+    from .config import INPUT_DIR, OUTPUT_DIR
+    from .data_loader import load_inscriptions
+
+    texts = [i.text for i in load_inscriptions(INPUT_DIR, limit=limit)]
+    if texts:
+        return texts
+    for file_path in sorted(OUTPUT_DIR.glob("*.json"))[:limit]:
+        themes = codec.load_file(file_path).get("themes", [])
+        texts.append("\n".join(t.get("quote") or "" for t in themes))
+    return texts
+
+
+def benchmark(limit: Optional[int] = None, workers: Optional[int] = None, repeat: int = 20) -> None:
+    texts = _benchmark_texts(limit)
+    if not texts:
+        print("No texts found for benchmarking.")
+        return
+    corpus = list(texts) * repeat
+    chars = sum(len(t) for t in corpus)
+    print(f"Documents: {len(corpus)} ({len(texts)} x {repeat}), {chars:,} characters")
+
+    start = time.perf_counter()
+    for text in corpus:
+        normalize_greek_text(text)
+    serial = time.perf_counter() - start
+    print(f"Serial:   {serial:.2f}s  {len(corpus) / serial:,.0f} docs/s  {serial / len(corpus) * 1e6:.1f} us/doc")
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(normalize_greek_text, corpus, chunksize=max(1, len(corpus) // (workers * 4))))
+    pooled = time.perf_counter() - start
+    print(f"Pool({workers}): {pooled:.2f}s  {len(corpus) / pooled:,.0f} docs/s  {pooled / len(corpus) * 1e6:.1f} us/doc")
+
+    suspicious = sum(1 for t in texts if mojibake_score(t) >= MOJIBAKE_MIN_RATIO)
+    print(f"Mojibake candidates: {suspicious}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Greek text normalization utilities.")
+    parser.add_argument("--benchmark", action="store_true", help="Measure normalization throughput")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N documents")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+    parser.add_argument("--repeat", type=int, default=20, help="Replicate the corpus N times")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(limit=args.limit, workers=args.workers, repeat=args.repeat)
+    else:
+        parser.print_help()
@@ -0,0 +1,371 @@
+"""
+Quote verification: locating each theme's ``quote`` in the inscription text.
+
+Quote and text are normalized the same way: accents and breathings
+stripped, lowercase, final/lunate sigma folded to σ, iota subscript written
+as adscript ι, and everything that is
+not a letter or digit dropped. That includes Leiden sigla (``[]``, ``<>``,
+``()``, ``{}``, ``⟦⟧``), lacuna dots and word breaks, so ``ἀ[ρ]χή`` and
+``ἀρχή`` compare equal. The normalized text keeps a map back to the
+original character offsets. Building it uses ``str.translate`` and
+``np.repeat``, not a per-character Python loop.
+
+Matching, per quote:
+
+1. exact: ``str.find`` on the normalized text. An inscription has only a
+   handful of quotes, so one C-level scan per quote beats a multi-pattern
+   automaton built in Python.
+2. elided quotes (``A ... B``): each part is located in order.
+3. fuzzy: 4-grams of the quote vote for candidate windows, then the Myers
+   bit-parallel edit distance finds the best alignment in each window.
+   Quotes below ``QUOTE_MIN_SIMILARITY`` are flagged ``not_found``, i.e.
+   probably not from this text.
+
+``align_themes`` stores ``quote_start``/``quote_end`` (offsets into the
+inscription text, end exclusive) and ``quote_status`` (exact | fuzzy |
+not_found) on each theme. The tagger runs it on every new output. For
+existing outputs, run:
+
+Usage:
+    python -m source.quotes [--dry-run]
+    python -m source.quotes --benchmark
+"""
+import argparse
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import QUOTE_MIN_SIMILARITY
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+EXACT, FUZZY, NOT_FOUND = "exact", "fuzzy", "not_found"
+NGRAM = 4
+MAX_NGRAM_HITS = 32  # Occurrences per 4-gram considered as anchors (common 4-grams add nothing)
+MAX_WINDOWS = 3
+MAX_QUOTE_CHARS = 2000  # Longer "quotes" are whole-text copies; only exact matching is tried
+_ELLIPSIS = re.compile(r"\s*(?:\.{2,}|…)\s*")
+_SIGMA = {"ς": "σ", "ϲ": "σ"}
+_OPENERS, _CLOSERS = "[(<{⟦⸢", "])>}⟧⸣"
+_YPOGEGRAMMENI = "\u0345"
+
+# Code point -> folded string / its length as a one-char code, filled per new character
+_FOLD: Dict[int, str] = {}
+_LENGTH: Dict[int, str] = {}
+_TABLE_LOCK = threading.Lock()
+
+
+def _fold_char(ch: str) -> str:
+    # Iota subscript folds to the adscript ι (τῷ = τῶι), not away with the other marks
+    text = unicodedata.normalize("NFKD", ch).replace(_YPOGEGRAMMENI, "ι")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return "".join(_SIGMA.get(c, c) for c in text if c.isalnum())
+
+
+def _extend_tables(text: str) -> None:
+    missing = {ord(c) for c in set(text)} - _FOLD.keys()
+    if missing:
+        with _TABLE_LOCK:
+            for code in missing:
+                folded = _fold_char(chr(code))
+                _LENGTH[code] = chr(len(folded))
+                _FOLD[code] = folded
+
+
+def fold(text: str) -> str:
+    """Normalized form of a quote or text (see module docstring)."""
+    _extend_tables(text)
+    return text.translate(_FOLD)
+
+
+def normalize(text: str) -> Tuple[str, np.ndarray]:
+    """Normalized text plus, per normalized character, its offset in ``text``."""
+    _extend_tables(text)
+    lengths = np.frombuffer(text.translate(_LENGTH).encode("utf-32-le"), dtype=np.uint32)
+    return text.translate(_FOLD), np.repeat(np.arange(len(text), dtype=np.int64), lengths)
+
+
+# --- Approximate matching ---
+
+def _myers(pattern: str, text: str) -> Tuple[int, int]:
+    """
+    Best semi-global edit distance of ``pattern`` inside ``text`` (Myers 1999).
+
+    Returns (distance, end index of the first best match; -1 if text is empty).
+    """
+    m = len(pattern)
+    full, high = (1 << m) - 1, 1 << (m - 1)
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    pv, mv, score = full, 0, m
+    best, best_end = m, -1
+    for j, c in enumerate(text):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+        if score < best:
+            best, best_end = score, j
+    return best, best_end
+
+
+def _start(pattern: str, text: str, end: int) -> int:
+    """Start of the best match ending at ``end``: the best end of the reversed pattern in the reversed text."""
+    _, reverse_end = _myers(pattern[::-1], text[end::-1])
+    return end - reverse_end
+
+
+def _windows(pattern: str, text: str) -> List[Tuple[int, int]]:
+    """
+    Candidate text windows for ``pattern``, from votes of its exact 4-grams.
+
+    Windows anchored by a single 4-gram, or with less than half the votes of
+    the best one, are skipped: they are almost never where a quote with at
+    most a quarter of its letters changed occurs, and each costs an alignment.
+    """
+    votes: Dict[int, int] = {}
+    bucket = max(NGRAM, len(pattern) // 8)
+    for offset in range(0, len(pattern) - NGRAM + 1, NGRAM // 2):
+        gram = pattern[offset:offset + NGRAM]
+        pos, hits = text.find(gram), 0
+        while pos >= 0 and hits < MAX_NGRAM_HITS:
+            key = (pos - offset) // bucket
+            votes[key] = votes.get(key, 0) + 1
+            pos, hits = text.find(gram, pos + 1), hits + 1
+    if not votes:
+        return []
+    ranked = sorted(votes.items(), key=lambda kv: -kv[1])[:MAX_WINDOWS]
+    min_votes = max(2 if len(pattern) > 2 * NGRAM else 1, (ranked[0][1] + 1) // 2)
+    slack = len(pattern) // 4 + NGRAM
+    return [
+        (max(0, key * bucket - slack), min(len(text), key * bucket + bucket + len(pattern) + slack))
+        for key, n in ranked if n >= min_votes
+    ]
+
+
+@dataclass
+class QuoteMatch:
+    status: str
+    start: Optional[int] = None  # Offsets into the original text, end exclusive
+    end: Optional[int] = None
+    similarity: float = 0.0
+
+
+class AlignedText:
+    """One inscription text, normalized once, against which its quotes are located."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.norm, self.offsets = normalize(text)
+
+    def _span(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Original offsets of a normalized range, widened to close brackets it
+        opens (and vice versa). The match may end inside the bracket
+        (``δ[ήμω`` of ``δ[ήμωι]``); the span then runs on to its closer, but
+        not past a line end or another bracket.
+        """
+        text = self.text
+        start, end = int(self.offsets[start]), int(self.offsets[end - 1]) + 1
+        span = text[start:end]
+        unclosed = sum(span.count(c) for c in _OPENERS) - sum(span.count(c) for c in _CLOSERS)
+        while unclosed > 0:
+            pos = end
+            while pos < len(text) and text[pos] not in _CLOSERS and text[pos] not in _OPENERS and text[pos] != "\n":
+                pos += 1
+            if pos == len(text) or text[pos] not in _CLOSERS:
+                break
+            end, unclosed = pos + 1, unclosed - 1
+        while unclosed < 0:
+            pos = start - 1
+            while pos >= 0 and text[pos] not in _OPENERS and text[pos] not in _CLOSERS and text[pos] != "\n":
+                pos -= 1
+            if pos < 0 or text[pos] not in _OPENERS:
+                break
+            start, unclosed = pos, unclosed + 1
+        return start, end
+
+    def _fuzzy(self, q: str, lo: int = 0) -> Tuple[float, int, int]:
+        """(similarity, start, end) in normalized coordinates of the best window at or after ``lo``."""
+        if len(q) < NGRAM or len(q) > MAX_QUOTE_CHARS:
+            return 0.0, lo, lo
+        best_similarity, best_window, best_end = 0.0, None, -1
+        windows = _windows(q, self.norm[lo:])
+        if not windows and len(q) <= 4 * NGRAM:
+            # Too short for surviving 4-grams to be likely; a full scan is cheap at this length
+            windows = [(0, len(self.norm) - lo)]
+        for start, end in windows:
+            distance, match_end = _myers(q, self.norm[lo + start:lo + end])
+            similarity = 1 - distance / len(q)
+            if match_end >= 0 and similarity > best_similarity:
+                best_similarity, best_window, best_end = similarity, lo + start, match_end
+        if best_window is None:
+            return best_similarity, lo, lo
+        window = self.norm[best_window:best_window + best_end + 1]
+        return best_similarity, best_window + _start(q, window, best_end), best_window + best_end + 1
+
+    def locate(self, quote: Optional[str], min_similarity: float = QUOTE_MIN_SIMILARITY) -> Optional[QuoteMatch]:
+        """Where ``quote`` occurs in the text; None if there is nothing to verify (no letters)."""
+        q = fold(quote or "")
+        if not q:
+            return None
+        pos = self.norm.find(q)
+        if pos >= 0:
+            return QuoteMatch(EXACT, *self._span(pos, pos + len(q)), 1.0)
+
+        parts = [fold(part) for part in _ELLIPSIS.split(quote)]
+        parts = [part for part in parts if part]
+        if len(parts) > 1:
+            # Elided quote: every part in order, exact where possible
+            lo, first, similarity, status = 0, None, 1.0, EXACT
+            for part in parts:
+                pos = self.norm.find(part, lo)
+                if pos >= 0:
+                    start, end = pos, pos + len(part)
+                else:
+                    part_similarity, start, end = self._fuzzy(part, lo)
+                    similarity, status = min(similarity, part_similarity), FUZZY
+                if end <= start:
+                    break
+                first = start if first is None else first
+                lo = end
+            else:
+                if similarity >= min_similarity:
+                    return QuoteMatch(status, *self._span(first, lo), similarity)
+
+        similarity, start, end = self._fuzzy(q)
+        if similarity >= min_similarity and end > start:
+            return QuoteMatch(FUZZY, *self._span(start, end), similarity)
+        return QuoteMatch(NOT_FOUND, similarity=max(similarity, 0.0))
+
+
+def align_themes(text: Optional[str], themes: List[dict], min_similarity: float = QUOTE_MIN_SIMILARITY) -> List[str]:
+    """
+    Locates each theme's quote in ``text`` and stores the result on the theme.
+
+    Sets ``quote_start``, ``quote_end`` and ``quote_status`` (offsets are
+    None for ``not_found``); themes without a verifiable quote get none of
+    the three. Returns one status per located quote.
+    """
+    if not text or not themes:
+        return []
+    aligned = AlignedText(text)
+    statuses = []
+    for theme in themes:
+        match = aligned.locate(theme.get("quote"), min_similarity)
+        if match is None:
+            for key in ("quote_start", "quote_end", "quote_status"):
+                theme.pop(key, None)
+            continue
+        theme["quote_start"], theme["quote_end"], theme["quote_status"] = match.start, match.end, match.status
+        METRICS.incr(f"quotes.{match.status}")
+        statuses.append(match.status)
+    return statuses
+
+
+# --- Retroactive pass over existing outputs ---
+
+_SNAPSHOT = None
+
+
+def _corpus_text(phi_id) -> Optional[str]:
+    global _SNAPSHOT
+    if _SNAPSHOT is None:
+        from .corpus import CorpusSnapshot
+
+        _SNAPSHOT = CorpusSnapshot()
+    inscription = _SNAPSHOT.get(phi_id)
+    return inscription.text if inscription else None
+
+
+def align_transform(data: dict) -> List[Tuple[str, str]]:
+    """Batch transform: aligns the quotes of one output with its corpus text; notes are (status, quote)."""
+    themes = data.get("themes") or []
+    text = _corpus_text(data.get("phi_id"))
+    if text is None:
+        return [("no_text", "")] if themes else []
+    statuses = align_themes(text, themes)
+    quotes = [t.get("quote") or "" for t in themes if t.get("quote_status")]
+    return list(zip(statuses, quotes))
+
+
+def benchmark(texts: List[str], quotes_per_text: List[List[str]]) -> None:
+    start = time.perf_counter()
+    counts: Dict[str, int] = {}
+    for text, quotes in zip(texts, quotes_per_text):
+        aligned = AlignedText(text)
+        for quote in quotes:
+            match = aligned.locate(quote)
+            if match is not None:
+                counts[match.status] = counts.get(match.status, 0) + 1
+    seconds = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"{len(texts):,} texts, {total:,} quotes in {seconds:.2f}s "
+          f"({total / seconds if seconds else 0:,.0f} quotes/s): {counts}")
+
+
+def _benchmark_corpus(n: int = 20000, seed: int = 0):
+    """Texts stitched from the quotes of the real outputs; exact, damaged and foreign quotes."""
+    import random
+
+    from . import codec
+    from .config import OUTPUT_DIR
+
+    rng = random.Random(seed)
+    pool = [t["quote"] for f in sorted(OUTPUT_DIR.glob("*.json"))
+            for t in (codec.load_file(f).get("themes") or []) if len(fold(t.get("quote") or "")) > 12]
+    pool = pool or ["ἀγαθῆι τύχηι ἔδοξεν τῆι βουλῆι καὶ τῶι δήμωι"]
+    texts, quotes = [], []
+    for _ in range(n):
+        parts = rng.sample(pool, min(len(pool), 12))
+        text = "\n".join(parts)
+        damaged = "".join(c if rng.random() > 0.08 else " " for c in parts[1])
+        texts.append(text)
+        quotes.append([parts[0], parts[5][3:-3], damaged, f"{parts[2]} ... {parts[4]}", rng.choice(pool)])
+    return texts, quotes
+
+
+if __name__ == "__main__":
+    from .batch_rewrite import rewrite_files
+    from .config import CORPUS_DB_PATH, OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Verify theme quotes against the inscription texts.")
+    parser.add_argument("--dry-run", action="store_true", help="Write nothing; summarize what would change")
+    parser.add_argument("--benchmark", action="store_true", help="Time alignment on synthetic texts")
+    parser.add_argument("--show", type=int, default=20, help="Print up to N quotes that were not found")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(*_benchmark_corpus())
+    elif not CORPUS_DB_PATH.exists():
+        parser.error(f"Corpus snapshot not found at {CORPUS_DB_PATH}; run 'python -m source.corpus build'")
+    else:
+        report = rewrite_files(sorted(OUTPUT_DIR.glob("*.json")), align_transform, dry_run=args.dry_run,
+                               desc="Aligning quotes")
+        counts: Dict[str, int] = {}
+        for result in report.results:
+            for status, _ in result.notes:
+                counts[status] = counts.get(status, 0) + 1
+        for line in report.summary_lines():
+            print(line)
+        print("Quotes: " + ", ".join(f"{status}={n}" for status, n in sorted(counts.items())))
+        missing = [(r.name, quote) for r in report.results for status, quote in r.notes if status == NOT_FOUND]
+        for name, quote in missing[:args.show]:
+            print(f"  not found  {name}: {quote[:80]}")
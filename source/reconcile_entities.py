@@ -1,28 +1,40 @@
-import json
+import argparse
+import threading
 import time
 import urllib.request
 import urllib.parse
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import codec
+from .batch_rewrite import rewrite_file, rewrite_files
 from .config import OUTPUT_DIR
 from .gazetteer import get_gazetteer
 
 # --- Configuration & Cache ---
 RECONCILIATION_CACHE_FILE = Path("data/reconciliation_cache.json")
 CACHE = {"places": {}, "deities": {}, "persons": {}}
+# Guards CACHE writes and snapshots; worker threads reconcile files concurrently
+CACHE_LOCK = threading.Lock()
+RECONCILE_WORKERS = 10  # Network-bound: more threads than cores
 
 def load_cache():
     global CACHE
     if RECONCILIATION_CACHE_FILE.exists():
         try:
-            with open(RECONCILIATION_CACHE_FILE, 'r', encoding='utf-8') as f:
-                CACHE.update(json.load(f))
+            loaded = codec.load_file(RECONCILIATION_CACHE_FILE)
+            with CACHE_LOCK:
+                CACHE.update(loaded)
         except Exception:
             pass
 
+def remember(bucket, key, value):
+    """Thread-safe cache write."""
+    with CACHE_LOCK:
+        CACHE[bucket][key] = value
+
 def save_cache():
-    with open(RECONCILIATION_CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(CACHE, f, indent=2, ensure_ascii=False)
+    with CACHE_LOCK:
+        snapshot = {bucket: dict(entries) for bucket, entries in CACHE.items()}
+    codec.dump_file(snapshot, RECONCILIATION_CACHE_FILE, atomic=True)  # Machine-only: compact
 
 # --- Manual Overrides ---
 # Manual list of known Pleiades URIs to avoid bot protection (Anubis) and ensure accuracy
@@ -45,7 +57,7 @@ def get_pleiades_from_wikidata(wikidata_id):
         url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
         req = urllib.request.Request(url, headers={'User-Agent': 'AGKI-Reconciliation-Tool/1.0'})
         with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
+            data = codec.loads(response.read())
             entity = data.get("entities", {}).get(wikidata_id, {})
             # P1566 is Pleiades ID
             claims = entity.get("claims", {}).get("P1566", [])
@@ -57,10 +69,10 @@ def get_pleiades_from_wikidata(wikidata_id):
         pass
     return None
 
-def search_pleiades_offline(name):
-    """Search using the local offline gazetteer (dump)."""
+def search_pleiades_offline(name, place_type=None):
+    """Search using the local offline gazetteer (dump); the place type re-ranks ambiguous names."""
     gaz = get_gazetteer()
-    return gaz.search(name)
+    return gaz.search(name, place_type)
 
 def is_instance_of(wikidata_id, target_qids):
     """Check if a Wikidata item is an instance of one of the target QIDs."""
@@ -71,7 +83,7 @@ def is_instance_of(wikidata_id, target_qids):
         url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
         req = urllib.request.Request(url, headers={'User-Agent': 'AGKI-Reconciliation-Tool/1.0'})
         with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
+            data = codec.loads(response.read())
             entity = data.get("entities", {}).get(wikidata_id, {})
             # P31 is 'instance of'
             claims = entity.get("claims", {}).get("P31", [])
@@ -115,14 +127,14 @@ def reconcile_place(name, place_type=None):
     if name in MANUAL_OVERRIDES:
         return MANUAL_OVERRIDES[name]
     
-    if name in CACHE["places"]: return CACHE["places"][name]
-
-    # 1. Try Offline Gazetteer (Best for Pleiades specific coverage)
-    gaz_uri = search_pleiades_offline(name)
+    # 1. Try Offline Gazetteer (Best for Pleiades specific coverage). Checked before the
+    # cache and not cached: it is a local lookup, and its answer depends on the place type
+    gaz_uri = search_pleiades_offline(name, place_type)
     if gaz_uri:
-        CACHE["places"][name] = gaz_uri
         return gaz_uri
 
+    if name in CACHE["places"]: return CACHE["places"][name]
+
     # 2. Try Wikidata search
     # Broaden filters: Q618123 (archaeological site), Q515 (city), Q1549593 (ancient city), Q1048835 (historical settlement)
     for qid in ["Q618123", "Q515", "Q1549593", "Q1048835"]:
@@ -131,7 +143,7 @@ def reconcile_place(name, place_type=None):
             wikidata_id = wd_uri.split('/')[-1]
             pleiades_uri = get_pleiades_from_wikidata(wikidata_id)
             if pleiades_uri:
-                CACHE["places"][name] = pleiades_uri
+                remember("places", name, pleiades_uri)
                 return pleiades_uri
             # Keep the first valid Wikidata URI as a fallback
             if "first_wd" not in locals():
@@ -139,7 +151,7 @@ def reconcile_place(name, place_type=None):
     
     # 3. Fallback to Wikidata URI if we found one earlier
     uri = locals().get("first_wd")
-    CACHE["places"][name] = uri
+    remember("places", name, uri)
     return uri
 
 def reconcile_wikidata(name, type_filter=None):
@@ -151,11 +163,12 @@ def reconcile_wikidata(name, type_filter=None):
     
     # Select appropriate cache
     if type_filter == "Q35277":
-        target_cache = CACHE["deities"]
+        bucket = "deities"
     elif type_filter == "Q5":
-        target_cache = CACHE["persons"]
+        bucket = "persons"
     else:
-        target_cache = CACHE["places"]
+        bucket = "places"
+    target_cache = CACHE[bucket]
 
     cache_key = f"{name}_{type_filter}" if type_filter else name
     if cache_key in target_cache: return target_cache[cache_key]
@@ -173,7 +186,7 @@ def reconcile_wikidata(name, type_filter=None):
         url = f"https://www.wikidata.org/w/api.php?{urllib.parse.urlencode(params)}"
         req = urllib.request.Request(url, headers={'User-Agent': 'AGKI-Reconciliation-Tool/1.0'})
         with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
+            data = codec.loads(response.read())
             if data.get("search"):
                 # Check the first few results for the right type
                 for result in data['search']:
@@ -188,24 +201,24 @@ def reconcile_wikidata(name, type_filter=None):
                         
                         if is_human_in_wikidata(result['id']):
                             uri = f"https://www.wikidata.org/wiki/{result['id']}"
-                            target_cache[cache_key] = uri
+                            remember(bucket, cache_key, uri)
                             return uri
                             
                     # Heuristic for Deities
                     elif type_filter in ["Q35277", "Q178885"]:
                         if is_deity_in_wikidata(result['id']):
                             uri = f"https://www.wikidata.org/wiki/{result['id']}"
-                            target_cache[cache_key] = uri
+                            remember(bucket, cache_key, uri)
                             return uri
                     else:
                         # For others, assume top rank is OK (or improve logic later)
                         uri = f"https://www.wikidata.org/wiki/{result['id']}"
-                        target_cache[cache_key] = uri
+                        remember(bucket, cache_key, uri)
                         return uri
     except Exception:
         pass
     
-    target_cache[cache_key] = None
+    remember(bucket, cache_key, None)
     return None
 
 def reconcile_deity(name):
@@ -220,20 +233,20 @@ def reconcile_deity(name):
         if len(main_name) > 2:
             uri_fallback = reconcile_wikidata(main_name, "Q35277")
             if uri_fallback:
-                CACHE["deities"][name] = uri_fallback # Cache under full name too
+                remember("deities", name, uri_fallback) # Cache under full name too
                 return uri_fallback
     
     # Fallback 2: Try singular form (e.g. "Nymphs" -> "Nymph")
     if name.endswith("s"):
         uri_singular = reconcile_wikidata(name[:-1], "Q35277")
         if uri_singular:
-            CACHE["deities"][name] = uri_singular
+            remember("deities", name, uri_singular)
             return uri_singular
 
     # Fallback 3: Try appending " (mythology)" for ambiguous names (e.g. "Nike")
     uri_myth = reconcile_wikidata(f"{name} (mythology)", "Q35277")
     if uri_myth:
-        CACHE["deities"][name] = uri_myth
+        remember("deities", name, uri_myth)
         return uri_myth
         
     return None
@@ -252,58 +265,61 @@ def reconcile_person(name, role=None):
     # 1. Try Wikidata (Q5 - Human)
     wd_uri = reconcile_wikidata(name, "Q5")
     if wd_uri:
-        CACHE["persons"][name] = wd_uri
+        remember("persons", name, wd_uri)
         return wd_uri
 
     # 2. Fallback to LGPN Search
     search_url = f"https://search.lgpn.ox.ac.uk/browse.html?field=names&sort=nymRef&query={urllib.parse.quote(name)}"
-    CACHE["persons"][name] = search_url
+    remember("persons", name, search_url)
     return search_url
 
 # --- Main Processing ---
 
-def process_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    changed = False
+def reconcile_data(data):
+    """Batch transform: fills in entity URIs of one output in place; returns the changes made."""
+    changes = []
     entities = data.get("entities", {})
-    
+    # Resolved outputs (python -m source.entity_resolution) look up the canonical name, so all
+    # spellings of an entity share one lookup and one cache entry
+
     # 1. Deities
     for deity in entities.get("deities", []):
-        uri = reconcile_deity(deity["name"])
+        uri = reconcile_deity(deity.get("canonical") or deity["name"])
         if uri and uri != deity.get("uri"):
             deity["uri"] = uri
-            changed = True
-    
+            changes.append(f"deity {deity['name']}: {uri}")
+
     # 2. Places
     for place in entities.get("places", []):
-        uri = reconcile_place(place["name"], place.get("type"))
+        uri = reconcile_place(place.get("canonical") or place["name"], place.get("type"))
         if uri and uri != place.get("uri"):
             place["uri"] = uri
-            changed = True
-                
+            changes.append(f"place {place['name']}: {uri}")
+
     # 3. Persons
     for person in entities.get("persons", []):
-        uri = reconcile_person(person["name"], person.get("role"))
+        uri = reconcile_person(person.get("canonical") or person["name"], person.get("role"))
         if uri and uri != person.get("uri"):
             person["uri"] = uri
-            changed = True
+            changes.append(f"person {person['name']}: {uri}")
 
     # 4. Provenance
     for loc in data.get("provenance", []):
-        uri = reconcile_place(loc["name"], loc.get("type"))
+        uri = reconcile_place(loc.get("canonical") or loc["name"], loc.get("type"))
         if uri and uri != loc.get("uri"):
             loc["uri"] = uri
-            changed = True
+            changes.append(f"provenance {loc['name']}: {uri}")
 
-    if changed:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    
-    return changed
+    return changes
+
+def process_file(file_path, dry_run=False):
+    """Reconciles one output file (atomic rewrite); returns True if it changed."""
+    result = rewrite_file(Path(file_path), reconcile_data, dry_run=dry_run)
+    if result.status == "error":
+        raise RuntimeError(result.error)
+    return result.status == "changed"
 
-def main():
+def main(dry_run=False):
     load_cache()
     
     # Force retry for deities that were previously not found
@@ -318,18 +334,21 @@ def main():
 
     files = list(OUTPUT_DIR.glob("*.json"))
     print(f"Reconciling entities in {len(files)} files...")
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(process_file, f): f for f in files}
-        count = 0
-        for future in as_completed(futures):
-            if future.result():
-                count += 1
-            if (len(futures) - len(futures)) % 50 == 0:
-                pass # progress
-    
-    print(f"Reconciliation complete. Updated {count} files.")
+
+    # Threads, not processes: lookups wait on the network and share CACHE
+    report = rewrite_files(files, reconcile_data, workers=RECONCILE_WORKERS, processes=False,
+                           dry_run=dry_run, desc="Reconciling")
+    for line in report.summary_lines():
+        print(line)
+    if dry_run:
+        for line in report.diff_summary():
+            print(line)
+
+    print(f"Reconciliation complete. {'Would update' if dry_run else 'Updated'} {report.changed} files.")
     save_cache()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Reconcile entity URIs in all outputs.")
+    parser.add_argument("--dry-run", action="store_true", help="Write no outputs; summarize what would change")
+    args = parser.parse_args()
+    main(dry_run=args.dry_run)
@@ -0,0 +1,429 @@
+"""
+Compact record types for bulk corpus processing.
+
+Slotted dataclass mirrors of the ``schema.py`` models. They validate the
+same required fields and types (with the same lax int/float coercion and the
+same defaults) but skip Pydantic's per-instance overhead, which matters when
+the whole corpus is held in memory (API, validation). Pydantic stays at the
+LLM boundary, where its richer validation and error messages are needed.
+
+Usage:
+    python -m source.records --benchmark
+"""
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+COMPLETENESS_VALUES = ("intact", "fragmentary", "mutilated")
+QUOTE_STATUS_VALUES = ("exact", "fuzzy", "not_found")
+
+
+class RecordError(ValueError):
+    """Raised when a JSON document does not match the record schema."""
+
+
+# --- Field coercion (mirrors Pydantic lax mode for the types used here) ---
+# Error messages carry the field name only; containers prefix their path
+# when re-raising, so the happy path never builds path strings.
+
+def _req_str(data: dict, key: str) -> str:
+    value = data.get(key)
+    if type(value) is str:
+        return value
+    if value is None:
+        raise RecordError(f"{key}: field required")
+    raise RecordError(f"{key}: expected string, got {type(value).__name__}")
+
+
+def _opt_str(data: dict, key: str) -> Optional[str]:
+    value = data.get(key)
+    if value is None or type(value) is str:
+        return value
+    raise RecordError(f"{key}: expected string, got {type(value).__name__}")
+
+
+def _opt_int(data: dict, key: str) -> Optional[int]:
+    value = data.get(key)
+    if value is None or type(value) is int:
+        return value
+    return _int(value, key)
+
+
+def _float(data: dict, key: str, default: Optional[float]) -> Optional[float]:
+    value = data.get(key, default)
+    if type(value) is float:
+        return value
+    if value is None:
+        if default is not None:
+            raise RecordError(f"{key}: expected number, got null")
+        return None
+    if type(value) is int:
+        return float(value)
+    try:
+        return float(value) if not isinstance(value, bool) else float(int(value))
+    except (TypeError, ValueError):
+        raise RecordError(f"{key}: expected number, got {type(value).__name__}") from None
+
+
+def _int(value, key: str) -> int:
+    """Coerce integral bools, floats and numeric strings the way Pydantic's lax mode does."""
+    if type(value) is str:
+        try:
+            value = float(value.strip()) if "." in value else int(value.strip())
+        except ValueError:
+            raise RecordError(f"{key}: expected integer, got {value!r}") from None
+    if type(value) is bool or (type(value) is float and value.is_integer()):
+        return int(value)
+    if type(value) is int:
+        return value
+    raise RecordError(f"{key}: expected integer, got {value!r}")
+
+
+_BOOL_STRINGS = {
+    **dict.fromkeys(("1", "true", "t", "yes", "y", "on"), True),
+    **dict.fromkeys(("0", "false", "f", "no", "n", "off"), False),
+}
+
+
+def _bool(data: dict, key: str, default: Optional[bool]) -> Optional[bool]:
+    value = data.get(key, default)
+    if value is None:
+        if default is not None:
+            raise RecordError(f"{key}: expected boolean, got null")
+        return None
+    if type(value) is bool:
+        return value
+    if type(value) is str and value.lower() in _BOOL_STRINGS:
+        return _BOOL_STRINGS[value.lower()]
+    if value in (0, 1):
+        return bool(value)
+    raise RecordError(f"{key}: expected boolean, got {type(value).__name__}")
+
+
+def _list(data: dict, key: str) -> list:
+    """List field defaulting to [] when absent; an explicit null is an error, as in Pydantic."""
+    if key not in data:
+        return []
+    value = data[key]
+    if value is None:
+        raise RecordError(f"{key}: expected list, got null")
+    if type(value) is not list:
+        raise RecordError(f"{key}: expected list, got {type(value).__name__}")
+    return value
+
+
+def _dict(value: Any) -> dict:
+    if type(value) is not dict:
+        raise RecordError(f"expected object, got {type(value).__name__}")
+    return value
+
+
+def _quote_status(data: dict) -> Optional[str]:
+    value = _opt_str(data, "quote_status")
+    if value is not None and value not in QUOTE_STATUS_VALUES:
+        raise RecordError(f"quote_status: must be one of {QUOTE_STATUS_VALUES}, got {value!r}")
+    return value
+
+
+def _decode_list(record_cls, values: list, path: str) -> list:
+    items = []
+    for i, value in enumerate(values):
+        try:
+            items.append(record_cls.from_dict(value))
+        except RecordError as e:
+            raise RecordError(f"{path}[{i}].{e}") from None
+    return items
+
+
+# --- Records ---
+
+@dataclass(slots=True)
+class HierarchyRecord:
+    domain: str
+    subdomain: Optional[str] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "HierarchyRecord":
+        data = _dict(data)
+        if "domain" in data:
+            domain = data["domain"]
+        else:
+            # Same fallback as schema.Hierarchy.check_domain
+            domain = data.get("type", "Unclassified")
+        return cls(
+            _req_str({"domain": domain}, "domain"),
+            _opt_str(data, "subdomain"),
+            _opt_str(data, "category"),
+            _opt_str(data, "subcategory"),
+        )
+
+
+@dataclass(slots=True)
+class ThemeRecord:
+    label: str
+    hierarchy: HierarchyRecord
+    rationale: str
+    confidence: Optional[float] = None
+    quote: Optional[str] = None
+    is_ambiguous: bool = False
+    ambiguity_note: Optional[str] = None
+    quote_start: Optional[int] = None
+    quote_end: Optional[int] = None
+    quote_status: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "ThemeRecord":
+        data = _dict(data)
+        if "hierarchy" not in data:
+            raise RecordError("hierarchy: field required")
+        try:
+            hierarchy = HierarchyRecord.from_dict(data["hierarchy"])
+        except RecordError as e:
+            raise RecordError(f"hierarchy.{e}") from None
+        return cls(
+            _req_str(data, "label"),
+            hierarchy,
+            _req_str(data, "rationale"),
+            _float(data, "confidence", None),
+            _opt_str(data, "quote"),
+            _bool(data, "is_ambiguous", False),
+            _opt_str(data, "ambiguity_note"),
+            _opt_int(data, "quote_start"),
+            _opt_int(data, "quote_end"),
+            _quote_status(data),
+        )
+
+
+@dataclass(slots=True)
+class PersonRecord:
+    name: str
+    role: Optional[str] = None
+    uri: Optional[str] = None
+    confidence: float = 1.0
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "PersonRecord":
+        data = _dict(data)
+        return cls(
+            _req_str(data, "name"),
+            _opt_str(data, "role"),
+            _opt_str(data, "uri"),
+            _float(data, "confidence", 1.0),
+            _opt_str(data, "entity_id"),
+            _opt_str(data, "canonical"),
+        )
+
+
+@dataclass(slots=True)
+class PlaceRecord:
+    name: str
+    type: Optional[str] = None
+    uri: Optional[str] = None
+    confidence: float = 1.0
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "PlaceRecord":
+        data = _dict(data)
+        return cls(
+            _req_str(data, "name"),
+            _opt_str(data, "type"),
+            _opt_str(data, "uri"),
+            _float(data, "confidence", 1.0),
+            _opt_str(data, "entity_id"),
+            _opt_str(data, "canonical"),
+        )
+
+
+@dataclass(slots=True)
+class DeityRecord:
+    name: str
+    uri: Optional[str] = None
+    confidence: float = 1.0
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "DeityRecord":
+        data = _dict(data)
+        return cls(
+            _req_str(data, "name"),
+            _opt_str(data, "uri"),
+            _float(data, "confidence", 1.0),
+            _opt_str(data, "entity_id"),
+            _opt_str(data, "canonical"),
+        )
+
+
+@dataclass(slots=True)
+class EntitiesRecord:
+    persons: List[PersonRecord] = field(default_factory=list)
+    places: List[PlaceRecord] = field(default_factory=list)
+    deities: List[DeityRecord] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "EntitiesRecord":
+        data = _dict(data)
+        return cls(
+            _decode_list(PersonRecord, _list(data, "persons"), "persons"),
+            _decode_list(PlaceRecord, _list(data, "places"), "places"),
+            _decode_list(DeityRecord, _list(data, "deities"), "deities"),
+        )
+
+
+@dataclass(slots=True)
+class GeoLocationRecord:
+    name: str
+    type: Optional[str] = None
+    uri: Optional[str] = None
+    role: Optional[str] = None
+    confidence: float = 1.0
+    entity_id: Optional[str] = None
+    canonical: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "GeoLocationRecord":
+        data = _dict(data)
+        return cls(
+            _req_str(data, "name"),
+            _opt_str(data, "type"),
+            _opt_str(data, "uri"),
+            _opt_str(data, "role"),
+            _float(data, "confidence", 1.0),
+            _opt_str(data, "entity_id"),
+            _opt_str(data, "canonical"),
+        )
+
+
+@dataclass(slots=True)
+class TaggedRecord:
+    phi_id: int
+    themes: List[ThemeRecord] = field(default_factory=list)
+    entities: EntitiesRecord = field(default_factory=EntitiesRecord)
+    completeness: str = "fragmentary"
+    provenance: List[GeoLocationRecord] = field(default_factory=list)
+    rationale: Optional[str] = None
+    model: Optional[str] = None
+    backend: Optional[str] = None
+    date_str: Optional[str] = None
+    date_min: Optional[float] = None
+    date_max: Optional[float] = None
+    date_circa: Optional[bool] = None
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "TaggedRecord":
+        data = _dict(data)
+        phi_id = data.get("phi_id")
+        if type(phi_id) is not int:
+            phi_id = _int(phi_id, "phi_id")
+        try:
+            completeness = data.get("completeness", "fragmentary")
+            if completeness not in COMPLETENESS_VALUES:
+                raise RecordError(f"completeness: must be one of {COMPLETENESS_VALUES}, got {completeness!r}")
+            if "entities" not in data:
+                entities = EntitiesRecord()
+            else:
+                try:
+                    entities = EntitiesRecord.from_dict(data["entities"])
+                except RecordError as e:
+                    raise RecordError(f"entities.{e}") from None
+            return cls(
+                phi_id,
+                _decode_list(ThemeRecord, _list(data, "themes"), "themes"),
+                entities,
+                completeness,
+                _decode_list(GeoLocationRecord, _list(data, "provenance"), "provenance"),
+                _opt_str(data, "rationale"),
+                _opt_str(data, "model"),
+                _opt_str(data, "backend"),
+                _opt_str(data, "date_str"),
+                _float(data, "date_min", None),
+                _float(data, "date_max", None),
+                _bool(data, "date_circa", None),
+            )
+        except RecordError as e:
+            raise RecordError(f"[{phi_id}] {e}") from None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        if data["backend"] is None:
+            del data["backend"]  # Older outputs have no backend field
+        return data
+
+    @property
+    def region(self) -> Optional[str]:
+        """Region from provenance (first 'Region' entry, else the first entry)."""
+        for loc in self.provenance:
+            if loc.type == "Region":
+                return loc.name
+        return self.provenance[0].name if self.provenance else None
+
+
+def load_tagged(path: Path) -> TaggedRecord:
+    """Decodes and validates one tagged output file."""
+    return TaggedRecord.from_dict(codec.load_file(path))
+
+
+def load_tagged_dir(directory: Path) -> Dict[int, TaggedRecord]:
+    """Loads all valid tagged outputs of a directory keyed by PHI id."""
+    records: Dict[int, TaggedRecord] = {}
+    for path in directory.glob("*.json"):
+        try:
+            record = load_tagged(path)
+        except (OSError, RecordError, *codec.DECODE_ERRORS) as e:
+            logger.warning(f"Error loading {path}: {e}")
+            continue
+        records[record.phi_id] = record
+    return records
+
+
+def benchmark(directory: Path) -> None:
+    from .schema import TaggedInscription
+
+    files = sorted(directory.glob("*.json"))
+    raw = [f.read_bytes() for f in files]
+    print(f"Files: {len(files)} ({sum(len(r) for r in raw) / 1e6:.2f} MB), JSON backend: {codec.BACKEND}")
+
+    loaders = {
+        "raw dicts": lambda b: codec.loads(b),
+        "pydantic TaggedInscription": lambda b: TaggedInscription(**codec.loads(b)),
+        "records TaggedRecord": lambda b: TaggedRecord.from_dict(codec.loads(b)),
+    }
+    for name, loader in loaders.items():
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        loaded = [loader(b) for b in raw]
+        elapsed = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:28s} {elapsed * 1000:8.1f} ms  resident {current / 1e6:6.2f} MB  "
+              f"({current / len(loaded) / 1e3:.1f} KB/doc)")
+        del loaded
+
+
+if __name__ == "__main__":
+    from .config import OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Compact record types for bulk processing.")
+    parser.add_argument("--benchmark", action="store_true", help="Compare load time and memory with Pydantic/dicts")
+    parser.add_argument("--dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.dir)
+    else:
+        parser.print_help()
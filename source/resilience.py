@@ -0,0 +1,173 @@
+"""
+Latency and failure handling for LLM calls: per-call deadlines, hedged
+requests and a circuit breaker per provider/model.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+from .metrics import METRICS
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``cooldown`` seconds. The first call after the cooldown
+    is let through as a probe; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError if the call must not be sent."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half-open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        METRICS.incr("llm.circuit_rejected")
+        raise CircuitOpenError(f"Circuit open for {self.name}")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= self.failure_threshold:
+                if self._opened_at is None or was_probe:
+                    METRICS.incr("llm.circuit_opened")
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies used to derive the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool(size: int) -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+
+def hedged_call(
+    request: Callable[[float], T],
+    timeout: float,
+    hedge_delay: Optional[float] = None,
+    pool_size: int = 32,
+) -> T:
+    """
+    Runs ``request(timeout)`` with an overall deadline.
+
+    Without a hedge delay the request runs inline and the deadline is enforced
+    by the SDK timeout passed to it. With a hedge delay, a duplicate request is
+    sent if the first has not finished after ``hedge_delay`` seconds, and
+    whichever succeeds first wins. The loser is left to finish in the
+    background (threads cannot be cancelled) but is bounded by its own timeout.
+
+    The hedge delay is measured from when the primary actually starts, so
+    time spent queued for a pool thread never triggers a duplicate. The pool
+    should be sized for two requests per concurrent caller (see
+    ``LLM_HEDGE_POOL_SIZE``).
+    """
+    if hedge_delay is None or hedge_delay >= timeout:
+        return request(timeout)
+
+    pool = _get_hedge_pool(pool_size)
+    deadline = time.monotonic() + timeout
+    started = threading.Event()
+
+    def run_primary() -> T:
+        started.set()
+        return request(max(deadline - time.monotonic(), 1.0))
+
+    primary = pool.submit(run_primary)
+    started.wait(timeout=max(deadline - time.monotonic(), 0.0))
+    done, _ = wait([primary], timeout=hedge_delay)
+    if done:
+        return primary.result()
+
+    METRICS.incr("llm.hedges_sent")
+    remaining = max(deadline - time.monotonic(), 1.0)
+    backup = pool.submit(request, remaining)
+    pending = {primary, backup}
+    last_error: Optional[BaseException] = None
+
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if future is backup:
+                    METRICS.incr("llm.hedges_won")
+                return future.result()
+            last_error = error
+
+    if last_error is not None and not pending:
+        raise last_error
+    raise TimeoutError(f"LLM call exceeded deadline of {timeout:.1f}s")
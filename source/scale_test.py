@@ -0,0 +1,347 @@
+"""
+Scale tests on synthetic corpora (see ``synthetic.py``).
+
+For each size a dataset is generated (or reused) and every subsystem runs
+against it in a fresh subprocess, so peak memory is measured per stage:
+
+- ingest:    snapshot build from the JSONL dump, full read, no-op rebuild
+- api:       cache load, then per-request latency of the main endpoints
+- website:   full ``build_website`` into the dataset directory
+- reconcile: ``reconcile_entities`` over all outputs (seeded cache)
+- schema:    ``enforce_schema_retroactive`` over all outputs
+- validate:  ``validation`` over all outputs, then again with nothing changed
+
+Network access is disabled in the stages; caches are seeded by the
+generator. Each run writes ``data/benchmarks/scale_<timestamp>.json`` and
+appends its rows to ``data/benchmarks/scale_results.jsonl`` so runs can be
+compared over time.
+
+Usage:
+    python -m source.scale_test --sizes 10000 100000 1000000
+    python -m source.scale_test --sizes 10000 --stages ingest api
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import codec
+from .config import BASE_DIR, BENCHMARKS_DIR, MIN_TEXT_LENGTH
+
+STAGES = ("ingest", "api", "website", "reconcile", "schema", "validate")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+REQUESTS_PER_ENDPOINT = 20
+RESULT_PREFIX = "SCALE_RESULT "
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+@contextlib.contextmanager
+def _offline():
+    """Fails every urllib request, as if the machine had no network."""
+    def refuse(*args, **kwargs):
+        raise OSError("network disabled during scale test")
+
+    original = urllib.request.urlopen
+    urllib.request.urlopen = refuse
+    try:
+        yield
+    finally:
+        urllib.request.urlopen = original
+
+
+def _output_count(dataset: Path) -> int:
+    return sum(1 for _ in (dataset / "output").glob("*.json"))
+
+
+# --- Stages (run inside the child process) ---
+
+def stage_ingest(dataset: Path) -> dict:
+    from .corpus import CorpusSnapshot, build_snapshot
+    from .data_loader import IngestFilter
+
+    db_path = dataset / "corpus.sqlite"
+    db_path.unlink(missing_ok=True)
+    ingest_filter = IngestFilter(min_length=MIN_TEXT_LENGTH)
+    start = time.perf_counter()
+    stats = build_snapshot(source=dataset / "input.jsonl.gz", db_path=db_path, force=True,
+                           ingest_filter=ingest_filter)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    count = sum(1 for _ in CorpusSnapshot(db_path).iter_inscriptions())
+    read_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_snapshot(source=dataset / "input.jsonl.gz", db_path=db_path, ingest_filter=ingest_filter)
+    noop_seconds = time.perf_counter() - start
+    return {
+        "seconds": build_seconds,
+        "records": stats["added"],
+        "read_seconds": read_seconds,
+        "read_records": count,
+        "noop_rebuild_seconds": noop_seconds,
+        "db_mb": db_path.stat().st_size / 1e6,
+    }
+
+
+def _latency(client, paths: List[str]) -> dict:
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 500:
+            raise RuntimeError(f"{path} -> HTTP {response.status_code}")
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "max_ms": timings[-1],
+    }
+
+
+def stage_api(dataset: Path, requests: int = REQUESTS_PER_ENDPOINT) -> dict:
+    from fastapi.testclient import TestClient
+
+    from . import api
+    from .corpus import CorpusSnapshot
+
+    api.DATA_DIR = dataset / "output"
+    api.INSCRIPTIONS_CACHE.clear()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cache = api.load_all_inscriptions()
+    load_seconds = time.perf_counter() - start
+    rss_after_load = _peak_rss_mb()
+    if (dataset / "corpus.sqlite").exists():
+        api.CORPUS = CorpusSnapshot(dataset / "corpus.sqlite")
+
+    rng = random.Random(0)
+    ids = rng.sample(sorted(cache), min(requests, len(cache)))
+    records = [cache[i] for i in ids]
+    pages = max(1, len(cache) // 20)
+    endpoints = {
+        "inscription": [f"/inscriptions/{i}" for i in ids],
+        "text": [f"/inscriptions/{i}/text" for i in ids],
+        "list_page": [f"/inscriptions?page={rng.randint(1, pages)}" for _ in ids],
+        "list_region": [f"/inscriptions?region={r.region}" for r in records],
+        "search_theme": [f"/search?theme={r.themes[0].label}" if r.themes else "/search?theme=Stele"
+                         for r in records],
+        "search_person": [f"/search?person={r.entities.persons[0].name}" if r.entities.persons
+                          else "/search?person=Demetrios" for r in records],
+        "stats": ["/stats"] * max(1, requests // 4),
+        "entities_persons": ["/entities/persons"] * max(1, requests // 4),
+        "regions": ["/regions"] * max(1, requests // 4),
+    }
+    client = TestClient(api.app)
+    result = {"seconds": load_seconds, "records": len(cache), "rss_after_load_mb": rss_after_load}
+    for name, paths in endpoints.items():
+        for key, value in _latency(client, paths).items():
+            result[f"{name}_{key}"] = value
+    return result
+
+
+def stage_website(dataset: Path) -> dict:
+    from . import build_website as bw
+    from .corpus import CorpusSnapshot
+
+    db_path = dataset / "corpus.sqlite"
+    if not db_path.exists():
+        raise FileNotFoundError("website stage needs the ingest stage (corpus.sqlite)")
+    site = dataset / "website"
+    shutil.rmtree(site, ignore_errors=True)
+    (site / "assets" / "js").mkdir(parents=True)
+    bw.OUTPUT_DIR = dataset / "output"
+    bw.WEBSITE_DIR = site
+    bw.INSCRIPTIONS_DIR = site / "inscriptions"
+    bw.ASSETS_DIR = site / "assets"
+    bw.ROOT_INDEX = site / "index.html"
+    bw.PLEIADES_CACHE_FILE = dataset / "pleiades_cache.json"
+    bw.load_corpus = lambda: list(CorpusSnapshot(db_path).iter_inscriptions())
+
+    start = time.perf_counter()
+    with _offline(), contextlib.redirect_stdout(io.StringIO()):
+        bw.build_website()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "records": sum(1 for _ in bw.INSCRIPTIONS_DIR.glob("*.html")),
+        "data_js_mb": (site / "assets" / "js" / "data.js").stat().st_size / 1e6,
+    }
+
+
+def stage_reconcile(dataset: Path) -> dict:
+    from . import reconcile_entities
+
+    reconcile_entities.RECONCILIATION_CACHE_FILE = dataset / "reconciliation_cache.json"
+    reconcile_entities.OUTPUT_DIR = dataset / "output"
+    start = time.perf_counter()
+    with _offline(), contextlib.redirect_stdout(io.StringIO()):
+        reconcile_entities.main()
+    return {"seconds": time.perf_counter() - start, "records": _output_count(dataset)}
+
+
+def stage_schema(dataset: Path) -> dict:
+    from . import enforce_schema_retroactive
+
+    enforce_schema_retroactive.OUTPUT_DIR = dataset / "output"
+    enforce_schema_retroactive.PATH_INDEX_PATH = dataset / "path_index.sqlite"
+    start = time.perf_counter()
+    enforce_schema_retroactive.main(full=True)
+    return {"seconds": time.perf_counter() - start, "records": _output_count(dataset)}
+
+
+def stage_validate(dataset: Path) -> dict:
+    from . import validation
+    from .taxonomy_utils import load_taxonomy
+
+    taxonomy = load_taxonomy(validation.TAXONOMY_DIR / "taxonomy.json")
+    start = time.perf_counter()
+    report = validation.validate_outputs(dataset / "output", taxonomy)
+    seconds = time.perf_counter() - start
+    incremental = validation.validate_outputs(dataset / "output", taxonomy, previous=report)
+    return {"seconds": seconds, "records": report.files, "invalid": report.invalid,
+            "incremental_seconds": incremental.seconds}
+
+
+STAGE_FUNCTIONS = {
+    "ingest": stage_ingest,
+    "api": stage_api,
+    "website": stage_website,
+    "reconcile": stage_reconcile,
+    "schema": stage_schema,
+    "validate": stage_validate,
+}
+
+
+def run_stage(stage: str, dataset: Path) -> dict:
+    """Runs one stage in this process and adds memory figures."""
+    rss_before = _peak_rss_mb()
+    result = STAGE_FUNCTIONS[stage](dataset)
+    result["rss_before_mb"] = rss_before
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+# --- Orchestration (parent process) ---
+
+def _run_stage_subprocess(stage: str, dataset: Path, verbose: bool) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "source.scale_test", "--stage", stage, "--dataset", str(dataset)],
+        cwd=BASE_DIR,
+        stdout=subprocess.PIPE,
+        stderr=None if verbose else subprocess.PIPE,
+        text=True,
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return codec.loads(line[len(RESULT_PREFIX):])
+    tail = (proc.stderr or "").strip().splitlines()[-5:]
+    return {"error": f"exit code {proc.returncode}: " + " | ".join(tail)}
+
+
+def _ensure_dataset(dataset: Path, size: int, seed: int) -> Optional[dict]:
+    """Generates the dataset unless a complete one of this size exists; returns the manifest if generated."""
+    from .synthetic import generate
+
+    manifest_path = dataset / "manifest.json"
+    if manifest_path.exists():
+        manifest = codec.load_file(manifest_path)
+        if manifest.get("count") == size and manifest.get("seed") == seed:
+            return None
+    shutil.rmtree(dataset, ignore_errors=True)
+    return generate(dataset, size, seed=seed)
+
+
+def _run_metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "json_backend": codec.BACKEND,
+    }
+
+
+def run_suite(sizes, stages, workdir: Path, seed: int = 0, keep: bool = True, verbose: bool = False) -> dict:
+    run = _run_metadata()
+    rows: List[Dict] = []
+    for size in sizes:
+        dataset = workdir / str(size)
+        print(f"== {size:,} inscriptions ({dataset})")
+        generated = _ensure_dataset(dataset, size, seed)
+        if generated:
+            rows.append({"size": size, "stage": "generate", "seconds": generated["seconds"],
+                         "records": size, "input_mb": generated["input_mb"], "output_mb": generated["output_mb"]})
+        for stage in stages:
+            result = _run_stage_subprocess(stage, dataset, verbose)
+            rows.append({"size": size, "stage": stage, **result})
+            if "error" in result:
+                print(f"  {stage:10s} FAILED {result['error']}")
+            else:
+                print(f"  {stage:10s} {result['seconds']:9.2f}s  peak RSS {result['peak_rss_mb']:8.1f} MB")
+        if not keep:
+            shutil.rmtree(dataset, ignore_errors=True)
+
+    BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
+    report = {"run": run, "results": rows}
+    stamp = run["timestamp"].replace(":", "-")
+    codec.dump_file(report, BENCHMARKS_DIR / f"scale_{stamp}.json", pretty=True)
+    with open(BENCHMARKS_DIR / "scale_results.jsonl", "ab") as f:
+        for row in rows:
+            f.write(codec.dumpb({**run, **row}) + b"\n")
+    return report
+
+
+def print_table(rows: List[dict]) -> None:
+    print(f"\n{'size':>10} {'stage':10} {'seconds':>10} {'us/record':>10} {'peak MB':>9}")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['size']:>10,} {row['stage']:10} {'FAILED':>10}")
+            continue
+        per_record = row["seconds"] / row["records"] * 1e6 if row.get("records") else 0.0
+        peak = f"{row['peak_rss_mb']:.1f}" if "peak_rss_mb" in row else "-"
+        print(f"{row['size']:>10,} {row['stage']:10} {row['seconds']:>10.2f} {per_record:>10.1f} {peak:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scale tests on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--workdir", type=Path, default=BENCHMARKS_DIR / "synthetic",
+                        help="Where datasets are generated (reused across runs)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clean", action="store_true", help="Delete each dataset after its tests")
+    parser.add_argument("--verbose", action="store_true", help="Show stage logs")
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--dataset", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        # Child process: one stage, one result line
+        print(RESULT_PREFIX + codec.dumps(run_stage(args.stage, args.dataset)))
+    else:
+        report = run_suite(args.sizes, args.stages, args.workdir, seed=args.seed,
+                           keep=not args.clean, verbose=args.verbose)
+        print_table(report["results"])
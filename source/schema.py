@@ -27,23 +27,37 @@ class Theme(BaseModel):
     quote: Optional[str] = Field(None, description="The specific Greek text segment that justifies this tag.")
     is_ambiguous: bool = Field(default=False, description="True if the classification is uncertain or debated.")
     ambiguity_note: Optional[str] = Field(None, description="Explanation of the ambiguity if present.")
+    # Set by quotes.align_themes (not by the LLM): where the quote occurs in the inscription text
+    quote_start: Optional[int] = Field(None, description="Start offset of the quote in the inscription text")
+    quote_end: Optional[int] = Field(None, description="End offset (exclusive) of the quote in the inscription text")
+    quote_status: Optional[Literal["exact", "fuzzy", "not_found"]] = Field(
+        None, description="How the quote matched the text; not_found means it probably is not from this text")
 
 class PersonEntity(BaseModel):
     name: str
     role: Optional[str] = None
     uri: Optional[str] = Field(None, description="Linked Open Data URI (e.g. LGPN)")
     confidence: float = Field(default=1.0, description="Confidence score 0.0-1.0")
+    # Set by entity_resolution (not by the LLM): the entity this spelling belongs to
+    entity_id: Optional[str] = Field(None, description="ID of the resolved entity, e.g. 'person:hadrian'")
+    canonical: Optional[str] = Field(None, description="Canonical spelling of the resolved entity")
 
 class PlaceEntity(BaseModel):
     name: str
     type: Optional[str] = None
     uri: Optional[str] = Field(None, description="Linked Open Data URI (e.g. Pleiades)")
     confidence: float = Field(default=1.0, description="Confidence score 0.0-1.0")
+    # Set by entity_resolution (not by the LLM): the entity this spelling belongs to
+    entity_id: Optional[str] = Field(None, description="ID of the resolved entity, e.g. 'place:athens'")
+    canonical: Optional[str] = Field(None, description="Canonical spelling of the resolved entity")
 
 class DeityEntity(BaseModel):
     name: str
     uri: Optional[str] = Field(None, description="Linked Open Data URI (e.g. Wikidata/ToposText)")
     confidence: float = Field(default=1.0, description="Confidence score 0.0-1.0")
+    # Set by entity_resolution (not by the LLM): the entity this spelling belongs to
+    entity_id: Optional[str] = Field(None, description="ID of the resolved entity, e.g. 'deity:zeus'")
+    canonical: Optional[str] = Field(None, description="Canonical spelling of the resolved entity")
 
 class Entities(BaseModel):
     persons: List[PersonEntity] = Field(default_factory=list)
@@ -56,6 +70,9 @@ class GeoLocation(BaseModel):
     uri: Optional[str] = Field(None, description="Pleiades URI")
     role: Optional[str] = Field(None, description="provenance")
     confidence: float = Field(default=1.0, description="Confidence score 0.0-1.0")
+    # Set by entity_resolution (provenance places are resolved together with the places)
+    entity_id: Optional[str] = Field(None, description="ID of the resolved place, e.g. 'place:athens'")
+    canonical: Optional[str] = Field(None, description="Canonical spelling of the resolved place")
 
 class TaggedInscription(BaseModel):
     phi_id: int
@@ -65,6 +82,7 @@ class TaggedInscription(BaseModel):
     provenance: List[GeoLocation] = Field(default_factory=list, description="Ordered hierarchy: [Macro -> Micro]")
     rationale: Optional[str] = Field(None, description="A comprehensive summary of the AI's analysis and reasoning.")
     model: Optional[str] = Field(None, description="The name of the model used for generation")
+    backend: Optional[str] = Field(None, description="LLM backend(s) that served the Proposer/Judge calls")
     
     # Date Metadata (Propagated from Input)
     date_str: Optional[str] = None
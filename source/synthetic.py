@@ -0,0 +1,338 @@
+"""
+Synthetic corpus generator for scale testing.
+
+Produces PHI-style inputs and matching ``TaggedInscription`` outputs at any
+size. Every field is sampled from something real:
+- theme paths from ``taxonomy.json`` (weighted by their frequency in
+  ``data/output``, with every valid path possible),
+- places and provenance from the Pleiades names dump (with coordinates),
+- persons, deities, dates, rationales and per-inscription entity/theme counts
+  from the tagged outputs in ``data/output``,
+- text lengths from the corpus snapshot when it exists; Greek text is
+  stitched from the quotes of the real outputs.
+
+A dataset directory contains ``input.jsonl.gz`` (ingest with
+``INPUT_SOURCE``), ``output/<id>.json``, and seeded ``pleiades_cache.json`` /
+``reconciliation_cache.json`` so the consumers run without network access.
+
+Usage:
+    python -m source.synthetic --count 10000 --out data/benchmarks/synthetic/10000
+"""
+import argparse
+import bisect
+import csv
+import gzip
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import codec
+from .config import CORPUS_DB_PATH, DATA_DIR, MIN_TEXT_LENGTH, OUTPUT_DIR, TAXONOMY_DIR
+from .taxonomy_utils import flatten_taxonomy, load_taxonomy
+
+logger = logging.getLogger(__name__)
+
+PLEIADES_NAMES_FILE = DATA_DIR / "pleiades_names.csv.gz"
+PLEIADES_URI = "https://pleiades.stoa.org/places/{}"
+
+# Synthetic PHI ids start far above the real ones so datasets never collide
+SYNTHETIC_ID_OFFSET = 10_000_000
+
+# Fallback text length model (log-normal, clipped at MIN_TEXT_LENGTH) when no
+# corpus snapshot is available to sample real lengths from
+FALLBACK_LENGTH_MEDIAN = 1900
+FALLBACK_LENGTH_SIGMA = 0.7
+MAX_TEXT_LENGTH = 60_000
+
+# Share of observed vs uniform weight when sampling taxonomy paths
+OBSERVED_PATH_WEIGHT = 0.8
+# Share of persons whose name is a new recombination (long tail of rare names)
+NOVEL_NAME_RATE = 0.6
+# Share of themes with a mis-leveled hierarchy (exercises schema enforcement)
+DEFAULT_NOISE = 0.02
+
+
+@dataclass
+class CorpusProfile:
+    """Empirical distributions taken from the real corpus."""
+    theme_counts: List[int]
+    person_counts: List[int]
+    place_counts: List[int]
+    deity_counts: List[int]
+    path_counts: Counter
+    persons: List[dict]
+    deities: List[dict]
+    regions: List[dict]
+    dates: List[Tuple[Optional[str], Optional[float], Optional[float], Optional[bool]]]
+    completeness: List[str]
+    confidences: List[float]
+    rationales: List[str]
+    quotes: List[str]
+    text_lengths: List[int] = field(default_factory=list)
+
+
+def build_profile(output_dir: Path = OUTPUT_DIR, corpus_db: Path = CORPUS_DB_PATH) -> CorpusProfile:
+    """Collects the sampling distributions from the tagged outputs (and snapshot lengths)."""
+    profile = CorpusProfile([], [], [], [], Counter(), [], [], [], [], [], [], [], [])
+    for file_path in sorted(output_dir.glob("*.json")):
+        try:
+            data = codec.load_file(file_path)
+        except (OSError, *codec.DECODE_ERRORS):
+            continue
+        themes = data.get("themes") or []
+        entities = data.get("entities") or {}
+        profile.theme_counts.append(len(themes))
+        profile.person_counts.append(len(entities.get("persons") or []))
+        profile.place_counts.append(len(entities.get("places") or []))
+        profile.deity_counts.append(len(entities.get("deities") or []))
+        for theme in themes:
+            h = theme.get("hierarchy") or {}
+            profile.path_counts[tuple(h.get(k) for k in ("domain", "subdomain", "category", "subcategory"))] += 1
+            if theme.get("confidence") is not None:
+                profile.confidences.append(theme["confidence"])
+            if theme.get("rationale"):
+                profile.rationales.append(theme["rationale"])
+            if theme.get("quote"):
+                profile.quotes.append(theme["quote"])
+        profile.persons.extend(p for p in entities.get("persons") or [] if p.get("name"))
+        profile.deities.extend(d for d in entities.get("deities") or [] if d.get("name"))
+        profile.regions.extend(p for p in data.get("provenance") or [] if p.get("type") == "Region")
+        profile.dates.append((data.get("date_str"), data.get("date_min"), data.get("date_max"), data.get("date_circa")))
+        profile.completeness.append(data.get("completeness") or "fragmentary")
+
+    if not profile.theme_counts:
+        raise FileNotFoundError(f"No tagged outputs in {output_dir} to build a profile from")
+
+    if corpus_db.exists():
+        from .corpus import CorpusSnapshot
+        profile.text_lengths = [len(i.text) for i in CorpusSnapshot(corpus_db).iter_inscriptions()
+                                if len(i.text) >= MIN_TEXT_LENGTH]
+    return profile
+
+
+def load_places(names_file: Path = PLEIADES_NAMES_FILE) -> List[Tuple[str, str, Optional[List[float]]]]:
+    """(name, Pleiades URI, [lat, lon]) for every transliterated name in the dump."""
+    places = []
+    seen = set()
+    with gzip.open(names_file, "rt", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("nameTransliterated") or row.get("title") or "").split(",")[0].strip()
+            pid = (row.get("pid") or "").replace("/places/", "").strip("/")
+            if not name or not pid or (name, pid) in seen:
+                continue
+            seen.add((name, pid))
+            try:
+                coords = [float(row["reprLat"]), float(row["reprLong"])]
+            except (KeyError, TypeError, ValueError):
+                coords = None
+            places.append((name, PLEIADES_URI.format(pid), coords))
+    return places
+
+
+class SyntheticGenerator:
+    """Samples inputs and tagged outputs from a ``CorpusProfile``."""
+
+    def __init__(self, profile: CorpusProfile, taxonomy: dict, places: list, seed: int = 0,
+                 noise: float = DEFAULT_NOISE):
+        self.profile = profile
+        self.places = places
+        self.noise = noise
+        self.rng = random.Random(seed)
+
+        _, valid = flatten_taxonomy(taxonomy)
+        self.paths = sorted(valid, key=lambda t: tuple(x or "" for x in t))
+        observed_total = sum(profile.path_counts[p] for p in self.paths) or 1
+        weights = [
+            OBSERVED_PATH_WEIGHT * profile.path_counts[p] / observed_total
+            + (1 - OBSERVED_PATH_WEIGHT) / len(self.paths)
+            for p in self.paths
+        ]
+        self.path_cum = list(itertools.accumulate(weights))
+
+        # Greek text is cut from one long stream of real quotes (cheap slicing)
+        quotes = profile.quotes or ["ἀγαθῆι τύχηι"]
+        stream: List[str] = []
+        stream_length = 0
+        while stream_length < 4 * MAX_TEXT_LENGTH:
+            batch = self.rng.sample(quotes, len(quotes))
+            stream.extend(batch)
+            stream_length += sum(len(q) + 1 for q in batch)
+        self.text_stream = "\n".join(stream)
+
+        self.person_names = sorted({p["name"] for p in profile.persons}) or ["Demetrios"]
+        self.used_places: Dict[str, Optional[List[float]]] = {}
+        self.used_names: Dict[str, Dict[str, Optional[str]]] = {"places": {}, "deities": {}, "persons": {}}
+
+    # --- Sampling helpers ---
+
+    def _text_length(self) -> int:
+        if self.profile.text_lengths:
+            return self.rng.choice(self.profile.text_lengths)
+        length = int(self.rng.lognormvariate(0, FALLBACK_LENGTH_SIGMA) * FALLBACK_LENGTH_MEDIAN)
+        return max(MIN_TEXT_LENGTH, min(MAX_TEXT_LENGTH, length))
+
+    def _text(self) -> str:
+        length = min(self._text_length(), len(self.text_stream) - 1)
+        start = self.rng.randrange(len(self.text_stream) - length)
+        return self.text_stream[start:start + length]
+
+    def _path(self) -> tuple:
+        return self.paths[bisect.bisect_left(self.path_cum, self.rng.random() * self.path_cum[-1])]
+
+    def _place(self) -> Tuple[str, str, Optional[List[float]]]:
+        name, uri, coords = self.rng.choice(self.places)
+        self.used_places[uri] = coords
+        self.used_names["places"][name] = uri
+        return name, uri, coords
+
+    def _person_name(self) -> str:
+        name = self.rng.choice(self.person_names)
+        if self.rng.random() < NOVEL_NAME_RATE and len(name) > 4:
+            other = self.rng.choice(self.person_names)
+            name = name[:self.rng.randint(2, len(name) - 2)] + other[self.rng.randint(1, max(1, len(other) - 2)):]
+        return name
+
+    # --- Records ---
+
+    def inscription(self, phi_id: int) -> dict:
+        """A PHI-style input record."""
+        date_str, date_min, date_max, date_circa = self.rng.choice(self.profile.dates)
+        region = self.rng.choice(self.profile.regions)["name"] if self.profile.regions else self._place()[0]
+        sub_region = self._place()[0]
+        return {
+            "id": phi_id,
+            "text": self._text(),
+            "metadata": f"Synthetic {phi_id}\n{region} - {sub_region}\n{date_str or ''}".strip(),
+            "region_main_id": str(self.rng.randint(1, 2000)),
+            "region_main": f"{region} (IG {self.rng.choice(['I-III', 'II-III', 'V', 'IX', 'XII'])})",
+            "region_sub_id": str(self.rng.randint(1, 20000)),
+            "region_sub": sub_region,
+            "date_str": date_str,
+            "date_min": date_min,
+            "date_max": date_max,
+            "date_circa": date_circa,
+        }
+
+    def tagged(self, inscription: dict) -> dict:
+        """A ``TaggedInscription``-shaped output for an input record."""
+        rng = self.rng
+        text = inscription["text"]
+        themes = []
+        for _ in range(rng.choice(self.profile.theme_counts)):
+            domain, subdomain, category, subcategory = self._path()
+            if rng.random() < self.noise and category:
+                # Typical LLM drift: leaf placed one level too high
+                subdomain, category, subcategory = category, subcategory, None
+            start = rng.randrange(max(1, len(text) - 60))
+            themes.append({
+                "label": subcategory or category or subdomain or domain,
+                "hierarchy": {"domain": domain, "subdomain": subdomain,
+                              "category": category, "subcategory": subcategory},
+                "rationale": rng.choice(self.profile.rationales) if self.profile.rationales else "",
+                "confidence": rng.choice(self.profile.confidences) if self.profile.confidences else 1.0,
+                "quote": text[start:start + rng.randint(15, 60)],
+                "is_ambiguous": False,
+                "ambiguity_note": None,
+            })
+
+        persons = []
+        for _ in range(rng.choice(self.profile.person_counts)):
+            template = rng.choice(self.profile.persons) if self.profile.persons else {}
+            name = self._person_name()
+            uri = f"https://search.lgpn.ox.ac.uk/browse.html?field=names&sort=nymRef&query={name}"
+            self.used_names["persons"][name] = uri
+            persons.append({"name": name, "role": template.get("role"), "uri": uri, "confidence": 1.0})
+
+        places = []
+        for _ in range(rng.choice(self.profile.place_counts)):
+            name, uri, _ = self._place()
+            places.append({"name": name, "type": rng.choice(["City", "Deme", "Sanctuary", "Region"]),
+                           "uri": uri, "confidence": 1.0})
+
+        deities = []
+        for _ in range(rng.choice(self.profile.deity_counts)):
+            deity = rng.choice(self.profile.deities) if self.profile.deities else {"name": "Zeus"}
+            self.used_names["deities"][f"{deity['name']}_Q35277"] = deity.get("uri")
+            deities.append({"name": deity["name"], "uri": deity.get("uri"), "confidence": 1.0})
+
+        region = inscription["region_main"].split(" (")[0]
+        city, city_uri, _ = self._place()
+        provenance = [
+            {"name": region, "type": "Region", "uri": None, "role": None, "confidence": 1.0},
+            {"name": city, "type": "City", "uri": city_uri, "role": None, "confidence": 1.0},
+        ]
+        return {
+            "phi_id": inscription["id"],
+            "themes": themes,
+            "entities": {"persons": persons, "places": places, "deities": deities},
+            "completeness": rng.choice(self.profile.completeness),
+            "provenance": provenance,
+            "rationale": rng.choice(self.profile.rationales) if self.profile.rationales else None,
+            "model": "synthetic",
+            "date_str": inscription["date_str"],
+            "date_min": inscription["date_min"],
+            "date_max": inscription["date_max"],
+            "date_circa": inscription["date_circa"],
+        }
+
+
+def generate(out_dir: Path, count: int, seed: int = 0, noise: float = DEFAULT_NOISE) -> dict:
+    """
+    Writes a synthetic dataset of ``count`` inscriptions to ``out_dir``.
+
+    Returns the manifest (also written to ``manifest.json``).
+    """
+    start = time.perf_counter()
+    profile = build_profile()
+    generator = SyntheticGenerator(
+        profile, load_taxonomy(TAXONOMY_DIR / "taxonomy.json"), load_places(), seed=seed, noise=noise
+    )
+    output_dir = out_dir / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    input_bytes = output_bytes = 0
+    with gzip.open(out_dir / "input.jsonl.gz", "wb", compresslevel=1) as dump:
+        for n in range(count):
+            phi_id = SYNTHETIC_ID_OFFSET + n
+            inscription = generator.inscription(phi_id)
+            line = codec.dumpb(inscription) + b"\n"
+            dump.write(line)
+            input_bytes += len(line)
+            encoded = codec.dumpb(generator.tagged(inscription), pretty=True)
+            (output_dir / f"{phi_id}.json").write_bytes(encoded)
+            output_bytes += len(encoded)
+            if (n + 1) % 100_000 == 0:
+                logger.info(f"Generated {n + 1:,}/{count:,}")
+
+    codec.dump_file(generator.used_places, out_dir / "pleiades_cache.json")
+    codec.dump_file(generator.used_names, out_dir / "reconciliation_cache.json")
+    manifest = {
+        "count": count,
+        "seed": seed,
+        "noise": noise,
+        "input_mb": round(input_bytes / 1e6, 2),
+        "output_mb": round(output_bytes / 1e6, 2),
+        "text_lengths": "snapshot" if profile.text_lengths else "lognormal fallback",
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    codec.dump_file(manifest, out_dir / "manifest.json", pretty=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    from .logging_setup import setup_logging
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Generate a synthetic PHI corpus with tagged outputs.")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--out", type=Path, required=True, help="Dataset directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE, help="Share of mis-leveled themes")
+    args = parser.parse_args()
+    for key, value in generate(args.out, args.count, seed=args.seed, noise=args.noise).items():
+        print(f"{key}: {value}")
@@ -1,9 +1,17 @@
 import json
 import logging
+from typing import List, Optional, Tuple
 from .data_loader import InputInscription
 from .schema import TaggedInscription
+from .config import STREAM_MAX_CHARS, STREAM_MAX_VIOLATIONS
+from .json_stream import StreamChecks
+from .classifier import format_hints_for_prompt
 from .llm_client import LLMProvider
-from .taxonomy_utils import format_taxonomy_for_prompt, validate_taxonomy_compliance, enforce_taxonomy_compliance
+from .quotes import NOT_FOUND, align_themes
+from .taxonomy_utils import (
+    enforce_taxonomy_compliance,
+    get_taxonomy_index,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -167,24 +175,41 @@ JSON Structure:
 }
 """
 
+def build_stream_checks(taxonomy: dict) -> StreamChecks:
+    """Hard constraints checked while a streamed response arrives (see json_stream)."""
+    # Paths post-validation can move, repair or prune are not violations
+    return StreamChecks(
+        max_chars=STREAM_MAX_CHARS,
+        max_violations=STREAM_MAX_VIOLATIONS,
+        reject_greek_names=True,
+        hierarchy_check=get_taxonomy_index(taxonomy).unrepairable,
+    )
+
+
 def tag_inscription(
     inscription: InputInscription,
     llm_client: LLMProvider,
     taxonomy: dict,
-    model: str
+    model: str,
+    hints: Optional[List[Tuple[str, float]]] = None
 ) -> TaggedInscription:
     """
     Two-Pass Tagging Process:
     1. Proposer: Generates candidate tags (Recall-focused).
     2. Judge: Validates and scores tags (Precision-focused).
-    3. Post-validation: Corrects hallucinated subcategories.
+    3. Post-validation: Corrects hallucinated subcategories and locates the
+       quotes in the text (offsets; quotes not found are flagged).
+
+    ``hints`` are optional (path, probability) candidates from the local
+    classifier; they are shown to the Proposer only.
     """
 
-    # Generate flattened taxonomy for clearer LLM instructions
-    taxonomy_paths_str = format_taxonomy_for_prompt(taxonomy)
+    # Flattened taxonomy for clearer LLM instructions (rendered once per taxonomy)
+    taxonomy_paths_str = get_taxonomy_index(taxonomy).prompt
+    stream_checks = build_stream_checks(taxonomy)
 
     # --- Pass 1: Proposer ---
-    logger.info(f"ID {inscription.id}: Starting Proposer phase (Tagging)...")
+    logger.info(f"ID {inscription.id}: Starting Proposer phase (Tagging)...", extra={"phi_id": inscription.id})
     proposer_prompt = f"""
 Inscription Text:
 {inscription.text}
@@ -193,20 +218,25 @@ Metadata: {inscription.metadata}
 
 {taxonomy_paths_str}
 """
+    if hints:
+        proposer_prompt += f"\n{format_hints_for_prompt(hints)}\n"
 
     try:
         proposed_data = llm_client.generate_json(
             system_prompt=PROPOSER_SYSTEM_PROMPT,
             user_prompt=proposer_prompt,
-            model=model
+            model=model,
+            stream_checks=stream_checks
         )
     except Exception as e:
         # Fallback if Proposer fails
-        logger.error(f"ID {inscription.id}: Proposer failed: {e}")
+        logger.error(f"ID {inscription.id}: Proposer failed: {e}", extra={"phi_id": inscription.id})
         return TaggedInscription(phi_id=inscription.id)
 
+    proposer_backend = llm_client.served_by
+
     # --- Pass 2: Judge ---
-    logger.info(f"ID {inscription.id}: Starting Judge phase (Reviewing)...")
+    logger.info(f"ID {inscription.id}: Starting Judge phase (Reviewing)...", extra={"phi_id": inscription.id})
     proposed_json_str = json.dumps(proposed_data, indent=2, ensure_ascii=False)
 
     judge_prompt = f"""
@@ -220,20 +250,31 @@ Proposed Analysis to Review:
     final_data = llm_client.generate_json(
         system_prompt=JUDGE_SYSTEM_PROMPT,
         user_prompt=judge_prompt,
-        model=model
+        model=model,
+        stream_checks=stream_checks
     )
 
+    judge_backend = llm_client.served_by
+
     # --- Post-Validation: Taxonomy Compliance ---
-    logger.info(f"ID {inscription.id}: Enforcing taxonomy compliance...")
+    logger.info(f"ID {inscription.id}: Enforcing taxonomy compliance...", extra={"phi_id": inscription.id})
 
-    # Strict enforcement (Prune or Remove)
+    # Strict enforcement (Repair, Prune or Remove)
     final_data, corrections = enforce_taxonomy_compliance(final_data, taxonomy)
     
     if corrections:
-        logger.warning(f"ID {inscription.id}: Taxonomy corrections applied:")
+        logger.warning(f"ID {inscription.id}: Taxonomy corrections applied:", extra={"phi_id": inscription.id})
         for corr in corrections:
             logger.warning(f"  - {corr}")
 
+    # --- Post-Validation: Quotes must occur in the text (offsets for highlighting) ---
+    themes = final_data.get("themes", [])
+    align_themes(inscription.text, themes)
+    for theme in themes:
+        if theme.get("quote_status") == NOT_FOUND:
+            logger.warning(f"ID {inscription.id}: Quote of theme '{theme.get('label')}' not found in the text: "
+                           f"{theme.get('quote')!r}", extra={"phi_id": inscription.id})
+
     # Merge Metadata (Date is not handled by LLM)
     merged_data = {
         "phi_id": inscription.id,
@@ -243,6 +284,7 @@ Proposed Analysis to Review:
         "completeness": final_data.get("completeness", "fragmentary"),
         "rationale": final_data.get("rationale", ""),
         "model": f"{model} (Proposer+Judge)",
+        "backend": proposer_backend if proposer_backend == judge_backend else f"{proposer_backend} / {judge_backend}",
 
         # Propagate Date Metadata
         "date_str": inscription.date_str,
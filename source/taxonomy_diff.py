@@ -0,0 +1,249 @@
+"""
+Node-level diff between two taxonomy versions.
+
+Every node (at any level) is identified by its full path. Paths that exist
+in only one version are classified as:
+
+- **renamed**: same parent, a new sibling with a similar name or children
+- **moved**: the same name appears exactly once at a new place
+- **split**: several similar new siblings replace it, or a former leaf
+  gained children (its themes have to choose one)
+- **removed** / **added**: everything else (added nodes are reported at
+  their top-most new ancestor)
+
+Descendants of a renamed or moved node follow it without extra entries.
+Renames and moves give a path mapping that migrates existing themes
+(``migrate_theme``); themes under split or removed nodes need re-tagging.
+
+Usage:
+    python -m source.taxonomy_diff old_taxonomy.json [new_taxonomy.json]
+"""
+import argparse
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+from .taxonomy_repair import normalize_name
+from .taxonomy_utils import HIERARCHY_LEVELS, TaxonomyIndex, get_taxonomy_index, hierarchy_tuple
+
+NodePath = Tuple[str, ...]
+
+RENAMED, MOVED, SPLIT, REMOVED, ADDED = "renamed", "moved", "split", "removed", "added"
+# Minimum name (or children) similarity for a new sibling to count as the same node
+RENAME_SIMILARITY = 0.5
+_STOPWORDS = {"and", "or", "of", "the", "und", "oder"}
+
+
+@dataclass
+class NodeChange:
+    kind: str
+    old_path: Optional[NodePath]
+    new_paths: List[NodePath] = field(default_factory=list)
+
+    def describe(self) -> str:
+        old = " > ".join(self.old_path) if self.old_path else ""
+        new = " | ".join(" > ".join(p) for p in self.new_paths)
+        if self.kind == ADDED:
+            return f"added    {new}"
+        if self.kind == REMOVED:
+            return f"removed  {old}"
+        return f"{self.kind:8s} {old} -> {new}"
+
+
+def _nodes(index: TaxonomyIndex) -> Set[NodePath]:
+    return {path for paths in index.label_paths.values() for path in paths}
+
+
+def _children(nodes: Set[NodePath]) -> Dict[NodePath, Set[str]]:
+    children: Dict[NodePath, Set[str]] = {}
+    for path in nodes:
+        children.setdefault(path[:-1], set()).add(path[-1])
+    return children
+
+
+def name_similarity(a: str, b: str) -> float:
+    """Edit-distance ratio or word containment of the normalized names, whichever is higher."""
+    na, nb = normalize_name(a), normalize_name(b)
+    ratio = SequenceMatcher(None, na, nb).ratio()
+    wa, wb = set(na.split()) - _STOPWORDS, set(nb.split()) - _STOPWORDS
+    if wa and wb:
+        ratio = max(ratio, len(wa & wb) / min(len(wa), len(wb)))
+    return ratio
+
+
+class TaxonomyDiff:
+    """Changes between two taxonomies plus the old -> new node mapping for renames and moves."""
+
+    def __init__(self, old: dict, new: dict):
+        self.old_index = get_taxonomy_index(old)
+        self.new_index = get_taxonomy_index(new)
+        self.changes: List[NodeChange] = []
+        self.mapping: Dict[NodePath, NodePath] = {}
+        if self.old_index.version != self.new_index.version:
+            self._compute()
+        self.change_at: Dict[NodePath, NodeChange] = {
+            change.old_path: change for change in self.changes if change.old_path is not None
+        }
+
+    def _compute(self) -> None:
+        old_nodes, new_nodes = _nodes(self.old_index), _nodes(self.new_index)
+        old_children, new_children = _children(old_nodes), _children(new_nodes)
+        unclaimed = new_nodes - old_nodes
+
+        def claim(path: NodePath) -> None:
+            unclaimed.difference_update([p for p in unclaimed if p[:len(path)] == path])
+
+        for path in sorted(old_nodes - new_nodes, key=lambda p: (len(p), p)):
+            target = self.translate(path)
+            if target != path and target in new_nodes:
+                unclaimed.discard(target)  # Carried along by a renamed or moved ancestor
+                continue
+
+            same_name = [p for p in unclaimed if p[-1] == path[-1]]
+            if len(same_name) == 1:
+                self.mapping[path] = same_name[0]
+                unclaimed.discard(same_name[0])
+                self.changes.append(NodeChange(MOVED, path, same_name))
+                continue
+
+            parent = self.translate(path[:-1])
+            old_kids = old_children.get(path, set())
+            similar = []
+            for sibling in sorted(p for p in unclaimed if p[:-1] == parent):
+                score = name_similarity(path[-1], sibling[-1])
+                new_kids = new_children.get(sibling, set())
+                if old_kids and new_kids:
+                    score = max(score, len(old_kids & new_kids) / len(old_kids | new_kids))
+                if score >= RENAME_SIMILARITY:
+                    similar.append(sibling)
+            if len(similar) == 1:
+                self.mapping[path] = similar[0]
+                unclaimed.discard(similar[0])
+                self.changes.append(NodeChange(RENAMED, path, similar))
+            elif similar:
+                for sibling in similar:
+                    claim(sibling)
+                self.changes.append(NodeChange(SPLIT, path, similar))
+            else:
+                self.changes.append(NodeChange(REMOVED, path))
+
+        # Former leaves that gained children: their themes have to pick a child
+        for path in sorted(old_nodes & new_nodes):
+            if path not in old_children and path in new_children:
+                kids = sorted(path + (kid,) for kid in new_children[path])
+                for kid in kids:
+                    claim(kid)
+                self.changes.append(NodeChange(SPLIT, path, kids))
+
+        for path in sorted(unclaimed):
+            if path[:-1] not in unclaimed:
+                self.changes.append(NodeChange(ADDED, None, [path]))
+
+    def translate(self, path: NodePath) -> NodePath:
+        """Old node path -> new path following renamed and moved ancestors (unchanged otherwise)."""
+        for depth in range(len(path), 0, -1):
+            target = self.mapping.get(path[:depth])
+            if target is not None:
+                return target + path[depth:]
+        return path
+
+    def affected_prefixes(self) -> List[NodePath]:
+        """Old node paths whose themes need migration or re-tagging."""
+        return list(self.change_at)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for change in self.changes:
+            counts[change.kind] = counts.get(change.kind, 0) + 1
+        return counts
+
+    def theme_path(self, theme: dict) -> NodePath:
+        """Full old node path of a theme (including a 5th-level label)."""
+        hierarchy = hierarchy_tuple(theme.get("hierarchy") or {})
+        path = tuple(level for level in hierarchy if level)
+        if theme.get("label") in self.old_index.fifth_level.get(hierarchy, ()):
+            path += (theme["label"],)
+        return path
+
+    def migrate_theme(self, theme: dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Applies rename/move mappings to one theme in place.
+
+        Returns (kind, message): kind is the change that affects the theme
+        (None if unaffected). Only renamed/moved themes are rewritten; for
+        the others the message explains why the theme needs re-tagging.
+        """
+        path = self.theme_path(theme)
+        change = None
+        for depth in range(len(path), 0, -1):
+            change = self.change_at.get(path[:depth])
+            if change is not None:
+                break
+        if change is None:
+            return None, None
+
+        label = theme.get("label", "Unknown")
+        old = " > ".join(path)
+        if change.kind not in (RENAMED, MOVED):
+            return change.kind, f"Theme '{label}': {old} is under {change.kind} node '{change.old_path[-1]}'"
+
+        target = self.translate(path)
+        if len(target) == 5:
+            valid = target[4] in self.new_index.fifth_level.get(target[:4], ())
+        else:
+            valid = target + (None,) * (4 - len(target)) in self.new_index.valid
+        if not valid:
+            return REMOVED, f"Theme '{label}': {old} maps to {' > '.join(target)}, which is not a valid path"
+
+        hierarchy = theme.setdefault("hierarchy", {})
+        for level, value in zip(HIERARCHY_LEVELS, target[:4] + (None,) * (4 - len(target[:4]))):
+            hierarchy[level] = value
+        if len(target) == 5 or label == path[-1]:
+            theme["label"] = target[-1]
+        return change.kind, f"Theme '{label}': {change.kind} {old} -> {' > '.join(target)}"
+
+
+_DIFFS: Dict[Tuple[str, str], TaxonomyDiff] = {}
+
+
+def diff_taxonomies(old: dict, new: dict) -> TaxonomyDiff:
+    """Diff between two taxonomies, computed once per pair of versions."""
+    key = (get_taxonomy_index(old).version, get_taxonomy_index(new).version)
+    diff = _DIFFS.get(key)
+    if diff is None:
+        diff = _DIFFS.setdefault(key, TaxonomyDiff(old, new))
+    return diff
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    from .config import TAXONOMY_DIR
+    from .path_index import PathIndex
+    from .taxonomy_utils import load_taxonomy
+
+    parser = argparse.ArgumentParser(description="Classify changes between two taxonomy versions.")
+    parser.add_argument("old", type=Path, nargs="?", default=None,
+                        help="Previous taxonomy (default: the baseline stored in the path index)")
+    parser.add_argument("new", type=Path, nargs="?", default=TAXONOMY_DIR / "taxonomy.json")
+    parser.add_argument("--no-index", action="store_true", help="Do not count affected inscriptions")
+    args = parser.parse_args()
+
+    index = None if args.no_index else PathIndex()
+    if args.old:
+        old_taxonomy = load_taxonomy(args.old)
+    else:
+        old_taxonomy = (index or PathIndex()).taxonomy()
+        if old_taxonomy is None:
+            parser.error("No baseline taxonomy in the path index yet; pass the old taxonomy file")
+    diff = diff_taxonomies(old_taxonomy, load_taxonomy(args.new))
+
+    print(f"{diff.old_index.version} -> {diff.new_index.version}: "
+          + (", ".join(f"{n} {kind}" for kind, n in sorted(diff.counts().items())) or "no changes"))
+    if index is not None:
+        index.refresh()
+    for change in diff.changes:
+        line = change.describe()
+        if index is not None and change.old_path:
+            line += f"  [{len(index.ids_under(change.old_path))} inscriptions]"
+        print(line)
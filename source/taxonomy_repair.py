@@ -0,0 +1,394 @@
+"""
+Local repair of invalid theme hierarchies by nearest valid taxonomy path.
+
+Instead of pruning a theme down to its valid prefix (or dropping it), the
+repairer looks for the valid path the model most likely meant:
+
+1. **Walk**: each level is matched against the children allowed under the
+   already-resolved prefix, ignoring case, diacritics and punctuation, then
+   via known synonyms and German/English translations, then by edit
+   distance. Fixes e.g. "votive dedication", "Weihinschriften" or
+   "Inhalt > Offizielle und rechtliche Dokumente > Dekrete".
+2. **Relocation**: the deepest given level and the theme label are looked up
+   in the reverse label index (``TaxonomyIndex.label_paths``), which places
+   misplaced categories and misspelled 5th-level leaves under their real
+   parents. Agreement of the remaining levels with the found path raises
+   the confidence; a path that contradicts every given level, or moves the
+   theme into another domain, is not proposed.
+
+Repairs below the confidence threshold (TAXONOMY_REPAIR_THRESHOLD) are not
+applied; pruning then proceeds as before.
+
+Usage:
+    python -m source.taxonomy_repair "Content > Religious and Dedicatory Texts > Decrees" --label Ehrendekret
+"""
+import argparse
+import threading
+import unicodedata
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import TAXONOMY_REPAIR_THRESHOLD
+from .taxonomy_utils import HIERARCHY_LEVELS, HierarchyTuple, TaxonomyIndex
+
+# Alias kinds and their match scores
+EXACT, PART, SYNONYM = 1.0, 0.95, 0.95
+# Minimum edit-distance similarity for a fuzzy candidate to be considered
+FUZZY_FLOOR = 0.8
+# Confidence factor of a relocated path: CONTEXT_BASE with no agreeing levels, 1.0 with all
+CONTEXT_BASE = 0.85
+# Competing relocations closer than this are ambiguous and not applied
+AMBIGUITY_MARGIN = 0.02
+
+# Known synonyms and German translations (as used in labels, see the vault
+# output examples) -> taxonomy node name. Keys are normalized on load.
+SYNONYMS: Dict[str, str] = {
+    # Domains and subdomains
+    "Inhalt": "Content",
+    "Typ": "Type",
+    "Zustand": "State",
+    "Erhaltungszustand": "State",
+    "Offizielle und rechtliche Dokumente": "Official and Legal Documents",
+    "Amtliche und rechtliche Dokumente": "Official and Legal Documents",
+    "Religiöse Texte und Weihungen": "Religious and Dedicatory Texts",
+    "Religiöse und Weihinschriften": "Religious and Dedicatory Texts",
+    "Ehren- und Gedenkinschriften": "Honorific and Commemorative Inscriptions",
+    "Verwaltungsdokumente und Listen": "Administrative Records and Lists",
+    "Kennzeichnungen und Besitzvermerke": "Identification and Ownership Marks",
+    "Didaktische und Schultexte": "Didactic and School Texts",
+    "Graffiti und persönliche Äußerungen": "Graffiti and Personal Expressions",
+    "Objekttyp": "Object Type",
+    "Objektform": "Object Type",
+    "Inschriftenträger": "Object Type",
+    "Physical Object Form": "Object Type",
+    "Substance": "Material",
+    "Lesbarkeit": "Legibility",
+    # Content categories
+    "Dekret": "Decrees",
+    "Dekrete": "Decrees",
+    "Ehrendekret": "Decrees",
+    "Ehrendekrete": "Decrees",
+    "Psephisma": "Decrees",
+    "Honorary Decree": "Decrees",
+    "Honorific Decree": "Decrees",
+    "Proxeny Decree": "Decrees",
+    "Gesetz": "Laws and Regulations",
+    "Gesetze": "Laws and Regulations",
+    "Edikt": "Edicts and Ordinances",
+    "Erlass": "Edicts and Ordinances",
+    "Vertrag": "Treaties and Agreements",
+    "Staatsvertrag": "Treaties and Agreements",
+    "Bündnisvertrag": "Treaties and Agreements",
+    "Freilassung": "Manumission Records",
+    "Freilassungsurkunde": "Manumission Records",
+    "Manumission": "Manumission Records",
+    "Brief": "Official Letters",
+    "Amtlicher Brief": "Official Letters",
+    "Weihung": "Votive Dedications",
+    "Weihinschrift": "Votive Dedications",
+    "Weihinschriften": "Votive Dedications",
+    "Votivinschrift": "Votive Dedications",
+    "Dedication": "Votive Dedications",
+    "Gebet": "Prayers and Invocations",
+    "Sakralgesetz": "Sacred Laws and Rules",
+    "Kultgesetz": "Sacred Laws and Rules",
+    "Fluchtafel": "Curse Tablets (Defixiones)",
+    "Defixio": "Curse Tablets (Defixiones)",
+    "Curse Tablet": "Curse Tablets (Defixiones)",
+    "Orakel": "Oracular and Prophetic Texts",
+    "Hymnus": "Hymns and Sacred Poetry",
+    "Beichtinschrift": "Confession Inscriptions",
+    "Sühneinschrift": "Confession Inscriptions",
+    "Ehreninschrift": "Honorific Inscriptions",
+    "Ehrung": "Honorific Inscriptions",
+    "Grabinschrift": "Funerary Inscriptions (Epitaphs)",
+    "Grabepigramm": "Funerary Inscriptions (Epitaphs)",
+    "Epitaph": "Funerary Inscriptions (Epitaphs)",
+    "Siegerinschrift": "Agonistic / Victory Inscriptions",
+    "Agonistische Inschrift": "Agonistic / Victory Inscriptions",
+    "Bauinschrift": "Building Commemoration",
+    "Rechnung": "Accounts and Financial Records",
+    "Abrechnung": "Accounts and Financial Records",
+    "Inventar": "Inventories",
+    "Beamtenliste": "Lists of Officials or Citizens",
+    "Bürgerliste": "Lists of Officials or Citizens",
+    "Namensliste": "Lists of Officials or Citizens",
+    "Stifterliste": "Donor and Subscription Lists",
+    "Spenderliste": "Donor and Subscription Lists",
+    "Kalender": "Calendars and Timetables",
+    "Opferkalender": "Calendars and Timetables",
+    "Besitzerinschrift": "Ownership Marks",
+    "Besitzvermerk": "Ownership Marks",
+    "Künstlersignatur": "Maker’s Marks and Signatures",
+    "Grenzstein": "Boundary Markers (Horoi)",
+    "Horos": "Boundary Markers (Horoi)",
+    "Abecedarium": "Abecedaria (Alphabetical Exercises)",
+    "Graffito": "Graffiti Messages",
+    "Akklamation": "Acclamations and Slogans",
+    # Object types
+    "Tragbare Objekte": "Portable Objects",
+    "Monumentale Steinobjekte": "Monumental Stone Objects",
+    "Statuenbasis": "Statue Base",
+    "Säule": "Column or Pillar",
+    "Pfeiler": "Column or Pillar",
+    "Grabstein": "Tombstone (Gravestone)",
+    "Sarkophag": "Sarcophagus",
+    "Mosaik": "Mosaic Floor or Pavement",
+    "Felsinschrift": "Rock-cut / Rupestral Inscriptions",
+    "Architrav": "Architraves / Friezes / Archways",
+    "Ostrakon": "Ostraca",
+    "Ostracon": "Ostraca",
+    "Bleitafel": "Lead Tablets",
+    "Bronzetafel": "Bronze Tablets",
+    "Münze": "Coins",
+    "Gemme": "Engraved Gemstones",
+    "Webgewicht": "Loom Weights",
+    "Holztafel": "Wooden Tablets",
+    # Materials
+    "Stein": "Stone",
+    "Marmor": "Marble",
+    "Kalkstein": "Limestone",
+    "Sandstein": "Sandstone",
+    "Granit": "Granite",
+    "Metall": "Metal",
+    "Blei": "Lead",
+    "Eisen": "Iron",
+    "Silber": "Silver",
+    "Ton und Keramik": "Clay and Ceramic",
+    "Keramik": "Clay and Ceramic",
+    "Terrakotta": "Terracotta / Pottery",
+    "Ziegel": "Ceramic Tiles / Bricks",
+    "Organische Materialien": "Organic Materials",
+    "Holz": "Wood",
+    "Knochen": "Bone",
+    "Elfenbein": "Ivory",
+    "Glas": "Glass",
+    "Stuck": "Plaster",
+    # State
+    "Vollständig": "Complete",
+    "Unvollständig": "Incomplete",
+    "Fragmentarisch": "Fragmentary",
+    "Fragment": "Fragmentary",
+    "Zerbrochen": "Broken",
+    "Beschädigt aber lesbar": "Damaged but Legible",
+    "Verwittert": "Worn / Weathered",
+    "Unleserlich": "Illegible",
+    "Verschollen": "Lost",
+    "Rekonstruiert": "Reconstructed",
+    "Getilgt": "Mutilated / Erased",
+    "Eradiert": "Mutilated / Erased",
+    "Wiederverwendet": "Reused / Palimpsest",
+    "Spolie": "Reused / Palimpsest",
+}
+
+
+def normalize_name(name: str) -> str:
+    """Casefolded, diacritics stripped, punctuation collapsed to single spaces."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn").casefold()
+    text = text.replace("&", " and ").replace("’", "").replace("'", "")
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def _node_aliases(name: str) -> Iterable[Tuple[str, float, str]]:
+    """Normalized aliases of a taxonomy node name as (alias, score, kind)."""
+    yield normalize_name(name), EXACT, "normalized"
+    base, paren, rest = name.partition(" (")
+    if paren:
+        # "Funerary Inscriptions (Epitaphs)" -> "funerary inscriptions", "epitaphs"
+        yield normalize_name(base), EXACT, "normalized"
+        yield normalize_name(rest.rstrip(")")), PART, "alias"
+    if " / " in base:
+        # "Worn / Weathered" -> "worn", "weathered"
+        for part in base.split(" / "):
+            yield normalize_name(part), PART, "alias"
+
+
+@dataclass
+class Repair:
+    """A proposed replacement path for an invalid theme hierarchy."""
+    hierarchy: HierarchyTuple
+    leaf: Optional[str]  # 5th-level node, which becomes the theme label
+    confidence: float
+    method: str
+
+    def depth(self) -> int:
+        return sum(level is not None for level in self.hierarchy) + (self.leaf is not None)
+
+
+class PathRepairer:
+    """
+    Nearest-valid-path search over one ``TaxonomyIndex``.
+
+    Alias tables are built once per taxonomy; name matches are memoized, so
+    repeated model mistakes cost a few dict lookups.
+    """
+
+    def __init__(self, index: TaxonomyIndex):
+        self.index = index
+        # normalized alias -> {node name: (score, kind)}
+        self.aliases: Dict[str, Dict[str, Tuple[float, str]]] = {}
+        for node in index.label_paths:
+            for alias, score, kind in _node_aliases(node):
+                if not alias:
+                    continue
+                nodes = self.aliases.setdefault(alias, {})
+                if score > nodes.get(node, (0.0, ""))[0]:
+                    nodes[node] = (score, kind)
+        for synonym, target in SYNONYMS.items():
+            if target not in index.label_paths:
+                continue  # Synonym for a node this taxonomy version does not have
+            nodes = self.aliases.setdefault(normalize_name(synonym), {})
+            nodes.setdefault(target, (SYNONYM, "synonym"))
+        self._alias_items = list(self.aliases.items())
+        self._match_cache: Dict[str, List[Tuple[str, float, str]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def match(self, name: str) -> List[Tuple[str, float, str]]:
+        """Taxonomy nodes a free-text name may refer to, as (node, score, method)."""
+        cached = self._match_cache.get(name)
+        if cached is not None:
+            return cached
+        key = normalize_name(name)
+        matches = []
+        exact = self.aliases.get(key)
+        if exact:
+            for node, (score, kind) in exact.items():
+                matches.append((node, score, "exact" if node == name else kind))
+        elif key:
+            best: Dict[str, float] = {}
+            for alias, nodes in self._alias_items:
+                matcher = SequenceMatcher(None, key, alias)
+                if matcher.real_quick_ratio() < FUZZY_FLOOR or matcher.quick_ratio() < FUZZY_FLOOR:
+                    continue
+                ratio = matcher.ratio()
+                if ratio < FUZZY_FLOOR:
+                    continue
+                for node, (score, _) in nodes.items():
+                    best[node] = max(best.get(node, 0.0), ratio * score)
+            matches = [(node, score, "edit distance") for node, score in best.items()]
+        matches.sort(key=lambda m: -m[1])
+        with self._cache_lock:
+            if len(self._match_cache) > 50_000:
+                self._match_cache.clear()
+            self._match_cache[name] = matches
+        return matches
+
+    def _same(self, given: str, node: str) -> bool:
+        return given == node or any(m[0] == node and m[1] >= PART for m in self.match(given))
+
+    def walk(self, hierarchy: HierarchyTuple) -> Optional[Repair]:
+        """Resolves the hierarchy level by level within the allowed children."""
+        prefix: Tuple[Optional[str], ...] = ()
+        confidence = 1.0
+        methods = []
+        for depth, name in enumerate(hierarchy):
+            allowed = self.index.children.get(prefix)
+            if allowed is None:
+                return None
+            if name is None or name in allowed:
+                if name is None and None not in allowed:
+                    return None
+                prefix += (name,)
+                continue
+            candidates = [m for m in self.match(name) if m[0] in allowed]
+            if not candidates:
+                if None in allowed:
+                    # Extra level that exists nowhere under this prefix: stop here
+                    prefix += (None,) * (4 - depth)
+                    methods.append(f"dropped {HIERARCHY_LEVELS[depth]} '{name}'")
+                    break
+                return None
+            if len(candidates) > 1 and candidates[1][1] > candidates[0][1] - AMBIGUITY_MARGIN:
+                return None
+            node, score, method = candidates[0]
+            prefix += (node,)
+            confidence = min(confidence, score)
+            methods.append(f"{method} '{name}' -> '{node}'")
+        if prefix not in self.index.valid:
+            return None
+        return Repair(prefix, None, confidence, "; ".join(methods))
+
+    def _target(self, path: Tuple[str, ...]) -> Optional[Tuple[HierarchyTuple, Optional[str]]]:
+        if len(path) == 5:
+            return path[:4], path[4]
+        hierarchy = path + (None,) * (4 - len(path))
+        return (hierarchy, None) if hierarchy in self.index.valid else None
+
+    def relocate(self, hierarchy: HierarchyTuple, label: Optional[str]) -> Optional[Repair]:
+        """Places the deepest given level or the label at its path from the reverse label index."""
+        given = [level for level in hierarchy if level is not None]
+        anchors = []
+        if given:
+            anchors.append((HIERARCHY_LEVELS[len(given) - 1], given[-1]))
+        if label and label not in given:
+            anchors.append(("label", label))
+
+        scored: Dict[Tuple[HierarchyTuple, Optional[str]], Repair] = {}
+        for anchor_kind, anchor in anchors:
+            for node, score, method in self.match(anchor):
+                for path in self.index.paths_for_label(node):
+                    target = self._target(path)
+                    if target is None:
+                        continue  # Inner node: which leaf was meant is unknown
+                    # Agreement of the given levels above the anchor with the found path
+                    context = [(i, self._same(hierarchy[i], path[i])) for i in range(min(len(path) - 1, 4))
+                               if hierarchy[i] is not None and hierarchy[i] != anchor]
+                    agreed = [same for _, same in context]
+                    if context and (not any(agreed) or context[0] == (0, False)):
+                        continue  # Every given level contradicts the path, or it changes the domain
+                    agreement = sum(agreed) / len(agreed) if agreed else 0.0
+                    confidence = score * (CONTEXT_BASE + (1 - CONTEXT_BASE) * agreement)
+                    previous = scored.get(target)
+                    if previous is None or confidence > previous.confidence:
+                        scored[target] = Repair(
+                            target[0], target[1], confidence,
+                            f"{method} {anchor_kind} '{anchor}' -> '{' > '.join(path)}'",
+                        )
+        if not scored:
+            return None
+        ranked = sorted(scored.values(), key=lambda r: -r.confidence)
+        if len(ranked) > 1 and ranked[1].confidence > ranked[0].confidence - AMBIGUITY_MARGIN:
+            return None
+        return ranked[0]
+
+    def repair(self, hierarchy: HierarchyTuple, label: Optional[str] = None,
+               threshold: Optional[float] = None) -> Optional[Repair]:
+        """
+        Nearest valid path for an invalid hierarchy, or None.
+
+        Among the walk and relocation results at or above ``threshold``
+        (default TAXONOMY_REPAIR_THRESHOLD) the most specific path wins,
+        then the more confident one.
+        """
+        threshold = TAXONOMY_REPAIR_THRESHOLD if threshold is None else threshold
+        candidates = [r for r in (self.walk(hierarchy), self.relocate(hierarchy, label))
+                      if r is not None and r.confidence >= threshold]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda r: (r.depth(), r.confidence))
+
+
+if __name__ == "__main__":
+    from .config import TAXONOMY_DIR
+    from .taxonomy_utils import get_taxonomy_index, load_taxonomy
+
+    parser = argparse.ArgumentParser(description="Show the repair for one theme hierarchy.")
+    parser.add_argument("path", help='Hierarchy as "domain > subdomain > category > subcategory"')
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--threshold", type=float, default=TAXONOMY_REPAIR_THRESHOLD)
+    args = parser.parse_args()
+
+    levels = [level.strip() or None for level in args.path.split(">")][:4]
+    hierarchy = tuple(levels + [None] * (4 - len(levels)))
+    repairer = get_taxonomy_index(load_taxonomy(TAXONOMY_DIR / "taxonomy.json")).repairer
+    result = repairer.repair(hierarchy, args.label, threshold=args.threshold)
+    if result is None:
+        print("No repair above threshold")
+    else:
+        print(" > ".join(level for level in result.hierarchy if level)
+              + (f" (label: {result.leaf})" if result.leaf else ""))
+        print(f"Confidence {result.confidence:.2f} via {result.method}")
@@ -1,13 +1,260 @@
 """
 Taxonomy utilities for flattening and validating taxonomy hierarchies.
+
+All helpers share one ``TaxonomyIndex`` per taxonomy version (see
+``get_taxonomy_index``), so the taxonomy is flattened and the prompt rendered
+once per process instead of once per inscription.
 """
-import json
+import hashlib
 import logging
+import threading
+from functools import cached_property
 from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
 
+from . import codec
+from .metrics import METRICS
+
 logger = logging.getLogger(__name__)
 
+HierarchyTuple = Tuple[str, Optional[str], Optional[str], Optional[str]]
+HIERARCHY_LEVELS = ("domain", "subdomain", "category", "subcategory")
+
+PROMPT_HEADER = """VALID TAXONOMY PATHS - USE ONLY THESE EXACT COMBINATIONS:
+═══════════════════════════════════════════════════════════════════════════════
+You MUST use ONLY the paths listed below. Do NOT invent new categories or subcategories.
+If a path ends without a subcategory, set "subcategory": null in your JSON.
+For paths with a 5th level, use the 4th level as subcategory and the 5th level as label.
+
+Format: domain > subdomain > category > subcategory (if exists)
+═══════════════════════════════════════════════════════════════════════════════
+
+"""
+
+
+def hierarchy_tuple(hierarchy: dict) -> HierarchyTuple:
+    """(domain, subdomain, category, subcategory) with empty values as None."""
+    return tuple(hierarchy.get(level) or None for level in HIERARCHY_LEVELS)
+
+
+def _prefix_children(valid: Set[HierarchyTuple]) -> Dict[tuple, Set[Optional[str]]]:
+    """Prefix tuple (0-3 levels) -> values allowed at the next level."""
+    children: Dict[tuple, Set[Optional[str]]] = {}
+    for hierarchy in valid:
+        for depth in range(4):
+            children.setdefault(hierarchy[:depth], set()).add(hierarchy[depth])
+    return children
+
+
+def _explain_invalid(label: str, hierarchy: HierarchyTuple, valid: Set[HierarchyTuple],
+                     children: Dict[tuple, Set[Optional[str]]]) -> str:
+    domain, subdomain, category, subcategory = hierarchy
+    if subcategory is not None and (domain, subdomain, category, None) in valid:
+        return f"Theme '{label}': Hallucinated subcategory '{subcategory}' - this category has no subcategories"
+    categories = children.get((domain, subdomain))
+    if categories is not None and category and category not in categories:
+        return f"Theme '{label}': Invalid category '{category}' under {domain} > {subdomain}"
+    subdomains = children.get((domain,))
+    if subdomains is not None and subdomain and subdomain not in subdomains:
+        return f"Theme '{label}': Invalid subdomain '{subdomain}' under {domain}"
+    if domain not in children.get((), ()):
+        return f"Theme '{label}': Invalid domain '{domain}'"
+    return f"Theme '{label}': Invalid hierarchy path {domain} > {subdomain} > {category} > {subcategory}"
+
+
+class TaxonomyIndex:
+    """
+    Precompiled lookup structures for one taxonomy.
+
+    - ``valid``: set of valid 4-level hierarchy tuples (O(1) validation)
+    - ``children``: prefix tuple -> valid values of the next level (None
+      included where the path may stop), one dict lookup per level
+    - ``fifth_level``: 4-level tuple -> names of its 5th-level leaves
+    - ``label_paths``: node name -> full paths (up to 5 levels) ending there
+    - ``prompt``: the rendered path list, built once
+
+    Instances are immutable after construction and shared across threads.
+    """
+
+    def __init__(self, taxonomy: dict):
+        self.version = hashlib.sha256(codec.dumpb(taxonomy, sort_keys=True)).hexdigest()[:16]
+        self.paths: List[Tuple[str, ...]] = []
+        self.valid: Set[HierarchyTuple] = set()
+        self.fifth_level: Dict[HierarchyTuple, Set[str]] = {}
+        self.label_paths: Dict[str, List[Tuple[str, ...]]] = {}
+        self._walk(taxonomy, ())
+        self.children = _prefix_children(self.valid)
+        # 5th-level leaf name -> parent 4-level tuples, for promoting misplaced leaves
+        self.fifth_level_parents: Dict[str, List[HierarchyTuple]] = {}
+        for parent, leaves in self.fifth_level.items():
+            for leaf in leaves:
+                self.fifth_level_parents.setdefault(leaf, []).append(parent)
+
+    def _walk(self, node: dict, prefix: Tuple[str, ...]) -> None:
+        for name, child in node.items():
+            path = prefix + (name,)
+            self.label_paths.setdefault(name, []).append(path)
+            if isinstance(child, dict) and child and len(path) < 5:
+                self._walk(child, path)
+                continue
+            self.paths.append(path)
+            if len(path) == 5:
+                # The schema has four levels; the 5th-level name goes into the label
+                parent = path[:4]
+                self.valid.add(parent)
+                self.fifth_level.setdefault(parent, set()).add(name)
+            else:
+                self.valid.add(path + (None,) * (4 - len(path)))
+
+    @cached_property
+    def prompt_lines(self) -> List[str]:
+        lines = []
+        for path in self.paths:
+            if len(path) == 1:
+                lines.append(f"• {path[0]} > [NO SUBDOMAIN]")
+            elif len(path) == 2:
+                lines.append(f"• {path[0]} > {path[1]} > [NO CATEGORY]")
+            else:
+                lines.append("• " + " > ".join(path))
+        return lines
+
+    @cached_property
+    def prompt(self) -> str:
+        return PROMPT_HEADER + "\n".join(self.prompt_lines)
+
+    @cached_property
+    def repairer(self):
+        """Nearest-valid-path search (``taxonomy_repair.PathRepairer``), built on first use."""
+        from .taxonomy_repair import PathRepairer
+
+        return PathRepairer(self)
+
+    def is_valid(self, hierarchy: HierarchyTuple) -> bool:
+        return hierarchy in self.valid
+
+    def paths_for_label(self, label: str) -> List[Tuple[str, ...]]:
+        """Full paths whose last node is ``label`` (any level)."""
+        return self.label_paths.get(label, [])
+
+    def validate_theme(self, theme: dict) -> Tuple[bool, str]:
+        """Validates one theme with constant-time lookups (see ``validate_theme_hierarchy``)."""
+        hierarchy = hierarchy_tuple(theme.get("hierarchy", {}))
+        if hierarchy in self.valid:
+            return True, ""
+        return False, _explain_invalid(theme.get("label", "Unknown"), hierarchy, self.valid, self.children)
+
+    def unrepairable(self, theme: dict) -> Optional[str]:
+        """
+        Error message for a theme ``prune`` would have to remove; None when the
+        theme is valid or can be moved, repaired or pruned to a valid path.
+
+        Nothing is modified and no metrics are recorded, so this is safe to
+        call on partial responses (see ``tagger.build_stream_checks``).
+        """
+        hierarchy = hierarchy_tuple(theme.get("hierarchy", {}))
+        if hierarchy in self.valid:
+            return None
+        d, sd, c, sc = hierarchy
+        if any(parent[:3] == (d, sd, c) for parent in self.fifth_level_parents.get(sc, ())):
+            return None
+        if any(prefix in self.valid for prefix in ((d, sd, c, None), (d, sd, None, None), (d, None, None, None))):
+            return None
+        label = theme.get("label", "Unknown")
+        if self.repairer.repair(hierarchy, label) is not None:
+            return None
+        return _explain_invalid(label, hierarchy, self.valid, self.children)
+
+    def prune(self, theme: dict, repair_threshold: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Makes a theme's hierarchy valid in place.
+
+        When pruning would lose the category, the nearest valid path is tried
+        first (see ``taxonomy_repair``); ``repair_threshold`` overrides
+        TAXONOMY_REPAIR_THRESHOLD (above 1 disables repairs).
+
+        Returns (keep, correction): ``keep`` is False when the theme has to be
+        removed; ``correction`` describes the change (None if already valid).
+        """
+        hierarchy = theme.get("hierarchy", {})
+        label = theme.get("label", "Unknown")
+        d, sd, c, sc = hierarchy_tuple(hierarchy)
+
+        if (d, sd, c, sc) in self.valid:
+            return True, None
+
+        # 5th-level leaf given as subcategory: move it to the label under its real parent
+        for parent in self.fifth_level_parents.get(sc, ()):
+            if parent[:3] == (d, sd, c):
+                hierarchy["subcategory"] = parent[3]
+                theme["hierarchy"] = hierarchy
+                theme["label"] = sc
+                return True, f"Theme '{label}': Moved 5th-level '{sc}' to label under subcategory '{parent[3]}'"
+
+        if (d, sd, c, None) not in self.valid:
+            repair = self.repairer.repair((d, sd, c, sc), label, repair_threshold)
+            if repair is not None:
+                METRICS.incr("taxonomy.repaired")
+                hierarchy.update(zip(HIERARCHY_LEVELS, repair.hierarchy))
+                theme["hierarchy"] = hierarchy
+                if repair.leaf is not None:
+                    theme["label"] = repair.leaf
+                new_path = " > ".join(level for level in repair.hierarchy + (repair.leaf,) if level)
+                return True, (f"Theme '{label}': Repaired path {d}>{sd}>{c}>{sc} -> {new_path} "
+                              f"({repair.method}, confidence {repair.confidence:.2f})")
+
+        if (d, sd, c, None) in self.valid:
+            hierarchy["subcategory"] = None
+            theme["hierarchy"] = hierarchy
+            return True, f"Theme '{label}': Pruned invalid subcategory '{sc}' -> kept category '{c}'"
+
+        if (d, sd, None, None) in self.valid:
+            hierarchy["subcategory"] = None
+            hierarchy["category"] = None
+            theme["hierarchy"] = hierarchy
+            return True, f"Theme '{label}': Pruned invalid category '{c}' -> kept subdomain '{sd}'"
+
+        if (d, None, None, None) in self.valid:
+            hierarchy["subcategory"] = None
+            hierarchy["category"] = None
+            hierarchy["subdomain"] = None
+            theme["hierarchy"] = hierarchy
+            return True, f"Theme '{label}': Pruned invalid subdomain '{sd}' -> kept domain '{d}'"
+
+        return False, f"Theme '{label}': REMOVED entire theme. Path {d}>{sd}>{c}>{sc} is invalid."
+
+
+_INDEX_LOCK = threading.Lock()
+# Dicts are held to keep their ids from being reused, so both maps are capped
+# (oldest entry evicted) for processes that load many taxonomy copies
+_MAX_INDEXED = 16
+_INDEX_BY_OBJECT: Dict[int, Tuple[dict, TaxonomyIndex]] = {}
+_INDEX_BY_VERSION: Dict[str, TaxonomyIndex] = {}
+
+
+def _bounded_set(cache: dict, key, value) -> None:
+    cache.pop(key, None)
+    while len(cache) >= _MAX_INDEXED:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+
+def get_taxonomy_index(taxonomy: dict) -> TaxonomyIndex:
+    """
+    Returns the shared index for a taxonomy dict.
+
+    Lookups for the same dict object are a single dict access; an equal
+    taxonomy loaded again (same version hash) reuses the existing index.
+    """
+    entry = _INDEX_BY_OBJECT.get(id(taxonomy))
+    if entry is not None and entry[0] is taxonomy:
+        return entry[1]
+    with _INDEX_LOCK:
+        index = TaxonomyIndex(taxonomy)
+        index = _INDEX_BY_VERSION.get(index.version, index)
+        _bounded_set(_INDEX_BY_VERSION, index.version, index)
+        _bounded_set(_INDEX_BY_OBJECT, id(taxonomy), (taxonomy, index))
+        return index
+
 
 def flatten_taxonomy(taxonomy: dict) -> Tuple[List[str], Set[str]]:
     """
@@ -20,43 +267,10 @@ def flatten_taxonomy(taxonomy: dict) -> Tuple[List[str], Set[str]]:
         Tuple of:
         - List of formatted path strings for the prompt
         - Set of all valid (domain, subdomain, category, subcategory) tuples
+          (5th-level paths are valid at their 4-level parent)
     """
-    paths = []
-    valid_tuples: Set[Tuple[str, Optional[str], Optional[str], Optional[str]]] = set()
-
-    for domain, subdomains in taxonomy.items():
-        if not isinstance(subdomains, dict) or not subdomains:
-            # Domain with no subdomains
-            paths.append(f"• {domain} > [NO SUBDOMAIN]")
-            valid_tuples.add((domain, None, None, None))
-            continue
-
-        for subdomain, categories in subdomains.items():
-            if not isinstance(categories, dict) or not categories:
-                # Subdomain with no categories
-                paths.append(f"• {domain} > {subdomain} > [NO CATEGORY]")
-                valid_tuples.add((domain, subdomain, None, None))
-                continue
-
-            for category, subcategories in categories.items():
-                if not isinstance(subcategories, dict) or not subcategories:
-                    # Category with no subcategories - this is valid, subcategory must be null
-                    paths.append(f"• {domain} > {subdomain} > {category}")
-                    valid_tuples.add((domain, subdomain, category, None))
-                else:
-                    # Category has subcategories
-                    for subcategory, sub_sub in subcategories.items():
-                        if not isinstance(sub_sub, dict) or not sub_sub:
-                            paths.append(f"• {domain} > {subdomain} > {category} > {subcategory}")
-                            valid_tuples.add((domain, subdomain, category, subcategory))
-                        else:
-                            # Handle 5th level (rare, but exists in taxonomy)
-                            for sub_sub_cat in sub_sub.keys():
-                                paths.append(f"• {domain} > {subdomain} > {category} > {subcategory} > {sub_sub_cat}")
-                                # Still store as 4-tuple, using deepest meaningful level
-                                valid_tuples.add((domain, subdomain, category, subcategory))
-
-    return paths, valid_tuples
+    index = get_taxonomy_index(taxonomy)
+    return list(index.prompt_lines), set(index.valid)
 
 
 def format_taxonomy_for_prompt(taxonomy: dict) -> str:
@@ -67,77 +281,34 @@ def format_taxonomy_for_prompt(taxonomy: dict) -> str:
         taxonomy: Nested taxonomy dict
 
     Returns:
-        Formatted string listing all valid taxonomy paths
+        Formatted string listing all valid taxonomy paths (memoized per taxonomy)
     """
-    paths, _ = flatten_taxonomy(taxonomy)
-
-    header = """VALID TAXONOMY PATHS - USE ONLY THESE EXACT COMBINATIONS:
-═══════════════════════════════════════════════════════════════════════════════
-You MUST use ONLY the paths listed below. Do NOT invent new categories or subcategories.
-If a path ends without a subcategory, set "subcategory": null in your JSON.
-
-Format: domain > subdomain > category > subcategory (if exists)
-═══════════════════════════════════════════════════════════════════════════════
-
-"""
-    return header + "\n".join(paths)
+    return get_taxonomy_index(taxonomy).prompt
 
 
 def validate_theme_hierarchy(
     theme: dict,
-    valid_tuples: Set[Tuple[str, Optional[str], Optional[str], Optional[str]]]
+    valid_tuples
 ) -> Tuple[bool, str]:
     """
     Validates a single theme's hierarchy against valid taxonomy paths.
 
     Args:
         theme: Theme dict with 'hierarchy' field
-        valid_tuples: Set of valid (domain, subdomain, category, subcategory) tuples
+        valid_tuples: A ``TaxonomyIndex``, or a set of valid
+            (domain, subdomain, category, subcategory) tuples
 
     Returns:
         Tuple of (is_valid, error_message)
     """
-    hierarchy = theme.get("hierarchy", {})
-    label = theme.get("label", "Unknown")
-
-    domain = hierarchy.get("domain")
-    subdomain = hierarchy.get("subdomain")
-    category = hierarchy.get("category")
-    subcategory = hierarchy.get("subcategory")
-
-    # Normalize None values
-    subdomain = subdomain if subdomain else None
-    category = category if category else None
-    subcategory = subcategory if subcategory else None
-
-    theme_tuple = (domain, subdomain, category, subcategory)
-
-    if theme_tuple in valid_tuples:
+    if isinstance(valid_tuples, TaxonomyIndex):
+        return valid_tuples.validate_theme(theme)
+    hierarchy = hierarchy_tuple(theme.get("hierarchy", {}))
+    if hierarchy in valid_tuples:
         return True, ""
-
-    # Check for hallucinated subcategory
-    base_tuple = (domain, subdomain, category, None)
-    if base_tuple in valid_tuples and subcategory is not None:
-        return False, f"Theme '{label}': Hallucinated subcategory '{subcategory}' - this category has no subcategories"
-
-    # Check for invalid category
-    for valid in valid_tuples:
-        if valid[0] == domain and valid[1] == subdomain:
-            if category and category not in [v[2] for v in valid_tuples if v[0] == domain and v[1] == subdomain]:
-                return False, f"Theme '{label}': Invalid category '{category}' under {domain} > {subdomain}"
-
-    # Check for invalid subdomain
-    for valid in valid_tuples:
-        if valid[0] == domain:
-            if subdomain and subdomain not in [v[1] for v in valid_tuples if v[0] == domain]:
-                return False, f"Theme '{label}': Invalid subdomain '{subdomain}' under {domain}"
-
-    # Check for invalid domain
-    valid_domains = {v[0] for v in valid_tuples}
-    if domain not in valid_domains:
-        return False, f"Theme '{label}': Invalid domain '{domain}'"
-
-    return False, f"Theme '{label}': Invalid hierarchy path {domain} > {subdomain} > {category} > {subcategory}"
+    # Bare tuple set: build the prefix lookups once for the error message
+    children = _prefix_children(valid_tuples)
+    return False, _explain_invalid(theme.get("label", "Unknown"), hierarchy, valid_tuples, children)
 
 
 def validate_taxonomy_compliance(
@@ -154,13 +325,11 @@ def validate_taxonomy_compliance(
     Returns:
         Tuple of (all_valid, list_of_errors)
     """
-    _, valid_tuples = flatten_taxonomy(taxonomy)
+    index = get_taxonomy_index(taxonomy)
     errors = []
 
-    themes = tagged_data.get("themes", [])
-
-    for theme in themes:
-        is_valid, error = validate_theme_hierarchy(theme, valid_tuples)
+    for theme in tagged_data.get("themes", []):
+        is_valid, error = index.validate_theme(theme)
         if not is_valid:
             errors.append(error)
 
@@ -169,101 +338,63 @@ def validate_taxonomy_compliance(
 
 def enforce_taxonomy_compliance(
     tagged_data: dict,
-    taxonomy: dict
+    taxonomy: dict,
+    repair_threshold: Optional[float] = None
 ) -> Tuple[dict, List[str]]:
     """
-    Strictly enforces taxonomy compliance by pruning invalid levels or removing invalid themes.
-    
+    Strictly enforces taxonomy compliance by repairing or pruning invalid levels or removing invalid themes.
+
     Logic:
     1. Check if full path (domain, subdomain, category, subcategory) is valid.
-    2. If not, try pruning 'subcategory'.
-    3. If still not valid, try pruning 'category'.
-    4. If still not valid, try pruning 'subdomain'.
-    5. If still not valid, REMOVE the theme entirely.
+    2. If the subcategory is a 5th-level leaf, move it to the label under its parent.
+    3. If pruning would lose the category, repair to the nearest valid path
+       (case/diacritics, synonyms and German labels, edit distance, reverse
+       label index) when confident enough.
+    4. If not, try pruning 'subcategory'.
+    5. If still not valid, try pruning 'category'.
+    6. If still not valid, try pruning 'subdomain'.
+    7. If still not valid, REMOVE the theme entirely.
 
     Args:
         tagged_data: The full tagged inscription dict
         taxonomy: The taxonomy dict
+        repair_threshold: Minimum repair confidence (default TAXONOMY_REPAIR_THRESHOLD)
 
     Returns:
         Tuple of (corrected_data, list_of_corrections_made)
     """
-    _, valid_tuples = flatten_taxonomy(taxonomy)
+    index = get_taxonomy_index(taxonomy)
     corrections = []
     valid_themes = []
 
-    themes = tagged_data.get("themes", [])
-
-    for theme in themes:
-        hierarchy = theme.get("hierarchy", {})
-        label = theme.get("label", "Unknown")
-
-        # Extract current path
-        d = hierarchy.get("domain")
-        sd = hierarchy.get("subdomain")
-        c = hierarchy.get("category")
-        sc = hierarchy.get("subcategory")
-        
-        # Normalize to None if empty string or None
-        d = d if d else None
-        sd = sd if sd else None
-        c = c if c else None
-        sc = sc if sc else None
-
-        # 1. Check exact match
-        if (d, sd, c, sc) in valid_tuples:
-            valid_themes.append(theme)
-            continue
-
-        # 2. Try pruning subcategory
-        if (d, sd, c, None) in valid_tuples:
-            corrections.append(f"Theme '{label}': Pruned invalid subcategory '{sc}' -> kept category '{c}'")
-            hierarchy["subcategory"] = None
-            theme["hierarchy"] = hierarchy
-            valid_themes.append(theme)
-            continue
-
-        # 3. Try pruning category
-        if (d, sd, None, None) in valid_tuples:
-            corrections.append(f"Theme '{label}': Pruned invalid category '{c}' -> kept subdomain '{sd}'")
-            hierarchy["subcategory"] = None
-            hierarchy["category"] = None
-            theme["hierarchy"] = hierarchy
-            valid_themes.append(theme)
-            continue
-            
-        # 4. Try pruning subdomain
-        if (d, None, None, None) in valid_tuples:
-            corrections.append(f"Theme '{label}': Pruned invalid subdomain '{sd}' -> kept domain '{d}'")
-            hierarchy["subcategory"] = None
-            hierarchy["category"] = None
-            hierarchy["subdomain"] = None
-            theme["hierarchy"] = hierarchy
+    for theme in tagged_data.get("themes", []):
+        keep, correction = index.prune(theme, repair_threshold)
+        if correction:
+            corrections.append(correction)
+        if keep:
             valid_themes.append(theme)
-            continue
 
-        # 5. Drop theme if nothing fits
-        corrections.append(f"Theme '{label}': REMOVED entire theme. Path {d}>{sd}>{c}>{sc} is invalid.")
-    
     tagged_data["themes"] = valid_themes
     return tagged_data, corrections
 
 
 def load_taxonomy(taxonomy_path: Path) -> dict:
     """Load taxonomy from JSON file."""
-    with open(taxonomy_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return codec.load_file(taxonomy_path)
 
 
 # Quick test
 if __name__ == "__main__":
-    from .config import TAXONOMY_PATH
+    from .config import TAXONOMY_DIR
 
-    taxonomy = load_taxonomy(TAXONOMY_PATH)
+    taxonomy = load_taxonomy(TAXONOMY_DIR / "taxonomy.json")
+    index = get_taxonomy_index(taxonomy)
     paths, tuples = flatten_taxonomy(taxonomy)
 
+    print(f"Taxonomy version: {index.version}")
     print(f"Total valid paths: {len(paths)}")
     print(f"Total valid tuples: {len(tuples)}")
+    print(f"5th-level leaves: {sum(len(v) for v in index.fifth_level.values())} under {len(index.fifth_level)} subcategories")
     print("\nSample paths:")
     for p in paths[:20]:
         print(p)
@@ -1,8 +1,52 @@
-import json
+"""
+Structural validation of tagged outputs.
+
+``validate_outputs`` checks every output file in one pass: the record schema
+(``records.TaggedRecord``, the fast mirror of ``schema.TaggedInscription``),
+the taxonomy (every theme hierarchy must be a valid path, see
+``TaxonomyIndex``) and that ``phi_id`` matches the file name.
+
+- files are streamed through a process pool; ``max_failures`` stops the run
+  early once that many invalid files were found (CI fail-fast)
+- each error gets a class (``decode``, ``schema:themes[].hierarchy.domain``,
+  ``taxonomy:category``, ...) and the report counts files per class
+- the report (JSON plus one CSV row per error) stores a content hash per
+  file; the next run re-validates only files whose hash changed, or all
+  files if the taxonomy changed
+
+Usage:
+    python -m source.validation [--full] [--max-failures N] [--dir DIR]
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
+
 from pydantic import BaseModel, Field
 
+from . import codec
+from .batch_rewrite import PARALLEL_MIN_BATCH
+from .config import MAINTENANCE_WORKERS, OUTPUT_DIR, TAXONOMY_DIR, VALIDATION_DIR, VALIDATION_MAX_FAILURES
+from .records import RecordError, TaggedRecord
+from .taxonomy_utils import get_taxonomy_index, load_taxonomy
+
+logger = logging.getLogger(__name__)
+
+REPORT_NAME = "validation_report.json"
+ERRORS_CSV_NAME = "validation_errors.csv"
+
+ErrorList = List[Tuple[str, str]]  # (error class, message)
+
+
 class ValidationMetrics(BaseModel):
     total_samples: int = 0
     valid_structural: int = 0
@@ -11,21 +55,232 @@ class ValidationMetrics(BaseModel):
     partial_matches: int = 0
     mismatches: int = 0
 
+
+# --- Per-file checks (run in the worker processes) ---
+
+_TAXONOMY_INDEX = None
+
+
+def _init_worker(taxonomy: Optional[dict]) -> None:
+    global _TAXONOMY_INDEX
+    _TAXONOMY_INDEX = get_taxonomy_index(taxonomy) if taxonomy is not None else None
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _schema_class(message: str) -> str:
+    """``[12] themes[0].hierarchy.domain: field required`` -> ``schema:themes[].hierarchy.domain``"""
+    message = re.sub(r"^\[[^\]]*\] ", "", message)
+    return "schema:" + re.sub(r"\[\d+\]", "[]", message.split(":", 1)[0])
+
+
+def _taxonomy_class(message: str) -> str:
+    match = re.search(r": Invalid (\w+)", message)
+    level = match.group(1) if match else "path"
+    return f"taxonomy:{'path' if level == 'hierarchy' else level}"
+
+
+def check_data(name: str, data, index=None) -> ErrorList:
+    """Schema, taxonomy and file name checks for one decoded output."""
+    try:
+        record = TaggedRecord.from_dict(data)
+    except RecordError as e:
+        return [(_schema_class(str(e)), str(e))]
+
+    errors: ErrorList = []
+    stem = Path(name).stem
+    if stem.isdigit() and int(stem) != record.phi_id:
+        errors.append(("phi_id:filename", f"phi_id {record.phi_id} does not match file name {name}"))
+    if index is not None:
+        for theme in data.get("themes") or []:
+            ok, message = index.validate_theme(theme)
+            if not ok:
+                errors.append((_taxonomy_class(message), message))
+    return errors
+
+
+@dataclass
+class FileCheck:
+    name: str
+    digest: Optional[str]
+    errors: ErrorList = field(default_factory=list)
+    cached: bool = False  # Content unchanged since the previous report; errors not re-computed
+
+
+def check_file(path: Path, previous_digest: Optional[str] = None) -> FileCheck:
+    """Validates one file unless its content hash equals ``previous_digest``."""
+    try:
+        raw = path.read_bytes()
+    except OSError as e:
+        return FileCheck(path.name, None, [("io", f"{type(e).__name__}: {e}")])
+    digest = content_hash(raw)
+    if digest == previous_digest:
+        return FileCheck(path.name, digest, cached=True)
+    try:
+        data = codec.loads(raw)
+    except codec.DECODE_ERRORS as e:
+        return FileCheck(path.name, digest, [("decode", f"{type(e).__name__}: {e}")])
+    return FileCheck(path.name, digest, check_data(path.name, data, _TAXONOMY_INDEX))
+
+
+def _check_task(task: Tuple[Path, Optional[str]]) -> FileCheck:
+    return check_file(*task)
+
+
+# --- Report ---
+
+@dataclass
+class ValidationReport:
+    directory: str = ""
+    taxonomy_version: Optional[str] = None
+    files: int = 0
+    checked: int = 0  # Validated in this run
+    reused: int = 0  # Unchanged since the previous report
+    invalid: int = 0
+    stopped_early: bool = False
+    seconds: float = 0.0
+    workers: int = 1
+    error_counts: Dict[str, int] = field(default_factory=dict)  # Error class -> files with that error
+    errors: Dict[str, ErrorList] = field(default_factory=dict)
+    hashes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def valid(self) -> int:
+        return self.checked + self.reused - self.invalid
+
+    def add(self, result: FileCheck, previous: Optional["ValidationReport"]) -> None:
+        if result.cached:
+            self.reused += 1
+            errors = previous.errors.get(result.name, []) if previous else []
+        else:
+            self.checked += 1
+            errors = result.errors
+        if result.digest is not None:
+            self.hashes[result.name] = result.digest
+        if errors:
+            self.invalid += 1
+            self.errors[result.name] = errors
+            for error_class in {error_class for error_class, _ in errors}:
+                self.error_counts[error_class] = self.error_counts.get(error_class, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+            "directory": self.directory,
+            "taxonomy_version": self.taxonomy_version,
+            "files": self.files,
+            "checked": self.checked,
+            "reused": self.reused,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "stopped_early": self.stopped_early,
+            "seconds": round(self.seconds, 3),
+            "workers": self.workers,
+            "error_counts": dict(sorted(self.error_counts.items(), key=lambda kv: -kv[1])),
+            "errors": {name: [list(e) for e in errors] for name, errors in sorted(self.errors.items())},
+            "hashes": self.hashes,
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ValidationReport"]:
+        try:
+            data = codec.load_file(path)
+        except (OSError, *codec.DECODE_ERRORS):
+            return None
+        return cls(
+            directory=data.get("directory", ""),
+            taxonomy_version=data.get("taxonomy_version"),
+            errors={name: [tuple(e) for e in errors] for name, errors in data.get("errors", {}).items()},
+            hashes=data.get("hashes", {}),
+        )
+
+    def write(self, report_dir: Path) -> Path:
+        """Writes the JSON report and the per-error CSV; returns the JSON path."""
+        report_dir.mkdir(parents=True, exist_ok=True)
+        report_path = report_dir / REPORT_NAME
+        codec.dump_file(self.to_dict(), report_path, pretty=True, atomic=True)
+        with open(report_dir / ERRORS_CSV_NAME, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "error_class", "message"])
+            for name, errors in sorted(self.errors.items()):
+                writer.writerows([name, error_class, message] for error_class, message in errors)
+        return report_path
+
+    def summary_lines(self) -> List[str]:
+        rate = (self.checked + self.reused) / self.seconds if self.seconds else 0.0
+        lines = [
+            f"Files: {self.files:,}, checked: {self.checked:,}, unchanged since last report: {self.reused:,} "
+            f"({self.seconds:.2f}s, {rate:,.0f} files/s, {self.workers} workers)",
+            f"Valid: {self.valid:,}, invalid: {self.invalid:,}"
+            + (" (stopped early, remaining files not checked)" if self.stopped_early else ""),
+        ]
+        lines.extend(f"{count:6,d}  {error_class}" for error_class, count
+                     in sorted(self.error_counts.items(), key=lambda kv: -kv[1]))
+        return lines
+
+
+# --- Engine ---
+
+def validate_outputs(
+    directory: Path = OUTPUT_DIR,
+    taxonomy: Optional[dict] = None,
+    previous: Optional[ValidationReport] = None,
+    max_failures: int = VALIDATION_MAX_FAILURES,
+    workers: Optional[int] = None,
+) -> ValidationReport:
+    """
+    Validates all output files of a directory.
+
+    Args:
+        directory: Output files to check.
+        taxonomy: Taxonomy to check theme hierarchies against (None skips it).
+        previous: Report of an earlier run; files with the same content hash
+            (and the same taxonomy) keep their previous result.
+        max_failures: Stop after this many invalid files (0 = check all).
+        workers: Process pool size (default: MAINTENANCE_WORKERS, 0 = CPU count).
+    """
+    start = time.perf_counter()
+    version = get_taxonomy_index(taxonomy).version if taxonomy is not None else None
+    if previous is not None and (previous.taxonomy_version != version or previous.directory != str(directory)):
+        previous = None
+    known = previous.hashes if previous is not None else {}
+
+    files = sorted(directory.glob("*.json"))
+    workers = workers or MAINTENANCE_WORKERS or os.cpu_count() or 1
+    if len(files) - len(known) < PARALLEL_MIN_BATCH:
+        workers = 1
+    report = ValidationReport(directory=str(directory), taxonomy_version=version, files=len(files), workers=workers)
+    tasks = [(path, known.get(path.name)) for path in files]
+
+    executor = None
+    if workers == 1:
+        _init_worker(taxonomy)
+        results = map(_check_task, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(taxonomy,))
+        results = executor.map(_check_task, tasks, chunksize=max(1, min(256, len(tasks) // (workers * 8))))
+    try:
+        for result in results:
+            report.add(result, previous)
+            if max_failures and report.invalid >= max_failures:
+                report.stopped_early = report.checked + report.reused < len(files)
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
 def validate_structure(prediction_dir: Path):
     """Checks if all JSON files in the directory match the TaggedInscription schema."""
-    from .schema import TaggedInscription
-    invalid_files = []
-    files = list(prediction_dir.glob("*.json"))
-    
-    for f in files:
-        try:
-            with open(f, 'r', encoding='utf-8') as f_in:
-                data = json.load(f_in)
-                TaggedInscription(**data)
-        except Exception as e:
-            invalid_files.append(f"{f.name}: {str(e)}")
-            
-    return len(files), invalid_files
+    report = validate_outputs(prediction_dir)
+    invalid_files = [f"{name}: {message}" for name, errors in sorted(report.errors.items())
+                     for _, message in errors]
+    return report.files, invalid_files
+
 
 def compare_themes(pred_themes: List[Dict], truth_themes: List[Dict]) -> str:
     """
@@ -34,7 +289,7 @@ def compare_themes(pred_themes: List[Dict], truth_themes: List[Dict]) -> str:
     """
     pred_labels = {t['label'] for t in pred_themes}
     truth_labels = {t['label'] for t in truth_themes}
-    
+
     if pred_labels == truth_labels:
         return 'exact'
     elif not pred_labels.isdisjoint(truth_labels):
@@ -44,45 +299,63 @@ def compare_themes(pred_themes: List[Dict], truth_themes: List[Dict]) -> str:
 
 def run_validation(prediction_dir: Path, ground_truth_dir: Path) -> ValidationMetrics:
     metrics = ValidationMetrics()
-    
+
     pred_files = list(prediction_dir.glob("*.json"))
-    
+
     for pred_path in pred_files:
         filename = pred_path.name
         truth_path = ground_truth_dir / filename
-        
+
         if not truth_path.exists():
             continue
-            
+
         metrics.total_samples += 1
-        
-        pred_data = load_json(pred_path)
-        truth_data = load_json(truth_path)
-        
+
+        pred_data = codec.load_file(pred_path)
+        truth_data = codec.load_file(truth_path)
+
         # Compare themes
         result = compare_themes(pred_data.get('themes', []), truth_data.get('themes', []))
-        
+
         if result == 'exact':
             metrics.exact_matches += 1
         elif result == 'partial':
             metrics.partial_matches += 1
         else:
             metrics.mismatches += 1
-            
+
     return metrics
 
-if __name__ == "__main__":
-    from .config import OUTPUT_DIR
-    
-    print(f"Running structural validation on {OUTPUT_DIR}...")
-    total, invalid = validate_structure(OUTPUT_DIR)
-    
-    print(f"\nResults:")
-    print(f"Total files checked: {total}")
-    print(f"Valid files: {total - len(invalid)}")
-    print(f"Invalid files: {len(invalid)}")
-    
-    if invalid:
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate output files against the schema and the taxonomy.")
+    parser.add_argument("--dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--report-dir", type=Path, default=VALIDATION_DIR)
+    parser.add_argument("--full", action="store_true", help="Re-validate all files, ignoring the previous report")
+    parser.add_argument("--max-failures", type=int, default=VALIDATION_MAX_FAILURES,
+                        help="Stop after this many invalid files (0 = check all)")
+    parser.add_argument("--no-taxonomy", action="store_true", help="Schema checks only")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--show", type=int, default=20, help="Print the errors of the first N invalid files")
+    args = parser.parse_args(argv)
+
+    taxonomy = None if args.no_taxonomy else load_taxonomy(TAXONOMY_DIR / "taxonomy.json")
+    previous = None if args.full else ValidationReport.load(args.report_dir / REPORT_NAME)
+
+    print(f"Running structural validation on {args.dir}...")
+    report = validate_outputs(args.dir, taxonomy, previous, args.max_failures, args.workers)
+    report_path = report.write(args.report_dir)
+
+    print()
+    for line in report.summary_lines():
+        print(line)
+    if report.errors:
         print("\nErrors found in:")
-        for err in invalid:
-            print(f" - {err}")
+        for name, errors in list(sorted(report.errors.items()))[:args.show]:
+            for _, message in errors:
+                print(f" - {name}: {message}")
+    print(f"\nReport: {report_path} (errors: {args.report_dir / ERRORS_CSV_NAME})")
+    return 1 if report.invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
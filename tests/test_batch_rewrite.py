@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from source.batch_rewrite import PARALLEL_MIN_BATCH, rewrite_file, rewrite_files
+from source.enforce_schema_retroactive import enforce_transform, init_taxonomy
+
+_SUFFIX = ""
+
+
+def _init_suffix(suffix):
+    global _SUFFIX
+    _SUFFIX = suffix
+
+
+def _append_suffix(data):
+    data["name"] += _SUFFIX
+    return [f"suffix {_SUFFIX}"]
+
+
+def _keep(data):
+    return ["looked"]
+
+
+def _rename(data):
+    data["name"] = "renamed"
+
+
+def _fail(data):
+    if data["name"] == "bad":
+        raise KeyError("missing")
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return path
+
+
+def test_unchanged_file_is_not_written(tmp_path):
+    path = _write(tmp_path / "1.json", {"name": "x", "n": 1})
+    before = path.stat().st_mtime_ns, path.read_bytes()
+
+    result = rewrite_file(path, _keep)
+    assert result.status == "unchanged"
+    assert result.notes == ["looked"]
+    assert (path.stat().st_mtime_ns, path.read_bytes()) == before
+
+
+def test_changed_file_is_replaced(tmp_path):
+    path = _write(tmp_path / "1.json", {"name": "x"})
+    result = rewrite_file(path, _rename)
+    assert result.status == "changed"
+    assert json.loads(path.read_text(encoding="utf-8")) == {"name": "renamed"}
+    assert [p.name for p in tmp_path.iterdir()] == ["1.json"]
+
+
+def test_dry_run_reports_diff_without_writing(tmp_path):
+    path = _write(tmp_path / "1.json", {"name": "x"})
+    raw = path.read_bytes()
+
+    result = rewrite_file(path, _rename, dry_run=True)
+    assert result.status == "changed"
+    assert result.diff == ["~ $.name: 'x' -> 'renamed'"]
+    assert path.read_bytes() == raw
+
+
+@pytest.mark.parametrize("content, transform, error", [
+    ('{"name": ', _keep, "JSON"),
+    ('{"name": "bad"}', _fail, "KeyError"),
+])
+def test_errors_are_reported_per_file(tmp_path, content, transform, error):
+    bad = tmp_path / "bad.json"
+    bad.write_text(content, encoding="utf-8")
+    good = _write(tmp_path / "good.json", {"name": "x"})
+
+    report = rewrite_files([bad, good], transform, progress=False)
+    assert report.errors == 1
+    assert report.files == 2
+    failed = [r for r in report.results if r.status == "error"]
+    assert [r.name for r in failed] == ["bad.json"]
+    assert error in failed[0].error
+    assert bad.read_text(encoding="utf-8") == content
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_initializer_sets_worker_state(tmp_path, workers):
+    files = [_write(tmp_path / f"{i}.json", {"name": str(i)}) for i in range(PARALLEL_MIN_BATCH)]
+    report = rewrite_files(files, _append_suffix, workers=workers, progress=False,
+                           initializer=_init_suffix, initargs=("-x",))
+    assert report.workers == workers
+    assert report.changed == report.written == len(files)
+    assert {json.loads(f.read_text(encoding="utf-8"))["name"] for f in files} == {f"{i}-x" for i in range(len(files))}
+
+
+def test_enforce_transform_uses_initialized_taxonomy():
+    taxonomy = {"Content": {"Official and Legal Documents": {"Decrees": {}}}}
+    init_taxonomy(taxonomy)
+    data = {"themes": [{"label": "Decrees", "hierarchy": {
+        "domain": "Content", "subdomain": "Official and Legal Documents",
+        "category": "Decrees", "subcategory": "Bogus"}}]}
+    assert enforce_transform(data)
+    assert data["themes"][0]["hierarchy"]["subcategory"] is None
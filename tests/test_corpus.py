@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from source import corpus
+from source.corpus import CorpusSnapshot, build_snapshot
+from source.data_loader import IngestFilter
+
+
+def _record(phi_id, text="ἔδοξεν τῆι βουλῆι"):
+    return {"id": phi_id, "text": text, "region_main": "Attica (IG I-III)", "date_min": -410.0}
+
+
+def _build(source, db_path):
+    return build_snapshot(source, db_path, ingest_filter=IngestFilter())
+
+
+def _changes(stats):
+    return {k: v for k, v in stats.items() if v}
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(corpus, "CHUNK_SIZE", 2)
+
+
+def test_directory_incremental_add_update_remove(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    db_path = tmp_path / "corpus.sqlite"
+    for phi_id in (1, 2, 3):
+        (input_dir / f"{phi_id}.json").write_text(json.dumps(_record(phi_id)), encoding="utf-8")
+
+    assert _changes(_build(input_dir, db_path)) == {"added": 3}
+    assert _changes(_build(input_dir, db_path)) == {"unchanged": 3}
+
+    (input_dir / "2.json").write_text(json.dumps(_record(2, "ὁ δῆμος")), encoding="utf-8")
+    (input_dir / "3.json").unlink()
+    (input_dir / "4.json").write_text(json.dumps(_record(4)), encoding="utf-8")
+    assert _changes(_build(input_dir, db_path)) == {"added": 1, "updated": 1, "unchanged": 1, "removed": 1}
+
+    snapshot = CorpusSnapshot(db_path)
+    assert snapshot.ids() == [1, 2, 4]
+    assert snapshot.get(2).text == "ὁ δῆμος"
+
+
+def test_directory_touched_file_is_not_reparsed(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    db_path = tmp_path / "corpus.sqlite"
+    path = input_dir / "1.json"
+    path.write_text(json.dumps(_record(1)), encoding="utf-8")
+    _build(input_dir, db_path)
+
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 10))
+    assert _changes(_build(input_dir, db_path)) == {"unchanged": 1}
+
+
+def test_stream_incremental_add_update_remove(tmp_path):
+    dump = tmp_path / "phi.jsonl"
+    db_path = tmp_path / "corpus.sqlite"
+
+    def write(records):
+        dump.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+        st = dump.stat()
+        os.utime(dump, (st.st_atime, st.st_mtime + 10))
+
+    write([_record(phi_id) for phi_id in range(1, 6)])
+    assert _changes(_build(dump, db_path)) == {"added": 5}
+    # Unchanged dump: not read again
+    assert _changes(_build(dump, db_path)) == {"unchanged": 5}
+
+    write([_record(1), _record(2, "ὁ δῆμος"), _record(4), _record(5), _record(6)])
+    assert _changes(_build(dump, db_path)) == {"added": 1, "updated": 1, "unchanged": 3, "removed": 1}
+
+    snapshot = CorpusSnapshot(db_path)
+    assert snapshot.ids() == [1, 2, 4, 5, 6]
+    assert snapshot.get(2).text == "ὁ δῆμος"
+
+
+def test_filtered_record_drops_old_row(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    db_path = tmp_path / "corpus.sqlite"
+    path = input_dir / "1.json"
+    path.write_text(json.dumps(_record(1)), encoding="utf-8")
+    _build(input_dir, db_path)
+
+    path.write_text(json.dumps({"id": 1}), encoding="utf-8")
+    assert _changes(_build(input_dir, db_path)) == {"removed": 1, "invalid": 1}
+    assert len(CorpusSnapshot(db_path)) == 0
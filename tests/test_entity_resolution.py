@@ -0,0 +1,37 @@
+import pytest
+
+from source.entity_resolution import Name, name_key, resolve
+
+
+def _clusters(entity_type, *names):
+    entries = [Name(name, name_key(name), count=1) for name in names]
+    return sorted(sorted(c.variants) for c in resolve(entries, entity_type))
+
+
+@pytest.mark.parametrize("entity_type, a, b", [
+    ("places", "Oineis", "Ainis"),
+    ("persons", "Pythagoras", "Peithagoras"),
+])
+def test_distinct_names_stay_apart(entity_type, a, b):
+    assert _clusters(entity_type, a, b) == sorted([[a], [b]])
+
+
+@pytest.mark.parametrize("entity_type, a, b", [
+    ("persons", "Aeschylus", "Aischylos"),
+    ("persons", "Dionysios", "Dionysius"),
+    ("places", "Athenai", "Athenae"),
+    ("places", "Boeotia", "Boiotia"),
+    ("deities", "Dioskouroi", "Dioscuri"),
+])
+def test_spelling_variants_merge(entity_type, a, b):
+    assert _clusters(entity_type, a, b) == [sorted([a, b])]
+
+
+def test_conflicting_uris_stay_apart():
+    entries = [
+        Name("Apollonia", name_key("Apollonia"), 2, {"pleiades.stoa.org/places/491503"}),
+        Name("Apollonia (Illyria)", name_key("Apollonia (Illyria)"), 1, {"pleiades.stoa.org/places/481771"}),
+    ]
+    clusters = resolve(entries, "places")
+    assert len(clusters) == 2
+    assert len({c.entity_id for c in clusters}) == 2
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from source.evaluation import Indicator, doc_counts, evaluate_runs, score
+from source.records import TaggedRecord
+
+THRESHOLDS = np.round(np.linspace(0.0, 1.0, 11), 2)
+
+
+def _random_matrices(seed, n_rows=40, n_cols=12, density=0.2):
+    rng = np.random.default_rng(seed)
+    gold_cells = {(r, c) for r in range(n_rows) for c in range(n_cols) if rng.random() < density}
+    # Predictions overlap the gold set, with duplicate cells (the max score must win)
+    pred = [(r, c, float(rng.choice(THRESHOLDS))) for r in range(n_rows) for c in range(n_cols)
+            if rng.random() < density * 1.5]
+    pred += [(r, c, float(rng.choice(THRESHOLDS))) for r, c, _ in pred[::3]]
+
+    gold = Indicator(n_rows, n_cols, *(np.array(x) for x in zip(*sorted(gold_cells))),
+                     np.ones(len(gold_cells), dtype=np.float32))
+    rows, cols, scores = (np.array(x) for x in zip(*pred))
+    pred_matrix = Indicator(n_rows, n_cols, rows, cols, scores.astype(np.float32))
+    best = {}
+    for r, c, s in pred:
+        best[r, c] = max(best.get((r, c), 0.0), s)
+    return gold, pred_matrix, gold_cells, best
+
+
+def _brute(gold_cells, best, threshold, cols=None):
+    active = {cell for cell, s in best.items() if s >= threshold and (cols is None or cell[1] in cols)}
+    gold = {cell for cell in gold_cells if cols is None or cell[1] in cols}
+    tp = len(active & gold)
+    fp = len(active - gold)
+    fn = len(gold - active)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return tp, fp, fn, precision, recall, f1
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("threshold", [0.0, 0.5, 0.9])
+def test_score_matches_brute_force(seed, threshold):
+    gold, pred, gold_cells, best = _random_matrices(seed)
+    columns = [f"c{i}" for i in range(gold.n_cols)]
+    result = score(gold, pred, columns, threshold, THRESHOLDS)
+
+    tp, fp, fn, precision, recall, f1 = _brute(gold_cells, best, threshold)
+    assert result["support"] == tp + fn
+    assert result["predicted"] == tp + fp
+    assert result["precision"] == pytest.approx(precision)
+    assert result["recall"] == pytest.approx(recall)
+    assert result["f1"] == pytest.approx(f1)
+
+    for t, p, r, f in zip(THRESHOLDS, *(result["sweep"][k] for k in ("precision", "recall", "f1"))):
+        assert (p, r, f) == pytest.approx(_brute(gold_cells, best, t)[3:])
+
+    node_f1 = []
+    for i, name in enumerate(columns):
+        tp, fp, fn, precision, recall, f1 = _brute(gold_cells, best, threshold, {i})
+        if tp + fp + fn == 0:
+            assert name not in result["per_node"]
+            continue
+        node = result["per_node"][name]
+        assert node["support"] == tp + fn
+        assert (node["precision"], node["recall"], node["f1"]) == pytest.approx((precision, recall, f1))
+        node_f1.append(f1)
+    assert result["macro_f1"] == pytest.approx(np.mean(node_f1))
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.5])
+def test_doc_counts_match_brute_force(threshold):
+    gold, pred, gold_cells, best = _random_matrices(7)
+    counts = doc_counts(gold, pred, threshold)
+    for row in range(gold.n_rows):
+        cells = {cell for cell in gold_cells if cell[0] == row}
+        scores = {cell: s for cell, s in best.items() if cell[0] == row}
+        assert tuple(counts[:, row]) == _brute(cells, scores, threshold)[:3]
+
+
+def test_evaluate_runs_counts_missing_inscriptions_as_empty():
+    def record(phi_id, *paths):
+        return TaggedRecord.from_dict({"phi_id": phi_id, "themes": [
+            {"label": path[-1], "rationale": "", "confidence": 1.0,
+             "hierarchy": dict(zip(("domain", "subdomain", "category"), path))}
+            for path in paths
+        ]})
+
+    gold = {1: record(1, ("Content", "Official", "Decrees")), 2: record(2, ("Content", "Religious"))}
+    run = {1: record(1, ("Content", "Official", "Laws"))}
+    result = evaluate_runs(gold, {"run": run})["run"]
+
+    assert result["missing"] == 1
+    domain, subdomain, category = (result["levels"][k] for k in ("domain", "subdomain", "category"))
+    assert (domain["support"], domain["predicted"], domain["recall"]) == (2, 1, 0.5)
+    assert (subdomain["precision"], subdomain["recall"]) == (1.0, 0.5)
+    assert (category["precision"], category["recall"]) == (0.0, 0.0)
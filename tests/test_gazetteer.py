@@ -0,0 +1,115 @@
+import csv
+import gzip
+import os
+
+import pytest
+
+from source import gazetteer
+from source.gazetteer import PleiadesGazetteer, load_scoring
+
+PLACES = [
+    {"id": "1", "featureTypes": "settlement", "timePeriods": "classical"},
+    {"id": "2", "featureTypes": "deme", "timePeriods": "classical,hellenistic"},
+    {"id": "5", "featureTypes": "island", "timePeriods": "classical"},
+]
+NAMES = [
+    # Halai: settlement (precise) wins by prior, the island wins for place type "Island"
+    {"pid": "/places/1", "locationPrecision": "precise", "nameTransliterated": "Halai", "title": "", "nameAttested": ""},
+    {"pid": "/places/5", "locationPrecision": "rough", "nameTransliterated": "Halai", "title": "", "nameAttested": ""},
+    {"pid": "/places/2", "locationPrecision": "precise", "nameTransliterated": "Aixone", "title": "Aixone (deme)",
+     "nameAttested": "Αἰξωνή"},
+    # No place metadata: found by name, ranked by precision only
+    {"pid": "/places/99", "locationPrecision": "rough", "nameTransliterated": "Nowhere", "title": "", "nameAttested": ""},
+    {"pid": "errata/1", "locationPrecision": "precise", "nameTransliterated": "Errata", "title": "", "nameAttested": ""},
+]
+
+
+def _write_csv(path, rows):
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    # Distinct mtime for every rewrite, however coarse the file system clock
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def dumps(tmp_path, monkeypatch):
+    names, places = tmp_path / "names.csv.gz", tmp_path / "places.csv.gz"
+    _write_csv(names, NAMES)
+    _write_csv(places, PLACES)
+    monkeypatch.setattr(gazetteer, "NAMES_FILE", names)
+    monkeypatch.setattr(gazetteer, "PLACES_FILE", places)
+    return names, places
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build_index = gazetteer.build_index
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return build_index(*args, **kwargs)
+
+    monkeypatch.setattr(gazetteer, "build_index", counting)
+    return calls
+
+
+def _open(tmp_path, scoring=None):
+    gaz = PleiadesGazetteer(tmp_path / "index", scoring or load_scoring(None))
+    gaz.load()
+    assert gaz.loaded
+    return gaz
+
+
+def test_search_and_rank(dumps, tmp_path):
+    gaz = _open(tmp_path)
+    assert gaz.search("Halai") == "https://pleiades.stoa.org/places/1"
+    assert gaz.rank("Halai") == [(1, 6.0), (5, 3.0)]
+    # Accents, case and the attested Greek name all normalize to the same key
+    assert gaz.search("aixone (DEME)") == "https://pleiades.stoa.org/places/2"
+    assert gaz.search("Αιξωνη") == "https://pleiades.stoa.org/places/2"
+    assert gaz.rank("Nowhere", "Island") == [(99, 0.0)]
+    assert gaz.search("Errata") is None
+    assert gaz.search("Athens") is None
+    assert gaz.rank("Athens") == []
+
+
+def test_place_type_reranks_candidates(dumps, tmp_path):
+    gaz = _open(tmp_path)
+    # Island bonus (+4) lifts the island above the settlement's higher prior
+    assert gaz.rank("Halai", "Island") == [(5, 7.0), (1, 6.0)]
+    assert gaz.search("Halai", "Island") == "https://pleiades.stoa.org/places/5"
+    # A type without rules keeps the prior order
+    assert gaz.search("Halai", "Mountain") == "https://pleiades.stoa.org/places/1"
+
+
+def test_rebuilds_only_when_dump_or_scoring_changes(dumps, tmp_path, builds):
+    names, _ = dumps
+    first = _open(tmp_path).meta["build"]
+    assert len(builds) == 1
+
+    # Reopened, and touched with identical content: the index is reused
+    assert _open(tmp_path).meta["build"] == first
+    st = names.stat()
+    os.utime(names, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert _open(tmp_path).meta["build"] == first
+    assert len(builds) == 1
+
+    # Changed dump
+    _write_csv(names, NAMES + [{"pid": "/places/5", "locationPrecision": "precise", "nameTransliterated": "Nisos",
+                                "title": "", "nameAttested": ""}])
+    gaz = _open(tmp_path)
+    assert len(builds) == 2
+    assert gaz.meta["build"] != first
+    assert gaz.search("Nisos") == "https://pleiades.stoa.org/places/5"
+
+    # Changed scoring: islands outrank precise settlements
+    scoring = dict(load_scoring(None), feature_types={"island": 10})
+    gaz = _open(tmp_path, scoring)
+    assert len(builds) == 3
+    assert gaz.search("Halai") == "https://pleiades.stoa.org/places/5"
+    assert sorted(p.name for p in (tmp_path / "index").iterdir() if not p.name.startswith(gaz.meta["build"])) \
+        == ["meta.json"]
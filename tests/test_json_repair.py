@@ -0,0 +1,75 @@
+import pytest
+
+from source.json_repair import JSONRepairError, repair_json, salvage_response
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "x" "b": 2}', {"a": "x", "b": 2}),
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}),
+    ('["x" "y"]', ["x", "y"]),
+    ('{"a": {"b": 1} "c": 2}', {"a": {"b": 1}, "c": 2}),
+])
+def test_inserts_missing_comma(text, expected):
+    data, repairs = repair_json(text)
+    assert data == expected
+    assert "inserted missing comma" in repairs
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "he said "yes", then left"}', {"a": 'he said "yes", then left'}),
+    ('{"q": "say "hi" now", "b": 1}', {"q": 'say "hi" now', "b": 1}),
+])
+def test_escapes_inner_quotes(text, expected):
+    data, repairs = repair_json(text)
+    assert data == expected
+    assert "escaped quote" in repairs
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[1,2,3", [1, 2, 3]),
+    ('["a", "b"', ["a", "b"]),
+    ('{"a": {"b": 1', {"a": {"b": 1}}),
+    ('{"a": "x"', {"a": "x"}),
+])
+def test_truncation_keeps_complete_trailing_scalar(text, expected):
+    assert repair_json(text)[0] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[1,2,", [1, 2]),
+    ('{"a": 1, "b": "unfinished', {"a": 1}),
+    ('{"a": 1, "b": tr', {"a": 1}),
+    ('{"themes": [{"a": 1}, {"b": "x', {"themes": [{"a": 1}, {}]}),
+])
+def test_truncation_drops_partial_element(text, expected):
+    data, repairs = repair_json(text)
+    assert data == expected
+    assert any(r.startswith("closed") for r in repairs)
+
+
+def test_trailing_commas_and_surrounding_text():
+    data, repairs = repair_json('Here you go:\n{"a": [1, 2,], "b": 3,}\nThanks!')
+    assert data == {"a": [1, 2], "b": 3}
+    assert "dropped leading text" in repairs
+    assert "dropped trailing text" in repairs
+    assert "removed trailing comma" in repairs
+
+
+def test_raw_control_characters_in_strings():
+    assert repair_json('{"a": "line\nbreak\ttab"}')[0] == {"a": "line\nbreak\ttab"}
+
+
+def test_no_json_raises():
+    with pytest.raises(JSONRepairError):
+        repair_json("no structured output here")
+
+
+def test_salvage_keeps_empty_theme_list():
+    data, dropped = salvage_response({"themes": [], "entities": {"persons": [], "places": [], "deities": []}})
+    assert data["themes"] == []
+    assert dropped == []
+
+
+def test_salvage_raises_when_every_theme_is_invalid():
+    with pytest.raises(JSONRepairError):
+        salvage_response({"themes": [{"label": "no hierarchy"}]})
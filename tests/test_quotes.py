@@ -0,0 +1,23 @@
+from source.quotes import EXACT, AlignedText, fold
+
+TEXT = "ἔδοξεν τῆι βουλῆι καὶ τῶι δ[ήμωι] τῶν Ἀθηναίων"
+
+
+def test_iota_subscript_folds_to_adscript():
+    assert fold("τῷ δήμῳ") == fold("τῶι δήμωι")
+
+
+def test_span_closes_bracket_after_match_end():
+    aligned = AlignedText(TEXT)
+    match = aligned.locate("καὶ τῷ δήμῳ")
+    assert match.status == EXACT
+    assert TEXT[match.start:match.end] == "καὶ τῶι δ[ήμωι]"
+
+    match = aligned.locate("καὶ τῶι δήμω")
+    assert TEXT[match.start:match.end] == "καὶ τῶι δ[ήμωι]"
+
+
+def test_span_opens_bracket_before_match_start():
+    aligned = AlignedText(TEXT)
+    match = aligned.locate("μωι τῶν Ἀθηναίων")
+    assert TEXT[match.start:match.end] == "[ήμωι] τῶν Ἀθηναίων"
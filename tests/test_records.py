@@ -0,0 +1,121 @@
+import copy
+
+import pytest
+from pydantic import ValidationError
+
+from source.records import RecordError, TaggedRecord
+from source.schema import TaggedInscription
+
+DOC = {
+    "phi_id": 104,
+    "themes": [{
+        "label": "Decrees",
+        "hierarchy": {
+            "domain": "Content",
+            "subdomain": "Official and Legal Documents",
+            "category": "Decrees",
+            "subcategory": None,
+        },
+        "rationale": "Formal enactment of council and people.",
+        "confidence": 0.9,
+        "quote": "ἔδοχσεν τει βολει",
+        "quote_start": 2,
+        "quote_end": 19,
+        "is_ambiguous": False,
+        "ambiguity_note": None,
+    }],
+    "entities": {
+        "persons": [{"name": "Thrasybulus", "role": "Honoree", "uri": None, "confidence": 1.0,
+                     "entity_id": "person:thrasybulus", "canonical": "Thrasybulus"}],
+        "places": [{"name": "Athens", "type": "City", "uri": None, "confidence": 1.0,
+                    "entity_id": "place:athens", "canonical": "Athens"}],
+        "deities": [{"name": "Athena", "uri": None, "confidence": 0.8,
+                     "entity_id": "deity:athena", "canonical": "Athena"}],
+    },
+    "completeness": "fragmentary",
+    "provenance": [{"name": "Attica", "type": "Region", "uri": None, "role": "provenance",
+                    "confidence": 1.0, "entity_id": "place:attica", "canonical": "Attica"}],
+    "rationale": "Athenian decree.",
+    "model": "test",
+    "date_str": "410/09 a.",
+    "date_min": -410.0,
+    "date_max": -409.0,
+    "date_circa": False,
+}
+
+VALUES = [None, 0, 1, 1.0, 1.5, "x", "1", "1.0", "true", "No", True, False, [], {}]
+MISSING = object()
+
+
+def _paths(obj, prefix=()):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield prefix + (key,)
+            yield from _paths(value, prefix + (key,))
+    elif isinstance(obj, list) and obj:
+        yield prefix + (0,)
+        yield from _paths(obj[0], prefix + (0,))
+
+
+def _mutate(path, value):
+    doc = copy.deepcopy(DOC)
+    target = doc
+    for key in path[:-1]:
+        target = target[key]
+    if value is MISSING:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+    return doc
+
+
+def _pydantic_accepts(doc):
+    try:
+        TaggedInscription(**copy.deepcopy(doc))
+    except (ValidationError, TypeError):
+        return False
+    return True
+
+
+def _record_accepts(doc):
+    try:
+        TaggedRecord.from_dict(copy.deepcopy(doc))
+    except RecordError:
+        return False
+    return True
+
+
+def test_fixture_is_valid():
+    assert _pydantic_accepts(DOC)
+    assert _record_accepts(DOC)
+
+
+@pytest.mark.parametrize("path", [
+    ("themes",),
+    ("entities",),
+    ("entities", "persons"),
+    ("entities", "places"),
+    ("entities", "deities"),
+    ("provenance",),
+    ("themes", 0, "hierarchy", "domain"),
+])
+def test_explicit_null_is_rejected_but_absent_key_defaults(path):
+    assert not _record_accepts(_mutate(path, None))
+    assert _record_accepts(_mutate(path, MISSING)) == _pydantic_accepts(_mutate(path, MISSING))
+
+
+def test_absent_domain_falls_back_to_type():
+    doc = _mutate(("themes", 0, "hierarchy", "domain"), MISSING)
+    doc["themes"][0]["hierarchy"]["type"] = "Content"
+    assert TaggedRecord.from_dict(doc).themes[0].hierarchy.domain == "Content"
+
+
+def test_acceptance_matches_pydantic():
+    mismatches = []
+    for path in _paths(DOC):
+        values = VALUES if isinstance(path[-1], int) else VALUES + [MISSING]
+        for value in values:
+            doc = _mutate(path, value)
+            if _pydantic_accepts(doc) != _record_accepts(doc):
+                mismatches.append((path, value))
+    assert mismatches == []
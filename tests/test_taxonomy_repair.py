@@ -0,0 +1,60 @@
+import pytest
+
+from source.config import TAXONOMY_DIR
+from source.taxonomy_utils import get_taxonomy_index, load_taxonomy
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_taxonomy_index(load_taxonomy(TAXONOMY_DIR / "taxonomy.json"))
+
+
+def test_relocates_misplaced_category(index):
+    repair = index.repairer.repair(("Content", "Religious and Dedicatory Texts", "Decrees", None))
+    assert repair.hierarchy == ("Content", "Official and Legal Documents", "Decrees", None)
+
+
+def test_label_match_alone_does_not_relocate(index):
+    # Every given level contradicts Type > Material > Stone > Marble
+    hierarchy = ("Content", "Religious and Dedicatory Texts", "Bogus Thing", None)
+    assert index.repairer.relocate(hierarchy, "Marble") is None
+
+    theme = {"label": "Marble", "hierarchy": dict(zip(
+        ("domain", "subdomain", "category", "subcategory"), hierarchy))}
+    _, correction = index.prune(theme)
+    # Falls through to pruning instead of moving the theme into the Type domain
+    assert "Repaired" not in correction
+    assert theme["hierarchy"]["domain"] == "Content"
+    assert theme["label"] == "Marble"
+
+
+def test_no_cross_domain_relocation(index):
+    # The subdomain agrees with Type > Material > Stone > Marble, the domain does not
+    assert index.repairer.relocate(("Content", "Material", "Marmor", None), None) is None
+
+
+def _theme(label, *levels):
+    return {"label": label, "hierarchy": dict(zip(("domain", "subdomain", "category", "subcategory"), levels))}
+
+
+@pytest.mark.parametrize("theme", [
+    _theme("Decrees", "Content", "Official and Legal Documents", "Decrees", None),
+    _theme("Decrees", "Content", "Religious and Dedicatory Texts", "Decrees", None),
+    _theme("Rock-cut", "Type", "Object Type", "Monumental Stone Objects", "Rock-cut / Rupestral Inscriptions"),
+    _theme("Decrees", "Content", "Official and Legal Documents", "Bogus Thing", None),
+])
+def test_stream_check_accepts_repairable_paths(index, theme):
+    assert index.unrepairable(theme) is None
+
+
+def test_stream_check_rejects_unrepairable_path(index):
+    theme = _theme("Bogus", "Nonsense", "Made Up", "Bogus Thing", None)
+    assert index.unrepairable(theme)
+    assert index.prune(dict(theme, hierarchy=dict(theme["hierarchy"])))[0] is False
+
+
+def test_stream_check_does_not_modify_theme(index):
+    theme = _theme("Rock-cut", "Type", "Object Type", "Monumental Stone Objects", "Rock-cut / Rupestral Inscriptions")
+    index.unrepairable(theme)
+    assert theme == _theme("Rock-cut", "Type", "Object Type", "Monumental Stone Objects",
+                           "Rock-cut / Rupestral Inscriptions")